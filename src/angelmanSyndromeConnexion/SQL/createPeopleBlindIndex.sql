@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS T_People_BlindIndex (
+  person_id    BIGINT      NOT NULL,
+
+  -- HMAC-SHA256 (hex) du clair normalisé, cf. angelmanSyndromeConnexion/peopleBlindIndex.py
+  column_name  VARCHAR(64) NOT NULL,
+  bidx         CHAR(64)    NOT NULL,
+  version      CHAR(8)     NOT NULL,
+
+  CONSTRAINT pk_people_blindindex PRIMARY KEY (person_id, column_name),
+  INDEX idx_T_People_BlindIndex_bidx (column_name, bidx)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -38,4 +38,14 @@ class ValidationError(AppError):
 
 class BadLocalization(AppError):
     code = "badLocalizationGPS"
-    http_status = 400
\ No newline at end of file
+    http_status = 400
+
+
+class ServiceBusyError(AppError):
+    code = "service_busy"
+    http_status = 503  # Service Unavailable (+ Retry-After)
+
+    def __init__(self, message: str, retry_after: int = 1, details: dict | None = None):
+        super().__init__(message, details)
+        self.retry_after = retry_after
+        self.headers = {"Retry-After": str(retry_after)}
@@ -6,8 +6,10 @@ from sqlalchemy import text
 import unicodedata
 from tools.logger import setup_logger
 from tools.utilsTools import _run_query
-import tools.crypto_utils as crypto  # email_sha256, verify_password_argon2
+import tools.crypto_utils as crypto  # email_sha256
 from angelmanSyndromeConnexion.peopleUpdate import setLang
+from angelmanSyndromeConnexion.peoplePassword import verify_password, rehash_if_needed
+from angelmanSyndromeConnexion.error import ServiceBusyError
 
 logger = setup_logger(debug=False)
 
@@ -59,7 +61,9 @@ def authenticate_email_password(email: str, password: str, bAngelmanResult:bool)
         if not row:
             return False
         _pid, stored_hash_bytes = row
-        return bool(crypto.verify_password_argon2(password, stored_hash_bytes))
+        return bool(verify_password(password, stored_hash_bytes))
+    except ServiceBusyError:
+        raise   # 503 + Retry-After, pas "identifiants invalides"
     except Exception:
         logger.exception("authenticate_email_password échec")
         return False
@@ -68,16 +72,20 @@ def authenticate_email_password(email: str, password: str, bAngelmanResult:bool)
 def authenticate_and_get_id(email: str, password: str, lang:str, bAngelmanResult=False) -> Optional[int]:
     """
     Retourne l'ID de l'utilisateur si les identifiants sont valides, sinon None.
+    Après succès, le hash est refait s'il n'a plus les paramètres Argon2 courants.
     """
     try:
         row = _get_auth_row_by_email(email, bAngelmanResult=bAngelmanResult)
         if not row:
             return None
         pid, stored_hash_bytes = row
-        if crypto.verify_password_argon2(password, stored_hash_bytes):
+        if verify_password(password, stored_hash_bytes):
+            rehash_if_needed(pid, password, stored_hash_bytes, bAngelmanResult=bAngelmanResult)   # anciens paramètres Argon2
             setLang(pid, lang=lang)
             return pid
         return None
+    except ServiceBusyError:
+        raise   # 503 + Retry-After, pas "identifiants invalides"
     except Exception:
         logger.exception("authenticate_and_get_id échec")
         return None
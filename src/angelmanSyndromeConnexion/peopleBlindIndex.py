@@ -0,0 +1,76 @@
+# src/angelmanSyndromeConnexion/peopleBlindIndex.py
+"""
+Index aveugles de T_People_Identity (cf. tools.blind_index): recherche exacte par
+prénom / nom / génotype sans lire ni déchiffrer toute la table.
+
+Colonnes indexées et normalisation déclarées dans PEOPLE_INDEX ci-dessous
+(ajouter une colonne ou changer une règle = nouvelle version -> relancer le backfill).
+Maintenus par insertData / updateData (même transaction), supprimés par deleteDataById.
+Aucun DDL dans les requêtes: T_People_BlindIndex vient de SQL/createPeopleBlindIndex.sql
+(déploiement), et le backfill crée au besoin les tables d'index et de checkpoint.
+
+Backfill (depuis src/), reprenable après interruption:
+  python -m angelmanSyndromeConnexion.peopleBlindIndex backfill
+  python -m angelmanSyndromeConnexion.peopleBlindIndex backfill --batch 200 --restart
+  python -m angelmanSyndromeConnexion.peopleBlindIndex status
+"""
+from __future__ import annotations
+
+import sys
+import json
+import argparse
+
+from tools.blind_index import BlindIndex, IndexedColumn
+from tools.logger import setup_logger
+import tools.utilsTools as utils
+import tools.crypto_utils as crypto
+
+logger = setup_logger(debug=False)
+
+PEOPLE_INDEX = BlindIndex(
+    source_table="T_People_Identity",
+    index_table="T_People_BlindIndex",
+    key_column="person_id",
+    columns=[
+        IndexedColumn("firstname", strip_punctuation=True),
+        IndexedColumn("lastname", strip_punctuation=True),
+        IndexedColumn("genotype"),
+    ],
+)
+
+def find_person_ids(**criteria) -> list[int]:
+    """person_id dont tous les critères (clair, ex. lastname="Dupont") matchent exactement après normalisation."""
+    _, engine = utils._get_engine(bAngelmanResult=False)
+    return PEOPLE_INDEX.lookup(engine, criteria)
+
+
+def backfill(batch_size: int = 500, restart: bool = False, max_batches: int | None = None) -> dict:
+    _, engine = utils._get_engine(bAngelmanResult=False)
+    return PEOPLE_INDEX.backfill(engine, crypto.decrypt_bytes_to_str_strict,
+                                 batch_size=batch_size, restart=restart, max_batches=max_batches)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Index aveugles de T_People_Identity")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("backfill", help="(Re)calcule les index, reprend au dernier checkpoint")
+    b.add_argument("--batch", type=int, default=500)
+    b.add_argument("--restart", action="store_true", help="Ignore le checkpoint, repart du début")
+    b.add_argument("--max-batches", type=int)
+    sub.add_parser("status", help="Checkpoint de la version courante")
+    args = p.parse_args(argv)
+
+    if args.cmd == "backfill":
+        report = backfill(args.batch, args.restart, args.max_batches)
+    else:
+        _, engine = utils._get_engine(bAngelmanResult=False)
+        with engine.begin() as conn:
+            PEOPLE_INDEX.ensure_tables(conn)
+        with engine.connect() as conn:
+            report = PEOPLE_INDEX.checkpoint(conn) or {"version": PEOPLE_INDEX.version, "last_key": None}
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    return 0 if args.cmd == "status" or report.get("finished") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
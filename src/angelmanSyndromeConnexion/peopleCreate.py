@@ -4,9 +4,12 @@ import json
 from datetime import date, datetime, timezone
 from sqlalchemy import text
 from tools.logger import setup_logger
-from tools.utilsTools import _run_query, _run_in_transaction_with_conn
+from tools.utilsTools import _run_query
+from tools.unit_of_work import run_in_unit_of_work
 import tools.crypto_utils as crypto
 from angelmanSyndromeConnexion import error
+from angelmanSyndromeConnexion.peopleBlindIndex import PEOPLE_INDEX
+from angelmanSyndromeConnexion.peoplePassword import hash_password
 
 from angelmanSyndromeConnexion.utils_image import (
     coerce_to_date, detect_mime_from_bytes, normalize_mime, recompress_image
@@ -37,7 +40,8 @@ def create_person_and_identity(data) -> int:
     data = dict avec city, age, enc_* etc.
     Retourne person_id créé dans T_People_Public.
     """
-    def worker(conn):
+    def worker(uow):
+        conn = uow.conn  # connexion épinglée de l'unité de travail
 
         langUser = data["lang"]
         # 1) INSERT public
@@ -90,10 +94,14 @@ def create_person_and_identity(data) -> int:
                 "secret_ans": data["enc_secret_ans"],
             },
         )
+        # 3) Index aveugles (recherche exacte prénom / nom / génotype), même transaction
+        if data.get("blind_index"):
+            PEOPLE_INDEX.store(conn, int(pid), data["blind_index"])
+
         bulk_add_new_person_to_all_global_group_conversations_conn(conn,int(pid));
         return int(pid)
 
-    return _run_in_transaction_with_conn(worker,bAngelmanResult=False)
+    return run_in_unit_of_work(worker, bAngelmanResult=False, label="Create person")
 
 def insertData(
     gender,
@@ -186,6 +194,7 @@ def insertData(
         lat_enc = crypto.encrypt_number(latitude)
 
         em_sha  = crypto.email_sha256(emailAddress)
+        blind   = PEOPLE_INDEX.hashes({"firstname": firstname, "lastname": lastname, "genotype": genotype})
 
         # --- Secret Q/A ---
         try:
@@ -198,7 +207,7 @@ def insertData(
         secret_ans_enc = crypto.encrypt_str(reponseSecrete)   # chiffrée
 
         # -------- 4) Hachage mot de passe (Argon2id) --------
-        pwd_hash_bytes, pwd_meta = crypto.hash_password_argon2(password)
+        pwd_hash_bytes, pwd_meta = hash_password(password)   # pool Argon2 (503 si saturé)
         pwd_meta_json = json.dumps(pwd_meta, separators=(",", ":"))
         pwd_updated_at = datetime.now(timezone.utc).replace(tzinfo=None)  # DATETIME sans TZ
 
@@ -227,6 +236,7 @@ def insertData(
         data["enc_secret_ans"] = secret_ans_enc
         data["is_info"] = is_info
         data["lang"] = lang
+        data["blind_index"] = blind
 
         id = create_person_and_identity(data)
 
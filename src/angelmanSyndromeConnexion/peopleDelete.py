@@ -4,11 +4,11 @@ from sqlalchemy import text
 
 from tools.logger import setup_logger
 from tools.utilsTools import _run_query
+from tools.unit_of_work import run_in_unit_of_work
+from angelmanSyndromeConnexion.peopleBlindIndex import PEOPLE_INDEX
 
 logger = setup_logger(debug=False)
 
-from sqlalchemy import text
-
 def deleteDataById(person_id: int) -> int:
     """
     Supprime une personne + ses messages envoyés + conversations 1-1 (is_group=0) orphelines.
@@ -25,10 +25,9 @@ def deleteDataById(person_id: int) -> int:
     if not exists_rows:
         return 0
 
-    _run_query(text("START TRANSACTION"), bAngelmanResult=False)
-    try:
+    def worker(uow) -> int:
         # 1) Conserver la liste des conversations 1-1 où la personne est membre (avant suppression)
-        conv_rows = _run_query(
+        conv_rows = uow.execute(
             text("""
                 SELECT cm.conversation_id
                 FROM T_Conversation_Member cm
@@ -36,24 +35,21 @@ def deleteDataById(person_id: int) -> int:
                 WHERE cm.people_public_id = :id
                   AND c.is_group = 0
             """),
-            params={"id": pid},
+            {"id": pid},
             return_result=True,
-            bAngelmanResult=False
         )
         conv_ids = [r[0] if not isinstance(r, dict) else r["conversation_id"] for r in (conv_rows or [])]
 
         # 2) Supprimer les messages envoyés (sinon FK RESTRICT bloque)
-        _run_query(
+        uow.execute(
             text("DELETE FROM T_Message WHERE sender_people_id = :id"),
-            params={"id": pid},
-            bAngelmanResult=False
+            {"id": pid},
         )
 
         # 3) Supprimer le membership de la personne
-        _run_query(
+        uow.execute(
             text("DELETE FROM T_Conversation_Member WHERE people_public_id = :id"),
-            params={"id": pid},
-            bAngelmanResult=False
+            {"id": pid},
         )
 
         # 4) Supprimer les conversations 1-1 devenues invalides (≠ 2 membres)
@@ -62,7 +58,7 @@ def deleteDataById(person_id: int) -> int:
             placeholders = ", ".join([f":c{i}" for i in range(len(conv_ids))])
             params = {f"c{i}": conv_ids[i] for i in range(len(conv_ids))}
 
-            orphan_rows = _run_query(
+            orphan_rows = uow.execute(
                 text(f"""
                     SELECT cm.conversation_id
                     FROM T_Conversation_Member cm
@@ -72,9 +68,8 @@ def deleteDataById(person_id: int) -> int:
                     GROUP BY cm.conversation_id
                     HAVING COUNT(*) <> 2
                 """),
-                params=params,
+                params,
                 return_result=True,
-                bAngelmanResult=False
             )
             orphan_ids = [r[0] if not isinstance(r, dict) else r["conversation_id"] for r in (orphan_rows or [])]
 
@@ -83,29 +78,26 @@ def deleteDataById(person_id: int) -> int:
                 params2 = {f"d{i}": orphan_ids[i] for i in range(len(orphan_ids))}
 
                 # Supprimer la conversation -> cascade vers messages + members (et attachments/reactions via messages)
-                _run_query(
+                uow.execute(
                     text(f"DELETE FROM T_Conversation WHERE id IN ({placeholders2})"),
-                    params=params2,
-                    bAngelmanResult=False
+                    params2,
                 )
 
-        # 5) Supprimer l'identité (optionnel, car People_Public -> Identity est ON DELETE CASCADE)
-        _run_query(
+        # 5) Index aveugles (pas de FK vers l'identité)
+        PEOPLE_INDEX.delete(uow.conn, pid)
+
+        # 5bis) Supprimer l'identité (optionnel, car People_Public -> Identity est ON DELETE CASCADE)
+        uow.execute(
             text("DELETE FROM T_People_Identity WHERE person_id = :id"),
-            params={"id": pid},
-            bAngelmanResult=False
+            {"id": pid},
         )
 
         # 6) Supprimer la personne
-        _run_query(
+        uow.execute(
             text("DELETE FROM T_People_Public WHERE id = :id"),
-            params={"id": pid},
-            bAngelmanResult=False
+            {"id": pid},
         )
-
-        _run_query(text("COMMIT"), bAngelmanResult=False)
         return 1
 
-    except Exception:
-        _run_query(text("ROLLBACK"), bAngelmanResult=False)
-        raise
+    # Une seule connexion / transaction pour tout: COMMIT à la fin, ROLLBACK sur erreur
+    return run_in_unit_of_work(worker, bAngelmanResult=False, label=f"Delete person {pid}")
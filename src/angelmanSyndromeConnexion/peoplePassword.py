@@ -0,0 +1,137 @@
+# src/angelmanSyndromeConnexion/peoplePassword.py
+"""
+Hachage / vérification des mots de passe (Argon2id) via le pool borné tools.password_pool,
+hors du thread de la requête. Pool saturé ou délai dépassé -> error.ServiceBusyError
+(503 + Retry-After via les handlers d'AppError).
+
+Paramètres Argon2 courants: crypto_utils (Config4.ini [Argon2], cf. tools.argon2_calibrate).
+Chaque hash PHC porte les siens: au login réussi, rehash_if_needed refait le hash aux
+paramètres courants; le rapport compte les comptes encore sur d'anciens paramètres.
+
+Depuis src/:
+  python -m angelmanSyndromeConnexion.peoplePassword report
+"""
+from __future__ import annotations
+
+import sys
+import json
+import argparse
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from tools.logger import setup_logger
+from tools.utilsTools import _run_query
+from tools.unit_of_work import run_in_unit_of_work
+import tools.crypto_utils as crypto
+from tools import password_pool
+from tools.password_pool import PoolBusyError
+from angelmanSyndromeConnexion import error
+
+logger = setup_logger(debug=False)
+
+
+def hash_password(password: str) -> tuple[bytes, dict]:
+    try:
+        return password_pool.hash_password(password)
+    except PoolBusyError as e:
+        logger.warning("Hachage refusé: %s", e)
+        raise error.ServiceBusyError("Service momentanément surchargé, réessayez", retry_after=e.retry_after) from e
+
+
+def verify_password(password: str, stored_hash_bytes: bytes) -> bool:
+    try:
+        return password_pool.verify_password(password, stored_hash_bytes)
+    except PoolBusyError as e:
+        logger.warning("Vérification refusée: %s", e)
+        raise error.ServiceBusyError("Service momentanément surchargé, réessayez", retry_after=e.retry_after) from e
+
+
+def rehash_if_needed(person_id: int, password: str, stored_hash_bytes: bytes, bAngelmanResult=False) -> bool:
+    """
+    À appeler juste après une vérification RÉUSSIE: si le hash stocké n'a pas les paramètres
+    courants, le refait et l'enregistre (seulement s'il n'a pas changé entre-temps).
+    Jamais bloquant pour le login: pool saturé ou erreur SQL -> False, on réessaiera au prochain.
+    """
+    if not crypto.password_needs_rehash(stored_hash_bytes):
+        return False
+    try:
+        new_hash, meta = hash_password(password)
+    except error.ServiceBusyError:
+        logger.info("Rehash de %s reporté (pool Argon2 saturé)", person_id)
+        return False
+
+    def worker(uow) -> bool:
+        res = uow.execute(text("""
+            UPDATE T_People_Identity
+               SET password_hash = :new_hash,
+                   password_algo = :algo,
+                   password_meta = CAST(:meta AS JSON),
+                   password_updated_at = :updated_at
+             WHERE person_id = :id
+               AND password_hash = :old_hash
+        """), {"new_hash": new_hash, "algo": meta["algo"], "meta": json.dumps(meta, separators=(",", ":")),
+               "updated_at": datetime.now(timezone.utc).replace(tzinfo=None),
+               "id": int(person_id), "old_hash": bytes(stored_hash_bytes)})
+        return res.rowcount == 1
+
+    try:
+        done = run_in_unit_of_work(worker, bAngelmanResult=bAngelmanResult, label=f"Rehash password {person_id}")
+    except Exception:
+        logger.exception("Rehash du mot de passe de %s échoué", person_id)
+        return False
+    if done:
+        logger.info("Mot de passe de %s rehaché: %s -> %s", person_id,
+                    _params_label(crypto.argon2_hash_params(stored_hash_bytes)), _params_label(meta))
+    return done
+
+
+def _params_label(prm: dict | None) -> str:
+    if not prm:
+        return "illisible"
+    return f"{prm['algo']} v={prm['v']} m={prm['m']} t={prm['t']} p={prm['p']}"
+
+
+def legacy_report(bAngelmanResult=False) -> dict:
+    """Comptes par jeu de paramètres Argon2 (lus dans les hashs PHC), courants vs anciens."""
+    rows = _run_query(
+        text("SELECT password_hash FROM T_People_Identity"),
+        return_result=True,
+        bAngelmanResult=bAngelmanResult,
+    ) or []
+    current = crypto.argon2_params()
+    by_params: Counter = Counter()
+    no_hash = 0
+    for (phc,) in rows:
+        if not phc:
+            no_hash += 1
+            continue
+        by_params[_params_label(crypto.argon2_hash_params(phc))] += 1
+    cur_label = _params_label(current)
+    hashed = sum(by_params.values())
+    up_to_date = by_params.get(cur_label, 0)
+    return {
+        "current": cur_label,
+        "accounts": len(rows),
+        "no_password": no_hash,
+        "up_to_date": up_to_date,
+        "legacy": hashed - up_to_date,
+        "legacy_ratio": round((hashed - up_to_date) / hashed, 4) if hashed else 0.0,
+        "by_params": [{"params": k, "accounts": n, "current": k == cur_label} for k, n in by_params.most_common()],
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Mots de passe Argon2 de T_People_Identity")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("report", help="Comptes encore sur d'anciens paramètres Argon2")
+    args = p.parse_args(argv)
+
+    if args.cmd == "report":
+        print(json.dumps(legacy_report(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,7 @@ import time
 from angelmanSyndromeConnexion.geo_utils3 import countries_from_iso2_list_sorted_dict, languages_from_code_list_sorted_dict
 from angelmanSyndromeConnexion.models.people_public import PeoplePublic
 from sqlalchemy import select, distinct
+from angelmanSyndromeConnexion.peopleBlindIndex import PEOPLE_INDEX
 logger = setup_logger(debug=False)
 
 
@@ -167,15 +168,7 @@ def fetch_person_decrypted_simple(person_id: int) -> dict | None:
         "latitude" : lat,
     }
 
-def getRecordsPeople():
-
-    #Only need City, Id, Firstname, LastName, Genotype
-    t0 = time.perf_counter()
-    logger.info("[V5][MAP] getRecordsPeople() start")
-
-    t_db0 = time.perf_counter()
-    rows = _run_query(
-        text("""
+_RECORDS_SELECT = """
             SELECT
                 p.id,
                 p.city,
@@ -192,22 +185,13 @@ def getRecordsPeople():
             FROM T_People_Public   AS p
             INNER JOIN T_People_Identity AS i
                 ON i.person_id = p.id
-            ORDER BY p.id
-        """),
-        return_result=True,
-        bAngelmanResult=False,
-    )
+"""
 
-    t_db1 = time.perf_counter()
-    logger.info(
-        "[V5][MAP] Private rows fetched: %d in %.3fs",
-        len(rows),
-        t_db1 - t_db0,
-    )
+_RECORDS_COLUMNS = ["id","firstname","lastname","city","country", "country_code", "lang", "is_connected", "age","genotype","longitude","latitude"]
 
-    data = []
 
-    decrypt_start = time.perf_counter()
+def _records_frame(rows) -> pd.DataFrame:
+    data = []
     for row in rows:
 
         # Compatibilité selon la version de SQLAlchemy
@@ -245,7 +229,30 @@ def getRecordsPeople():
             "latitude": lat,
         })
 
-    df = pd.DataFrame(data, columns=["id","firstname","lastname","city","country", "country_code", "lang", "is_connected", "age","genotype","longitude","latitude"])
+    return pd.DataFrame(data, columns=_RECORDS_COLUMNS)
+
+def getRecordsPeople():
+
+    #Only need City, Id, Firstname, LastName, Genotype
+    t0 = time.perf_counter()
+    logger.info("[V5][MAP] getRecordsPeople() start")
+
+    t_db0 = time.perf_counter()
+    rows = _run_query(
+        text(_RECORDS_SELECT + "            ORDER BY p.id\n"),
+        return_result=True,
+        bAngelmanResult=False,
+    )
+
+    t_db1 = time.perf_counter()
+    logger.info(
+        "[V5][MAP] Private rows fetched: %d in %.3fs",
+        len(rows),
+        t_db1 - t_db0,
+    )
+
+    decrypt_start = time.perf_counter()
+    df = _records_frame(rows)
 
     decrypt_end = time.perf_counter()
     logger.info(
@@ -259,6 +266,37 @@ def getRecordsPeople():
 
     return df
 
+def findPeople(*, firstname=None, lastname=None, genotype=None, city=None) -> pd.DataFrame:
+    """
+    Recherche exacte (mêmes colonnes que getRecordsPeople), sans lire toute la table:
+    prénom / nom / génotype via les index aveugles (normalisés: casse, accents, espaces),
+    joints dans la même requête; city en clair sur T_People_Public.
+    Seules les lignes trouvées sont déchiffrées.
+    """
+    criteria = {k: v for k, v in (("firstname", firstname), ("lastname", lastname), ("genotype", genotype))
+                if v is not None}
+    if not criteria and city is None:
+        raise ValueError("findPeople: au moins un critère")
+
+    sql, params = _RECORDS_SELECT, {}
+    if criteria:
+        match = PEOPLE_INDEX.match_subquery(criteria)
+        if match is None:
+            return pd.DataFrame(columns=_RECORDS_COLUMNS)
+        sql += f"            INNER JOIN ({match[0]}) AS bi\n                ON bi.{PEOPLE_INDEX.key_column} = p.id\n"
+        params.update(match[1])
+    if city is not None:
+        sql += "            WHERE p.city = :city\n"
+        params["city"] = city.strip()
+
+    rows = _run_query(
+        text(sql + "            ORDER BY p.id\n"),
+        return_result=True,
+        params=params,
+        bAngelmanResult=False,
+    )
+    return _records_frame(rows)
+
 def getLang(session, idPeople: int) -> str | None:
     stmt = select(PeoplePublic.lang).where(PeoplePublic.id == idPeople)
     return session.execute(stmt).scalar_one_or_none()
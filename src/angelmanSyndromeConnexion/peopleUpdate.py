@@ -7,6 +7,7 @@ from sqlalchemy import text
 
 from tools.logger import setup_logger
 from tools.utilsTools import _run_query
+from tools.unit_of_work import run_in_unit_of_work
 import tools.crypto_utils as crypto
 
 from angelmanSyndromeConnexion import error
@@ -16,6 +17,8 @@ from angelmanSyndromeConnexion.utils_image import (
     coerce_to_date, detect_mime_from_bytes, normalize_mime, recompress_image
 )
 from angelmanSyndromeConnexion.peopleRead import giveId, fetch_person_decrypted_simple
+from angelmanSyndromeConnexion.peoplePassword import hash_password
+from angelmanSyndromeConnexion.peopleBlindIndex import PEOPLE_INDEX
 from angelmanSyndromeConnexion.models.people_public import PeoplePublic
 from app.db import get_session
 from angelmanSyndromeConnexion.geo_utils3 import get_place_here
@@ -27,6 +30,11 @@ _cfg.read(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "a
 _PUBLIC_KEY = (_cfg.get("PUBLIC", "APP_HERE_KEY", fallback="") or "").strip()
 
 
+# colonnes chiffrées de T_People_Identity dont le clair peut être dans crypto.decrypt_cache
+_CACHED_COLUMNS = ("firstname", "lastname", "emailAddress", "dateOfBirth", "genotype",
+                   "longitude", "latitude", "secret_question", "secret_answer")
+
+
 def _to_float_or_none(v):
     if v in (None, "", "null"):
         return None
@@ -132,6 +140,11 @@ def updateData(
         ident_sets.append("genotype = :gt")
         ident_params["gt"] = crypto.encrypt_str(genotype)
 
+    # index aveugles des colonnes modifiées (même transaction que l'UPDATE chiffré)
+    blind = PEOPLE_INDEX.hashes({k: v for k, v in
+                                 (("firstname", firstname), ("lastname", lastname), ("genotype", genotype))
+                                 if v is not None})
+
     # email → chiffré + sha
     if emailNewAddress is not None:
         ident_sets += ["emailAddress = :em", "email_sha = :email_sha"]
@@ -167,7 +180,7 @@ def updateData(
 
     # password (Argon2)
     if password is not None:
-        pwd_hash_bytes, pwd_meta = crypto.hash_password_argon2(password)
+        pwd_hash_bytes, pwd_meta = hash_password(password)   # pool Argon2 (503 si saturé)
         ident_sets += [
             "password_hash = :pwd_hash",
             "password_algo = :pwd_algo",
@@ -264,40 +277,45 @@ def updateData(
     public_sets.append("is_info = :is_info")
     public_params["is_info"] = is_info
 
-    # 5) Exécutions SQL (seulement s’il y a quelque chose à modifier)
-    affected = 0
-
-    if ident_sets:
-        sql_ident = text(f"""
-            UPDATE T_People_Identity
-               SET {", ".join(ident_sets)}
-             WHERE person_id = :id
-             LIMIT 1
-        """)
-        try:
-            _run_query(sql_ident, params=ident_params,bAngelmanResult=False)
-            affected = 1
-        except Exception:
-            logger.exception("Update failed (Identity)")
-            # on continue pour tenter la partie publique si souhaité, sinon return 0
-            return 0
-
-    if public_sets:
-        sql_public = text(f"""
-            UPDATE T_People_Public
-               SET {", ".join(public_sets)}
-             WHERE id = :id
-             LIMIT 1
-        """)
-        try:
-            _run_query(sql_public, params=public_params,bAngelmanResult=False)
-            affected = 1
-        except Exception:
-            logger.exception("Update failed (Public)")
-            return 0
-
     if not ident_sets and not public_sets:
         logger.info("Aucun champ fourni pour update (id=%s)", pid)
         return 0
 
-    return affected
\ No newline at end of file
+    # anciens jetons des colonnes chiffrées modifiées: retirés du cache de déchiffrement après commit
+    # (vie privée: l'ancien clair ne reste pas en mémoire jusqu'au TTL)
+    cached_cols = [c for c in (s.split(" = ")[0] for s in ident_sets) if c in _CACHED_COLUMNS]
+    stale_tokens: list = []
+
+    # 5) Exécutions SQL: les deux tables dans UNE transaction (tout ou rien)
+    def worker(uow) -> int:
+        stale_tokens.clear()
+        if cached_cols and crypto.decrypt_cache.enabled:
+            rows = uow.execute(text(f"SELECT {', '.join(cached_cols)} FROM T_People_Identity WHERE person_id = :id"),
+                               {"id": pid}, return_result=True)
+            stale_tokens.extend(v for r in rows for v in r)
+        if ident_sets:
+            uow.execute(text(f"""
+                UPDATE T_People_Identity
+                   SET {", ".join(ident_sets)}
+                 WHERE person_id = :id
+                 LIMIT 1
+            """), ident_params)
+        if blind:
+            PEOPLE_INDEX.store(uow.conn, pid, blind)
+
+        if public_sets:
+            uow.execute(text(f"""
+                UPDATE T_People_Public
+                   SET {", ".join(public_sets)}
+                 WHERE id = :id
+                 LIMIT 1
+            """), public_params)
+        return 1
+
+    try:
+        n = run_in_unit_of_work(worker, bAngelmanResult=False, label=f"Update person {pid}")
+    except Exception:
+        logger.exception("Update failed (Identity/Public), rollback")
+        return 0
+    crypto.decrypt_cache.invalidate(stale_tokens)
+    return n
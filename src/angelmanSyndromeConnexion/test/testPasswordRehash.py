@@ -0,0 +1,164 @@
+"""
+Test des paramètres Argon2 (crypto_utils + tools.argon2_calibrate) et du rehash au login
+(angelmanSyndromeConnexion.peoplePassword), sur une base SQLite jetable:
+
+  - paramètres portés par les hashs stockés (argon2_hash_params), meta = paramètres courants
+  - rapport: comptes sur d'anciens paramètres / à jour / sans mot de passe
+  - login réussi sur un ancien hash -> rehash aux paramètres courants; mauvais mot de passe: rien
+  - rehash jamais bloquant: hash changé entre-temps, pool saturé
+  - changement des paramètres courants -> les hashs deviennent "anciens"
+  - calibrage: jeu retenu = le plus coûteux sous la cible, aucun si cible intenable
+
+  python angelmanSyndromeConnexion/test/testPasswordRehash.py
+"""
+import sys, os
+import time
+import tempfile
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from argon2 import PasswordHasher
+from sqlalchemy import create_engine, text
+
+from tools.logger import setup_logger
+import tools.utilsTools as utils
+import tools.unit_of_work as uow_mod
+import tools.crypto_utils as crypto
+import tools.argon2_calibrate as calib
+import angelmanSyndromeConnexion.peopleAuth as people_auth
+import angelmanSyndromeConnexion.peoplePassword as people_pwd
+from angelmanSyndromeConnexion import error
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+PWD = "S3cret!pwd"
+LEGACY = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1)
+
+SCHEMA = """CREATE TABLE T_People_Identity (person_id INTEGER PRIMARY KEY, email_sha BLOB UNIQUE,
+            password_hash BLOB, password_algo TEXT, password_meta TEXT, password_updated_at TEXT)"""
+
+
+def _seed(engine):
+    accounts = [
+        (1, "legacy1@example.org", LEGACY.hash(PWD).encode()),
+        (2, "legacy2@example.org", LEGACY.hash(PWD).encode()),
+        (3, "current@example.org", crypto.hash_password_argon2(PWD)[0]),
+        (4, "nopwd@example.org", None),
+    ]
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA))
+        for pid, email, phc in accounts:
+            conn.execute(text("INSERT INTO T_People_Identity (person_id, email_sha, password_hash) VALUES (:id, :sha, :h)"),
+                         {"id": pid, "sha": crypto.email_sha256(email), "h": phc})
+
+
+def _row(engine, pid):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT password_hash, password_algo FROM T_People_Identity WHERE person_id = :id"),
+                            {"id": pid}).one()
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_params():
+    phc, meta = crypto.hash_password_argon2(PWD)
+    assert crypto.argon2_hash_params(phc) == meta == crypto.argon2_params(), (meta, crypto.argon2_hash_params(phc))
+    assert crypto.argon2_hash_params(LEGACY.hash(PWD))["m"] == 8192
+    assert crypto.argon2_hash_params(b"pas un hash") is None
+    assert crypto.password_needs_rehash(LEGACY.hash(PWD).encode()) and not crypto.password_needs_rehash(phc)
+    logger.info("✅ paramètres portés par les hashs: %s", meta)
+
+
+def test_report_and_login_rehash(engine):
+    rep = people_pwd.legacy_report()
+    assert (rep["accounts"], rep["legacy"], rep["up_to_date"], rep["no_password"]) == (4, 2, 1, 1), rep
+    assert rep["by_params"][0]["params"].endswith("m=8192 t=1 p=1") and not rep["by_params"][0]["current"], rep
+
+    old, _ = _row(engine, 1)
+    assert people_auth.authenticate_and_get_id("legacy1@example.org", "mauvais", lang="fr") is None
+    assert _row(engine, 1)[0] == old                                   # échec: pas de rehash
+    assert people_auth.authenticate_and_get_id("legacy1@example.org", PWD, lang="fr") == 1
+    new, algo = _row(engine, 1)
+    assert new != old and crypto.argon2_hash_params(new) == crypto.argon2_params(), new
+    assert algo == "argon2id", algo      # password_meta: CAST(... AS JSON) MySQL, pas relu sous SQLite
+    assert people_auth.authenticate_and_get_id("legacy1@example.org", PWD, lang="fr") == 1
+    assert _row(engine, 1)[0] == new                                   # déjà à jour: inchangé
+
+    rep = people_pwd.legacy_report()
+    assert (rep["legacy"], rep["up_to_date"]) == (1, 2), rep
+    logger.info("✅ login: ancien hash refait aux paramètres courants, rapport %s", {k: rep[k] for k in ("legacy", "up_to_date")})
+
+
+def test_rehash_never_blocks(engine):
+    stale = LEGACY.hash(PWD).encode()                  # plus celui de la base (changé entre-temps)
+    assert people_pwd.rehash_if_needed(2, PWD, stale) is False
+    assert crypto.argon2_hash_params(_row(engine, 2)[0])["m"] == 8192
+
+    orig = people_pwd.hash_password
+    def _busy(password):
+        raise error.ServiceBusyError("saturé", retry_after=2)
+    people_pwd.hash_password = _busy
+    try:
+        assert people_auth.authenticate_and_get_id("legacy2@example.org", PWD, lang="fr") == 2
+    finally:
+        people_pwd.hash_password = orig
+    assert crypto.argon2_hash_params(_row(engine, 2)[0])["m"] == 8192  # reporté au prochain login
+    logger.info("✅ rehash non bloquant: hash changé entre-temps / pool saturé -> login OK, rehash reporté")
+
+
+def test_params_change(engine):
+    saved = crypto.argon2_params()
+    crypto.set_argon2_params(3, 12288, 1)
+    try:
+        assert people_pwd.legacy_report()["up_to_date"] == 0
+        assert people_auth.authenticate_and_get_id("current@example.org", PWD, lang="fr") == 3
+        assert crypto.argon2_hash_params(_row(engine, 3)[0])["t"] == 3
+        assert people_pwd.legacy_report()["up_to_date"] == 1
+    finally:
+        crypto.set_argon2_params(saved["t"], saved["m"], saved["p"])
+    logger.info("✅ nouveaux paramètres courants: les anciens hashs sont refaits au login")
+
+
+def test_calibrate():
+    rep = calib.calibrate(target_ms=10_000, max_memory_mib=64, memory_kib=[4096, 7168, 19456],
+                          max_t=2, rounds=1, workers=2)
+    grid = [(r["m"], r["t"]) for r in rep["candidates"]]
+    assert grid == [(19456, 2)], grid                       # m < 7 MiB et m*t < OWASP écartés
+    assert (rep["recommended"]["m"], rep["recommended"]["t"]) == (19456, 2)
+    none = calib.calibrate(target_ms=0.001, max_memory_mib=64, memory_kib=[19456], max_t=3, rounds=1, workers=1)
+    assert none["recommended"] is None and len(none["candidates"]) == 1   # arrêt au premier trop lent
+    capped = calib.calibrate(target_ms=10_000, max_memory_mib=30, memory_kib=[19456], max_t=2, rounds=1, workers=2)
+    assert capped["candidates"] == []                       # 2 workers x 19 MiB > 30 MiB
+    logger.info("✅ calibrage: %s", rep["recommended"])
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'pwd.sqlite')}", future=True)
+        orig = (utils._get_engine, uow_mod._get_engine, people_auth.setLang)
+        utils._get_engine = uow_mod._get_engine = lambda **kw: ("sqlite_test", engine)
+        people_auth.setLang = lambda pid, lang: None
+        try:
+            _seed(engine)
+            test_params()
+            test_report_and_login_rehash(engine)
+            test_rehash_never_blocks(engine)
+            test_params_change(engine)
+            test_calibrate()
+        except Exception:
+            logger.exception("❌ Test rehash Argon2 KO")
+            raise
+        finally:
+            utils._get_engine, uow_mod._get_engine, people_auth.setLang = orig
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
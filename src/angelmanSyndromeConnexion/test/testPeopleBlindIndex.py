@@ -0,0 +1,282 @@
+"""
+Test des index aveugles de T_People_Identity (tools.blind_index + peopleBlindIndex).
+
+Base SQLite jetable à la place de MySQL, vrais insertData / updateData / deleteDataById
+(géocodage HERE et conversations de groupe neutralisés):
+  - normalisation par colonne (casse, accents, espaces, ponctuation)
+  - insertData / updateData maintiennent l'index dans la même transaction
+  - findPeople: recherche exacte en UNE requête (index joint), seules les lignes trouvées sont déchiffrées
+  - GET /people/search (blueprint privé, Basic Auth): 401 sans identifiants, critère manquant -> 400, erreur -> 500
+  - backfill reprenable: arrêt au milieu, reprise au checkpoint, valeur indéchiffrable comptée
+  - changement de HMAC_KEY: nouvelle version, le backfill réindexe tout
+  - deleteDataById supprime l'index
+
+  python angelmanSyndromeConnexion/test/testPeopleBlindIndex.py
+"""
+import sys, os
+import time
+import base64
+import tempfile
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+
+from tools.logger import setup_logger
+import tools.utilsTools as utils
+import tools.unit_of_work as uow_mod
+import tools.crypto_utils as crypto
+from tools.blind_index import IndexedColumn, CHECKPOINT_TABLE
+import angelmanSyndromeConnexion.peopleCreate as people_create
+import angelmanSyndromeConnexion.peopleBlindIndex as people_index
+from angelmanSyndromeConnexion.peopleBlindIndex import PEOPLE_INDEX
+from angelmanSyndromeConnexion.peopleCreate import insertData
+from angelmanSyndromeConnexion.peopleUpdate import updateData
+from angelmanSyndromeConnexion.peopleDelete import deleteDataById
+from angelmanSyndromeConnexion.peopleRead import findPeople
+from angelmanSyndromeConnexion.geo_utils3 import GeoPlace
+import bcrypt
+import app.common.basic_auth as basic_auth
+import app.v5.people as people_api
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+SCHEMA = [
+    """CREATE TABLE T_People_Public (id INTEGER PRIMARY KEY AUTOINCREMENT, gender TEXT, city TEXT, country TEXT,
+       country_code TEXT, lang TEXT, age_years INTEGER, pseudo TEXT, status TEXT DEFAULT 'active',
+       is_connected INTEGER DEFAULT 0, is_info INTEGER DEFAULT 0)""",
+    """CREATE TABLE T_People_Identity (person_id INTEGER PRIMARY KEY, firstname BLOB, lastname BLOB,
+       emailAddress BLOB, dateOfBirth BLOB, genotype BLOB, longitude BLOB, latitude BLOB, photo BLOB,
+       photo_mime TEXT, email_sha BLOB UNIQUE, password_hash BLOB, password_algo TEXT, password_meta TEXT,
+       password_updated_at TEXT, secret_question BLOB, secret_answer BLOB)""",
+    "CREATE TABLE T_Conversation (id INTEGER PRIMARY KEY, is_group INTEGER)",
+    "CREATE TABLE T_Conversation_Member (conversation_id INTEGER, people_public_id INTEGER)",
+    "CREATE TABLE T_Message (id INTEGER PRIMARY KEY, conversation_id INTEGER, sender_people_id INTEGER)",
+]
+
+PEOPLE = [
+    ("F", "Élodie", "Dupont", "elodie@example.org", "Deletion", "Lyon"),
+    ("M", "Jean-Pierre", "Dupont", "jp@example.org", "UPD", "Paris"),
+    ("F", "Ana", "García", "ana@example.org", "Deletion", "Madrid"),
+]
+
+
+class _Patched:
+    """Redirige _get_engine (utilsTools + unit_of_work) vers SQLite, coupe HERE et les conversations de groupe."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.city = "Lyon"
+
+    def __enter__(self):
+        self._orig = (utils._get_engine, uow_mod._get_engine, people_create.get_place_here,
+                      people_create.bulk_add_new_person_to_all_global_group_conversations_conn)
+        fake = lambda **kw: ("sqlite_test", self.engine)
+        utils._get_engine = uow_mod._get_engine = fake
+        people_create.get_place_here = lambda lat, lon, key: GeoPlace(self.city, "France", "FR")
+        people_create.bulk_add_new_person_to_all_global_group_conversations_conn = lambda conn, pid: None
+        return self
+
+    def __exit__(self, *exc):
+        (utils._get_engine, uow_mod._get_engine, people_create.get_place_here,
+         people_create.bulk_add_new_person_to_all_global_group_conversations_conn) = self._orig
+
+
+class _Decrypts:
+    """Compte les déchiffrements crypto.decrypt_bytes_to_str_strict."""
+
+    def __enter__(self):
+        self.n, self._orig = 0, crypto.decrypt_bytes_to_str_strict
+        def _counted(b):
+            self.n += 1
+            return self._orig(b)
+        crypto.decrypt_bytes_to_str_strict = _counted
+        return self
+
+    def __exit__(self, *exc):
+        crypto.decrypt_bytes_to_str_strict = self._orig
+
+
+def _index_rows(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {PEOPLE_INDEX.index_table}")).scalar()
+
+
+def _names(df) -> list:
+    return sorted(df["firstname"].tolist())
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_normalization():
+    name = IndexedColumn("lastname", strip_punctuation=True)
+    assert name.normalize("  Élodie\t ") == name.normalize("elodie") == "elodie"
+    assert name.normalize("Jean-Pierre") == name.normalize("jean  pierre") == "jean pierre"
+    assert name.normalize("   ") is None and name.normalize(None) is None
+    exact = IndexedColumn("lastname", casefold=False, strip_accents=False)
+    assert exact.normalize(" Élodie ") == "Élodie" and exact.version != name.version
+    assert PEOPLE_INDEX.blind("lastname", "GARCIA") == PEOPLE_INDEX.blind("lastname", "García ")
+    assert PEOPLE_INDEX.blind("lastname", "Dupont") != PEOPLE_INDEX.blind("firstname", "Dupont")
+    logger.info("✅ normalisation par colonne (casse, accents, espaces, ponctuation) et version des règles")
+
+
+def test_insert_and_find(engine, patched):
+    for gender, fn, ln, em, gt, city in PEOPLE:
+        patched.city = city
+        insertData(gender, fn, ln, em, "2015-03-02", gt, None, 4.8, 45.7, "S3cret!pwd", 1, "chat", 0, "fr")
+    assert _index_rows(engine) == 3 * len(PEOPLE)
+
+    sql = []
+    hook = lambda conn, cursor, statement, *a: sql.append(statement)
+    event.listen(engine, "before_cursor_execute", hook)
+    try:
+        with _Decrypts() as dec:
+            df = findPeople(lastname="DUPONT ")
+    finally:
+        event.remove(engine, "before_cursor_execute", hook)
+    assert _names(df) == ["Jean-Pierre", "Élodie"], df
+    assert len(sql) == 1 and PEOPLE_INDEX.index_table in sql[0] and " IN (" not in sql[0], sql   # index joint
+    assert dec.n == 3 * 2, dec.n      # firstname/lastname/genotype des 2 lignes trouvées, rien d'autre
+    assert _names(findPeople(firstname="elodie")) == ["Élodie"]
+    assert _names(findPeople(firstname="jean pierre", lastname="dupont")) == ["Jean-Pierre"]
+    assert _names(findPeople(genotype="deletion")) == ["Ana", "Élodie"]
+    assert _names(findPeople(genotype="Deletion", city="Madrid")) == ["Ana"]
+    assert findPeople(lastname="Martin").empty and findPeople(lastname="  ").empty
+    logger.info("✅ insertData indexe, findPeople: recherche exacte, %d déchiffrements", dec.n)
+
+
+def test_update(engine):
+    assert updateData("ana@example.org", lastname="Gómez", is_info=False) == 1
+    assert findPeople(lastname="garcia").empty
+    assert _names(findPeople(lastname="GOMEZ")) == ["Ana"]
+    assert _names(findPeople(genotype="deletion")) == ["Ana", "Élodie"]   # colonnes non modifiées intactes
+    logger.info("✅ updateData: index des colonnes modifiées remplacés")
+
+
+def test_search_endpoint():
+    app = Flask(__name__)
+    app.register_blueprint(people_api.bp)
+    client = app.test_client()
+    orig = (basic_auth._BASIC_USER, basic_auth._BASIC_PASS_HASH, people_api.findPeople)
+    basic_auth._BASIC_USER = "tester"
+    basic_auth._BASIC_PASS_HASH = bcrypt.hashpw(b"pw", bcrypt.gensalt(rounds=4)).decode()
+    try:
+        internal = {"X-Internal-Call": "1"}
+        auth = {**internal, "Authorization": "Basic " + base64.b64encode(b"tester:pw").decode()}
+        assert client.get("/people/search?lastname=dupont", headers=internal).status_code == 401
+        assert client.get("/people/search?lastname=dupont",
+                          headers={"Authorization": auth["Authorization"]}).status_code == 401   # pas d'appel interne
+        r = client.get("/people/search?lastname=DUPONT", headers=auth)
+        assert r.status_code == 200 and sorted(p["firstname"] for p in r.get_json()) == ["Jean-Pierre", "Élodie"], r.get_json()
+        r = client.get("/people/search?genotype=deletion&city=Madrid", headers=auth)
+        assert [p["firstname"] for p in r.get_json()] == ["Ana"], r.get_json()
+        assert client.get("/people/search?lastname=Martin", headers=auth).get_json() == []
+        r = client.get("/people/search?firstname=%20%20", headers=auth)
+        assert r.status_code == 400 and r.get_json()["status"] == "validation error", r.get_json()
+
+        def _boom(**kw):
+            raise RuntimeError("base indisponible")
+        people_api.findPeople = _boom
+        r = client.get("/people/search?lastname=dupont", headers=auth)
+        assert r.status_code == 500 and "base indisponible" not in r.get_data(as_text=True), r.get_json()
+    finally:
+        basic_auth._BASIC_USER, basic_auth._BASIC_PASS_HASH, people_api.findPeople = orig
+    logger.info("✅ GET /people/search: Basic Auth + appel interne, 400 sans critère, 500 sans détail")
+
+
+def test_backfill_resumable(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {PEOPLE_INDEX.index_table}"))
+        # lignes "historiques" sans index, dont une valeur indéchiffrable
+        for pid, fn, ln in [(100, "Louis", "Petit"), (101, "Chloé", "Petit"), (102, "Inès", "Roux")]:
+            conn.execute(text("INSERT INTO T_People_Public (id, gender, city, country, country_code, lang, age_years, pseudo) "
+                              "VALUES (:id, 'F', 'Nantes', 'France', 'FR', 'fr', 8, 'x')"), {"id": pid})
+            conn.execute(text("INSERT INTO T_People_Identity (person_id, firstname, lastname, genotype, longitude, latitude, email_sha) "
+                              "VALUES (:id, :fn, :ln, :gt, :lon, :lat, :sha)"),
+                         {"id": pid, "fn": crypto.encrypt_str(fn), "ln": crypto.encrypt_str(ln),
+                          "gt": b"not-a-token" if pid == 102 else crypto.encrypt_str("ICD"),
+                          "lon": crypto.encrypt_number(1.0), "lat": crypto.encrypt_number(2.0), "sha": bytes([pid])})
+    assert findPeople(lastname="petit").empty
+
+    first = people_index.backfill(batch_size=2, max_batches=2)
+    assert not first["finished"] and first["rows_done"] == 4, first
+    with engine.connect() as conn:
+        cp = PEOPLE_INDEX.checkpoint(conn)
+    assert cp["last_key"] == first["last_key"] and cp["finished_at"] is None, cp
+
+    resumed = people_index.backfill(batch_size=2)
+    assert resumed["finished"] and resumed["rows_done"] == 6 and resumed["errors"] == 1, resumed
+    assert resumed["batches"] == 2, resumed      # 101-102 puis lot vide: reprise au checkpoint, pas depuis le début
+    assert _names(findPeople(lastname="PETIT")) == ["Chloé", "Louis"]
+    assert people_index.find_person_ids(firstname="ines", lastname="roux") == [102]
+    assert people_index.find_person_ids(genotype="icd", lastname="roux") == []   # génotype indéchiffrable: pas d'index
+    assert _names(findPeople(lastname="Dupont")) == ["Jean-Pierre", "Élodie"]
+
+    assert people_index.backfill()["batches"] == 0                # déjà à jour
+    again = people_index.backfill(batch_size=10, restart=True)
+    assert again["finished"] and again["rows_done"] == 6, again
+    with engine.connect() as conn:
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {CHECKPOINT_TABLE}")).scalar() == 1
+    logger.info("✅ backfill reprenable: %s", resumed)
+
+
+def test_hmac_key_change():
+    old_version, orig = PEOPLE_INDEX.version, crypto._hmac_key
+    crypto.set_key_ring(crypto.key_ring(), hmac_key="another-hmac-key")
+    try:
+        assert PEOPLE_INDEX.version != old_version
+        assert findPeople(lastname="petit").empty          # index calculés avec l'ancienne clé
+        report = people_index.backfill(batch_size=10)
+        assert report["finished"] and report["batches"] == 1 and report["rows_done"] == 6, report
+        assert _names(findPeople(lastname="PETIT")) == ["Chloé", "Louis"]
+    finally:
+        crypto.set_key_ring(crypto.key_ring(), hmac_key=orig)
+    assert PEOPLE_INDEX.version == old_version
+    people_index.backfill(batch_size=10, restart=True)     # retour à la clé d'origine pour la suite
+    logger.info("✅ HMAC_KEY changée: nouvelle version %s, backfill complet", report["version"])
+
+
+def test_delete(engine):
+    pid = int(findPeople(firstname="Élodie")["id"].iloc[0])
+    assert deleteDataById(pid) == 1
+    assert findPeople(firstname="Élodie").empty
+    with engine.connect() as conn:
+        left = conn.execute(text(f"SELECT COUNT(*) FROM {PEOPLE_INDEX.index_table} WHERE person_id = :id"),
+                            {"id": pid}).scalar()
+    assert left == 0, left
+    logger.info("✅ deleteDataById supprime l'index")
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'people.sqlite')}", future=True)
+        with engine.begin() as conn:
+            for stmt in SCHEMA:
+                conn.execute(text(stmt))
+            PEOPLE_INDEX.ensure_tables(conn)   # fait au déploiement (SQL/createPeopleBlindIndex.sql)
+        try:
+            test_normalization()
+            with _Patched(engine) as patched:
+                test_insert_and_find(engine, patched)
+                test_update(engine)
+                test_search_endpoint()
+                test_backfill_resumable(engine)
+                test_hmac_key_change()
+                test_delete(engine)
+        except Exception:
+            logger.exception("❌ Test index aveugles KO")
+            raise
+        finally:
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,7 @@ logger = setup_logger(debug=False)
 
 def _insertDataFrame(firstRow=False):
 
+    dropTable("T_People_BlindIndex",bAngelmanResult=False)
     dropTable("T_People_Identity",bAngelmanResult=False)
     dropTable("T_People_Public",bAngelmanResult=False)    
     
@@ -41,6 +42,9 @@ def _insertDataFrame(firstRow=False):
     script_path = os.path.join(f"{wkdir}/../SQL/","createPeopleIdentity.sql")
     createTable(script_path,bAngelmanResult=False)
 
+    script_path3 = os.path.join(f"{wkdir}/../SQL/","createPeopleBlindIndex.sql")
+    createTable(script_path3,bAngelmanResult=False)
+
     BASE = Path(__file__).resolve().parent / "../../.." / "data" / "Picture"
 
     if (firstRow):
@@ -0,0 +1,221 @@
+"""
+Test de la session par requête (app.db: get_session / request_session / init_app).
+
+Base SQLite jetable à la place de MySQL, vraies routes /api/v5 (app.v5.message):
+  - GET /people/<id>/conversationsSummary: UNE seule connexion sortie du pool
+  - plusieurs helpers (get_session imbriqués + peopleUpdate.setLang) dans une même
+    requête: une connexion, une transaction, écriture visible après la requête
+  - get_session imbriqué en erreur, rattrapé par l'appelant: seul le bloc interne
+    est annulé (SAVEPOINT), le with externe commite le reste
+  - exception dans la requête: le non commité est annulé au teardown, connexion rendue au pool
+  - hors requête (scripts): get_session garde son comportement (session dédiée)
+
+  python angelmanSyndromeConnexion/test/testRequestSession.py
+"""
+from __future__ import annotations
+import sys, os
+import time
+import base64
+import tempfile
+from datetime import datetime
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import bcrypt
+
+# identifiants Basic des routes v5 (lus à l'import de app.common.basic_auth)
+BASIC_USER, BASIC_PASS = "test", "test-pass"
+os.environ["BASIC_USER"] = BASIC_USER
+os.environ["BASIC_PASS_HASH"] = bcrypt.hashpw(BASIC_PASS.encode(), bcrypt.gensalt(4)).decode()
+
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.pool import QueuePool
+
+from tools.logger import setup_logger
+import app.db as db
+from angelmanSyndromeConnexion import models  # noqa: F401  <-- important
+from angelmanSyndromeConnexion.models.people_public import PeoplePublic
+from angelmanSyndromeConnexion.models.conversation import Conversation
+from angelmanSyndromeConnexion.models.conversationMember import ConversationMember
+from angelmanSyndromeConnexion.models.message import Message
+from angelmanSyndromeConnexion.peopleUpdate import setLang
+from app.v5.message import bp as v5_message
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+HEADERS = {
+    "X-Internal-Call": "1",
+    "Authorization": "Basic " + base64.b64encode(f"{BASIC_USER}:{BASIC_PASS}".encode()).decode(),
+}
+
+
+class _Checkouts:
+    """Compte les connexions sorties du pool de l'engine."""
+
+    def __init__(self, engine):
+        self.engine, self.count = engine, 0
+
+    def _hook(self, *a):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "checkout", self._hook)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "checkout", self._hook)
+
+
+def _seed(engine) -> None:
+    db.Base.metadata.create_all(engine)
+    now, mid = datetime.now(), 0
+    with db.get_session() as s:   # hors requête: session dédiée
+        for pid, pseudo in ((1, "alice"), (2, "bob"), (3, "carol")):
+            s.add(PeoplePublic(id=pid, city="Paris", age_years=10, pseudo=pseudo, lang="fr", is_connected=False, status="active"))
+        s.flush()
+        for cid, other in ((1, 2), (2, 3)):
+            s.add(Conversation(id=cid, title=None, is_group=False, created_at=now, last_message_at=now))
+            s.flush()
+            s.add_all([ConversationMember(conversation_id=cid, people_public_id=p, role="member", joined_at=now)
+                       for p in (1, other)])
+            s.flush()
+            for k in range(3):
+                mid += 1   # BIGINT PK: pas d'autoincrément sous SQLite
+                s.add(Message(id=mid, conversation_id=cid, sender_people_id=other if k % 2 else 1,
+                              body_text=f"message {cid}.{k}".encode(), status="normal", created_at=now))
+        s.flush()
+
+
+def _app() -> Flask:
+    app = Flask(__name__)
+    app.register_blueprint(v5_message, url_prefix="/api/v5")
+    db.init_app(app)
+
+    @app.post("/_test/several-helpers")
+    def several_helpers():
+        with db.get_session() as s:
+            person = s.get(PeoplePublic, 1)
+            setLang(2, "en")          # get_session imbriqué: même session
+            with db.get_session() as inner:
+                assert inner is s and db.request_session() is s
+                inner.get(PeoplePublic, 3).pseudo = "caroline"
+            return jsonify({"pseudo": person.pseudo}), 200
+
+    @app.post("/_test/inner-fails")
+    def inner_fails():
+        with db.get_session() as s:
+            s.get(PeoplePublic, 1).city = "Lyon"
+            try:
+                with db.get_session() as inner:
+                    inner.get(PeoplePublic, 3).city = "Nantes"
+                    inner.flush()
+                    raise ValueError("erreur dans le bloc interne")
+            except ValueError:
+                pass
+            s.get(PeoplePublic, 2).city = "Lille"
+        return jsonify({"ok": True}), 200
+
+    @app.post("/_test/boom")
+    def boom():
+        with db.get_session() as s:
+            s.get(PeoplePublic, 1).pseudo = "jamais"
+        s = db.request_session()      # helper hors with: commit laissé au teardown
+        s.get(PeoplePublic, 2).pseudo = "jamais non plus"
+        raise RuntimeError("erreur dans la route")
+
+    return app
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_summary_single_checkout(client, engine):
+    with _Checkouts(engine) as c:
+        resp = client.get("/api/v5/people/1/conversationsSummary", headers=HEADERS)
+    data = resp.get_json()
+    assert resp.status_code == 200, (resp.status_code, data)
+    assert len(data) == 2 and {d["other_people_id"] for d in data} == {2, 3}, data
+    assert c.count == 1, f"{c.count} connexions sorties pour une requête"
+    assert engine.pool.checkedout() == 0
+    logger.info("✅ /conversationsSummary: 1 connexion du pool pour %d conversations", len(data))
+
+
+def test_several_helpers(client, engine):
+    with _Checkouts(engine) as c:
+        resp = client.post("/_test/several-helpers")
+    assert resp.status_code == 200 and c.count == 1, (resp.status_code, c.count)
+    with db.get_session() as s:
+        assert s.get(PeoplePublic, 2).lang == "en" and s.get(PeoplePublic, 3).pseudo == "caroline"
+    logger.info("✅ get_session imbriqués + setLang: 1 connexion, écritures validées")
+
+
+def test_inner_failure_caught(client, engine):
+    resp = client.post("/_test/inner-fails")
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    assert engine.pool.checkedout() == 0
+    with db.get_session() as s:
+        cities = {pid: s.get(PeoplePublic, pid).city for pid in (1, 2, 3)}
+    assert cities == {1: "Lyon", 2: "Lille", 3: "Paris"}, cities
+    logger.info("✅ with imbriqué en erreur rattrapé: SAVEPOINT annulé, with externe commité")
+
+
+def test_rollback_on_error(client, engine):
+    client.application.config["PROPAGATE_EXCEPTIONS"] = False
+    resp = client.post("/_test/boom")
+    assert resp.status_code == 500
+    assert engine.pool.checkedout() == 0
+    with db.get_session() as s:
+        assert s.get(PeoplePublic, 2).pseudo == "bob"        # annulé au teardown
+        assert s.get(PeoplePublic, 1).pseudo == "jamais"     # commité à la sortie du with
+    logger.info("✅ exception: reste de la requête annulé, connexion rendue au pool")
+
+
+def test_outside_request(engine):
+    with _Checkouts(engine) as c:
+        with db.get_session() as a:
+            a.execute(select(PeoplePublic.id)).all()
+        with db.get_session() as b:
+            assert b is not a
+            b.execute(select(PeoplePublic.id)).all()
+    assert c.count == 2
+    try:
+        db.request_session()
+        raise AssertionError("request_session() hors requête aurait dû échouer")
+    except RuntimeError:
+        pass
+    logger.info("✅ hors requête: une session dédiée par get_session()")
+
+
+def main():
+    start = time.time()
+    orig = (db.engine, db.SessionLocal.kw.get("bind"))
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'asconnect.sqlite')}", future=True,
+                               poolclass=QueuePool, pool_size=5)
+        db.engine = engine
+        db.SessionLocal.configure(bind=engine)
+        try:
+            _seed(engine)
+            client = _app().test_client()
+            test_summary_single_checkout(client, engine)
+            test_several_helpers(client, engine)
+            test_inner_failure_caught(client, engine)
+            test_rollback_on_error(client, engine)
+            test_outside_request(engine)
+        except Exception:
+            logger.exception("❌ Test session par requête KO")
+            raise
+        finally:
+            db.engine = orig[0]
+            db.SessionLocal.configure(bind=orig[1])
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,7 @@ from angelmanSyndromeConnexion.models.conversation import Conversation
 from angelmanSyndromeConnexion.models.conversationMember import ConversationMember
 from angelmanSyndromeConnexion.models.message import Message
 from angelmanSyndromeConnexion.models.people_public import PeoplePublic
-from tools.crypto_utils import encrypt_str
+from tools.crypto_utils import encrypt_str, decrypt_cache
 
 def deleteMessageSoft(session, message_id: int) -> bool:
     """
@@ -21,11 +21,13 @@ def deleteMessageSoft(session, message_id: int) -> bool:
     if not msg:
         return False
 
+    old_body = msg.body_text   # déjà chargé: pas d'aller-retour en plus
     msg.status = "deleted"
     msg.deleted_at = utc_now()
     msg.body_text = encrypt_str("Message supprimé")
 
     session.commit()
+    decrypt_cache.invalidate([old_body])   # vie privée: le clair supprimé ne reste pas en mémoire jusqu'au TTL
     return True
 
 def utc_now() -> datetime:
@@ -4,7 +4,7 @@ from datetime import datetime
 from angelmanSyndromeConnexion.models.message import Message
 from sqlalchemy import select
 from zoneinfo import ZoneInfo
-from tools.crypto_utils import encrypt_str
+from tools.crypto_utils import encrypt_str, decrypt_cache
 
 def utc_now() -> datetime:
     return datetime.now(ZoneInfo("Europe/Paris"))
@@ -41,10 +41,12 @@ def updateMessage(session, message_id: int, editor_people_id: int, new_text: str
         raise PermissionError("Vous ne pouvez modifier que vos propres messages")
 
     # 4️⃣ Appliquer les modifications
+    old_body = message.body_text
     message.body_text = encrypt_str(new_text)
     message.status = "edited"
     message.edited_at = utc_now()
     session.commit()
+    decrypt_cache.invalidate([old_body])   # vie privée: l'ancien texte ne reste pas en mémoire jusqu'au TTL
     session.refresh(message)
 
     return message
\ No newline at end of file
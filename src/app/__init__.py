@@ -27,6 +27,14 @@ def create_app():
     # CORS (ouvre les endpoints /api/* ; durcis ensuite au besoin)
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+    # Instrumentation SQL: Server-Timing + log structuré + détection N+1
+    from tools.sql_instrumentation import init_app as init_sql_instrumentation
+    init_sql_instrumentation(app)
+
+    # Session SQLAlchemy par requête (app.db): une connexion du pool, rendue au teardown
+    from app.db import init_app as init_db
+    init_db(app)
+
     # Blueprints (ici on ne branche que v1 pour commencer)
     from app.v1.routes import bp as v1
     app.register_blueprint(v1, url_prefix="/api/v1")
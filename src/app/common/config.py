@@ -1,33 +1,38 @@
 # src/app/common/config.py
 import os
-from configparser import ConfigParser
+from tools.config_loader import config_path, get_section
 
 # Détection PythonAnywhere vs local
 LOCAL_CONNEXION = not os.environ.get("PYTHONANYWHERE_DOMAIN", "").lower().startswith("pythonanywhere")
 
 def load_db_config():
     """
-    Lit ../angelman_viz_keys/Config2.ini (par rapport à src/app/)
+    Lit angelman_viz_keys/Config2.ini (mis en cache, relu si le fichier change).
     Retourne un dict avec les paramètres DB et SSH.
     """
-    # __file__ = src/app/common/config.py
-    common_dir = os.path.dirname(__file__)          # .../src/app/common
-    app_dir    = os.path.dirname(common_dir)        # .../src/app
-    src_dir    = os.path.dirname(app_dir)           # .../src
-    proj_root  = os.path.dirname(src_dir)           # .../
-    cfg_path   = os.path.join(proj_root, "angelman_viz_keys", "Config2.ini")
-
-    cfg = ConfigParser()
-    if not cfg.read(cfg_path):
-        raise FileNotFoundError(f"Config file not found: {cfg_path}")
+    mysql = get_section(config_path("Config2.ini"), "MySQL")
+    ssh = get_section(config_path("Config2.ini"), "SSH")
 
     return {
         "LOCAL_CONNEXION": LOCAL_CONNEXION,
-        "DB_HOST": cfg["MySQL"]["DB_HOST"],
-        "DB_USERNAME": cfg["MySQL"]["DB_USERNAME"],
-        "DB_PASSWORD": cfg["MySQL"]["DB_PASSWORD"],
-        "DB_NAME": cfg["MySQL"]["DB_NAME"],
-        "SSH_HOST": cfg["SSH"]["SSH_HOST"],
-        "SSH_USERNAME": cfg["SSH"]["SSH_USERNAME"],
-        "SSH_PASSWORD": cfg["SSH"]["SSH_PASSWORD"],
+        "DB_HOST": mysql["DB_HOST"],
+        "DB_USERNAME": mysql["DB_USERNAME"],
+        "DB_PASSWORD": mysql["DB_PASSWORD"],
+        "DB_NAME": mysql["DB_NAME"],
+        "SSH_HOST": ssh["SSH_HOST"],
+        "SSH_USERNAME": ssh["SSH_USERNAME"],
+        "SSH_PASSWORD": ssh["SSH_PASSWORD"],
+    }
+
+def load_smtp_config():
+    """
+    Paramètres SMTP (angelman_viz_keys/Config5.ini), relus si le fichier change.
+    Partagé par le mail privé (v5/mail.py) et le proxy public (v5/public/proxy_mail.py).
+    """
+    path = config_path("Config5.ini")
+    return {
+        "SMTP_HOST": get_section(path, "SMTP_HOST")["SMTP"],
+        "SMTP_PORT": get_section(path, "SMTP_PORT").get_int("PORT"),  # 465 ou 587
+        "SMTP_USER": get_section(path, "SMTP_USER")["USER"],
+        "SMTP_PASS": get_section(path, "SMTP_PASS")["PASS"],
     }
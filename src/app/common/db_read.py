@@ -1,43 +1,120 @@
 # src/app/common/db_read.py
+import os
 import pandas as pd
-from sqlalchemy import create_engine
-from flask import jsonify
-from sshtunnel import SSHTunnelForwarder
+from sqlalchemy import MetaData, Table, select
+from flask import jsonify, current_app, Response
 from tools.crypto_utils import decrypt_dataframe_auto
+from tools.ssh_tunnel import get_tunnel
+from tools.db_pool import get_engine
+from tools import crypto_spec_registry as spec_registry
 # ⬇️ import absolu
 from app.common.config import load_db_config
 
-def _read_table_as_json(table_name: str,decrypt = True):
-    cfg = load_db_config()
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+# Mode streaming: le JSON part par morceaux (1er octet envoyé dès le 1er chunk, mémoire bornée)
+STREAMING = os.environ.get("MAP_JSON_STREAMING", "true").lower() in ("1", "true", "yes", "on")
+CHUNK_ROWS = max(1, _env_int("MAP_JSON_CHUNK_ROWS", 2000))
 
+def _read_engine(cfg):
+    """Engine poolé (tools.db_pool, instrumenté) de la base des tables cartes."""
+    key = f"api_read:{cfg['DB_NAME']}"
     if cfg["LOCAL_CONNEXION"]:
-        with SSHTunnelForwarder(
-            (cfg["SSH_HOST"]),
-            ssh_username=cfg["SSH_USERNAME"],
-            ssh_password=cfg["SSH_PASSWORD"],
-            remote_bind_address=(cfg["DB_HOST"], 3306),
-        ) as tunnel:
-            local_port = tunnel.local_bind_port
-            db_url = (
-                f"mysql+pymysql://{cfg['DB_USERNAME']}:{cfg['DB_PASSWORD']}"
-                f"@127.0.0.1:{local_port}/{cfg['DB_NAME']}"
-            )
-            return _read_json_from_engine(db_url, table_name, decrypt=decrypt)
-    else:
-        db_url = (
+        # Tunnel SSH partagé (tools.ssh_tunnel): plus d'ouverture/fermeture à chaque requête
+        tunnel = get_tunnel(cfg["SSH_HOST"], cfg["SSH_USERNAME"], cfg["SSH_PASSWORD"], cfg["DB_HOST"], 3306)
+        engine = get_engine(key, lambda: (
             f"mysql+pymysql://{cfg['DB_USERNAME']}:{cfg['DB_PASSWORD']}"
-            f"@{cfg['DB_HOST']}/{cfg['DB_NAME']}"
-        )
-        return _read_json_from_engine(db_url, table_name, decrypt=decrypt)
+            f"@127.0.0.1:{tunnel.port}/{cfg['DB_NAME']}"
+        ))
+        tunnel.attach(engine)
+        return engine
+    return get_engine(key, lambda: (
+        f"mysql+pymysql://{cfg['DB_USERNAME']}:{cfg['DB_PASSWORD']}"
+        f"@{cfg['DB_HOST']}/{cfg['DB_NAME']}"
+    ))
 
-def _read_json_from_engine(db_url: str, table_name: str, decrypt = True):
-    engine = create_engine(db_url, pool_pre_ping=True, future=True)
-    try:
-        with engine.connect() as conn:
-            df = pd.read_sql_table(table_name, conn)
-            if decrypt:
-                decrypt_dataframe_auto(df,inplace=True)
+def _read_table_as_json(table_name: str, decrypt = True, stream = None):
+    """
+    Renvoie toute la table en JSON (liste d'objets, NULL -> "None").
+    - stream=None: suit MAP_JSON_STREAMING (défaut: streaming)
+    """
+    engine = _read_engine(load_db_config())
+    if stream is None:
+        stream = STREAMING
+    if stream:
+        return _stream_json_from_engine(engine, table_name, decrypt=decrypt)
+    return _read_json_from_engine(engine, table_name, decrypt=decrypt)
+
+def _read_json_from_engine(engine, table_name: str, decrypt = True):
+    """Mode historique: toute la table en mémoire puis jsonify."""
+    with engine.connect() as conn:
+        df = pd.read_sql_table(table_name, conn)
+        if decrypt:
+            # spec enregistré à l'export (None -> ré-inféré par decrypt_dataframe_auto)
+            spec = spec_registry.lookup(conn, table_name, df.columns)
+            decrypt_dataframe_auto(df, inplace=True, spec_override=spec)
+    df = df.fillna("None")
+    return jsonify(df.to_dict(orient="records"))
+
+def _iter_table_chunks(engine, table_name: str, chunk_rows: int):
+    """
+    DataFrames de chunk_rows lignes, lus via un curseur serveur.
+    Table réfléchie comme read_sql_table: mêmes conversions de types (dates...) que le mode historique.
+    """
+    with engine.connect() as conn:
+        table = Table(table_name, MetaData(), autoload_with=conn)
+        res = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows).execute(select(table))
+        cols = list(res.keys())
+        for part in res.partitions(chunk_rows):
+            yield pd.DataFrame.from_records(part, columns=cols)
+
+def _stream_json_from_engine(engine, table_name: str, decrypt = True, chunk_rows: int = None):
+    """
+    Même sortie que _read_json_from_engine, mais écrite au fil de l'eau:
+    lecture par chunks -> déchiffrement du chunk -> fillna("None") -> objets JSON.
+    Le spec de déchiffrement vient du registre (enregistré à l'export). Sans spec enregistré,
+    pas de streaming: un spec inféré sur un seul chunk ne vaut pas pour les suivants, on
+    repasse par le mode historique (inférence sur toute la table).
+    Le 1er chunk est lu AVANT d'envoyer les en-têtes: une erreur de connexion/SQL reste un 500 classique.
+    """
+    dumps = current_app.json.dumps   # même encodeur (et même tri des clés) que jsonify
+    chunks = _iter_table_chunks(engine, table_name, chunk_rows or CHUNK_ROWS)
+    spec = None
+
+    def _encode(df) -> str:
+        if decrypt:
+            decrypt_dataframe_auto(df, inplace=True, spec_override=spec)
         df = df.fillna("None")
-        return jsonify(df.to_dict(orient="records"))
-    finally:
-        engine.dispose()
+        return ",".join(dumps(r) for r in df.to_dict(orient="records"))
+
+    try:
+        first = next(chunks, None)
+        if decrypt and first is not None:
+            spec = spec_registry.lookup(engine, table_name, first.columns)
+            if spec is None:
+                chunks.close()
+                current_app.logger.info("Pas de spec enregistré pour %s: lecture non streamée", table_name)
+                return _read_json_from_engine(engine, table_name, decrypt=True)
+        head = _encode(first) if first is not None and not first.empty else ""
+    except Exception:
+        chunks.close()
+        raise
+
+    def generate():
+        try:
+            yield "[" + head
+            sep = "," if head else ""
+            for df in chunks:
+                if df.empty:
+                    continue
+                yield sep + _encode(df)
+                sep = ","
+            yield "]"
+        finally:
+            chunks.close()
+
+    return Response(generate(), mimetype="application/json")
@@ -5,16 +5,17 @@ import os
 from contextlib import contextmanager
 from datetime import datetime  # (si tu t’en sers ailleurs)
 
+from flask import g, has_request_context
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
 
-from tools.utilsTools import get_db_params, _build_db_url
+from tools.utilsTools import get_db_params, _build_db_url, _shared_tunnel
+from tools.sql_instrumentation import instrument_engine
+from tools import slow_query_log
+from tools import pool_telemetry
+from tools.logger import setup_logger
 
-try:
-    # sshtunnel n’est nécessaire que en local
-    from sshtunnel import SSHTunnelForwarder
-except ImportError:
-    SSHTunnelForwarder = None  # pour éviter un crash si pas installé
+logger = setup_logger(debug=False)
 
 # -------------------------------------------------------------------
 # Détection LOCAL vs PythonAnywhere
@@ -31,30 +32,13 @@ cfg = get_db_params(bAngelmanResult=False)
 # Tunnel SSH éventuel (LOCAL uniquement)
 # -------------------------------------------------------------------
 
-_tunnel = None
+# Tunnel partagé avec tools.utilsTools / app.common.db_read (tools.ssh_tunnel):
+# ouvert paresseusement à la première connexion, sondé et reconstruit au besoin.
+_tunnel = _shared_tunnel(cfg) if LOCAL_CONNEXION else None
 
 def _init_db_url() -> str:
-    global _tunnel
-
-    if LOCAL_CONNEXION:
-        if SSHTunnelForwarder is None:
-            raise RuntimeError(
-                "sshtunnel n’est pas installé alors que LOCAL_CONNEXION=True. "
-                "pip install sshtunnel ou mets LOCAL_CONNEXION=False."
-            )
-
-        # On ouvre le tunnel UNE FOIS pour tout le process
-        if _tunnel is None:
-            _tunnel = SSHTunnelForwarder(
-                (cfg["ssh_host"]),
-                ssh_username=cfg["ssh_user"],
-                ssh_password=cfg["ssh_pass"],
-                remote_bind_address=(cfg["db_host"], 3306),
-            )
-            _tunnel.start()
-
-        local_port = _tunnel.local_bind_port
-        return _build_db_url(cfg, local_port)
+    if _tunnel is not None:
+        return _build_db_url(cfg, _tunnel.port)
 
     # Sur PythonAnywhere → pas de tunnel, on se connecte directement
     return _build_db_url(cfg)
@@ -72,6 +56,11 @@ engine = create_engine(
     pool_recycle=3600,
     echo=False,  # Mets True si tu veux voir les requêtes SQL
 )
+if _tunnel is not None:
+    _tunnel.attach(engine)
+instrument_engine(engine)  # compteurs SQL par requête HTTP (Server-Timing)
+slow_query_log.attach(engine)  # journal des requêtes lentes (+ EXPLAIN)
+pool_telemetry.attach(engine, "app_orm")  # attente au checkout, invalidations... (GET /_pool)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -96,16 +85,92 @@ def get_db():
         db.close()
 
 
-@contextmanager
-def get_session() -> Session:
+# -------------------------------------------------------------------
+# Session par requête HTTP
+# -------------------------------------------------------------------
+# Dans une requête Flask, tous les get_session() (routes, whatsApp*, peopleUpdate.setLang...)
+# partagent UNE session liée à UNE connexion du pool, ouverte au premier appel.
+# Le with le plus externe commite comme avant (avant l'envoi de la réponse), les with
+# imbriqués sont des SAVEPOINT (begin_nested); le teardown commite / annule ce qui
+# reste puis rend la connexion au pool.
+_REQUEST_SCOPE = "_db_request_scope"
+
+
+class _RequestScope:
+    def __init__(self):
+        self.connection = engine.connect()
+        # session liée à NOTRE connexion: commit() valide la transaction sans rendre la connexion
+        self.session: Session = SessionLocal(bind=self.connection)
+        self.depth = 0
+
+    def close(self, exc: BaseException | None = None) -> None:
+        try:
+            if exc is None:
+                self.session.commit()
+            else:
+                self.session.rollback()
+        except Exception:
+            logger.exception("Session de requête: commit en fin de requête impossible, rollback")
+            self.session.rollback()
+        finally:
+            self.session.close()
+            self.connection.close()
+
+
+def _request_scope(create: bool = True) -> _RequestScope | None:
+    if not has_request_context():
+        return None
+    scope = g.get(_REQUEST_SCOPE)
+    if scope is None and create:
+        scope = _RequestScope()
+        setattr(g, _REQUEST_SCOPE, scope)
+    return scope
+
+
+def request_session() -> Session:
     """
-    Usage typique :
+    Session de la requête courante (ouverte paresseusement, fermée par le teardown).
+    Hors requête Flask: RuntimeError, utiliser get_session().
+    """
+    scope = _request_scope()
+    if scope is None:
+        raise RuntimeError("request_session() hors d'une requête Flask")
+    return scope.session
 
-    from app.db import get_session
 
-    with get_session() as db:
-        obj = db.query(MyModel).first()
-    """
+def _teardown_request_session(exc: BaseException | None = None) -> None:
+    scope = g.pop(_REQUEST_SCOPE, None)
+    if scope is not None:
+        scope.close(exc)
+
+
+def init_app(app) -> None:
+    """Branche la fermeture de la session de requête (create_app)."""
+    app.teardown_request(_teardown_request_session)
+
+
+@contextmanager
+def _shared_session(scope: _RequestScope):
+    scope.depth += 1
+    try:
+        if scope.depth > 1:
+            # with imbriqué: SAVEPOINT, une erreur n'annule que ce bloc; si l'appelant
+            # la rattrape, le with externe commite le reste
+            with scope.session.begin_nested():
+                yield scope.session
+            return
+        try:
+            yield scope.session
+            scope.session.commit()
+        except Exception:
+            scope.session.rollback()
+            raise
+    finally:
+        scope.depth -= 1
+
+
+@contextmanager
+def _own_session():
     db: Session = SessionLocal()
     try:
         yield db
@@ -115,3 +180,21 @@ def get_session() -> Session:
         raise
     finally:
         db.close()
+
+
+def get_session():
+    """
+    Usage typique :
+
+    from app.db import get_session
+
+    with get_session() as db:
+        obj = db.query(MyModel).first()
+
+    Dans une requête Flask: session partagée de la requête (cf. request_session),
+    commit à la sortie du with le plus externe; un with imbriqué qui lève n'annule
+    que son propre bloc (SAVEPOINT). Hors requête (scripts, tests):
+    session dédiée, commit / rollback puis fermeture.
+    """
+    scope = _request_scope()
+    return _shared_session(scope) if scope is not None else _own_session()
@@ -38,3 +38,33 @@ def list_routes():
             "methods": methods,
         })
     return jsonify(routes)
+
+@bp.get("/_pool")
+def pool_telemetry():
+    """
+    Télémétrie des pools / tunnels de CE worker (tools.pool_telemetry).
+    ?history=N : N derniers échantillons (-1: tous), ?since=S : fenêtre de S secondes
+    """
+    from tools import pool_telemetry as telemetry
+    limit = request.args.get("history", default=0, type=int)
+    since = request.args.get("since", type=float)
+    snap = telemetry.snapshot(history_limit=None if limit < 0 else limit, since_s=since)
+    resp = jsonify(snap)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+@bp.get("/_decrypt_cache")
+def decrypt_cache_stats():
+    """Compteurs du cache de déchiffrement de CE worker (tools.crypto_utils.decrypt_cache), jamais son contenu."""
+    from tools.crypto_utils import decrypt_cache
+    resp = jsonify(decrypt_cache.stats())
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+@bp.get("/_argon2")
+def argon2_pool_stats():
+    """Pool Argon2 de CE worker (tools.password_pool): file, délestages, temps de file / de calcul."""
+    from tools import password_pool
+    resp = jsonify(password_pool.stats())
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
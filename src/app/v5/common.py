@@ -82,7 +82,7 @@ def register_error_handlers(bp):
         resp = {"status": "error", "code": e.code, "message": str(e)}
         if getattr(e, "details", None):
             resp["details"] = e.details
-        return jsonify(resp), e.http_status
+        return jsonify(resp), e.http_status, getattr(e, "headers", None) or {}
 
     @bp.app_errorhandler(IntegrityError)
     def _handle_integrity(e: IntegrityError):
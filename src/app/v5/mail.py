@@ -1,9 +1,7 @@
 # app/v5/mail.py
 from __future__ import annotations
 
-import os
 import ssl
-from configparser import ConfigParser
 from email.message import EmailMessage
 from email.utils import parseaddr
 
@@ -12,23 +10,16 @@ from flask import Blueprint, jsonify, request, current_app
 from .common import sanitize_subject, sanitize_body, register_error_handlers
 from app.common.security import ratelimit
 from app.common.basic_auth import require_basic, require_internal
+from app.common.config import load_smtp_config
+from tools.config_loader import ConfigError
 
 bp = Blueprint("v5_mail", __name__)
 bp.before_request(require_internal)
 register_error_handlers(bp)
 
 # -------------------------------------------------------------------
-# Chargement Config5.ini (même logique qu'avant)
+# Config SMTP: Config5.ini relu à chaque envoi (mis en cache, invalidé si modifié)
 # -------------------------------------------------------------------
-_app_dir = os.path.dirname(os.path.dirname(__file__))  # -> src/app
-_cfg = ConfigParser()
-_cfg.read(os.path.abspath(os.path.join(_app_dir, "..", "..", "angelman_viz_keys", "Config5.ini")))
-
-SMTP_HOST = _cfg["SMTP_HOST"]["SMTP"]
-SMTP_PORT = int(_cfg["SMTP_PORT"]["PORT"])  # 465 ou 587
-SMTP_USER = _cfg["SMTP_USER"]["USER"]
-SMTP_PASS = _cfg["SMTP_PASS"]["PASS"]
-
 MAIL_TO = "contact@angelmananalytics.org"
 
 # Fallback Reply-To si aucun mail_from fourni (ou invalide)
@@ -95,9 +86,12 @@ def relay_contact():
         return jsonify({"error": "subject et body requis"}), 400
 
     try:
-        port = int(SMTP_PORT)
-    except Exception:
-        return jsonify({"error": "SMTP_PORT invalide"}), 500
+        smtp = load_smtp_config()
+    except (ConfigError, FileNotFoundError) as e:
+        current_app.logger.error("Config SMTP invalide: %s", e)
+        return jsonify({"error": "SMTP non configuré côté serveur"}), 500
+    SMTP_HOST, SMTP_USER, SMTP_PASS = smtp["SMTP_HOST"], smtp["SMTP_USER"], smtp["SMTP_PASS"]
+    port = smtp["SMTP_PORT"]
 
     if not SMTP_HOST or not SMTP_USER or not SMTP_PASS:
         return jsonify({"error": "SMTP non configuré côté serveur"}), 500
@@ -9,7 +9,7 @@ from angelmanSyndromeConnexion.error import (
 )
 from angelmanSyndromeConnexion.peopleCreate import insertData
 from angelmanSyndromeConnexion.peopleRead import(
-    giveId, fetch_person_decrypted, fetch_photo, getRecordsPeople, identity_public,getListPaysTranslate, getLanguagesTranslate
+    giveId, fetch_person_decrypted, fetch_photo, getRecordsPeople, findPeople, identity_public,getListPaysTranslate, getLanguagesTranslate
 )
 from angelmanSyndromeConnexion.peopleUpdate import updateData
 from angelmanSyndromeConnexion.peopleDelete import deleteDataById
@@ -247,7 +247,7 @@ def create_person():
         new_id = insertData(gender, fn, ln, email, dob, gt, photo_bytes, long, lat, password, qSec, rSec, is_info, lang)
         return jsonify({"status": "created", "id": new_id}), 200
     except AppError as e:
-        return jsonify({"status": "validation error" , "message" : e.code}), e.http_status
+        return jsonify({"status": "validation error" , "message" : e.code}), e.http_status, getattr(e, "headers", None) or {}
     except Exception:
         current_app.logger.exception("Unhandled error")
         return jsonify({"status": "error", "message": "Internal server error"}), 500
@@ -307,6 +307,33 @@ def get_idPerson():
         )
 
 
+# Recherche exacte (querystring) — index aveugles (findPeople), sans lire toute la table
+@bp.get("/people/search")
+@require_basic
+def search_people():
+    """
+    ?firstname=&lastname=&genotype=&city= (au moins un): mêmes colonnes que peopleMapRepresentation,
+    seules les personnes trouvées. Casse / accents / espaces ignorés sauf pour city.
+    """
+    try:
+        criteria = {k: request.args.get(k, "").strip() or None for k in ("firstname", "lastname", "genotype", "city")}
+        if not any(criteria.values()):
+            raise MissingFieldError(
+                "firstname, lastname, genotype ou city (query param) manquant",
+                {"missing": ["firstname|lastname|genotype|city"]},
+            )
+        df = findPeople(**criteria)
+        return jsonify(df.to_dict(orient="records")), 200
+    except AppError as e:
+        return jsonify({"status": "validation error" , "message" : e.code}), e.http_status
+    except Exception:
+        current_app.logger.exception("Unhandled error (search_people)")
+        return (
+            jsonify({"status": "error", "message": "Internal server error"}),
+            500,
+        )
+
+
 @bp.get("/people/countriesTranslated")
 @require_basic
 def private_countries_translated():
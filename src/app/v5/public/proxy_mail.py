@@ -1,10 +1,8 @@
 # app/v5/public/proxy_mail.py
 from __future__ import annotations
 
-import os
 import ssl
 import json
-from configparser import ConfigParser
 from email.message import EmailMessage
 from email.utils import parseaddr
 from datetime import datetime, timezone
@@ -13,27 +11,14 @@ from flask import Blueprint, jsonify, request, current_app
 
 from app.common.security import ratelimit, require_public_app_key
 from app.v5.common import sanitize_subject, sanitize_body
+from app.common.config import load_smtp_config
+from tools.config_loader import ConfigError
 
 bp = Blueprint("public_mail", __name__)
 
 # -------------------------------------------------------------------
-# Charger la même config que le mail privé
+# Même config SMTP que le mail privé (app.common.config.load_smtp_config)
 # -------------------------------------------------------------------
-
-_APP_DIR = os.path.dirname(os.path.dirname(__file__))  # -> src/app/v5
-_INI_PATH = os.path.abspath(
-    os.path.join(_APP_DIR, "..", "..", "..", "angelman_viz_keys", "Config5.ini")
-)
-
-_cfg = ConfigParser()
-if not _cfg.read(_INI_PATH):
-    raise RuntimeError(f"Config file not found: {_INI_PATH}")
-
-SMTP_HOST = _cfg["SMTP_HOST"]["SMTP"]
-SMTP_PORT = int(_cfg["SMTP_PORT"]["PORT"])
-SMTP_USER = _cfg["SMTP_USER"]["USER"]
-SMTP_PASS = _cfg["SMTP_PASS"]["PASS"]
-
 MAIL_TO = "contact@angelmananalytics.org"
 
 # Fallback Reply-To si aucun mail_from fourni (ou invalide)
@@ -132,6 +117,14 @@ def relay_contact_public():
     # ---------------------------------------------------------------
     # Vérification config SMTP
     # ---------------------------------------------------------------
+    try:
+        smtp = load_smtp_config()
+    except (ConfigError, FileNotFoundError) as e:
+        current_app.logger.error("Config SMTP invalide: %s", e)
+        return jsonify({"error": "SMTP non configuré côté serveur"}), 500
+    SMTP_HOST, SMTP_PORT = smtp["SMTP_HOST"], smtp["SMTP_PORT"]
+    SMTP_USER, SMTP_PASS = smtp["SMTP_USER"], smtp["SMTP_PASS"]
+
     if not SMTP_HOST or not SMTP_USER or not SMTP_PASS:
         return jsonify({"error": "SMTP non configuré côté serveur"}), 500
 
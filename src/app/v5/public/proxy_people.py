@@ -371,7 +371,7 @@ def public_create_person():
         )
         return jsonify({"status": "created", "id": new_id}), 200
     except AppError as e:
-        return jsonify({"status": "validation error" , "code": e.code,"message": str(e),}), e.http_status
+        return jsonify({"status": "validation error" , "code": e.code,"message": str(e),}), e.http_status, getattr(e, "headers", None) or {}
     except Exception:
         current_app.logger.exception("Unhandled error (public_create_person)")
         return (
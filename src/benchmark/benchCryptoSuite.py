@@ -0,0 +1,289 @@
+"""
+Micro-benchmarks de toutes les primitives de tools/crypto_utils.py et de
+app/common/basic_auth.py (bcrypt.checkpw de require_basic), avec résultats JSON
+comparables d'un run à l'autre.
+
+Cas mesurés (--only pour filtrer, par préfixe):
+  fernet.*     encrypt_str / decrypt (strict, or_plain sur un clair historique) / aller-retour,
+               nombres (encrypt_number / decrypt_number), dates (encrypt_date_like / relecture)
+  frame.*      encrypt_dataframe / decrypt_dataframe sur une table large (--cols x --rows)
+  infer.*      infer_crypto_spec sur la même table, cache vide puis cache chaud
+  hash.*       email_sha256, keyed_sha256
+  argon2.*     hash / verify aux paramètres courants (Config4.ini [Argon2])
+  bcrypt.*     checkpw (coût --bcrypt-rounds, comme le PASS_HASH de Basic Auth)
+
+Pour chaque cas: --repeat séries d'au moins --min-time s -> ops/s (médiane des séries,
+écart entre séries = bruit), latences p50 / p95 / p99 / max par opération, pic mémoire
+Python (tracemalloc, hors allocations C d'Argon2 / OpenSSL) et RSS max du process.
+Le cache de déchiffrement (DECRYPT_CACHE_SIZE) est coupé pendant les mesures.
+
+Comparaison: diff signale les cas plus lents de plus de --threshold % (ou du bruit
+mesuré s'il est plus grand; p95: deux fois ce seuil); code retour 1 s'il y a une régression.
+
+Usage:
+  python benchmark/benchCryptoSuite.py run --out bench_before.json
+  python benchmark/benchCryptoSuite.py run --only fernet frame --min-time 0.5 --out bench_after.json
+  python benchmark/benchCryptoSuite.py diff bench_before.json bench_after.json --threshold 10
+"""
+import sys, os
+import gc
+import json
+import time
+import argparse
+import warnings
+import platform
+import statistics
+import tracemalloc
+from datetime import datetime, timezone
+from importlib.metadata import version as pkg_version, PackageNotFoundError
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[1]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import bcrypt
+import numpy as np
+import pandas as pd
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+
+logger = setup_logger(debug=False)
+
+PACKAGES = ("cryptography", "argon2-cffi", "bcrypt", "pandas", "numpy")
+
+
+# -----------------------------
+#  Données
+# -----------------------------
+def _wide_frame(cols: int, rows: int) -> tuple[pd.DataFrame, dict]:
+    """Table façon T_Map: libellés, années, dates, nombres, avec des trous."""
+    rng = np.random.default_rng(42)
+    data, spec = {}, {}
+    for i in range(cols):
+        kind = i % 4
+        if kind == 0:
+            values = rng.choice(["Deletion", "Mutation", "UPD", "ICD", "Clinical"], rows).astype(object)
+            spec[f"c{i}"] = "str"
+        elif kind == 1:
+            values = rng.integers(1980, 2024, rows).astype(str).astype(object)
+            spec[f"c{i}"] = "date"
+        elif kind == 2:
+            values = (pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3000, rows), unit="D")) \
+                .strftime("%Y-%m-%d").to_numpy(dtype=object)
+            spec[f"c{i}"] = "date"
+        else:
+            values = rng.uniform(-60, 60, rows).round(4).astype(object)
+            spec[f"c{i}"] = "number"
+        values[::40] = None
+        data[f"c{i}"] = values
+    return pd.DataFrame(data), spec
+
+
+def _cases(args) -> list[tuple[str, callable, int]]:
+    """(nom, opération, unités traitées par opération)."""
+    short = crypto.encrypt_str("Élodie")
+    number = crypto.encrypt_number(48.8566)
+    date_tok = crypto.encrypt_date_like("2016-03-02")
+    df, spec = _wide_frame(args.cols, args.rows)
+    enc = crypto.encrypt_dataframe(df, spec)
+    cells = args.cols * args.rows
+    text_df = df.astype(str).where(df.notna(), None)   # comme infer_crypto_spec après lecture SQL / CSV
+    argon_hash, _ = crypto.hash_password_argon2("S3cret!pwd")
+    bc_hash = bcrypt.hashpw(b"S3cret!pwd", bcrypt.gensalt(rounds=args.bcrypt_rounds))
+
+    def _infer_cold():
+        crypto._infer_cache.clear()
+        return crypto.infer_crypto_spec(text_df)
+
+    return [
+        ("fernet.encrypt_str", lambda: crypto.encrypt_str("Élodie"), 1),
+        ("fernet.decrypt_str", lambda: crypto.decrypt_bytes_to_str_strict(short), 1),
+        ("fernet.decrypt_or_plain_legacy", lambda: crypto.decrypt_or_plain(b"ancien message en clair"), 1),
+        ("fernet.roundtrip_str", lambda: crypto.decrypt_bytes_to_str_strict(crypto.encrypt_str("Élodie")), 1),
+        ("fernet.encrypt_number", lambda: crypto.encrypt_number(48.8566), 1),
+        ("fernet.decrypt_number", lambda: crypto.decrypt_number(number), 1),
+        ("fernet.encrypt_date", lambda: crypto.encrypt_date_like("2016-03-02"), 1),
+        ("fernet.decrypt_date", lambda: crypto.decrypt_bytes_to_str_strict(date_tok), 1),
+        ("frame.encrypt_dataframe", lambda: crypto.encrypt_dataframe(df, spec), cells),
+        ("frame.decrypt_dataframe", lambda: crypto.decrypt_dataframe(enc, spec, to_python=spec), cells),
+        ("infer.cold", _infer_cold, args.cols),
+        ("infer.warm", lambda: crypto.infer_crypto_spec(text_df), args.cols),
+        ("hash.email_sha256", lambda: crypto.email_sha256(" Elodie@Example.org "), 1),
+        ("hash.keyed_sha256", lambda: crypto.keyed_sha256("Deletion", purpose="bench"), 1),
+        ("argon2.hash", lambda: crypto.hash_password_argon2("S3cret!pwd"), 1),
+        ("argon2.verify", lambda: crypto.verify_password_argon2("S3cret!pwd", argon_hash), 1),
+        ("bcrypt.checkpw", lambda: bcrypt.checkpw(b"S3cret!pwd", bc_hash), 1),
+    ]
+
+
+# -----------------------------
+#  Mesure
+# -----------------------------
+def _percentile(sorted_ns: list[int], q: float) -> float:
+    i = min(len(sorted_ns) - 1, max(0, round(q / 100 * (len(sorted_ns) - 1))))
+    return sorted_ns[i] / 1e6
+
+
+def _max_rss_kib() -> int | None:
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # KiB sous Linux
+    except Exception:
+        return None
+
+
+def measure(op, *, units: int = 1, repeat: int = 3, min_time: float = 0.3, max_ops: int = 200_000) -> dict:
+    op()   # chauffe (imports paresseux, caches)
+    lat_ns: list[int] = []
+    rates = []
+    for _ in range(repeat):
+        n, t_start = 0, time.perf_counter_ns()
+        deadline = t_start + int(min_time * 1e9)
+        now = t_start
+        while (now < deadline or n == 0) and n < max_ops:
+            t0 = now
+            op()
+            now = time.perf_counter_ns()
+            lat_ns.append(now - t0)
+            n += 1
+        rates.append(n / ((now - t_start) / 1e9))
+
+    gc.collect()
+    tracemalloc.start()
+    for _ in range(min(3, len(lat_ns))):
+        op()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lat_ns.sort()
+    ops = statistics.median(rates)
+    return {
+        "ops_s": round(ops, 3),
+        "units_s": round(ops * units, 1),
+        "units_per_op": units,
+        "noise_pct": round(100 * (max(rates) - min(rates)) / ops, 2) if ops else 0.0,
+        "n": len(lat_ns),
+        "lat_ms": {"p50": round(_percentile(lat_ns, 50), 4), "p95": round(_percentile(lat_ns, 95), 4),
+                   "p99": round(_percentile(lat_ns, 99), 4), "max": round(lat_ns[-1] / 1e6, 4)},
+        "py_peak_kib": round(peak / 1024, 1),
+        "max_rss_kib": _max_rss_kib(),
+    }
+
+
+def _meta(args) -> dict:
+    versions = {}
+    for p in PACKAGES:
+        try:
+            versions[p] = pkg_version(p)
+        except PackageNotFoundError:
+            versions[p] = None
+    return {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "host": {"node": platform.node(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+                 "python": platform.python_version(), "platform": platform.platform()},
+        "versions": versions,
+        "argon2": crypto.argon2_params(),
+        "args": {"cols": args.cols, "rows": args.rows, "repeat": args.repeat, "min_time": args.min_time,
+                 "bcrypt_rounds": args.bcrypt_rounds},
+    }
+
+
+def cmd_run(args) -> int:
+    warnings.simplefilter("ignore", UserWarning)   # to_datetime sans format (infer_crypto_spec)
+    saved = crypto.decrypt_cache.max_entries
+    crypto.decrypt_cache.configure(max_entries=0)
+    results = {}
+    try:
+        for name, op, units in _cases(args):
+            if args.only and not any(name.startswith(p) for p in args.only):
+                continue
+            r = results[name] = measure(op, units=units, repeat=args.repeat, min_time=args.min_time)
+            logger.info("%-32s %12.1f ops/s  p50 %9.4f ms  p95 %9.4f ms  p99 %9.4f ms  bruit %5.1f%%  py %8.1f KiB",
+                        name, r["ops_s"], r["lat_ms"]["p50"], r["lat_ms"]["p95"], r["lat_ms"]["p99"],
+                        r["noise_pct"], r["py_peak_kib"])
+    finally:
+        crypto.decrypt_cache.configure(max_entries=saved)
+
+    report = {"meta": _meta(args), "results": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info("Résultats écrits: %s", args.out)
+    return 0
+
+
+# -----------------------------
+#  Comparaison
+# -----------------------------
+def compare(old: dict, new: dict, threshold: float = 10.0) -> list[dict]:
+    """
+    Par cas commun: variation de débit et de p95 (%). Régression si le débit baisse de plus
+    que tol = max(threshold, bruit des deux runs), ou si le p95 monte de plus de 2 x tol
+    (queue de latence, plus bruitée que le débit sur les opérations de quelques µs).
+    """
+    rows = []
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        a, b = old["results"][name], new["results"][name]
+        tol = max(threshold, a.get("noise_pct", 0.0), b.get("noise_pct", 0.0))
+        d_ops = 100 * (b["ops_s"] - a["ops_s"]) / a["ops_s"] if a["ops_s"] else 0.0
+        d_p95 = 100 * (b["lat_ms"]["p95"] - a["lat_ms"]["p95"]) / a["lat_ms"]["p95"] if a["lat_ms"]["p95"] else 0.0
+        if d_ops < -tol or d_p95 > 2 * tol:
+            verdict = "regression"
+        elif d_ops > tol:
+            verdict = "improvement"
+        else:
+            verdict = "same"
+        rows.append({"case": name, "old_ops_s": a["ops_s"], "new_ops_s": b["ops_s"], "d_ops_pct": round(d_ops, 2),
+                     "d_p95_pct": round(d_p95, 2), "tolerance_pct": round(tol, 2), "verdict": verdict})
+    return rows
+
+
+def cmd_diff(args) -> int:
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    for key in ("host", "versions", "argon2", "args"):
+        if old["meta"].get(key) != new["meta"].get(key):
+            logger.warning("%s différent entre les deux runs: %s -> %s", key, old["meta"].get(key), new["meta"].get(key))
+    only = sorted(set(old["results"]) ^ set(new["results"]))
+    if only:
+        logger.info("Cas présents dans un seul run (ignorés): %s", ", ".join(only))
+
+    rows = compare(old, new, args.threshold)
+    marks = {"regression": "REGRESSION", "improvement": "mieux", "same": ""}
+    for r in rows:
+        logger.info("%-32s %12.1f -> %12.1f ops/s  %+7.1f%%  p95 %+7.1f%%  (tolérance %4.1f%%)  %s",
+                    r["case"], r["old_ops_s"], r["new_ops_s"], r["d_ops_pct"], r["d_p95_pct"],
+                    r["tolerance_pct"], marks[r["verdict"]])
+    bad = [r["case"] for r in rows if r["verdict"] == "regression"]
+    if bad:
+        logger.warning("%d régression(s) au-delà du bruit: %s", len(bad), ", ".join(bad))
+        return 1
+    logger.info("Pas de régression au-delà du bruit (%d cas)", len(rows))
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="Mesure les cas et écrit le JSON")
+    r.add_argument("--out", help="fichier JSON de résultats")
+    r.add_argument("--only", nargs="+", help="préfixes de cas (ex: fernet argon2)")
+    r.add_argument("--repeat", type=int, default=3, help="séries par cas (bruit = écart entre séries)")
+    r.add_argument("--min-time", type=float, default=0.3, help="durée minimale d'une série (s)")
+    r.add_argument("--cols", type=int, default=40)
+    r.add_argument("--rows", type=int, default=2000)
+    r.add_argument("--bcrypt-rounds", type=int, default=12)
+    d = sub.add_parser("diff", help="Compare deux JSON de résultats")
+    d.add_argument("old")
+    d.add_argument("new")
+    d.add_argument("--threshold", type=float, default=10.0, help="seuil de régression en %% (min)")
+    args = ap.parse_args(argv)
+    return cmd_run(args) if args.cmd == "run" else cmd_diff(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Benchmark: cache des déchiffrements (tools.crypto_utils.decrypt_cache) sur une
+conversation de groupe synthétique de 200 membres.
+
+Chaque membre ouvre la conversation (--views fois): résumé (dernier message),
+puis la page des --page derniers messages avec, pour chacun, le prénom chiffré de
+l'auteur, le corps et l'aperçu du message cité. Les mêmes jetons reviennent sans
+cesse: on compare cache désactivé / activé (une ou plusieurs tailles), temps par
+ouverture et taux de hit. Aucune base: jetons Fernet en mémoire, via decrypt_or_plain
+comme whatsAppRead / app.v5.message.
+
+Usage:
+  python benchmark/benchDecryptCache.py
+  python benchmark/benchDecryptCache.py --members 200 --messages 5000 --sizes 0 256 4096
+"""
+import sys, os
+import time
+import random
+import argparse
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[1]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+
+logger = setup_logger(debug=False)
+
+
+def _conversation(members: int, messages: int, seed: int = 42) -> tuple[dict, list[dict]]:
+    """Prénoms chiffrés par membre, messages (auteur, corps chiffré, message cité éventuel)."""
+    rng = random.Random(seed)
+    firstnames = {m: crypto.encrypt_str(f"Prénom{m}") for m in range(1, members + 1)}
+    msgs = []
+    for i in range(messages):
+        reply_to = rng.randrange(i) if i and rng.random() < 0.3 else None
+        msgs.append({"sender": rng.randint(1, members),
+                     "body": crypto.encrypt_str(f"Message {i} " + "bla " * rng.randint(1, 30)),
+                     "reply_to": reply_to})
+    return firstnames, msgs
+
+
+def _open(firstnames: dict, msgs: list[dict], page: int) -> list:
+    """Une ouverture de conversation par un membre: résumé + dernière page."""
+    out = [crypto.decrypt_or_plain(msgs[-1]["body"])]
+    for m in msgs[-page:]:
+        reply = msgs[m["reply_to"]]["body"] if m["reply_to"] is not None else None
+        out.append((crypto.decrypt_or_plain(firstnames[m["sender"]]),
+                    crypto.decrypt_or_plain(m["body"]),
+                    crypto.decrypt_or_plain(reply)))
+    return out
+
+
+def _run(size: int, firstnames: dict, msgs: list[dict], members: int, views: int, page: int) -> dict:
+    crypto.decrypt_cache.configure(max_entries=size)
+    crypto.decrypt_cache.reset_stats()
+    opens = members * views
+    t0 = time.perf_counter()
+    for _ in range(opens):
+        res = _open(firstnames, msgs, page)
+    dt = time.perf_counter() - t0
+    st = crypto.decrypt_cache.stats()
+    return {"size": size, "opens": opens, "total_s": dt, "ms_per_open": 1000 * dt / opens,
+            "hit_ratio": st["hit_ratio"], "evictions": st["evictions"], "last": res}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--members", type=int, default=200)
+    ap.add_argument("--messages", type=int, default=2000)
+    ap.add_argument("--page", type=int, default=50, help="messages affichés par ouverture")
+    ap.add_argument("--views", type=int, default=3, help="ouvertures par membre")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[0, 64, 1024, 16384],
+                    help="tailles de cache (0 = désactivé)")
+    args = ap.parse_args()
+
+    firstnames, msgs = _conversation(args.members, args.messages)
+    logger.info("%d membres, %d messages, page de %d, %d ouvertures", args.members, args.messages,
+                args.page, args.members * args.views)
+    saved = (crypto.decrypt_cache.max_entries, crypto.decrypt_cache.ttl)
+    try:
+        results = [_run(s, firstnames, msgs, args.members, args.views, args.page) for s in args.sizes]
+    finally:
+        crypto.decrypt_cache.configure(max_entries=saved[0], ttl=saved[1])
+
+    base = next((r for r in results if r["size"] == 0), results[0])
+    for r in results:
+        assert r["last"] == base["last"], "le cache change le clair"
+        logger.info("cache %6s  %8.3f ms/ouverture  total %6.2fs  hit %-6s  évictions %7d  x%.1f",
+                    r["size"] or "off", r["ms_per_open"], r["total_s"],
+                    "-" if r["hit_ratio"] is None else f"{r['hit_ratio']:.1%}", r["evictions"],
+                    base["ms_per_open"] / r["ms_per_open"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: infer_crypto_spec, parse complet de chaque colonne (sample=0, ancien
+comportement) vs inférence par échantillon, cache vide puis cache chaud.
+
+Table large synthétique façon T_Map après fillna (colonnes texte: libellés,
+villes, années, dates, codes, âges en texte avec des "None"), N colonnes x M lignes.
+Vérifie au passage que les deux specs sont identiques.
+
+Usage:
+  python benchmark/benchInferSpec.py --cols 60 --rows 50000
+  python benchmark/benchInferSpec.py --cols 200 --rows 10000 --sample 128
+"""
+import sys, os
+import time
+import argparse
+import warnings
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[1]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import numpy as np
+import pandas as pd
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+
+logger = setup_logger(debug=False)
+
+
+def _column(kind: int, n: int, rng) -> np.ndarray:
+    if kind == 0:
+        return rng.choice(["Deletion", "Mutation", "UPD", "ICD", "Clinical", "I don't know"], n)
+    if kind == 1:
+        return np.array([f"Ville {i}" for i in rng.integers(0, 500, n)], dtype=object)
+    if kind == 2:
+        return rng.integers(1980, 2024, n).astype(str)
+    if kind == 3:
+        return (pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3000, n), unit="D")).strftime("%Y-%m-%d").to_numpy()
+    if kind == 4:
+        ages = rng.integers(0, 45, n).astype(str).astype(object)
+        ages[rng.random(n) < 0.03] = "None"
+        return ages
+    return rng.choice(["M", "F", "None"], n)
+
+
+def _table(cols: int, rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({f"c{i}_{i % 6}": _column(i % 6, rows, rng) for i in range(cols)})
+
+
+def _timed(label: str, fn, cells: int):
+    t0 = time.perf_counter()
+    res = fn()
+    dt = time.perf_counter() - t0
+    logger.info("%-26s %8.3fs  %12.0f cellules/s", label, dt, cells / dt)
+    return dt, res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cols", type=int, default=60)
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--sample", type=int, default=crypto.INFER_SAMPLE)
+    args = ap.parse_args()
+    warnings.simplefilter("ignore", UserWarning)   # "Could not infer format" de pd.to_datetime
+
+    df = _table(args.cols, args.rows)
+    cells = args.cols * args.rows
+    logger.info("Table %d colonnes x %d lignes, échantillon %d", args.cols, args.rows, args.sample)
+
+    t_full, full = _timed("parse complet (sample=0)", lambda: crypto.infer_crypto_spec(df, sample=0), cells)
+    crypto._infer_cache.clear()
+    t_cold, cold = _timed("échantillon, cache vide", lambda: crypto.infer_crypto_spec(df, sample=args.sample), cells)
+    t_warm, warm = _timed("échantillon, cache chaud", lambda: crypto.infer_crypto_spec(df, sample=args.sample), cells)
+
+    assert cold == full == warm, {c: (full[c], cold[c]) for c in full if full[c] != cold[c]}
+    logger.info("Specs identiques (%s)", {t: list(full.values()).count(t) for t in ("str", "number", "date")})
+    logger.info("Gain: x%.1f (cache vide), x%.1f (cache chaud)", t_full / t_cold, t_full / t_warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: JSON des tables cartes, mode historique (read_sql_table + jsonify)
+vs mode streaming (chunks + encodage incrémental) de app/common/db_read.py.
+
+Table T_Map synthétique (SQLite temporaire, 100k lignes par défaut). Chaque mode
+tourne dans un sous-process séparé pour mesurer proprement:
+  - time-to-first-byte (premier morceau reçu par le client)
+  - temps total
+  - pic RSS du process (ru_maxrss) au-delà de la base avant requête
+et on vérifie que les deux réponses JSON sont identiques.
+
+Usage:
+  python benchmark/benchMapJson.py --rows 100000
+  python benchmark/benchMapJson.py --rows 20000 --encrypt   # colonnes chiffrées Fernet (lent à préparer)
+"""
+import sys, os
+import json
+import time
+import hashlib
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[1]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+TABLE = "T_Map_Bench"
+
+
+def _seed(path: str, rows: int, encrypt: bool) -> None:
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "id": np.arange(1, rows + 1),
+        "genotype": rng.choice(["Deletion", "Mutation", "UPD", "ICD", "Clinical", "Mosaic"], rows),
+        "gender": rng.choice(["M", "F"], rows),
+        "groupAge": rng.choice(["<4 years", "4-8 years", "8-12 years", "12-17 years", ">18 years"], rows),
+        "country": rng.choice(["France", "Spain", "Italy", "Brazil", "India"], rows),
+        "city": [f"City {i % 5000}" for i in range(rows)],
+        "latitude": rng.uniform(-60, 60, rows).round(5),
+        "longitude": rng.uniform(-180, 180, rows).round(5),
+        "dateOfBirth": pd.to_datetime("2000-01-01") + pd.to_timedelta(rng.integers(0, 8000, rows), unit="D"),
+        "difficulties": rng.choice(["Sleep", "Epilepsy", "Walking", None], rows),
+    })
+    spec = None
+    if encrypt:
+        from tools.crypto_utils import encrypt_dataframe_auto
+        _, spec = encrypt_dataframe_auto(df, inplace=True, return_spec=True)
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    df.to_sql(TABLE, engine, if_exists="replace", index=False, chunksize=5000)
+    if spec:
+        # spec enregistré comme par export_Table: sans lui, pas de streaming (cf. db_read)
+        from tools import crypto_spec_registry as spec_registry
+        with engine.begin() as conn:
+            spec_registry.save_spec(conn, TABLE, spec)
+    engine.dispose()
+
+
+def _child(path: str, mode: str, decrypt: bool) -> None:
+    """Sous-process: sert UNE requête via Flask test_client et mesure TTFB / total / RSS."""
+    from flask import Flask
+    import app.common.db_read as db_read
+
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    app = Flask(__name__)
+
+    @app.get("/map")
+    def _map():
+        return db_read._read_table_as_json(TABLE, decrypt=decrypt, stream=(mode == "stream"))
+
+    db_read._read_engine = lambda cfg: engine
+    db_read.load_db_config = lambda: {}
+
+    client = app.test_client()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    resp = client.get("/map", buffered=False)
+    digest = hashlib.sha256()
+    ttfb = None
+    body = []
+    for part in resp.response:
+        if ttfb is None:
+            ttfb = time.perf_counter() - t0
+        body.append(part if isinstance(part, bytes) else part.encode("utf-8"))
+    total = time.perf_counter() - t0
+    resp.close()
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    records = json.loads(b"".join(body))
+    digest.update(json.dumps(records, sort_keys=True).encode("utf-8"))
+    print(json.dumps({
+        "mode": mode,
+        "rows": len(records),
+        "ttfb_s": ttfb,
+        "total_s": total,
+        "rss_delta_mb": (rss_peak - rss_before) / 1024,   # ru_maxrss en Ko sous Linux
+        "sha256": digest.hexdigest(),
+    }))
+
+
+def _run_child(path: str, mode: str, decrypt: bool) -> dict:
+    cmd = [sys.executable, __file__, "--child", mode, "--db", path]
+    if decrypt:
+        cmd.append("--encrypt")
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--encrypt", action="store_true", help="Chiffre la table (et déchiffre à la lecture)")
+    parser.add_argument("--child", choices=["legacy", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.db, args.child, args.encrypt)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "map.sqlite")
+        logger.info("Seed %d lignes (%s)...", args.rows, "chiffrées" if args.encrypt else "en clair")
+        _seed(path, args.rows, args.encrypt)
+
+        results = [_run_child(path, "legacy", args.encrypt), _run_child(path, "stream", args.encrypt)]
+        for r in results:
+            logger.info("%-7s %7d lignes  TTFB %7.3fs  total %7.3fs  pic RSS +%7.1f Mo",
+                        r["mode"], r["rows"], r["ttfb_s"], r["total_s"], r["rss_delta_mb"])
+        legacy, stream = results
+        if legacy["sha256"] != stream["sha256"]:
+            logger.error("❌ Les deux modes ne renvoient PAS le même JSON")
+            sys.exit(1)
+        logger.info("✅ JSON identique. TTFB x%.1f, pic RSS +%.1f Mo -> +%.1f Mo",
+                    legacy["ttfb_s"] / max(stream["ttfb_s"], 1e-9),
+                    legacy["rss_delta_mb"], stream["rss_delta_mb"])
+
+
+if __name__ == "__main__":
+    main()
@@ -19,14 +19,14 @@ from angelmanSyndromeConnexion.geo_utils3 import country_name_from_iso2
 # Set up logger
 logger = setup_logger(debug=False)
 
-def readTable_with_retry(table_name, max_retries=3, delay_seconds=5):
+def readTable_with_retry(table_name, max_retries=3, delay_seconds=5, columns=None):
     """
     Tentative de lecture avec relances automatiques
     """
     for attempt in range(1, max_retries + 1):
         try:
             logging.info(f"Tentative {attempt} de lecture de la table '{table_name}'")
-            df = readTable(table_name, bAngelmanResult=False)
+            df = readTable(table_name, bAngelmanResult=False, columns=columns)
             return df
         except Exception as e:
             logging.error(f"[ERREUR LECTURE] Table '{table_name}' - Tentative {attempt} : {e}")
@@ -37,13 +37,12 @@ def readTable_with_retry(table_name, max_retries=3, delay_seconds=5):
                 return pd.DataFrame()
             
 def _buildDataFrameMapASConnect():
-    df_PeoplePublic = readTable_with_retry("T_People_Public")
+    # Projection côté SQL: on ne ramène que les colonnes utiles (pas la photo MEDIUMBLOB)
     cols = ['id', 'country_code', 'age_years', 'created_at', 'city' , 'gender']
-    df_PeoplePublic = df_PeoplePublic.loc[:, df_PeoplePublic.columns.intersection(cols)]
+    df_PeoplePublic = readTable_with_retry("T_People_Public", columns=cols)
     
-    df_PeopleIdentity = readTable_with_retry("T_People_Identity")
     cols = ['person_id','genotype']
-    df_PeopleIdentity = df_PeopleIdentity.loc[:, df_PeopleIdentity.columns.intersection(cols)]
+    df_PeopleIdentity = readTable_with_retry("T_People_Identity", columns=cols)
     df_PeopleIdentity = df_PeopleIdentity.rename(columns={"person_id": "id"})
     df_merged = pd.merge(
         df_PeoplePublic,
@@ -80,6 +79,7 @@ def _transformersMapASConnect(df):
     
 
 class T_MapASConnect(T_ReaderAbstract):
+    source = "db"
 
     def readData(self):
         self.df = _buildDataFrameMapASConnect()
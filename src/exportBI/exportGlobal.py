@@ -5,7 +5,7 @@ from pathlib import Path
 SRC_DIR = Path(__file__).resolve().parents[1]  # .../src
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
-from tools.utilsTools import readTable
+from tools.utilsTools import readTable, load_crypto_spec
 import pandas as pd
 from exportBI.exportTools import T_ReaderAbstract
 from configparser import ConfigParser
@@ -34,7 +34,9 @@ def readTable_with_retry(table_name, max_retries=3, delay_seconds=5, bAngelmanRe
         try:
             logging.info(f"Tentative {attempt} de lecture de la table '{table_name}'")
             df = readTable(table_name, bAngelmanResult=bAngelmanResult)
-            decrypt_dataframe_auto(df,inplace=True)
+            # spec enregistré par export_Table; None -> ré-inféré
+            spec = load_crypto_spec(table_name, df.columns, bAngelmanResult=bAngelmanResult)
+            decrypt_dataframe_auto(df, inplace=True, spec_override=spec)
             return df
         except Exception as e:
             logging.error(f"[ERREUR LECTURE] Table '{table_name}' - Tentative {attempt} : {e}")
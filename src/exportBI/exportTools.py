@@ -5,6 +5,8 @@ import os
 from configparser import ConfigParser
 
 class T_ReaderAbstract(ABC):
+    # origine des données, tracée dans export_run (tools.export_ledger)
+    source = "google_sheet"
 
     def __init__(self):
         self.df = pd.DataFrame()
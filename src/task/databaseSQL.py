@@ -22,14 +22,20 @@ logger = setup_logger(debug=False)
 # === READER CLASSES ===
 
 class PubMedReader:
+    source = "api"
+
     def readData(self):
         return scrPubMed.pubmed_by_year(1965)
 
 class ASTrialReader:
+    source = "scraper"
+
     def readData(self):
         return scrASTrial.as_trials()
 
 class UnPopulationReader:
+    source = "api"
+
     def readData(self):
         config_path = os.path.join(os.path.dirname(__file__), "../../angelman_viz_keys/Config3.ini")
         from configparser import ConfigParser
@@ -41,6 +47,8 @@ class UnPopulationReader:
             raise Exception("Config3.ini non trouvé ou invalide")
 
 class ClinicalTrialsReader:
+    source = "file"
+
     def readData(self):
         json_path = os.path.join(os.path.dirname(__file__), "../../data/asf_clinics2.json")
         df = pd.read_json(json_path, orient="index")
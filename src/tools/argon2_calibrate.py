@@ -0,0 +1,143 @@
+# tools/argon2_calibrate.py
+"""
+Calibrage des paramètres Argon2id sur l'hôte courant (à lancer SUR la machine de prod).
+
+Mesure la vérification (ce que paie chaque login) pour une grille de paramètres
+(mémoire m en KiB x itérations t, parallélisme p fixé) et retient le jeu le plus coûteux
+pour un attaquant (m * t maximal) qui respecte:
+  - la latence cible: médiane de verify <= --target-ms
+  - le plafond mémoire: m x ARGON2_POOL_WORKERS (calculs simultanés, tools.password_pool) <= --max-memory-mib
+  - le minimum OWASP: m >= 7 MiB et m * t >= 19 MiB x 2
+
+Imprime le tableau, la section [Argon2] à reporter dans Config4.ini, et garde avec --out
+un rapport JSON (hôte, versions, mesures) comme trace du choix.
+
+Depuis src/:
+  python -m tools.argon2_calibrate calibrate --target-ms 250 --max-memory-mib 128
+  python -m tools.argon2_calibrate calibrate --memory 19456 47104 65536 --max-t 4 --out argon2_calibration.json
+  python -m tools.argon2_calibrate current
+"""
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+from datetime import datetime, timezone
+from importlib.metadata import version as pkg_version
+
+from argon2 import PasswordHasher
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+from tools import password_pool
+
+logger = setup_logger(debug=False)
+
+DEFAULT_MEMORY_KIB = (12288, 19456, 32768, 47104, 65536, 131072)
+OWASP_MIN_M = 7168
+OWASP_MIN_WORK = 19456 * 2
+_PASSWORD = "Calibrage!Argon2id-2024"
+
+
+def measure(t: int, m: int, p: int, *, rounds: int = 7) -> dict:
+    """Médiane / max de verify (ms) pour un jeu de paramètres, plus le temps d'un hash."""
+    ph = PasswordHasher(time_cost=t, memory_cost=m, parallelism=p)
+    t0 = time.perf_counter()
+    phc = ph.hash(_PASSWORD)
+    hash_ms = (time.perf_counter() - t0) * 1000
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        ph.verify(phc, _PASSWORD)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"t": t, "m": m, "p": p, "hash_ms": round(hash_ms, 2),
+            "verify_median_ms": round(statistics.median(samples), 2), "verify_max_ms": round(max(samples), 2)}
+
+
+def calibrate(*, target_ms: float, max_memory_mib: float, parallelism: int = 1,
+              memory_kib=DEFAULT_MEMORY_KIB, max_t: int = 6, rounds: int = 7, workers: int | None = None) -> dict:
+    workers = max(1, workers if workers is not None else password_pool.WORKERS)
+    results = []
+    for m in sorted(memory_kib):
+        if m < OWASP_MIN_M:
+            continue
+        if m * workers > max_memory_mib * 1024:
+            logger.info("m=%d KiB écarté: %d workers x %.0f MiB > plafond %.0f MiB",
+                        m, workers, m / 1024, max_memory_mib)
+            continue
+        for t in range(1, max_t + 1):
+            if m * t < OWASP_MIN_WORK:
+                continue
+            r = measure(t, m, parallelism, rounds=rounds)
+            r["within_target"] = r["verify_median_ms"] <= target_ms
+            results.append(r)
+            logger.info("m=%6d KiB t=%d p=%d  verify médiane %7.1f ms  max %7.1f ms  %s",
+                        m, t, parallelism, r["verify_median_ms"], r["verify_max_ms"],
+                        "ok" if r["within_target"] else "trop lent")
+            if r["verify_median_ms"] > target_ms:
+                break   # t croissant = plus lent: inutile d'aller plus loin pour ce m
+
+    ok = [r for r in results if r["within_target"]]
+    best = max(ok, key=lambda r: (r["m"] * r["t"], r["m"])) if ok else None
+    return {
+        "measured_at": datetime.now(timezone.utc).isoformat(),
+        "host": {"node": platform.node(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+                 "python": platform.python_version(), "argon2_cffi": pkg_version("argon2-cffi"),
+                 "platform": platform.platform()},
+        "constraints": {"target_ms": target_ms, "max_memory_mib": max_memory_mib,
+                        "pool_workers": workers, "parallelism": parallelism},
+        "current": crypto.argon2_params(),
+        "candidates": results,
+        "recommended": best,
+    }
+
+
+def _config_snippet(r: dict) -> str:
+    return f"[Argon2]\nTIME_COST = {r['t']}\nMEMORY_COST = {r['m']}\nPARALLELISM = {r['p']}\n"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Calibrage Argon2id sur l'hôte courant")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("calibrate", help="Mesure la grille et recommande un jeu de paramètres")
+    c.add_argument("--target-ms", type=float, default=250.0, help="latence de verify visée (médiane)")
+    c.add_argument("--max-memory-mib", type=float, default=128.0,
+                   help="mémoire Argon2 max pour l'ensemble des workers du pool")
+    c.add_argument("--parallelism", type=int, default=1)
+    c.add_argument("--memory", type=int, nargs="+", default=list(DEFAULT_MEMORY_KIB), help="m candidats (KiB)")
+    c.add_argument("--max-t", type=int, default=6)
+    c.add_argument("--rounds", type=int, default=7)
+    c.add_argument("--workers", type=int, help="calculs simultanés (défaut: ARGON2_POOL_WORKERS)")
+    c.add_argument("--out", help="écrit le rapport JSON (trace du choix)")
+    sub.add_parser("current", help="Mesure les paramètres actuellement configurés")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "current":
+        cur = crypto.argon2_params()
+        print(json.dumps({**cur, **measure(cur["t"], cur["m"], cur["p"])}, indent=2))
+        return 0
+
+    report = calibrate(target_ms=args.target_ms, max_memory_mib=args.max_memory_mib,
+                       parallelism=args.parallelism, memory_kib=args.memory, max_t=args.max_t,
+                       rounds=args.rounds, workers=args.workers)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info("Rapport écrit: %s", args.out)
+    best = report["recommended"]
+    if best is None:
+        logger.error("Aucun jeu ne tient la cible (%.0f ms, %.0f MiB): relâcher les contraintes",
+                     args.target_ms, args.max_memory_mib)
+        return 1
+    logger.info("Recommandé: m=%d KiB t=%d p=%d (verify %.1f ms), actuel: %s",
+                best["m"], best["t"], best["p"], best["verify_median_ms"], report["current"])
+    print(_config_snippet(best))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+# tools/blind_index.py
+"""
+Index aveugles (blind index): recherche par égalité sur des colonnes chiffrées Fernet.
+
+Fernet n'est pas déterministe (IV aléatoire): WHERE firstname = ... est impossible,
+toute recherche par nom / génotype lisait la table entière et déchiffrait chaque
+ligne. Ici, pour chaque colonne déclarée, on stocke à côté un HMAC-SHA256 du clair
+NORMALISÉ (crypto_utils.keyed_sha256, une clé dérivée par colonne), dans une table
+d'index dédiée:
+    <index_table> (<key_column>, column_name, bidx CHAR(64), version CHAR(8))
+    PK (<key_column>, column_name), INDEX (column_name, bidx)
+
+  - normalisation configurable par colonne (IndexedColumn): trim, espaces multiples,
+    casse (casefold), accents, ponctuation. "  Élodie " et "elodie" -> même index
+  - version = empreinte des règles: changer les règles d'une colonne change ses
+    index (clé dérivée incluse), les lignes d'une ancienne version ne matchent plus
+    et le backfill (nouvelle version) les réécrit. La version de l'index (clé du
+    checkpoint) inclut aussi le key_id de HMAC_KEY: après un changement de clé, les
+    anciens index ne matchent plus et le backfill ne se croit pas à jour
+  - hashes() / store() séparés: le HMAC se calcule hors transaction, store() écrit
+    sur la connexion de l'appelant (même transaction que l'INSERT / UPDATE chiffré)
+  - backfill(): job par lots, reprenable. Chaque lot (lecture + déchiffrement +
+    upsert + checkpoint) est UNE transaction; le checkpoint (table
+    blind_index_checkpoint) garde la dernière clé traitée par version
+  - match_subquery(): sous-requête des clés dont TOUS les critères matchent, à
+    joindre dans la requête de l'appelant; lookup_query() / lookup(): ces clés
+
+Rien du clair n'est stocké; un index ne révèle que l'égalité entre lignes (comme
+email_sha), d'où des règles de normalisation à garder minimales.
+"""
+from __future__ import annotations
+
+import re
+import json
+import hashlib
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from tools.crypto_utils import keyed_sha256, hmac_key_id
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+CHECKPOINT_TABLE = "blind_index_checkpoint"
+
+CHECKPOINT_DDL = f"""
+CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+  index_table VARCHAR(64) NOT NULL,
+  version     CHAR(8)     NOT NULL,
+  last_key    BIGINT      NOT NULL,
+  rows_done   BIGINT      NOT NULL,
+  errors      BIGINT      NOT NULL,
+  finished_at DATETIME    NULL,
+  updated_at  DATETIME    NOT NULL,
+  PRIMARY KEY (index_table, version)
+)
+"""
+
+_SPACES = re.compile(r"\s+")
+_PUNCT = re.compile(r"[-'’`.,_/]+")
+
+
+def _short_hash(obj) -> str:
+    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+
+@dataclass(frozen=True)
+class IndexedColumn:
+    """Colonne indexée et ses règles de normalisation (appliquées dans cet ordre)."""
+    name: str
+    trim: bool = True
+    collapse_spaces: bool = True
+    casefold: bool = True
+    strip_accents: bool = True
+    strip_punctuation: bool = False   # "Jean-Pierre" == "jean pierre"
+
+    def normalize(self, value: Any) -> str | None:
+        """Clair normalisé, None si vide (pas d'index pour une valeur vide)."""
+        if value is None:
+            return None
+        s = value if isinstance(value, str) else str(value)
+        s = unicodedata.normalize("NFC", s)
+        if self.strip_punctuation:
+            s = _PUNCT.sub(" ", s)
+        if self.trim:
+            s = s.strip()
+        if self.collapse_spaces:
+            s = _SPACES.sub(" ", s)
+        if self.casefold:
+            s = s.casefold()
+        if self.strip_accents:
+            s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+            s = unicodedata.normalize("NFC", s)
+        return s or None
+
+    @property
+    def version(self) -> str:
+        return _short_hash({"name": self.name, "trim": self.trim, "spaces": self.collapse_spaces,
+                            "casefold": self.casefold, "accents": self.strip_accents,
+                            "punct": self.strip_punctuation})
+
+
+@dataclass
+class BlindIndex:
+    """
+    Index aveugles des colonnes 'columns' de source_table (clé entière key_column),
+    stockés dans index_table.
+    """
+    source_table: str
+    index_table: str
+    columns: Sequence[IndexedColumn]
+    key_column: str = "id"
+    _by_name: dict[str, IndexedColumn] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._by_name = {c.name: c for c in self.columns}
+
+    @property
+    def version(self) -> str:
+        """Version de l'ensemble des règles et de la clé HMAC (clé du checkpoint de backfill)."""
+        return _short_hash({"rules": [c.version for c in self.columns], "hmac_key": hmac_key_id()})
+
+    def column(self, name: str) -> IndexedColumn:
+        try:
+            return self._by_name[name]
+        except KeyError:
+            raise KeyError(f"{self.source_table}.{name}: pas d'index aveugle déclaré") from None
+
+    def blind(self, name: str, value: Any) -> str | None:
+        """Index d'une valeur en clair pour la colonne 'name' (None si valeur vide)."""
+        col = self.column(name)
+        norm = col.normalize(value)
+        if norm is None:
+            return None
+        return keyed_sha256(norm, purpose=f"blind_index:{self.source_table}.{col.name}:{col.version}")
+
+    def hashes(self, values: Mapping[str, Any]) -> dict[str, str | None]:
+        """{colonne: index} pour les colonnes indexées présentes dans values (clair)."""
+        return {name: self.blind(name, v) for name, v in values.items() if name in self._by_name}
+
+    # -----------------------------
+    #  DDL
+    # -----------------------------
+    def ensure_tables(self, conn: Connection) -> None:
+        """Tables d'index et de checkpoint (hors transaction applicative: DDL = COMMIT implicite en MySQL)."""
+        t, k = self.index_table, self.key_column
+        inline_index = f",\n  INDEX idx_{t}_bidx (column_name, bidx)" if conn.dialect.name == "mysql" else ""
+        conn.exec_driver_sql(f"""
+            CREATE TABLE IF NOT EXISTS {t} (
+              {k}         BIGINT      NOT NULL,
+              column_name VARCHAR(64) NOT NULL,
+              bidx        CHAR(64)    NOT NULL,
+              version     CHAR(8)     NOT NULL,
+              PRIMARY KEY ({k}, column_name){inline_index}
+            )""")
+        if conn.dialect.name != "mysql":
+            conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS idx_{t}_bidx ON {t} (column_name, bidx)")
+        conn.exec_driver_sql(CHECKPOINT_DDL)
+
+    # -----------------------------
+    #  Écriture (même transaction que la ligne source)
+    # -----------------------------
+    def _upsert_sql(self, conn: Connection):
+        t, k = self.index_table, self.key_column
+        if conn.dialect.name == "mysql":
+            return text(f"INSERT INTO {t} ({k}, column_name, bidx, version) VALUES (:k, :c, :h, :v) "
+                        "ON DUPLICATE KEY UPDATE bidx = VALUES(bidx), version = VALUES(version)")
+        return text(f"INSERT INTO {t} ({k}, column_name, bidx, version) VALUES (:k, :c, :h, :v) "
+                    f"ON CONFLICT({k}, column_name) DO UPDATE SET bidx = excluded.bidx, version = excluded.version")
+
+    def store(self, conn: Connection, key: int, hashes: Mapping[str, str | None]) -> None:
+        """Écrit les index d'une ligne (hashes() en amont); None -> index supprimé."""
+        self.store_many(conn, [(key, hashes)])
+
+    def store_many(self, conn: Connection, items: Iterable[tuple[int, Mapping[str, str | None]]]) -> None:
+        upserts, deletes = [], []
+        for key, hashes in items:
+            for name, h in hashes.items():
+                if h is None:
+                    deletes.append({"k": int(key), "c": name})
+                else:
+                    upserts.append({"k": int(key), "c": name, "h": h, "v": self.column(name).version})
+        if upserts:
+            conn.execute(self._upsert_sql(conn), upserts)
+        if deletes:
+            conn.execute(text(f"DELETE FROM {self.index_table} WHERE {self.key_column} = :k AND column_name = :c"),
+                         deletes)
+
+    def delete(self, conn: Connection, key: int) -> None:
+        conn.execute(text(f"DELETE FROM {self.index_table} WHERE {self.key_column} = :k"), {"k": int(key)})
+
+    # -----------------------------
+    #  Recherche
+    # -----------------------------
+    def match_subquery(self, criteria: Mapping[str, Any]) -> tuple[str, dict] | None:
+        """
+        (SQL, params) d'une sous-requête des clés (colonne key_column) dont TOUTES les
+        colonnes de criteria (clair) matchent, à joindre dans la requête de l'appelant.
+        Paramètres préfixés bi_. None si un critère est vide après normalisation.
+        """
+        if not criteria:
+            raise ValueError("lookup: au moins un critère")
+        conds, params = [], {}
+        for i, (name, value) in enumerate(criteria.items()):
+            h = self.blind(name, value)
+            if h is None:
+                return None
+            conds.append(f"(column_name = :bi_c{i} AND bidx = :bi_h{i} AND version = :bi_v{i})")
+            params.update({f"bi_c{i}": name, f"bi_h{i}": h, f"bi_v{i}": self.column(name).version})
+        sql = (f"SELECT {self.key_column} FROM {self.index_table} WHERE {' OR '.join(conds)} "
+               f"GROUP BY {self.key_column} HAVING COUNT(*) = {len(conds)}")
+        return sql, params
+
+    def lookup_query(self, criteria: Mapping[str, Any]):
+        """(requête, params) des clés qui matchent (cf. match_subquery), triées; None si rien ne peut matcher."""
+        q = self.match_subquery(criteria)
+        if q is None:
+            return None
+        sql, params = q
+        return text(f"{sql} ORDER BY {self.key_column}"), params
+
+    def lookup(self, bind: Engine | Connection, criteria: Mapping[str, Any]) -> list[int]:
+        q = self.lookup_query(criteria)
+        if q is None:
+            return []
+        if isinstance(bind, Connection):
+            rows = bind.execute(*q).fetchall()
+        else:
+            with bind.connect() as conn:
+                rows = conn.execute(*q).fetchall()
+        return [int(r[0]) for r in rows]
+
+    # -----------------------------
+    #  Backfill (reprenable)
+    # -----------------------------
+    def checkpoint(self, conn: Connection) -> dict | None:
+        row = conn.execute(text(f"SELECT last_key, rows_done, errors, finished_at, updated_at FROM {CHECKPOINT_TABLE} "
+                                "WHERE index_table = :t AND version = :v"),
+                           {"t": self.index_table, "v": self.version}).fetchone()
+        if row is None:
+            return None
+        return {"version": self.version, "last_key": int(row[0]), "rows_done": int(row[1]), "errors": int(row[2]),
+                "finished_at": row[3] and str(row[3]), "updated_at": str(row[4])}
+
+    def _save_checkpoint(self, conn: Connection, state: dict, finished: bool) -> None:
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        params = {"t": self.index_table, "v": self.version, "k": state["last_key"], "n": state["rows_done"],
+                  "e": state["errors"], "f": now if finished else None, "u": now}
+        conn.execute(text(f"DELETE FROM {CHECKPOINT_TABLE} WHERE index_table = :t AND version = :v"), params)
+        conn.execute(text(f"INSERT INTO {CHECKPOINT_TABLE} (index_table, version, last_key, rows_done, errors, "
+                          "finished_at, updated_at) VALUES (:t, :v, :k, :n, :e, :f, :u)"), params)
+
+    def backfill(
+        self,
+        engine: Engine,
+        decrypt: Callable[[Any], str | None],
+        *,
+        batch_size: int = 500,
+        restart: bool = False,
+        max_batches: int | None = None,
+    ) -> dict:
+        """
+        (Re)calcule les index de toutes les lignes de source_table, par lots de batch_size
+        dans l'ordre de key_column, en reprenant après le dernier checkpoint de la version
+        courante (restart=True: depuis le début). decrypt(valeur stockée) -> clair;
+        une valeur indéchiffrable est comptée dans 'errors' et son index supprimé.
+        max_batches: arrêt volontaire après N lots (job découpé / tests).
+        """
+        with engine.begin() as conn:
+            self.ensure_tables(conn)
+            state = None if restart else self.checkpoint(conn)
+        if state and state["finished_at"]:
+            logger.info("--- Index aveugles %s déjà à jour (version %s)", self.index_table, self.version)
+            return {**state, "finished": True, "batches": 0}
+        state = {k: state[k] for k in ("last_key", "rows_done", "errors")} if state else \
+            {"last_key": -1, "rows_done": 0, "errors": 0}
+        names = [c.name for c in self.columns]
+        select = (f"SELECT {self.key_column}, {', '.join(names)} FROM {self.source_table} "
+                  f"WHERE {self.key_column} > :last ORDER BY {self.key_column} LIMIT :n")
+        logger.info("--- Backfill index aveugles %s (version %s) depuis %s=%d",
+                    self.index_table, self.version, self.key_column, state["last_key"])
+
+        batches, finished = 0, False
+        while not finished and (max_batches is None or batches < max_batches):
+            with engine.begin() as conn:
+                # FOR UPDATE: un UPDATE applicatif concurrent attend la fin du lot (pas d'index périmé)
+                lock = " FOR UPDATE" if conn.dialect.name == "mysql" else ""
+                rows = conn.execute(text(select + lock), {"last": state["last_key"], "n": batch_size}).fetchall()
+                items = []
+                for row in rows:
+                    clear = {}
+                    for name, stored in zip(names, row[1:]):
+                        try:
+                            clear[name] = None if stored is None else decrypt(stored)
+                        except Exception:
+                            state["errors"] += 1
+                            clear[name] = None
+                    items.append((row[0], self.hashes(clear)))
+                self.store_many(conn, items)
+                if rows:
+                    state["last_key"] = int(rows[-1][0])
+                    state["rows_done"] += len(rows)
+                finished = len(rows) < batch_size
+                self._save_checkpoint(conn, state, finished)
+            batches += 1
+            logger.info("--- Backfill %s: %d lignes (dernière clé %d, %d erreurs)",
+                        self.index_table, state["rows_done"], state["last_key"], state["errors"])
+        return {"version": self.version, **state, "finished": finished, "batches": batches}
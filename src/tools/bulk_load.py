@@ -0,0 +1,338 @@
+# tools/bulk_load.py
+"""
+Chargement en masse d'un DataFrame dans une table EXISTANTE (DDL conservée).
+
+Avant: export_Table faisait df.to_sql(if_exists='replace') -> pandas recrée la
+table (TEXT/BIGINT/DOUBLE...) et jette la DDL que le script CREATE de
+src/SQLScript/<Pays>/ venait d'appliquer, puis insère par petits lots.
+
+Ici on n'insère que dans la table telle qu'elle est définie par la DDL:
+  - "executemany": INSERT multi-lignes par lots de batch_size lignes
+                   (pymysql réécrit l'executemany en un seul INSERT ... VALUES (...),(...))
+  - "load_data"  : CSV temporaire + LOAD DATA LOCAL INFILE, si le serveur l'autorise
+                   (sinon repli automatique sur executemany)
+  - "to_sql"     : ancien comportement (replace), seulement si demandé explicitement
+
+Colonnes chiffrées (ciphertext=, les colonnes du spec): un jeton Fernet en Base64 fait
+100+ caractères et ne tient ni dans un INT ni dans un VARBINARY(64) de la DDL. Sur la
+table fraîchement créée, ces colonnes sont élargies (MySQL: ALTER TABLE ... MODIFY en
+VARCHAR(n) / TEXT, NOT NULL, clés et index conservés); SQLite ne contrôle pas les types
+déclarés, rien à faire.
+
+Si les colonnes du DataFrame ne collent toujours pas à la DDL (colonne inconnue de la
+table, colonne NOT NULL sans défaut absente du DataFrame, texte en clair dans un INT...),
+on ne devine pas: ColumnMismatch est levée, la table n'est pas remplacée en silence.
+
+Variables d'environnement:
+  - EXPORT_BULK_MODE   : executemany (défaut) | load_data | to_sql
+  - EXPORT_BULK_BATCH  : lignes par lot pour executemany (défaut 1000)
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Iterable, Literal
+
+import pandas as pd
+from sqlalchemy import inspect
+from sqlalchemy import types as sqltypes
+from sqlalchemy.engine import Connection, Engine
+
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+BulkMode = Literal["executemany", "load_data", "to_sql"]
+
+DEFAULT_MODE: BulkMode = os.environ.get("EXPORT_BULK_MODE", "executemany").lower()  # type: ignore[assignment]
+try:
+    DEFAULT_BATCH = int(os.environ.get("EXPORT_BULK_BATCH", 1000))
+except ValueError:
+    DEFAULT_BATCH = 1000
+
+# Codes MySQL: LOAD DATA LOCAL refusé côté serveur ou côté client
+_LOCAL_INFILE_REFUSED = {1148, 2068, 3948}
+_MAX_INDEXED_VARCHAR = 768
+
+
+class ColumnMismatch(ValueError):
+    """Les colonnes du DataFrame ne correspondent pas à la DDL de la table."""
+
+
+def _q(name: str) -> str:
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def table_columns(conn: Connection, table_name: str) -> list[dict]:
+    """Colonnes de la table (ordre DDL): name, nullable, default, autoincrement."""
+    return inspect(conn).get_columns(table_name)
+
+
+def match_columns(conn: Connection, table_name: str, df: pd.DataFrame, ciphertext: Iterable[str] = ()) -> list[str]:
+    """
+    Noms de colonnes de la TABLE (casse DDL) dans l'ordre du DataFrame.
+    ColumnMismatch si une colonne du DataFrame est inconnue, ou si une colonne
+    obligatoire de la table (NOT NULL, sans défaut, pas auto-incrément) manque.
+    ciphertext: colonnes de jetons chiffrés, type non contrôlé là où il n'est pas appliqué (SQLite).
+    """
+    cols = table_columns(conn, table_name)
+    by_lower = {c["name"].lower(): c for c in cols}
+
+    unknown = [c for c in df.columns if str(c).lower() not in by_lower]
+    if unknown:
+        raise ColumnMismatch(f"{table_name}: colonnes absentes de la DDL: {unknown}")
+
+    provided = {str(c).lower() for c in df.columns}
+    missing = [
+        c["name"] for c in cols
+        if c["name"].lower() not in provided
+        and not c.get("nullable", True)
+        and c.get("default") is None
+        and c.get("autoincrement") is not True
+    ]
+    if missing:
+        raise ColumnMismatch(f"{table_name}: colonnes NOT NULL sans valeur: {missing}")
+
+    unchecked = {str(c).lower() for c in ciphertext} if not _types_enforced(conn) else set()
+    too_wide = {}
+    for col in df.columns:
+        if str(col).lower() in unchecked:
+            continue
+        reason = _type_mismatch(by_lower[str(col).lower()]["type"], df[col])
+        if reason:
+            too_wide[col] = reason
+    if too_wide:
+        raise ColumnMismatch(f"{table_name}: valeurs incompatibles avec la DDL: {too_wide}")
+
+    return [by_lower[str(c).lower()]["name"] for c in df.columns]
+
+
+def _type_mismatch(col_type, ser: pd.Series) -> str | None:
+    """Raison pour laquelle ser ne tient pas dans col_type (None si ça passe)."""
+    values = ser.dropna()
+    if values.empty:
+        return None
+    if isinstance(col_type, (sqltypes.Integer, sqltypes.Numeric)):
+        if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+            return None
+        parsed = pd.to_numeric(values, errors="coerce")
+        if parsed.isna().any():
+            return f"{col_type} attend des nombres"
+        if isinstance(col_type, sqltypes.Integer) and (parsed % 1 != 0).any():
+            return f"{col_type} attend des entiers"
+        return None
+    if isinstance(col_type, (sqltypes.Date, sqltypes.DateTime)):
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return None
+        if pd.to_datetime(values, errors="coerce").isna().any():
+            return f"{col_type} attend des dates"
+        return None
+    length = getattr(col_type, "length", None)
+    if length and isinstance(col_type, (sqltypes.String, sqltypes._Binary)):
+        if isinstance(col_type, sqltypes._Binary):
+            widest = values.map(lambda v: len(v) if isinstance(v, (bytes, bytearray)) else len(str(v).encode("utf-8"))).max()
+        else:
+            widest = values.map(lambda v: len(str(v))).max()
+        if widest > length:
+            return f"{col_type}: valeur de {widest} > {length}"
+    return None
+
+
+def _types_enforced(conn: Connection) -> bool:
+    return conn.dialect.name != "sqlite"   # SQLite: typage dynamique, longueurs ignorées
+
+
+def _widest(ser: pd.Series) -> int:
+    values = ser.dropna()
+    if values.empty:
+        return 0
+    return int(values.map(lambda v: len(v) if isinstance(v, (bytes, bytearray)) else len(str(v))).max())
+
+
+def fit_ciphertext_columns(conn: Connection, table_name: str, df: pd.DataFrame, ciphertext: Iterable[str]) -> list[str]:
+    """
+    Élargit les colonnes de table_name qui vont recevoir des jetons chiffrés et dont le type
+    DDL ne peut pas les contenir (INT, DECIMAL, VARBINARY(64)...). DDL: à appeler hors
+    transaction, sur une table fraîchement créée. Retourne les colonnes modifiées.
+    Seules les colonnes de ciphertext (celles que le spec de chiffrement marque chiffrées)
+    sont touchées, jamais la clé primaire ni une colonne AUTO_INCREMENT: si le spec en
+    contient une, elle garde son type et l'insertion échoue franchement.
+    """
+    if conn.dialect.name != "mysql":
+        return []
+    by_lower = {c["name"].lower(): c for c in table_columns(conn, table_name)}
+    pk = {str(n).lower() for n in inspect(conn).get_pk_constraint(table_name).get("constrained_columns") or ()}
+    altered = []
+    for col in ciphertext:
+        c = by_lower.get(str(col).lower())
+        if c is None or col not in df.columns:
+            continue   # match_columns le signalera
+        if c["name"].lower() in pk or c.get("autoincrement") is True:
+            logger.warning("%s.%s: clé primaire / AUTO_INCREMENT marquée chiffrée, type %s conservé",
+                           table_name, c["name"], c["type"])
+            continue
+        if isinstance(c["type"], (sqltypes.String, sqltypes._Binary)) and _type_mismatch(c["type"], df[col]) is None:
+            continue
+        # marge pour les jetons un peu plus longs des exports incrémentaux suivants;
+        # 768 caractères = plus grande clé indexable en utf8mb4 (UNIQUE / PRIMARY KEY)
+        width = max(255, -(-int(_widest(df[col]) * 1.25) // 64) * 64)
+        col_type = f"VARCHAR({width})" if width <= _MAX_INDEXED_VARCHAR else "TEXT"
+        conn.exec_driver_sql(f"ALTER TABLE {_q(table_name)} MODIFY COLUMN {_q(c['name'])} {col_type} "
+                             f"{'NULL' if c.get('nullable', True) else 'NOT NULL'}")
+        logger.info("%s.%s: %s -> %s (jetons chiffrés)", table_name, c["name"], c["type"], col_type)
+        altered.append(c["name"])
+    return altered
+
+
+def _rows(df: pd.DataFrame):
+    """Tuples Python natifs (NaN/NaT -> None, numpy -> int/float, bool -> int)."""
+    work = df.astype(object).where(pd.notna(df), None)
+    for col in work.columns:
+        if pd.api.types.is_bool_dtype(df[col]):
+            work[col] = work[col].map(lambda v: None if v is None else int(v))
+    return work.itertuples(index=False, name=None)
+
+
+def _placeholder(conn: Connection) -> str:
+    return "%s" if conn.dialect.paramstyle in ("format", "pyformat") else "?"
+
+
+def insert_executemany(conn: Connection, table_name: str, columns: list[str], df: pd.DataFrame,
+                       batch_size: int = DEFAULT_BATCH) -> int:
+    """INSERT par lots de batch_size lignes (executemany DBAPI)."""
+    ph = _placeholder(conn)
+    sql = (
+        f"INSERT INTO {_q(table_name)} ({', '.join(_q(c) for c in columns)}) "
+        f"VALUES ({', '.join([ph] * len(columns))})"
+    )
+    batch, total = [], 0
+    for row in _rows(df):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.exec_driver_sql(sql, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.exec_driver_sql(sql, batch)
+        total += len(batch)
+    return total
+
+
+def _csv_field(v) -> str:
+    if v is None:
+        return "NULL"
+    return '"' + str(v).replace('"', '""') + '"'
+
+
+def local_infile_allowed(conn: Connection) -> bool:
+    if conn.dialect.name != "mysql":
+        return False
+    try:
+        return bool(int(conn.exec_driver_sql("SELECT @@GLOBAL.local_infile").scalar() or 0))
+    except Exception as e:
+        logger.info("local_infile illisible (%s): LOAD DATA désactivé.", e)
+        return False
+
+
+def insert_load_data(conn: Connection, table_name: str, columns: list[str], df: pd.DataFrame) -> int:
+    """
+    CSV temporaire + LOAD DATA LOCAL INFILE.
+    Chaque champ est entre guillemets (doublés si présents dans la valeur), NULL sans guillemets.
+    Nécessite local_infile côté serveur ET côté client (connect_args={"local_infile": True}).
+    """
+    for col in df.columns:
+        if df[col].map(lambda v: isinstance(v, (bytes, bytearray, memoryview))).any():
+            raise ColumnMismatch(f"{table_name}.{col}: valeurs binaires, LOAD DATA CSV non adapté")
+
+    fd, path = tempfile.mkstemp(prefix=f"bulk_{table_name}_", suffix=".csv")
+    try:
+        n = 0
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            for row in _rows(df):
+                f.write(",".join(_csv_field(v) for v in row))
+                f.write("\n")
+                n += 1
+        sql = (
+            f"LOAD DATA LOCAL INFILE '{path.replace(chr(92), '/')}' INTO TABLE {_q(table_name)} "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            "LINES TERMINATED BY '\\n' "
+            f"({', '.join(_q(c) for c in columns)})"
+        )
+        conn.exec_driver_sql(sql)
+        return n
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _error_code(e: BaseException) -> int | None:
+    args = getattr(getattr(e, "orig", None), "args", None) or ()
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def bulk_load(
+    engine: Engine,
+    table_name: str,
+    df: pd.DataFrame,
+    *,
+    mode: BulkMode | None = None,
+    batch_size: int | None = None,
+    infile_engine: Engine | None = None,
+    ciphertext: Iterable[str] = (),
+) -> str:
+    """
+    Charge df dans table_name (qui doit déjà exister avec sa DDL) en UNE transaction.
+    - infile_engine: engine créé avec local_infile=True (requis pour mode="load_data")
+    - ciphertext: colonnes de jetons chiffrés, élargies si besoin (fit_ciphertext_columns)
+    ColumnMismatch si df ne tient pas dans la DDL (la table n'est jamais remplacée implicitement).
+    Retourne le mode réellement utilisé ("executemany" | "load_data" | "to_sql").
+    """
+    mode = (mode or DEFAULT_MODE).lower()
+    batch_size = batch_size or DEFAULT_BATCH
+    if mode not in ("executemany", "load_data", "to_sql"):
+        raise ValueError(f"Mode de chargement inconnu: {mode!r}")
+
+    if mode == "to_sql":
+        return _to_sql_replace(engine, table_name, df)
+
+    ciphertext = list(ciphertext)
+    with engine.connect() as conn:
+        if ciphertext:
+            fit_ciphertext_columns(conn, table_name, df, ciphertext)
+            conn.commit()
+        columns = match_columns(conn, table_name, df, ciphertext)
+
+    if mode == "load_data" and infile_engine is not None:
+        with infile_engine.connect() as conn:
+            allowed = local_infile_allowed(conn)
+        if allowed:
+            try:
+                with infile_engine.begin() as conn:
+                    n = insert_load_data(conn, table_name, columns, df)
+                logger.info("LOAD DATA: %d lignes chargées dans %s", n, table_name)
+                return "load_data"
+            except ColumnMismatch as e:
+                logger.info("%s -> executemany.", e)
+            except Exception as e:
+                if _error_code(e) not in _LOCAL_INFILE_REFUSED:
+                    raise
+                logger.warning("LOAD DATA LOCAL refusé (%s) -> executemany.", e)
+        else:
+            logger.info("local_infile désactivé sur le serveur -> executemany.")
+    elif mode == "load_data":
+        logger.info("Pas d'engine local_infile -> executemany.")
+
+    with engine.begin() as conn:
+        n = insert_executemany(conn, table_name, columns, df, batch_size)
+    logger.info("executemany: %d lignes chargées dans %s (lots de %d)", n, table_name, batch_size)
+    return "executemany"
+
+
+def _to_sql_replace(engine: Engine, table_name: str, df: pd.DataFrame) -> str:
+    with engine.begin() as conn:
+        df.to_sql(table_name, con=conn, if_exists="replace", index=False)
+    logger.info("to_sql(replace): %d lignes dans %s", len(df), table_name)
+    return "to_sql"
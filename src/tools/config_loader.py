@@ -0,0 +1,177 @@
+# tools/config_loader.py
+"""
+Service de configuration partagé pour les fichiers angelman_viz_keys/Config*.ini.
+
+- Chaque .ini est parsé UNE fois puis gardé en cache (process-wide).
+- Le cache est invalidé automatiquement quand le mtime du fichier change
+  (pas besoin de redémarrer l'appli après une modification des clés).
+- Une clé/section absente lève ConfigError avec le fichier, la section et la clé,
+  au lieu d'un KeyError anonyme au milieu d'une requête.
+
+Usage:
+    from tools.config_loader import config_path, get_section
+
+    mysql = get_section(config_path("Config2.ini"), "MySQL")
+    host = mysql["DB_HOST"]                     # str, ConfigError si absente
+    port = mysql.get_int("DB_PORT", 3306)       # typé, avec défaut
+"""
+from __future__ import annotations
+
+import os
+import threading
+from configparser import ConfigParser
+from typing import Any, Callable
+
+KEYS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "angelman_viz_keys"))
+
+_MISSING = object()
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off", ""}
+
+
+class ConfigError(Exception):
+    """Configuration absente ou invalide (fichier, section, clé ou type)."""
+
+
+def config_path(filename: str) -> str:
+    """Chemin absolu d'un fichier du dossier angelman_viz_keys (ex: 'Config2.ini')."""
+    return os.path.join(KEYS_DIR, filename)
+
+
+class ConfigSection:
+    """Section d'un .ini, en lecture seule, avec accès typés."""
+
+    def __init__(self, path: str, name: str, values: dict[str, str]):
+        self.path = path
+        self.name = name
+        self._values = values
+
+    def __contains__(self, key: str) -> bool:
+        return key.lower() in self._values
+
+    def __getitem__(self, key: str) -> str:
+        return self.get_str(key)
+
+    def keys(self):
+        return self._values.keys()
+
+    def _raw(self, key: str, default: Any):
+        value = self._values.get(key.lower(), _MISSING)
+        if value is _MISSING:
+            if default is not _MISSING:
+                return default
+            raise ConfigError(f"Clé {key!r} absente de la section [{self.name}] de {self.path}")
+        return value
+
+    def _cast(self, key: str, default: Any, cast: Callable[[str], Any], type_name: str):
+        value = self._raw(key, default)
+        if value is default and default is not _MISSING:
+            return default
+        try:
+            return cast(value.strip())
+        except (TypeError, ValueError):
+            raise ConfigError(
+                f"Clé {key!r} de [{self.name}] ({self.path}) n'est pas un {type_name}: {value!r}"
+            ) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._raw(key, default)
+
+    def get_str(self, key: str, default: Any = _MISSING) -> str:
+        value = self._raw(key, default)
+        return value.strip() if isinstance(value, str) else value
+
+    def get_int(self, key: str, default: Any = _MISSING) -> int:
+        return self._cast(key, default, int, "entier")
+
+    def get_float(self, key: str, default: Any = _MISSING) -> float:
+        return self._cast(key, default, float, "nombre")
+
+    def get_bool(self, key: str, default: Any = _MISSING) -> bool:
+        def _to_bool(v: str) -> bool:
+            v = v.lower()
+            if v in _TRUE:
+                return True
+            if v in _FALSE:
+                return False
+            raise ValueError(v)
+        return self._cast(key, default, _to_bool, "booléen")
+
+
+class _CachedConfig:
+    def __init__(self, path: str, mtime: float, parser: ConfigParser):
+        self.path = path
+        self.mtime = mtime
+        self.parser = parser
+        self.sections: dict[str, ConfigSection] = {}
+
+
+_cache: dict[str, _CachedConfig] = {}
+_lock = threading.Lock()
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load(path: str) -> _CachedConfig:
+    path = os.path.abspath(path)
+    mtime = _mtime(path)
+    if mtime is None:
+        with _lock:
+            _cache.pop(path, None)
+        raise FileNotFoundError(f"Config file not found: {path}")
+
+    entry = _cache.get(path)
+    if entry is not None and entry.mtime == mtime:
+        return entry
+
+    with _lock:
+        entry = _cache.get(path)
+        if entry is None or entry.mtime != mtime:
+            parser = ConfigParser()
+            if not parser.read(path, encoding="utf-8"):
+                raise FileNotFoundError(f"Config file not found: {path}")
+            entry = _CachedConfig(path, mtime, parser)
+            _cache[path] = entry
+    return entry
+
+
+def load_parser(path: str) -> ConfigParser:
+    """ConfigParser mis en cache (NE PAS le modifier: il est partagé)."""
+    return _load(path).parser
+
+
+def get_section(path: str, name: str, *, required: bool = True) -> ConfigSection | None:
+    """Section [name] du fichier 'path' (ConfigError si absente et required=True)."""
+    entry = _load(path)
+    section = entry.sections.get(name)
+    if section is not None:
+        return section
+    if not entry.parser.has_section(name):
+        if required:
+            raise ConfigError(f"Section [{name}] absente de {entry.path}")
+        return None
+    section = ConfigSection(entry.path, name, dict(entry.parser.items(name, raw=True)))
+    entry.sections[name] = section
+    return section
+
+
+def get_value(path: str, section: str, key: str, default: Any = _MISSING) -> str:
+    """Raccourci: valeur str d'une clé (ConfigError si absente sans défaut)."""
+    sec = get_section(path, section, required=default is _MISSING)
+    if sec is None:
+        return default
+    return sec.get_str(key, default)
+
+
+def invalidate(path: str | None = None) -> None:
+    """Vide le cache (un fichier ou tout)."""
+    with _lock:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.abspath(path), None)
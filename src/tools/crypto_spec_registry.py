@@ -0,0 +1,185 @@
+# tools/crypto_spec_registry.py
+"""
+Registre des specs de chiffrement ({col: 'str'|'number'|'date'}) par table exportée.
+
+decrypt_dataframe_auto ré-infère le spec à chaque lecture (infer_crypto_spec: deux
+pd.to_datetime + un pd.to_numeric par colonne), à chaque appel des endpoints cartes
+et à chaque readTable_with_retry d'exportGlobal. Or le spec est connu à l'export:
+  - export_Table l'infère UNE fois sur le clair, chiffre avec, puis l'enregistre ici
+    (table crypto_spec), avec la liste ordonnée des colonnes de la table publiée
+  - schema_version = empreinte de cette liste: la lecture (SELECT *) retrouve la
+    même liste, donc la même version. Une table dont le schéma a changé (colonne
+    ajoutée / retirée / renommée) ne correspond plus -> pas de spec, on ré-infère
+  - les anciennes versions restent; à chaque publication staged, les specs de la
+    génération sortante passent sous <table>__prev (retire_to_previous), et
+    rollback_table les échange avec ceux de la table (swap_with_previous): la
+    génération republiée est relue avec SON spec, même à colonnes identiques
+
+Côté lecture, lookup() met en cache les specs d'une table CRYPTO_SPEC_CACHE_TTL
+secondes (défaut 300; l'export tourne souvent dans un autre process). La lecture ne
+fait jamais de DDL: la table n'est créée que côté écriture (save_spec et la publication
+staged). Table absente = aucun spec; toute autre erreur (droits) donne None: dans les
+deux cas l'appelant repasse par l'inférence.
+"""
+from __future__ import annotations
+
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+
+from tools.logger import setup_logger
+from tools.staged_publish import previous_name
+
+logger = setup_logger(debug=False)
+
+SPEC_TABLE = "crypto_spec"
+
+try:
+    CACHE_TTL = float(os.environ.get("CRYPTO_SPEC_CACHE_TTL", 300))
+except ValueError:
+    CACHE_TTL = 300.0
+
+SPEC_DDL = f"""
+CREATE TABLE IF NOT EXISTS {SPEC_TABLE} (
+  table_name     VARCHAR(255) NOT NULL,
+  schema_version CHAR(16)     NOT NULL,
+  column_list    TEXT         NOT NULL,
+  spec           TEXT         NOT NULL,
+  run_id         CHAR(32),
+  created_at     DATETIME     NOT NULL,
+  PRIMARY KEY (table_name, schema_version)
+)
+"""
+
+_cache: dict[tuple[str, str], tuple[float, dict[str, dict]]] = {}
+_lock = threading.Lock()
+
+
+def schema_version(columns: Iterable[str]) -> str:
+    """Empreinte courte de la liste ORDONNÉE des colonnes."""
+    return hashlib.sha256("\x1f".join(str(c) for c in columns).encode("utf-8")).hexdigest()[:16]
+
+
+def _ph(conn: Connection) -> str:
+    return "%s" if conn.dialect.paramstyle in ("format", "pyformat") else "?"
+
+
+def ensure_table(conn: Connection) -> None:
+    conn.exec_driver_sql(SPEC_DDL)
+
+
+def table_columns(conn: Connection, table_name: str) -> list[str]:
+    """Colonnes de la table live, dans l'ordre physique (celui d'un SELECT *)."""
+    return [c["name"] for c in inspect(conn).get_columns(table_name)]
+
+
+def save_spec(conn: Connection, table_name: str, spec: dict, run_id: str | None = None) -> str:
+    """Enregistre le spec de la génération publiée de table_name; renvoie sa schema_version."""
+    ensure_table(conn)
+    columns = table_columns(conn, table_name)
+    version = schema_version(columns)
+    ph = _ph(conn)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if conn.dialect.name == "mysql":
+        sql = (f"INSERT INTO {SPEC_TABLE} (table_name, schema_version, column_list, spec, run_id, created_at) "
+               f"VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}) "
+               "ON DUPLICATE KEY UPDATE column_list = VALUES(column_list), spec = VALUES(spec), "
+               "run_id = VALUES(run_id), created_at = VALUES(created_at)")
+    else:
+        sql = (f"INSERT INTO {SPEC_TABLE} (table_name, schema_version, column_list, spec, run_id, created_at) "
+               f"VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}) "
+               "ON CONFLICT(table_name, schema_version) DO UPDATE SET column_list = excluded.column_list, "
+               "spec = excluded.spec, run_id = excluded.run_id, created_at = excluded.created_at")
+    conn.exec_driver_sql(sql, (table_name, version, json.dumps(columns, ensure_ascii=False),
+                               json.dumps(spec, ensure_ascii=False), run_id, now))
+    invalidate(table_name)
+    logger.info("--- Spec de chiffrement %s enregistré (version %s, %d colonnes chiffrées)", table_name, version, len(spec))
+    return version
+
+
+def load_specs(conn: Connection, table_name: str) -> dict[str, dict]:
+    """
+    {schema_version: {"columns", "spec", "run_id", "created_at"}} de toutes les versions connues.
+    Table crypto_spec absente (rien encore exporté avec spec) -> {} sans la créer.
+    """
+    if not inspect(conn).has_table(SPEC_TABLE):
+        return {}
+    rows = conn.exec_driver_sql(
+        f"SELECT schema_version, column_list, spec, run_id, created_at FROM {SPEC_TABLE} "
+        f"WHERE table_name = {_ph(conn)}", (table_name,)
+    ).fetchall()
+    return {r[0]: {"columns": json.loads(r[1]), "spec": json.loads(r[2]), "run_id": r[3], "created_at": str(r[4])}
+            for r in rows}
+
+
+def _bind_key(bind: Engine | Connection) -> str:
+    engine = bind.engine if isinstance(bind, Connection) else bind
+    return engine.url.render_as_string(hide_password=True)
+
+
+def lookup(bind: Engine | Connection, table_name: str, columns: Iterable[str]) -> dict | None:
+    """
+    Spec enregistré pour table_name si ses colonnes sont exactement 'columns'
+    (liste d'un SELECT *), sinon None (-> inférence côté appelant). Mis en cache.
+    """
+    columns = list(columns)
+    key = (_bind_key(bind), table_name)
+    with _lock:
+        hit = _cache.get(key)
+    if hit is None or time.monotonic() - hit[0] > CACHE_TTL:
+        try:
+            if isinstance(bind, Connection):
+                specs = load_specs(bind, table_name)
+            else:
+                with bind.begin() as conn:
+                    specs = load_specs(conn, table_name)
+        except Exception as e:
+            logger.warning("⚠️ Registre des specs illisible pour %s (%s): inférence", table_name, e)
+            return None
+        with _lock:
+            _cache[key] = hit = (time.monotonic(), specs)
+
+    entry = hit[1].get(schema_version(columns))
+    if entry is None:
+        logger.info("--- Pas de spec enregistré pour %s (%d colonnes): inférence", table_name, len(columns))
+        return None
+    return dict(entry["spec"])
+
+
+def _rename(conn: Connection, src: str, dst: str) -> None:
+    ph = _ph(conn)
+    conn.exec_driver_sql(f"DELETE FROM {SPEC_TABLE} WHERE table_name = {ph}", (dst,))
+    conn.exec_driver_sql(f"UPDATE {SPEC_TABLE} SET table_name = {ph} WHERE table_name = {ph}", (dst, src))
+
+
+def retire_to_previous(conn: Connection, table_name: str) -> None:
+    """Publication staged: les specs de la génération sortante deviennent ceux de <table>__prev."""
+    ensure_table(conn)
+    _rename(conn, table_name, previous_name(table_name))
+    invalidate(table_name)
+    invalidate(previous_name(table_name))
+
+
+def swap_with_previous(conn: Connection, table_name: str) -> None:
+    """Rollback: échange les specs de <table> et de <table>__prev (comme les tables elles-mêmes)."""
+    ensure_table(conn)
+    prev, tmp = previous_name(table_name), f"{table_name}__swap"
+    _rename(conn, table_name, tmp)
+    _rename(conn, prev, table_name)
+    _rename(conn, tmp, prev)
+    invalidate(table_name)
+    invalidate(prev)
+
+
+def invalidate(table_name: str | None = None) -> None:
+    """Vide le cache (d'une table, ou entièrement)."""
+    with _lock:
+        for key in [k for k in _cache if table_name is None or k[1] == table_name]:
+            del _cache[key]
@@ -5,26 +5,217 @@ import base64
 import pandas as pd
 import numpy as np
 import hashlib
+import hmac
+import math
 import os
+import threading
+import time
+from collections import OrderedDict
 from configparser import ConfigParser
 from datetime import date, datetime
 from typing import Union
-from argon2 import PasswordHasher
+from argon2 import PasswordHasher, extract_parameters
 from argon2.exceptions import VerifyMismatchError, VerificationError, InvalidHash
-from cryptography.fernet import Fernet
-
-# --- Chargement clé Fernet depuis Config4.ini ---
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+
+# --- Anneau de clés Fernet depuis Config4.ini, section [CleChiffrement] ---
+#   KEY           clé primaire: tout nouveau chiffrement
+#   PREVIOUS_KEYS anciennes clés (virgules, de la plus récente à la plus ancienne): déchiffrement seulement
+#   HMAC_KEY      base des clés dérivées de keyed_sha256 (index aveugles, empreintes d'export).
+#                 Défaut: la plus ancienne clé de l'anneau. À renseigner AVANT de retirer
+#                 l'ancienne clé (sinon index / empreintes à recalculer), cf. tools.key_rotation
 _wkdir = os.path.dirname(__file__)
 _cfg = ConfigParser()
 _cfg.read(os.path.abspath(os.path.join(_wkdir, "..", "..", "angelman_viz_keys", "Config4.ini")))
 _key = _cfg["CleChiffrement"]["KEY"]
-_cipher = Fernet(_key)
+_previous = [k.strip() for k in _cfg.get("CleChiffrement", "PREVIOUS_KEYS", fallback="").split(",") if k.strip()]
+_hmac_cfg = _cfg.get("CleChiffrement", "HMAC_KEY", fallback="").strip()
+
+_ring: list[str] = []
+_hmac_key = ""
+_cipher: MultiFernet
+_derived_keys: dict[str, bytes] = {}
+
+
+# -----------------------------
+#  Cache des déchiffrements (opt-in)
+# -----------------------------
+class DecryptCache:
+    """
+    Cache LRU borné (nombre d'entrées + TTL) jeton chiffré -> clair, partagé par le process.
+    Les listes de messages / résumés de conversation redéchiffrent sans cesse les mêmes jetons.
+
+    - clé: BLAKE2b du jeton (jamais le jeton lui-même), valeur: le clair, en mémoire uniquement
+      (rien n'est jamais écrit sur disque)
+    - max_entries = 0 -> désactivé (défaut). Env DECRYPT_CACHE_SIZE / DECRYPT_CACHE_TTL (s)
+      et DECRYPT_CACHE_MAX_LEN (clairs plus longs non mis en cache)
+    - invalidate(anciens_jetons) après commit quand une valeur est modifiée ou supprimée
+      (updateData, édition / suppression de message): un jeton Fernet reste lisible, mais l'ancien
+      clair ne doit pas rester en mémoire jusqu'au TTL. clear() au rechargement de l'anneau de clés
+    """
+
+    def __init__(self, max_entries: int = 0, ttl: float = 300.0, max_len: int = 4096):
+        self.max_entries, self.ttl, self.max_len = max_entries, ttl, max_len
+        self._data: OrderedDict[bytes, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _digest(token: bytes) -> bytes:
+        return hashlib.blake2b(token, digest_size=16).digest()
+
+    def configure(self, *, max_entries: int | None = None, ttl: float | None = None,
+                  max_len: int | None = None) -> None:
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max(0, int(max_entries))
+            if ttl is not None:
+                self.ttl = float(ttl)
+            if max_len is not None:
+                self.max_len = int(max_len)
+            self._data.clear()
+
+    def get(self, token: bytes) -> str | None:
+        k = self._digest(token)
+        with self._lock:
+            item = self._data.get(k)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[0] <= time.monotonic():
+                del self._data[k]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(k)
+            self.hits += 1
+            return item[1]
+
+    def put(self, token: bytes, plain: str) -> None:
+        if not self.enabled or len(plain) > self.max_len:
+            return
+        k = self._digest(token)
+        with self._lock:
+            self._data[k] = (time.monotonic() + self.ttl, plain)
+            self._data.move_to_end(k)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tokens: Iterable) -> int:
+        """Retire les jetons donnés (bytes/memoryview, None ignorés), sans aller-retour SQL. Retourne le nombre retiré."""
+        digests = [self._digest(bytes(t)) for t in tokens if isinstance(t, (bytes, bytearray, memoryview)) and t]
+        n = 0
+        with self._lock:
+            for k in digests:
+                if self._data.pop(k, None) is not None:
+                    n += 1
+            self.invalidations += n
+        return n
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"enabled": self.enabled, "size": len(self._data), "max_entries": self.max_entries,
+                    "ttl_s": self.ttl, "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                    "evictions": self.evictions, "expired": self.expired, "invalidations": self.invalidations}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.expired = self.invalidations = 0
+
+
+decrypt_cache = DecryptCache(
+    max_entries=int(os.getenv("DECRYPT_CACHE_SIZE", "0") or 0),
+    ttl=float(os.getenv("DECRYPT_CACHE_TTL", "300") or 300),
+    max_len=int(os.getenv("DECRYPT_CACHE_MAX_LEN", "4096") or 4096),
+)
+
+
+def set_key_ring(keys: list[str], *, hmac_key: str | None = None) -> None:
+    """
+    (Re)charge l'anneau: keys[0] chiffre, toutes déchiffrent (MultiFernet).
+    hmac_key None -> la plus ancienne clé de l'anneau.
+    """
+    global _ring, _hmac_key, _cipher
+    if not keys:
+        raise ValueError("set_key_ring: au moins une clé")
+    new_hmac = hmac_key or keys[-1]
+    if new_hmac != _hmac_key:
+        _derived_keys.clear()
+    _ring, _hmac_key = list(keys), new_hmac
+    _cipher = MultiFernet([Fernet(k) for k in _ring])
+    decrypt_cache.clear()
+
+
+def key_ring() -> list[str]:
+    """Clés de l'anneau, la primaire en tête."""
+    return list(_ring)
+
+
+def key_id(key: str | bytes) -> str:
+    """Identifiant court et non secret d'une clé (checkpoints, logs)."""
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    return hashlib.sha256(b"key_id:" + key).hexdigest()[:16]
+
+
+def hmac_key_id() -> str:
+    """key_id de la clé HMAC courante (versions des index aveugles, empreintes)."""
+    return key_id(_hmac_key)
+
+
+def hmac_key_pinned() -> bool:
+    """True si HMAC_KEY est fixée dans la config (indépendante des clés de l'anneau)."""
+    return bool(_hmac_cfg)
+
+
+set_key_ring([_key] + _previous, hmac_key=_hmac_cfg or None)
+
+# --- Argon2id: paramètres depuis Config4.ini, section [Argon2] (TIME_COST, MEMORY_COST en KiB, PARALLELISM) ---
+# À calibrer sur l'hôte de prod: python -m tools.argon2_calibrate calibrate (rapport à garder avec la config).
+# Défaut: minimum OWASP (t=2, m=19 MiB, p=1). Un hash aux anciens paramètres est refait au login
+# (cf. angelmanSyndromeConnexion.peoplePassword.rehash_if_needed).
+ARGON2_DEFAULTS = {"t": 2, "m": 19456, "p": 1}
+_ph: PasswordHasher
+
 
-# --- Argon2 (paramètres recommandés) ---
-_ph = PasswordHasher(
-    time_cost=2,       # itérations
-    memory_cost=19456, # ~19 MiB
-    parallelism=1,
+def set_argon2_params(time_cost: int, memory_cost: int, parallelism: int) -> None:
+    """Paramètres des NOUVEAUX hashs; les anciens restent vérifiables (paramètres dans la chaîne PHC)."""
+    global _ph
+    _ph = PasswordHasher(time_cost=int(time_cost), memory_cost=int(memory_cost), parallelism=int(parallelism))
+
+
+def argon2_params() -> dict:
+    """Paramètres courants, même forme que password_meta / argon2_hash_params."""
+    return {"algo": "argon2id", "v": 19, "t": _ph.time_cost, "m": _ph.memory_cost, "p": _ph.parallelism}
+
+
+def argon2_hash_params(stored_hash_bytes: bytes | str) -> dict | None:
+    """Paramètres portés par un hash PHC stocké ($argon2id$v=19$m=...,t=...,p=...$...), None si illisible."""
+    if isinstance(stored_hash_bytes, (bytes, bytearray)):
+        stored_hash_bytes = bytes(stored_hash_bytes).decode("utf-8", errors="replace")
+    try:
+        prm = extract_parameters(stored_hash_bytes)
+    except (InvalidHash, ValueError, TypeError):
+        return None
+    return {"algo": f"argon2{prm.type.name.lower()}", "v": prm.version,
+            "t": prm.time_cost, "m": prm.memory_cost, "p": prm.parallelism}
+
+
+set_argon2_params(
+    _cfg.getint("Argon2", "TIME_COST", fallback=ARGON2_DEFAULTS["t"]),
+    _cfg.getint("Argon2", "MEMORY_COST", fallback=ARGON2_DEFAULTS["m"]),
+    _cfg.getint("Argon2", "PARALLELISM", fallback=ARGON2_DEFAULTS["p"]),
 )
 
 # -----------------------------
@@ -39,8 +230,7 @@ def hash_password_argon2(password: str) -> tuple[bytes, dict]:
     if not isinstance(password, str) or not password:
         raise ValueError("password doit être une chaîne non vide")
     phc = _ph.hash(password)
-    meta = {"algo": "argon2id", "v": 19, "t": _ph.time_cost, "m": _ph.memory_cost, "p": _ph.parallelism}
-    return phc.encode("utf-8"), meta
+    return phc.encode("utf-8"), argon2_params()
 
 def verify_password_argon2(password: str, stored_hash_bytes: bytes) -> bool:
     if not isinstance(stored_hash_bytes, (bytes, bytearray)):
@@ -68,6 +258,19 @@ def _norm_email(e: str) -> str:
 def email_sha256(e: str) -> bytes:
     return hashlib.sha256(_norm_email(e).encode("utf-8")).digest()
 
+def keyed_sha256(data: bytes | str, *, purpose: str) -> str:
+    """
+    HMAC-SHA256 (hex) avec une clé dérivée de HMAC_KEY (stable d'une rotation Fernet à l'autre), une par 'purpose'.
+    Empreinte stable d'une valeur en clair, sans qu'on puisse la retrouver par dictionnaire
+    (contrairement à un SHA-256 nu sur des valeurs à faible entropie: année, genre...).
+    """
+    k = _derived_keys.get(purpose)
+    if k is None:
+        k = _derived_keys[purpose] = hmac.new(_hmac_key.encode("utf-8"), purpose.encode("utf-8"), hashlib.sha256).digest()
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hmac.new(k, data, hashlib.sha256).hexdigest()
+
 # -----------------------------
 #  Chiffrement / Déchiffrement (Fernet)
 # -----------------------------
@@ -85,7 +288,7 @@ def decrypt_number(b: bytes | memoryview | None) -> float | None:
     if isinstance(b, memoryview):
         b = b.tobytes()
     try:
-        return float(_cipher.decrypt(b).decode("utf-8"))
+        return float(_decrypt_cached(bytes(b)))
     except Exception:
         return None
 
@@ -94,6 +297,10 @@ def encrypt_date_like(d) -> bytes:
     Accepte date/datetime/pandas.Timestamp/str('YYYY-MM-DD' ou ISO datetime)
     et renvoie un blob chiffré (bytes).
     """
+    return _cipher.encrypt(_date_plain(d))
+
+def _date_plain(d) -> bytes:
+    """Clair d'une date: 'YYYY-MM-DD' (str ISO tronquée à la date, telle quelle sinon)."""
     # import paresseux pour ne pas rendre pandas obligatoire si non utilisé
     try:
         import pandas as pd  # type: ignore
@@ -105,12 +312,11 @@ def encrypt_date_like(d) -> bytes:
     elif isinstance(d, datetime):
         d = d.date()
     elif isinstance(d, str):
-        d = d.split("T")[0].split(" ")[0]
-        return _cipher.encrypt(d.encode("utf-8"))
+        return d.split("T")[0].split(" ")[0].encode("utf-8")
     elif not isinstance(d, date):
         raise TypeError("Type de date non supporté")
 
-    return _cipher.encrypt(d.isoformat().encode("utf-8"))
+    return d.isoformat().encode("utf-8")
 
 class DecryptError(Exception):
     pass
@@ -140,10 +346,21 @@ def decrypt_bytes_to_str_strict(b: Union[bytes, memoryview, str]) -> str:
     if not isinstance(b, (bytes, bytearray)) or not b:
         raise DecryptError("Type/longueur invalide pour déchiffrement")
     try:
-        return _cipher.decrypt(bytes(b)).decode("utf-8")
+        return _decrypt_cached(bytes(b))
     except Exception as e:
         raise DecryptError(f"Échec de déchiffrement: {e}") from e
 
+
+def _decrypt_cached(token: bytes) -> str:
+    """Déchiffre un jeton en passant par decrypt_cache s'il est activé (les échecs ne sont pas mis en cache)."""
+    if not decrypt_cache.enabled:
+        return _cipher.decrypt(token).decode("utf-8")
+    plain = decrypt_cache.get(token)
+    if plain is None:
+        plain = _cipher.decrypt(token).decode("utf-8")
+        decrypt_cache.put(token, plain)
+    return plain
+
 OutputMode = Literal["bytes", "b64"]
 ColType    = Literal["str", "number", "date"]
 
@@ -153,6 +370,15 @@ def _is_datetime_dtype(ser: pd.Series) -> bool:
 def _is_numeric_dtype(ser: pd.Series) -> bool:
     return pd.api.types.is_numeric_dtype(ser) and not pd.api.types.is_bool_dtype(ser)
 
+def _date_ratio(s: pd.Series) -> float:
+    """Part des valeurs (str, non nulles) parsables en dates (2 essais, dayfirst False/True)."""
+    parsed1 = pd.to_datetime(s, errors="coerce", utc=False, dayfirst=False)
+    parsed2 = pd.to_datetime(s, errors="coerce", utc=False, dayfirst=True)
+    return max(parsed1.notna().mean(), parsed2.notna().mean())
+
+def _number_ratio(s: pd.Series) -> float:
+    return pd.to_numeric(s, errors="coerce").notna().mean()
+
 def _looks_like_dates(ser: pd.Series, ratio: float = 0.8) -> bool:
     """Heuristique: assez de valeurs parsables en dates ? (2 essais, dayfirst False/True)"""
     if ser.empty:
@@ -160,10 +386,7 @@ def _looks_like_dates(ser: pd.Series, ratio: float = 0.8) -> bool:
     s = ser.dropna().astype(str).str.strip()
     if s.empty:
         return False
-    parsed1 = pd.to_datetime(s, errors="coerce", utc=False, dayfirst=False)
-    parsed2 = pd.to_datetime(s, errors="coerce", utc=False, dayfirst=True)
-    ok_ratio = max(parsed1.notna().mean(), parsed2.notna().mean())
-    return ok_ratio >= ratio
+    return _date_ratio(s) >= ratio
 
 def _looks_like_numbers(ser: pd.Series, ratio: float = 0.9) -> bool:
     """Heuristique: la majorité est convertible en nombres ?"""
@@ -174,8 +397,81 @@ def _looks_like_numbers(ser: pd.Series, ratio: float = 0.9) -> bool:
     s = ser.dropna().astype(str).str.strip()
     if s.empty:
         return False
-    parsed = pd.to_numeric(s, errors="coerce")
-    return parsed.notna().mean() >= ratio
+    return _number_ratio(s) >= ratio
+
+# --- inférence par échantillon (object/str) ---
+# On teste d'abord INFER_SAMPLE cellules non nulles réparties sur toute la colonne
+# (une par tranche, la 1re incluse: pd.to_datetime devine son format dessus); on ne
+# parse toute la colonne que si l'échantillon est trop proche du seuil pour trancher.
+# Décisions mises en cache par empreinte de colonne (nom, dtype, taille, hash de l'échantillon).
+INFER_SAMPLE = int(os.environ.get("CRYPTO_INFER_SAMPLE", 256))
+_INFER_Z = 4.0               # marge de l'échantillon, en écarts-types
+_INFER_CACHE_MAX = 4096
+_infer_cache: dict[tuple, str] = {}   # ColType, ou "full": voir le hash complet
+
+def _sample_decides(p: float, n: int, threshold: float) -> bool | None:
+    """True/False si la proportion p mesurée sur n cellules tranche nettement, None sinon."""
+    se = math.sqrt(max(p * (1 - p), 1 / n) / n)
+    if p - _INFER_Z * se >= threshold:
+        return True
+    if p + _INFER_Z * se < threshold:
+        return False
+    return None
+
+def _values_hash(s: pd.Series) -> int:
+    return int(pd.util.hash_pandas_object(s, index=False).sum())
+
+def _infer_text_column(ser: pd.Series, date_ratio: float, num_ratio: float, sample: int) -> ColType:
+    """date / number / str d'une colonne object/str: mêmes règles que _looks_like_dates puis _looks_like_numbers."""
+    pos = np.flatnonzero(ser.notna().to_numpy())
+    n_values = len(pos)
+    if not n_values:
+        return "str"
+    # seul l'échantillon est converti en str; la colonne entière seulement si on escalade
+    if n_values > sample:
+        pos = pos[np.linspace(0, n_values - 1, sample).astype(np.int64)]
+    part = ser.iloc[pos].astype(str).str.strip()
+    full: pd.Series | None = part if len(part) == n_values else None
+
+    def _full() -> pd.Series:
+        nonlocal full
+        if full is None:
+            full = ser.dropna().astype(str).str.strip()
+        return full
+
+    sample_key = (ser.name, str(ser.dtype), n_values, date_ratio, num_ratio, _values_hash(part))
+    key = sample_key
+    if _infer_cache.get(sample_key) == "full":
+        # échantillon ambigu la dernière fois: décision rangée sous le hash de toute la colonne
+        key = sample_key + (_values_hash(_full()),)
+    hit = _infer_cache.get(key)
+    if hit is not None:
+        return hit
+
+    escalated = False
+
+    def _passes(ratio_fn, threshold: float) -> bool:
+        nonlocal escalated
+        if len(part) < n_values:
+            decided = _sample_decides(ratio_fn(part), len(part), threshold)
+            if decided is not None:
+                return decided
+            escalated = True
+        return ratio_fn(_full()) >= threshold
+
+    if _passes(_date_ratio, date_ratio):
+        ctype: ColType = "date"
+    elif _passes(_number_ratio, num_ratio):
+        ctype = "number"
+    else:
+        ctype = "str"
+    if len(_infer_cache) >= _INFER_CACHE_MAX:
+        _infer_cache.clear()
+    if escalated and key is sample_key:
+        _infer_cache[sample_key] = "full"
+        key = sample_key + (_values_hash(_full()),)
+    _infer_cache[key] = ctype
+    return ctype
 
 def infer_crypto_spec(
     df: pd.DataFrame,
@@ -184,6 +480,7 @@ def infer_crypto_spec(
     exclude: Iterable[str] | None = None,
     date_ratio: float = 0.8,
     num_ratio: float = 0.9,
+    sample: int | None = None,
 ) -> Dict[str, ColType]:
     """
     Retourne un spec {col: 'str'|'number'|'date'} inféré depuis df.
@@ -191,7 +488,10 @@ def infer_crypto_spec(
     - exclude: liste noire (prioritaire)
     - date_ratio: seuil de détection pour les dates à partir de strings
     - num_ratio: seuil de détection pour les nombres à partir de strings
+    - sample: taille d'échantillon des colonnes texte (défaut INFER_SAMPLE);
+      0 = parse complet de chaque colonne, sans cache (ancien comportement)
     """
+    sample = INFER_SAMPLE if sample is None else sample
     include_set = set(include) if include else None
     exclude_set = set(exclude) if exclude else set()
 
@@ -219,7 +519,9 @@ def infer_crypto_spec(
             continue
         if pd.api.types.is_string_dtype(ser) or ser.dtype == "object":
             # 2) heuristiques sur object/str
-            if _looks_like_dates(ser, ratio=date_ratio):
+            if sample:
+                spec[col] = _infer_text_column(ser, date_ratio, num_ratio, sample)
+            elif _looks_like_dates(ser, ratio=date_ratio):
                 spec[col] = "date"
             elif _looks_like_numbers(ser, ratio=num_ratio):
                 spec[col] = "number"
@@ -341,6 +643,8 @@ def encrypt_dataframe(
         "number": lambda v: None if _isnull(v) else encrypt_number(v),
         "date": lambda v: None if _isnull(v) else encrypt_date_like(v),
     }
+    if output not in ("bytes", "b64"):
+        raise ValueError("output doit être 'bytes' ou 'b64'")
 
     for col, ctype in spec.items():
         if col not in work.columns:
@@ -349,15 +653,12 @@ def encrypt_dataframe(
             raise ValueError(f"Type inconnu pour {col!r}: {ctype!r}")
 
         # Serie -> bytes (Fernet)
-        ser_bytes = work[col].map(enc_by_type[ctype])
+        tokens = [enc_by_type[ctype](v) for v in work[col].tolist()]
 
         # Sortie bytes ou Base64
-        if output == "bytes":
-            work[col] = ser_bytes
-        elif output == "b64":
-            work[col] = ser_bytes.map(_b64e)
-        else:
-            raise ValueError("output doit être 'bytes' ou 'b64'")
+        if output == "b64":
+            tokens = [_b64e(t) for t in tokens]
+        work[col] = pd.Series(tokens, index=work.index, dtype="object")
 
     return work
 
@@ -398,27 +699,28 @@ def decrypt_dataframe(
     else:
         raise ValueError("input_mode doit être 'b64' ou 'bytes'")
 
-    # Déchiffreurs -> vers str/float/str(date ISO)
+    # Déchiffreurs -> vers str/float/str(date ISO), mêmes règles que decrypt_bytes_to_str_strict /
+    # decrypt_number mais sans decrypt_cache: une table entière ne doit pas évincer les messages
     def _dec_str(b: bytes | None) -> str | None:
         if b is None:
             return None
-        return decrypt_bytes_to_str_strict(b)
+        try:
+            return _cipher.decrypt(b).decode("utf-8")
+        except (InvalidToken, TypeError, ValueError) as e:
+            raise DecryptError(f"Échec de déchiffrement: {e!r}") from e
 
     def _dec_num(b: bytes | None) -> float | None:
         if b is None:
             return None
-        return decrypt_number(b)
-
-    def _dec_date(b: bytes | None) -> str | None:
-        if b is None:
+        try:
+            return float(_cipher.decrypt(b).decode("utf-8"))
+        except Exception:
             return None
-        # decrypt_bytes_to_str_strict renvoie la chaîne claire (ex 'YYYY-MM-DD')
-        return decrypt_bytes_to_str_strict(b)
 
-    dec_by_type: Dict[ColType, Callable[[bytes | None], Any]] = {
+    dec_by_type: Dict[ColType, Callable[[bytes], Any]] = {
         "str": _dec_str,
         "number": _dec_num,
-        "date": _dec_date,
+        "date": _dec_str,   # la chaîne claire (ex 'YYYY-MM-DD')
     }
 
     # Que faire comme type Python final ?
@@ -431,10 +733,11 @@ def decrypt_dataframe(
             raise ValueError(f"Type inconnu pour {col!r}: {ctype!r}")
 
         # -> bytes
-        ser_bytes = work[col].map(decode_in)
+        tokens = work[col].map(decode_in).tolist()
 
         # -> clair Python
-        ser_clear = ser_bytes.map(dec_by_type[ctype])
+        dec = dec_by_type[ctype]
+        ser_clear = pd.Series([dec(t) for t in tokens], index=work.index)
 
         # Conversion finale optionnelle par colonne
         target = to_py.get(col, "str")
@@ -0,0 +1,126 @@
+# tools/db_pool.py
+"""
+Registre process-wide des engines SQLAlchemy poolés.
+
+Avant: chaque appel à _run_query / _insert_data / ... faisait create_engine()
+puis dispose() -> handshake TCP + MySQL (et tunnel SSH en local) à CHAQUE requête.
+Ici on garde UN engine par base cible (clé = nom logique de la base) pour tout
+le process, et les connexions sont réutilisées via le pool SQLAlchemy.
+
+Paramètres du pool (surchargés par variables d'environnement ou configure_pool()):
+  - DB_POOL_SIZE       : connexions gardées ouvertes (défaut 5)
+  - DB_MAX_OVERFLOW    : connexions supplémentaires temporaires (défaut 5)
+  - DB_POOL_PRE_PING   : ping avant checkout (défaut true)
+  - DB_POOL_RECYCLE    : recyclage des connexions en secondes (défaut 280,
+                         PythonAnywhere coupe les connexions inactives ~300s)
+  - DB_POOL_TIMEOUT    : attente max d'une connexion libre en secondes (défaut 30)
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Callable
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from tools.logger import setup_logger
+from tools.sql_instrumentation import instrument_engine
+from tools import slow_query_log
+from tools import pool_telemetry
+
+logger = setup_logger(debug=False)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, "true" if default else "false").lower() in ("1", "true", "yes", "on")
+
+
+POOL_OPTIONS: dict = {
+    "pool_size": _env_int("DB_POOL_SIZE", 5),
+    "max_overflow": _env_int("DB_MAX_OVERFLOW", 5),
+    "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    "pool_recycle": _env_int("DB_POOL_RECYCLE", 280),
+    "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+}
+
+_engines: dict[str, Engine] = {}
+_lock = threading.Lock()
+
+
+def configure_pool(**options) -> None:
+    """
+    Modifie les paramètres du pool pour les engines créés ENSUITE.
+    Ex: configure_pool(pool_size=10, max_overflow=0)
+    """
+    unknown = set(options) - set(POOL_OPTIONS)
+    if unknown:
+        raise ValueError(f"Options de pool inconnues: {sorted(unknown)}")
+    POOL_OPTIONS.update(options)
+
+
+def get_engine(key: str, url_factory: Callable[[], str], **overrides) -> Engine:
+    """
+    Retourne l'engine poolé associé à 'key' (créé au premier appel).
+    - url_factory() n'est appelée qu'à la création (ouverture tunnel, etc.)
+    - overrides: options create_engine spécifiques à cet engine
+    """
+    engine = _engines.get(key)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            opts = {**POOL_OPTIONS, **overrides}
+            engine = instrument_engine(create_engine(url_factory(), future=True, **opts))
+            slow_query_log.attach(engine)
+            pool_telemetry.attach(engine, key)
+            _engines[key] = engine
+            logger.debug("Engine poolé créé pour %s (%s)", key, opts)
+    return engine
+
+
+def dispose_engine(key: str) -> None:
+    """Ferme toutes les connexions de l'engine 'key' et le retire du registre."""
+    with _lock:
+        engine = _engines.pop(key, None)
+    if engine is not None:
+        pool_telemetry.detach(key)
+        engine.dispose()
+        logger.debug("Engine %s disposé.", key)
+
+
+def dispose_all() -> None:
+    """Ferme tous les engines du registre (fin de script, tests...)."""
+    with _lock:
+        engines = list(_engines.items())
+        _engines.clear()
+    for key, engine in engines:
+        pool_telemetry.detach(key)
+        engine.dispose()
+        logger.debug("Engine %s disposé.", key)
+
+
+def pool_status() -> dict[str, dict]:
+    """
+    Photo de l'état des pools: {key: {size, checked_out, overflow, checked_in}}.
+    Attentes, invalidations, historique: tools.pool_telemetry.
+    """
+    status = {}
+    for key, engine in list(_engines.items()):
+        pool = engine.pool
+        status[key] = {
+            "size": getattr(pool, "size", lambda: None)(),
+            "checked_out": getattr(pool, "checkedout", lambda: None)(),
+            "overflow": getattr(pool, "overflow", lambda: None)(),
+            "checked_in": getattr(pool, "checkedin", lambda: None)(),
+        }
+    return status
@@ -0,0 +1,195 @@
+# tools/db_retry.py
+"""
+Politique de relance des opérations MySQL, par classe d'erreur.
+
+Avant: toute exception était relancée 3 fois avec time.sleep(3) -> 9s de worker
+bloqué pour une simple erreur de syntaxe, mais abandon trop rapide sur un vrai
+basculement serveur.
+
+Ici chaque erreur est classée:
+  - "transient" : coupure/perte de connexion (2006, 2013...), deadlock (1213),
+                  lock wait timeout (1205), pool saturé, tunnel SSH...
+                  -> relancée avec backoff exponentiel + jitter
+  - "permanent" : syntaxe, contrainte, colonne/table inconnue, droits...
+                  -> jamais relancée
+  - "ambiguous" : le reste (OperationalError sans code connu, erreurs inconnues)
+                  -> budget réduit
+Chaque classe a son budget de relances, et un délai global (deadline) borne le tout.
+"""
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Literal, TypeVar
+
+from sqlalchemy import exc as sa_exc
+
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+T = TypeVar("T")
+ErrorClass = Literal["transient", "permanent", "ambiguous"]
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+AMBIGUOUS = "ambiguous"
+
+# Codes MySQL / client (pymysql)
+TRANSIENT_CODES = {
+    1040,  # Too many connections
+    1053,  # Server shutdown in progress
+    1205,  # Lock wait timeout exceeded
+    1213,  # Deadlock found when trying to get lock
+    1927,  # Connection was killed
+    2002,  # Can't connect to local MySQL server
+    2003,  # Can't connect to MySQL server
+    2006,  # MySQL server has gone away
+    2013,  # Lost connection to MySQL server during query
+    2055,  # Lost connection to MySQL server at '%s', system error
+    3024,  # Query execution was interrupted, maximum statement execution time exceeded
+}
+
+PERMANENT_CODES = {
+    1044, 1045,        # Accès refusé
+    1048,              # Column cannot be null
+    1049,              # Unknown database
+    1054,              # Unknown column
+    1062,              # Duplicate entry
+    1064,              # Syntax error
+    1091,              # Can't DROP; check that column/key exists
+    1142, 1143,        # Command / column denied
+    1146,              # Table doesn't exist
+    1264,              # Out of range value
+    1292,              # Incorrect date/time value
+    1364,              # Field doesn't have a default value
+    1366,              # Incorrect value
+    1406,              # Data too long
+    1451, 1452,        # Contrainte de clé étrangère
+    3140,              # Invalid JSON text
+    3819,              # Check constraint violated
+}
+
+
+def mysql_error_code(e: BaseException) -> int | None:
+    """Code d'erreur MySQL d'une exception SQLAlchemy/pymysql (ou None)."""
+    orig = getattr(e, "orig", None) or e
+    args = getattr(orig, "args", None) or ()
+    if args and isinstance(args[0], int):
+        return args[0]
+    return None
+
+
+# Sous-ensemble des transitoires où la connexion elle-même est perdue (pool à jeter)
+CONNECTION_LOST_CODES = {1053, 1927, 2002, 2003, 2006, 2013, 2055}
+
+
+def is_connection_error(e: BaseException) -> bool:
+    """True si la connexion/le serveur est en cause (et pas seulement la requête)."""
+    if mysql_error_code(e) in CONNECTION_LOST_CODES:
+        return True
+    if isinstance(e, sa_exc.DBAPIError) and e.connection_invalidated:
+        return True
+    return isinstance(e, (sa_exc.DisconnectionError, sa_exc.InterfaceError, ConnectionError))
+
+
+def classify_error(e: BaseException) -> ErrorClass:
+    """Classe une exception en 'transient' | 'permanent' | 'ambiguous'."""
+    code = mysql_error_code(e)
+    if code in TRANSIENT_CODES:
+        return TRANSIENT
+    if code in PERMANENT_CODES:
+        return PERMANENT
+
+    if isinstance(e, sa_exc.DBAPIError) and e.connection_invalidated:
+        return TRANSIENT
+    if isinstance(e, (sa_exc.TimeoutError, sa_exc.DisconnectionError, sa_exc.InterfaceError)):
+        return TRANSIENT  # pool saturé / connexion fermée
+    if isinstance(e, (sa_exc.IntegrityError, sa_exc.ProgrammingError, sa_exc.DataError,
+                      sa_exc.NotSupportedError, sa_exc.ArgumentError, sa_exc.CompileError)):
+        return PERMANENT
+    if isinstance(e, (ConnectionError, TimeoutError)):
+        return TRANSIENT
+    if type(e).__module__.startswith("sshtunnel"):
+        return TRANSIENT  # tunnel SSH indisponible
+    if isinstance(e, (ValueError, TypeError, KeyError, AttributeError)):
+        return PERMANENT  # bug applicatif: relancer ne changera rien
+    return AMBIGUOUS
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    transient_retries: int = 5
+    ambiguous_retries: int = 1
+    permanent_retries: int = 0
+    base_delay: float = 0.2      # secondes
+    max_delay: float = 5.0       # plafond d'un délai
+    multiplier: float = 2.0
+    deadline: float = 30.0       # secondes, toutes tentatives comprises
+
+    def budget(self, error_class: ErrorClass) -> int:
+        return {
+            TRANSIENT: self.transient_retries,
+            AMBIGUOUS: self.ambiguous_retries,
+            PERMANENT: self.permanent_retries,
+        }[error_class]
+
+    def backoff(self, retry_index: int, rng: random.Random | None = None) -> float:
+        """Délai avant la relance n° retry_index (0-based), 'full jitter'."""
+        cap = min(self.max_delay, self.base_delay * (self.multiplier ** retry_index))
+        return (rng or random).uniform(0, cap)
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+def run_with_retry(
+    fn: Callable[[], T],
+    *,
+    policy: RetryPolicy | None = None,
+    max_attempts: int | None = None,
+    on_error: Callable[[BaseException, ErrorClass], None] | None = None,
+    label: str = "operation",
+    sleep: Callable[[float], None] = time.sleep,
+    clock: Callable[[], float] = time.monotonic,
+    rng: random.Random | None = None,
+) -> T:
+    """
+    Exécute fn() et la relance selon la classe de l'erreur.
+    Budget épuisé / deadline atteinte: la dernière exception d'origine est relancée telle quelle.
+    - max_attempts: plafond optionnel du nombre total de tentatives
+    - on_error(exc, classe): appelé à chaque échec (ex: jeter l'engine sur perte de connexion)
+    - sleep/clock/rng: injectables pour les tests
+    """
+    policy = policy or DEFAULT_POLICY
+    started = clock()
+    used = {TRANSIENT: 0, AMBIGUOUS: 0, PERMANENT: 0}
+    attempt = 0
+
+    while True:
+        attempt += 1
+        try:
+            return fn()
+        except Exception as e:
+            error_class = classify_error(e)
+            logger.error("[Attempt %d] %s failed (%s, code=%s): %s",
+                         attempt, label, error_class, mysql_error_code(e), e)
+            if on_error is not None:
+                try:
+                    on_error(e, error_class)
+                except Exception as hook_err:
+                    logger.warning("on_error hook failed: %r", hook_err)
+
+            if used[error_class] >= policy.budget(error_class):
+                raise
+            if max_attempts is not None and attempt >= max_attempts:
+                raise
+
+            delay = policy.backoff(sum(used.values()), rng)
+            if clock() - started + delay > policy.deadline:
+                logger.error("%s: deadline de %.1fs atteinte, abandon.", label, policy.deadline)
+                raise
+            used[error_class] += 1
+            logger.info("Retrying %s in %.2fs...", label, delay)
+            sleep(delay)
@@ -0,0 +1,421 @@
+# tools/drift_guard.py
+"""
+Garde-fou de dérive des données, colonne par colonne, avant publication d'un export.
+
+Le seul contrôle historique d'export_Table est le volume (>= 90% des lignes de la
+table live). Une colonne vidée, un libellé de génotype renommé dans le Google Sheet
+ou une année de naissance aberrante passaient sans bruit. Ici:
+  1. profil du DataFrame CLAIR (avant remplissage des NaN et chiffrement), par colonne:
+     taux de nulls, nombre de valeurs distinctes, min / max / moyenne si numérique,
+     ensemble des valeurs pour les colonnes de libellés (genotype, sexe, gender...)
+  2. comparaison au profil du dernier export publié (table export_profile) et à la
+     DDL de src/SQLScript/<Pays>/ par une liste de checks (CHECKS, register_check)
+  3. violations "block" -> export refusé, rapport JSON (alerte e-mail + export_run)
+
+Seuils (DriftConfig, défauts surchargables par variables d'environnement):
+  EXPORT_DRIFT_GUARD                  block | warn | off   (défaut: block)
+  EXPORT_DRIFT_MAX_NULL_INCREASE      hausse tolérée du taux de nulls      (0.10)
+  EXPORT_DRIFT_MAX_CARDINALITY_CHANGE variation relative des distinctes   (0.5)
+  EXPORT_DRIFT_RANGE_TOLERANCE        débord toléré, en fraction de l'étendue (0.5)
+  EXPORT_DRIFT_CATEGORY_COLUMNS       colonnes de libellés (genotype,sexe,gender)
+
+Le profil ne contient pas de données patient: des agrégats, plus les libellés des
+colonnes de catégories. Le 1er export d'une table n'a pas de référence: seules les
+règles absolues (libellés autorisés explicites) bloquent, le reste est signalé.
+
+CLI (depuis src/):
+  python -m tools.drift_guard profile T_MapFrance_English
+  python -m tools.drift_guard report T_MapFrance_English      # dernier rapport refusé
+  python -m tools.drift_guard profile T_MapFrance_English --asconnect
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import json
+import argparse
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.engine import Connection
+
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+PROFILE_TABLE = "export_profile"
+NUMERIC_SHARE = 0.95          # part des valeurs non nulles qui doivent être des nombres
+MIN_DISTINCT_FOR_CARDINALITY = 10
+_NULL_STRINGS = {"", "none", "nan", "null", "n/a", "na"}
+
+PROFILE_DDL = f"""
+CREATE TABLE IF NOT EXISTS {PROFILE_TABLE} (
+  table_name  VARCHAR(255) NOT NULL PRIMARY KEY,
+  run_id      CHAR(32),
+  profiled_at DATETIME     NOT NULL,
+  profile     TEXT         NOT NULL
+)
+"""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        logger.warning("%s invalide, défaut %s", name, default)
+        return default
+
+
+@dataclass
+class DriftConfig:
+    """Seuils et règles du garde-fou (cf. docstring du module)."""
+    mode: str = "block"
+    max_null_increase: float = 0.10
+    max_cardinality_change: float = 0.5
+    range_tolerance: float = 0.5
+    category_columns: tuple[str, ...] = ("genotype", "sexe", "gender")
+    # libellés autorisés explicites {colonne: {valeurs}}; sinon ceux du profil précédent
+    allowed: dict[str, set] = field(default_factory=dict)
+    checks: list[Callable] | None = None    # None: CHECKS
+
+    @classmethod
+    def from_env(cls, **overrides) -> "DriftConfig":
+        cats = os.environ.get("EXPORT_DRIFT_CATEGORY_COLUMNS")
+        cfg = cls(
+            mode=os.environ.get("EXPORT_DRIFT_GUARD", "block").lower(),
+            max_null_increase=_env_float("EXPORT_DRIFT_MAX_NULL_INCREASE", 0.10),
+            max_cardinality_change=_env_float("EXPORT_DRIFT_MAX_CARDINALITY_CHANGE", 0.5),
+            range_tolerance=_env_float("EXPORT_DRIFT_RANGE_TOLERANCE", 0.5),
+        )
+        if cats is not None:
+            cfg.category_columns = tuple(c.strip() for c in cats.split(",") if c.strip())
+        for k, v in overrides.items():
+            setattr(cfg, k, v)
+        return cfg
+
+
+@dataclass
+class Violation:
+    check: str
+    column: str | None
+    severity: str            # "block" | "warn"
+    message: str
+    observed: object = None
+    expected: object = None
+
+
+@dataclass
+class DriftReport:
+    table_name: str
+    rows: int
+    baseline: str | None                 # profiled_at du profil de référence
+    violations: list[Violation] = field(default_factory=list)
+
+    @property
+    def blocking(self) -> list[Violation]:
+        return [v for v in self.violations if v.severity == "block"]
+
+    def to_dict(self) -> dict:
+        return {"table": self.table_name, "rows": self.rows, "baseline": self.baseline,
+                "blocked": bool(self.blocking), "violations": [asdict(v) for v in self.violations]}
+
+    def to_json(self, **kw) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, default=str, **kw)
+
+
+class DriftViolation(ValueError):
+    """Export refusé par le garde-fou; .report porte le détail (DriftReport)."""
+
+    def __init__(self, report: DriftReport):
+        self.report = report
+        super().__init__(f"{report.table_name}: {len(report.blocking)} violation(s) de dérive")
+
+
+# ----------------------------------------------------------------------
+# Profil (sur le clair)
+# ----------------------------------------------------------------------
+def _is_null(s: pd.Series) -> pd.Series:
+    null = s.isna()
+    if s.dtype == object:
+        null |= s.astype(str).str.strip().str.lower().isin(_NULL_STRINGS)
+    return null
+
+
+def _plain(v):
+    if isinstance(v, (np.integer,)):
+        return int(v)
+    if isinstance(v, (np.floating,)):
+        return float(v)
+    return v if isinstance(v, (int, float, bool)) else str(v)
+
+
+def profile_dataframe(df: pd.DataFrame, category_columns=()) -> dict:
+    """
+    {"rows", "columns": [...], "stats": {col: {...}}}, JSON-sérialisable.
+    stats: null_ratio, distinct, kind ("numeric" | "text"), min/max/mean si numérique,
+    values (libellés triés) pour les colonnes de catégories.
+    """
+    rows = int(len(df))
+    stats = {}
+    cats = set(category_columns)
+    for col in df.columns:
+        s = df[col]
+        null = _is_null(s)
+        present = s[~null]
+        st = {"null_ratio": round(float(null.mean()), 6) if rows else 0.0,
+              "distinct": int(present.astype(str).nunique())}
+        num = pd.to_numeric(present, errors="coerce")
+        if len(present) and num.notna().mean() >= NUMERIC_SHARE:
+            num = num.dropna()
+            st.update(kind="numeric", min=_plain(num.min()), max=_plain(num.max()), mean=round(float(num.mean()), 6))
+        else:
+            st["kind"] = "text"
+        if str(col) in cats:
+            st["values"] = sorted(present.astype(str).unique().tolist())
+        stats[str(col)] = st
+    return {"rows": rows, "columns": [str(c) for c in df.columns], "stats": stats}
+
+
+_COLUMN_RE = re.compile(r"^\s*[`\"\[]?(\w+)[`\"\]]?\s+\w+", re.I)
+_CONSTRAINTS = {"PRIMARY", "UNIQUE", "KEY", "INDEX", "CONSTRAINT", "FOREIGN", "CHECK"}
+
+
+def ddl_columns(ddl: str) -> list[str]:
+    """Colonnes alimentées par l'export: celles du CREATE TABLE hors AUTO_INCREMENT et contraintes."""
+    body = ddl[ddl.index("(") + 1: ddl.rindex(")")]
+    cols = []
+    for line in re.split(r",\s*\n", body):
+        m = _COLUMN_RE.match(line)
+        if not m or m.group(1).upper() in _CONSTRAINTS or re.search(r"AUTO_?INCREMENT", line, re.I):
+            continue
+        cols.append(m.group(1))
+    return cols
+
+
+# ----------------------------------------------------------------------
+# Checks: f(current, previous, ctx) -> [Violation]
+#   current / previous: profils (previous None au premier export)
+#   ctx: {"config": DriftConfig, "ddl_columns": [...] | None}
+# ----------------------------------------------------------------------
+CHECKS: list[Callable] = []
+
+
+def register_check(fn: Callable) -> Callable:
+    """Ajoute un check à la liste par défaut (utilisable en décorateur)."""
+    CHECKS.append(fn)
+    return fn
+
+
+def _severity(cfg: DriftConfig) -> str:
+    return "warn" if cfg.mode == "warn" else "block"
+
+
+@register_check
+def check_schema(current, previous, ctx) -> list[Violation]:
+    """Colonnes vs DDL (écarts nouveaux par rapport au profil précédent) et vs export précédent."""
+    cfg, out = ctx["config"], []
+    cols = current["columns"]
+    ddl = ctx.get("ddl_columns")
+    if ddl is not None:
+        mismatch = {"missing": sorted(set(ddl) - set(cols)), "extra": sorted(set(cols) - set(ddl))}
+        current["ddl_mismatch"] = mismatch
+        known = (previous or {}).get("ddl_mismatch", {})
+        for kind, names in mismatch.items():
+            new = [n for n in names if n not in known.get(kind, [])]
+            old = [n for n in names if n not in new]
+            what = "absente(s) du DataFrame" if kind == "missing" else "absente(s) de la DDL"
+            if new:
+                # sans profil précédent on ne sait pas si l'écart est nouveau: signalé seulement
+                sev = _severity(cfg) if previous is not None else "warn"
+                out.append(Violation("schema", None, sev, f"colonnes {what}: {new}", observed=cols, expected=ddl))
+            if old:
+                out.append(Violation("schema", None, "warn", f"écart DDL connu, colonnes {what}: {old}"))
+    if previous is not None and previous["columns"] != cols:
+        added = [c for c in cols if c not in previous["columns"]]
+        removed = [c for c in previous["columns"] if c not in cols]
+        msg = f"colonnes ajoutées {added}, supprimées {removed}" if (added or removed) else "ordre des colonnes modifié"
+        out.append(Violation("schema", None, _severity(cfg), msg, observed=cols, expected=previous["columns"]))
+    return out
+
+
+@register_check
+def check_nulls(current, previous, ctx) -> list[Violation]:
+    if previous is None:
+        return []
+    cfg, out = ctx["config"], []
+    for col, st in current["stats"].items():
+        prev = previous["stats"].get(col)
+        if prev and st["null_ratio"] - prev["null_ratio"] > cfg.max_null_increase:
+            out.append(Violation("null_ratio", col, _severity(cfg),
+                                 f"nulls {st['null_ratio']:.1%} (avant {prev['null_ratio']:.1%})",
+                                 observed=st["null_ratio"], expected=prev["null_ratio"]))
+    return out
+
+
+@register_check
+def check_cardinality(current, previous, ctx) -> list[Violation]:
+    if previous is None:
+        return []
+    cfg, out = ctx["config"], []
+    for col, st in current["stats"].items():
+        prev = previous["stats"].get(col)
+        if not prev or prev["distinct"] < MIN_DISTINCT_FOR_CARDINALITY:
+            continue
+        change = abs(st["distinct"] - prev["distinct"]) / prev["distinct"]
+        if change > cfg.max_cardinality_change:
+            out.append(Violation("cardinality", col, _severity(cfg),
+                                 f"{st['distinct']} valeurs distinctes (avant {prev['distinct']}, {change:+.0%})",
+                                 observed=st["distinct"], expected=prev["distinct"]))
+    return out
+
+
+@register_check
+def check_ranges(current, previous, ctx) -> list[Violation]:
+    if previous is None:
+        return []
+    cfg, out = ctx["config"], []
+    for col, st in current["stats"].items():
+        prev = previous["stats"].get(col)
+        if not prev or prev["kind"] != "numeric":
+            continue
+        if st["kind"] != "numeric":
+            out.append(Violation("range", col, _severity(cfg), "colonne numérique devenue texte",
+                                 observed="text", expected="numeric"))
+            continue
+        span = float(prev["max"]) - float(prev["min"])
+        margin = cfg.range_tolerance * (span if span > 0 else max(abs(float(prev["max"])), 1.0))
+        lo, hi = float(prev["min"]) - margin, float(prev["max"]) + margin
+        if float(st["min"]) < lo or float(st["max"]) > hi:
+            out.append(Violation("range", col, _severity(cfg),
+                                 f"[{st['min']}, {st['max']}] hors de [{lo:g}, {hi:g}]",
+                                 observed=[st["min"], st["max"]], expected=[prev["min"], prev["max"]]))
+    return out
+
+
+@register_check
+def check_categories(current, previous, ctx) -> list[Violation]:
+    """Libellés hors de l'ensemble autorisé (explicite, sinon celui du profil précédent)."""
+    cfg, out = ctx["config"], []
+    for col, st in current["stats"].items():
+        if "values" not in st:
+            continue
+        allowed = cfg.allowed.get(col)
+        if allowed is None and previous is not None:
+            allowed = (previous["stats"].get(col) or {}).get("values")
+        if allowed is None:
+            continue
+        unknown = sorted(set(st["values"]) - set(map(str, allowed)))
+        if unknown:
+            out.append(Violation("category", col, _severity(cfg), f"libellés inconnus: {unknown}",
+                                 observed=unknown, expected=sorted(map(str, allowed))))
+    return out
+
+
+def validate(current: dict, previous: dict | None, *, table_name: str, config: DriftConfig,
+             ddl: str | None = None) -> DriftReport:
+    """Passe les checks; ne lève pas (cf. enforce)."""
+    ctx = {"config": config, "ddl_columns": ddl_columns(ddl) if ddl else None}
+    report = DriftReport(table_name, current["rows"], (previous or {}).get("profiled_at"))
+    for check in (config.checks if config.checks is not None else CHECKS):
+        report.violations.extend(check(current, previous, ctx))
+    return report
+
+
+def enforce(report: DriftReport, config: DriftConfig) -> None:
+    """Log des violations; DriftViolation s'il reste des violations bloquantes en mode block."""
+    for v in report.violations:
+        log = logger.warning if v.severity == "block" else logger.info
+        log("Dérive %s [%s] %s: %s", report.table_name, v.check, v.column or "-", v.message)
+    if config.mode == "block" and report.blocking:
+        raise DriftViolation(report)
+
+
+# ----------------------------------------------------------------------
+# Stockage des profils
+# ----------------------------------------------------------------------
+def _ph(conn: Connection) -> str:
+    return "%s" if conn.dialect.paramstyle in ("format", "pyformat") else "?"
+
+
+def ensure_table(conn: Connection) -> None:
+    conn.exec_driver_sql(PROFILE_DDL)
+
+
+def load_profile(conn: Connection, table_name: str) -> dict | None:
+    ensure_table(conn)
+    row = conn.exec_driver_sql(
+        f"SELECT profiled_at, profile FROM {PROFILE_TABLE} WHERE table_name = {_ph(conn)}", (table_name,)
+    ).fetchone()
+    if row is None:
+        return None
+    profile = json.loads(row[1])
+    profile["profiled_at"] = str(row[0])
+    return profile
+
+
+def delete_profile(conn: Connection, table_name: str) -> None:
+    """Plus de référence pour table_name: le prochain export n'est comparé à rien."""
+    ensure_table(conn)
+    conn.exec_driver_sql(f"DELETE FROM {PROFILE_TABLE} WHERE table_name = {_ph(conn)}", (table_name,))
+
+
+def save_profile(conn: Connection, table_name: str, profile: dict, run_id: str | None = None) -> None:
+    """Profil de la génération publiée (référence du prochain export)."""
+    ensure_table(conn)
+    ph = _ph(conn)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    body = json.dumps({k: v for k, v in profile.items() if k != "profiled_at"}, ensure_ascii=False, default=str)
+    if conn.dialect.name == "mysql":
+        sql = (f"INSERT INTO {PROFILE_TABLE} (table_name, run_id, profiled_at, profile) VALUES ({ph}, {ph}, {ph}, {ph}) "
+               "ON DUPLICATE KEY UPDATE run_id = VALUES(run_id), profiled_at = VALUES(profiled_at), profile = VALUES(profile)")
+    else:
+        sql = (f"INSERT INTO {PROFILE_TABLE} (table_name, run_id, profiled_at, profile) VALUES ({ph}, {ph}, {ph}, {ph}) "
+               "ON CONFLICT(table_name) DO UPDATE SET run_id = excluded.run_id, "
+               "profiled_at = excluded.profiled_at, profile = excluded.profile")
+    conn.exec_driver_sql(sql, (table_name, run_id, now, body))
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Garde-fou de dérive des exports (export_profile)")
+    p.add_argument("--asconnect", action="store_true", help="Base ASConnect au lieu d'AngelmanResult")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("profile", help="Profil de référence d'une table").add_argument("table")
+    sub.add_parser("report", help="Rapport du dernier export refusé d'une table").add_argument("table")
+    args = p.parse_args(argv)
+
+    # imports tardifs: utilsTools importe ce module
+    from tools.utilsTools import _get_engine
+    from tools.export_ledger import fetch_runs
+    _, engine = _get_engine(bAngelmanResult=not args.asconnect)
+
+    with engine.connect() as conn:
+        if args.cmd == "profile":
+            profile = load_profile(conn, args.table)
+            if profile is None:
+                print(f"Pas de profil pour {args.table}")
+                return 1
+            print(json.dumps(profile, ensure_ascii=False, indent=2))
+            return 0
+        rejected = [r for r in fetch_runs(conn, args.table) if r["outcome"] == "rejected"]
+
+    if not rejected:
+        print(f"Aucun export refusé pour {args.table}")
+        return 0
+    last = rejected[0]
+    print(f"# run {last['run_id']} du {last['started_at']}")
+    try:
+        print(json.dumps(json.loads(last["error"]), ensure_ascii=False, indent=2))
+    except (TypeError, ValueError):
+        print(last["error"] or "-")   # refus du contrôle de volume: texte simple
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+# tools/export_ledger.py
+"""
+Historique des exports (export_Table): une ligne par exécution dans export_run.
+
+update_log ne garde que la dernière date par table. Ici, pour CHAQUE run:
+  - run_id, table, source (google_sheet, db, api, scraper, file...), mode de publication
+  - lignes lues / écrites / rejetées
+  - temps par étape: read, validate (profil), fillna, drift (garde-fou de dérive), encrypt, insert, swap
+  - octets envoyés à la base (requêtes + paramètres liés)
+  - issue (ok | rejected | error) et texte de l'erreur (ou motif du refus:
+    contrôle de volume, rapport JSON du garde-fou de dérive)
+
+CLI (depuis src/), tendances par table et détection des régressions
+(temps ou volume qui s'écartent de la médiane glissante des runs précédents):
+  python -m tools.export_ledger trends
+  python -m tools.export_ledger trends --window 10 --time-ratio 1.5 --rows-drop 0.1
+  python -m tools.export_ledger history T_MapFrance_English --limit 20
+  python -m tools.export_ledger trends --asconnect
+Code retour 1 si au moins une table est signalée (pratique en cron).
+"""
+from __future__ import annotations
+
+import sys
+import time
+import uuid
+import argparse
+import statistics
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Connection, Engine
+
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+RUN_TABLE = "export_run"
+STAGES = ("read", "validate", "fillna", "drift", "encrypt", "insert", "swap")
+
+RUN_DDL = f"""
+CREATE TABLE IF NOT EXISTS {RUN_TABLE} (
+  run_id        CHAR(32)     NOT NULL PRIMARY KEY,
+  table_name    VARCHAR(255) NOT NULL,
+  source        VARCHAR(64),
+  publish_mode  VARCHAR(32),
+  started_at    DATETIME(6)  NOT NULL,
+  duration_s    DOUBLE,
+  rows_read     INT,
+  rows_written  INT,
+  rows_rejected INT,
+  {", ".join(f"t_{s} DOUBLE" for s in STAGES)},
+  bytes_sent    BIGINT,
+  outcome       VARCHAR(16)  NOT NULL,
+  error         TEXT
+)
+"""
+_COLUMNS = (
+    ["run_id", "table_name", "source", "publish_mode", "started_at", "duration_s",
+     "rows_read", "rows_written", "rows_rejected"]
+    + [f"t_{s}" for s in STAGES]
+    + ["bytes_sent", "outcome", "error"]
+)
+
+
+def reader_source(reader) -> str:
+    """Origine des données d'un reader (attribut 'source', sinon nom de classe)."""
+    return getattr(reader, "source", None) or type(reader).__name__
+
+
+def _param_bytes(p) -> int:
+    if p is None:
+        return 0
+    if isinstance(p, (bytes, bytearray, memoryview)):
+        return len(p)
+    if isinstance(p, str):
+        return len(p.encode("utf-8"))
+    if isinstance(p, dict):
+        return sum(_param_bytes(v) for v in p.values())
+    if isinstance(p, (list, tuple)):
+        return sum(_param_bytes(v) for v in p)
+    return 8   # nombres, dates...
+
+
+class ExportRun:
+    """Mesures d'un run export_Table; enregistré à la fin par insert_run()."""
+
+    def __init__(self, table_name: str, *, source: str | None = None, publish_mode: str | None = None):
+        self.run_id = uuid.uuid4().hex
+        self.table_name = table_name
+        self.source = source
+        self.publish_mode = publish_mode
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self.duration_s: float | None = None
+        self.rows_read = self.rows_written = self.rows_rejected = 0
+        self.stages: dict[str, float] = {s: 0.0 for s in STAGES}
+        self.bytes_sent = 0
+        self.outcome = "running"
+        self.error: str | None = None
+        self.rejection: str | None = None   # motif si l'export est refusé
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - t0)
+
+    @contextmanager
+    def count_bytes(self, engine: Engine):
+        """Compte les octets envoyés sur engine (texte SQL + paramètres) pendant le bloc."""
+        def _hook(conn, cursor, statement, parameters, context, executemany):
+            self.bytes_sent += len(statement.encode("utf-8")) + _param_bytes(parameters)
+
+        event.listen(engine, "before_cursor_execute", _hook)
+        try:
+            yield
+        finally:
+            event.remove(engine, "before_cursor_execute", _hook)
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def finish(self, outcome: str, error: BaseException | str | None = None) -> None:
+        self.outcome = outcome
+        self.error = None if error is None else str(error)[:4000]
+        self.duration_s = self.elapsed_s
+
+    def row(self) -> dict:
+        out = {
+            "run_id": self.run_id, "table_name": self.table_name, "source": self.source,
+            "publish_mode": self.publish_mode, "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "duration_s": self.duration_s, "rows_read": self.rows_read, "rows_written": self.rows_written,
+            "rows_rejected": self.rows_rejected, "bytes_sent": self.bytes_sent,
+            "outcome": self.outcome, "error": self.error,
+        }
+        out.update({f"t_{s}": round(self.stages.get(s, 0.0), 4) for s in STAGES})
+        return out
+
+
+def stage(run: ExportRun | None, name: str):
+    """run.stage(name), ou rien si pas de run (fonctions appelées hors export_Table)."""
+    return run.stage(name) if run is not None else nullcontext()
+
+
+# ----------------------------------------------------------------------
+# Stockage
+# ----------------------------------------------------------------------
+def _ph(conn: Connection) -> str:
+    return "%s" if conn.dialect.paramstyle in ("format", "pyformat") else "?"
+
+
+def ensure_table(conn: Connection) -> None:
+    conn.exec_driver_sql(RUN_DDL)
+    # tables créées avant l'ajout d'une étape: colonne t_<étape> manquante
+    existing = {c["name"] for c in inspect(conn).get_columns(RUN_TABLE)}
+    for s in STAGES:
+        if f"t_{s}" not in existing:
+            conn.exec_driver_sql(f"ALTER TABLE {RUN_TABLE} ADD COLUMN t_{s} DOUBLE")
+
+
+def insert_run(conn: Connection, run: ExportRun) -> None:
+    ensure_table(conn)
+    row = run.row()
+    conn.exec_driver_sql(
+        f"INSERT INTO {RUN_TABLE} ({', '.join(_COLUMNS)}) VALUES ({', '.join([_ph(conn)] * len(_COLUMNS))})",
+        tuple(row[c] for c in _COLUMNS),
+    )
+
+
+def fetch_runs(conn: Connection, table_name: str | None = None, limit: int | None = None) -> list[dict]:
+    """Runs les plus récents d'abord."""
+    ensure_table(conn)
+    sql = f"SELECT {', '.join(_COLUMNS)} FROM {RUN_TABLE}"
+    params: tuple = ()
+    if table_name:
+        sql += f" WHERE table_name = {_ph(conn)}"
+        params = (table_name,)
+    sql += " ORDER BY started_at DESC, run_id"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return [dict(zip(_COLUMNS, r)) for r in conn.exec_driver_sql(sql, params)]
+
+
+# ----------------------------------------------------------------------
+# Tendances
+# ----------------------------------------------------------------------
+def trends(runs: list[dict], *, window: int = 10, time_ratio: float = 1.5, rows_drop: float = 0.1) -> list[dict]:
+    """
+    Par table: dernier run réussi comparé à la médiane des `window` runs réussis précédents.
+    Signalé si durée > time_ratio x médiane, ou lignes lues < (1 - rows_drop) x médiane,
+    ou si le dernier run (réussi ou non) est en erreur.
+    runs: sortie de fetch_runs (plus récents d'abord).
+    """
+    by_table: dict[str, list[dict]] = {}
+    for r in runs:
+        by_table.setdefault(r["table_name"], []).append(r)
+
+    out = []
+    for table, rs in sorted(by_table.items()):
+        ok = [r for r in rs if r["outcome"] == "ok" and r["duration_s"] is not None]
+        last = rs[0]
+        item = {"table": table, "runs": len(rs), "last_outcome": last["outcome"],
+                "last_started": last["started_at"], "flags": []}
+        if last["outcome"] == "error":
+            item["flags"].append(f"dernier run en erreur: {(last['error'] or '')[:80]}")
+        if ok:
+            cur, prev = ok[0], ok[1:window + 1]
+            item.update(duration_s=cur["duration_s"], rows_read=cur["rows_read"], rows_written=cur["rows_written"])
+            if prev:
+                med_t = statistics.median(r["duration_s"] for r in prev)
+                med_rows = statistics.median(r["rows_read"] or 0 for r in prev)
+                item.update(median_duration_s=med_t, median_rows_read=med_rows)
+                if med_t > 0 and cur["duration_s"] > time_ratio * med_t:
+                    item["flags"].append(f"durée {cur['duration_s']:.1f}s > {time_ratio:g} x médiane {med_t:.1f}s")
+                if med_rows > 0 and (cur["rows_read"] or 0) < (1 - rows_drop) * med_rows:
+                    item["flags"].append(f"lignes {cur['rows_read']} < médiane {med_rows:g} - {rows_drop:.0%}")
+        out.append(item)
+    return out
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def _fmt(v, spec: str = "") -> str:
+    return "-" if v is None else format(v, spec)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Historique des exports (export_run)")
+    p.add_argument("--asconnect", action="store_true", help="Base ASConnect au lieu d'AngelmanResult")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    t = sub.add_parser("trends", help="Tendances par table + régressions")
+    t.add_argument("--table")
+    t.add_argument("--window", type=int, default=10, help="Runs précédents pour la médiane glissante")
+    t.add_argument("--time-ratio", type=float, default=1.5, help="Seuil durée / médiane")
+    t.add_argument("--rows-drop", type=float, default=0.1, help="Baisse tolérée des lignes lues (0.1 = 10%%)")
+
+    h = sub.add_parser("history", help="Derniers runs d'une table")
+    h.add_argument("table")
+    h.add_argument("--limit", type=int, default=20)
+    args = p.parse_args(argv)
+
+    # import tardif: utilsTools importe ce module
+    from tools.utilsTools import _get_engine
+    _, engine = _get_engine(bAngelmanResult=not args.asconnect)
+
+    with engine.connect() as conn:
+        if args.cmd == "history":
+            runs = fetch_runs(conn, args.table, args.limit)
+        else:
+            runs = fetch_runs(conn, args.table)
+
+    if args.cmd == "history":
+        print(f"{'started':<26} {'outcome':<9} {'mode':<12} {'read':>7} {'written':>7} {'rej.':>6} "
+              f"{'total s':>8} " + " ".join(f"{s:>7}" for s in STAGES) + f" {'Ko':>9}")
+        for r in runs:
+            print(f"{str(r['started_at']):<26} {r['outcome']:<9} {str(r['publish_mode'] or '-'):<12} "
+                  f"{_fmt(r['rows_read']):>7} {_fmt(r['rows_written']):>7} {_fmt(r['rows_rejected']):>6} "
+                  f"{_fmt(r['duration_s'], '.2f'):>8} "
+                  + " ".join(f"{_fmt(r[f't_{s}'], '.2f'):>7}" for s in STAGES)
+                  + f" {_fmt((r['bytes_sent'] or 0) / 1024, '.0f'):>9}"
+                  + (f"  {r['error'][:60]}" if r["error"] else ""))
+        return 0
+
+    items = trends(runs, window=args.window, time_ratio=args.time_ratio, rows_drop=args.rows_drop)
+    flagged = 0
+    print(f"{'table':<45} {'runs':>5} {'last s':>8} {'median s':>9} {'rows':>7} {'median':>7}  flags")
+    for it in items:
+        flagged += bool(it["flags"])
+        print(f"{it['table']:<45} {it['runs']:>5} {_fmt(it.get('duration_s'), '.1f'):>8} "
+              f"{_fmt(it.get('median_duration_s'), '.1f'):>9} {_fmt(it.get('rows_read')):>7} "
+              f"{_fmt(it.get('median_rows_read'), 'g'):>7}  {'⚠️ ' + '; '.join(it['flags']) if it['flags'] else 'ok'}")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# tools/incremental_export.py
+"""
+Export incrémental d'une table (export_Table(publish="incremental")).
+
+La plupart des exports pays réécrivent toute la table alors que seules quelques
+lignes du Google Sheet ont bougé. Ici:
+  1. une empreinte stable par ligne, calculée sur le CLAIR (avant chiffrement:
+     Fernet n'est pas déterministe, deux chiffrements d'une même valeur diffèrent)
+     et indexée par la clé métier (key_columns, "id" par défaut)
+  2. comparaison avec les empreintes de l'export précédent (table export_fingerprint)
+  3. seuls les écarts sont appliqués, en UNE transaction:
+     INSERT (ajoutées), UPDATE (modifiées), DELETE (supprimées)
+
+Empreintes et clés sont des HMAC (crypto_utils.keyed_sha256): rien du clair n'est
+stocké. Pour retrouver une ligne dont la clé est chiffrée en base, on garde la
+valeur de clé TELLE QU'ÉCRITE (row_ref: jeton chiffré ou clair) et on cible
+WHERE <clé> = row_ref.
+
+Le mode incrémental n'est tenté que si les empreintes stockées couvrent exactement
+la table live; sinon export complet puis empreintes réécrites (cf. utilsTools).
+"""
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.engine import Connection
+
+from tools.bulk_load import _q, _rows, _placeholder, insert_executemany, match_columns
+from tools.crypto_utils import keyed_sha256
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+FINGERPRINT_TABLE = "export_fingerprint"
+_PURPOSE_KEY = "export_fingerprint:key"
+_PURPOSE_ROW = "export_fingerprint:row"
+
+FINGERPRINT_DDL = f"""
+CREATE TABLE IF NOT EXISTS {FINGERPRINT_TABLE} (
+  table_name  VARCHAR(255) NOT NULL,
+  key_hash    CHAR(64)     NOT NULL,
+  fingerprint CHAR(64)     NOT NULL,
+  row_ref     TEXT         NOT NULL,
+  PRIMARY KEY (table_name, key_hash)
+)
+"""
+
+
+class IncrementalUnavailable(ValueError):
+    """Le mode incrémental ne peut pas s'appliquer: on repasse par un export complet."""
+
+
+@dataclass
+class RowDiff:
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    def counts(self) -> dict:
+        return {"added": len(self.added), "changed": len(self.changed),
+                "removed": len(self.removed), "unchanged": self.unchanged}
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+
+# ----------------------------------------------------------------------
+# Empreintes (sur le clair)
+# ----------------------------------------------------------------------
+def _canon(v):
+    """Valeur canonique JSON-sérialisable (stable d'un run à l'autre)."""
+    if v is None:
+        return None
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    if isinstance(v, (int, np.integer)):
+        return int(v)
+    if isinstance(v, (float, np.floating)):
+        f = float(v)
+        if math.isnan(f):
+            return None
+        return int(f) if f.is_integer() else repr(f)
+    if isinstance(v, (pd.Timestamp, datetime, date)):
+        return v.isoformat()
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return bytes(v).hex()
+    return str(v)
+
+
+def row_fingerprints(df: pd.DataFrame, key_columns: list[str]) -> pd.DataFrame:
+    """
+    DataFrame indexé comme df: colonnes key_hash et fingerprint.
+    IncrementalUnavailable si une colonne clé manque ou si la clé n'est pas unique.
+    """
+    missing = [k for k in key_columns if k not in df.columns]
+    if missing:
+        raise IncrementalUnavailable(f"clé métier absente du DataFrame: {missing}")
+    cols = sorted(map(str, df.columns))
+    work = df[cols].astype(object).where(pd.notna(df[cols]), None)
+
+    key_hash, fingerprint = [], []
+    for row in work.itertuples(index=False, name=None):
+        values = dict(zip(cols, (_canon(v) for v in row)))
+        key_hash.append(keyed_sha256(json.dumps([values[k] for k in key_columns]), purpose=_PURPOSE_KEY))
+        fingerprint.append(keyed_sha256(json.dumps(values, sort_keys=True), purpose=_PURPOSE_ROW))
+
+    out = pd.DataFrame({"key_hash": key_hash, "fingerprint": fingerprint}, index=df.index)
+    if out["key_hash"].duplicated().any():
+        raise IncrementalUnavailable(f"clé métier {key_columns} non unique")
+    return out
+
+
+def diff_fingerprints(new: pd.DataFrame, old: dict[str, tuple[str, str]]) -> RowDiff:
+    """new: sortie de row_fingerprints; old: {key_hash: (fingerprint, row_ref)}."""
+    d = RowDiff()
+    seen = set()
+    for key_hash, fp in zip(new["key_hash"], new["fingerprint"]):
+        seen.add(key_hash)
+        prev = old.get(key_hash)
+        if prev is None:
+            d.added.append(key_hash)
+        elif prev[0] != fp:
+            d.changed.append(key_hash)
+        else:
+            d.unchanged += 1
+    d.removed = [k for k in old if k not in seen]
+    return d
+
+
+# ----------------------------------------------------------------------
+# Stockage des empreintes
+# ----------------------------------------------------------------------
+def ensure_fingerprint_table(conn: Connection) -> None:
+    conn.exec_driver_sql(FINGERPRINT_DDL)
+
+
+def load_fingerprints(conn: Connection, table_name: str) -> dict[str, tuple[str, str]]:
+    ph = _placeholder(conn)
+    res = conn.exec_driver_sql(
+        f"SELECT key_hash, fingerprint, row_ref FROM {FINGERPRINT_TABLE} WHERE table_name = {ph}",
+        (table_name,),
+    )
+    return {k: (fp, ref) for k, fp, ref in res}
+
+
+def delete_fingerprints(conn: Connection, table_name: str) -> None:
+    """Oublie les empreintes de table_name: le prochain export incrémental sera complet."""
+    ensure_fingerprint_table(conn)
+    conn.exec_driver_sql(f"DELETE FROM {FINGERPRINT_TABLE} WHERE table_name = {_placeholder(conn)}", (table_name,))
+
+
+def _row_refs(stored: pd.DataFrame, key_columns: list[str]) -> list[str]:
+    """Valeurs de clé telles qu'écrites en base (chiffrées ou non), en JSON."""
+    return [json.dumps(list(r)) for r in _rows(stored[key_columns])]
+
+
+def replace_fingerprints(conn: Connection, table_name: str, fps: pd.DataFrame,
+                         stored: pd.DataFrame, key_columns: list[str]) -> None:
+    """Réécrit toutes les empreintes de table_name (après un export complet)."""
+    ph = _placeholder(conn)
+    conn.exec_driver_sql(f"DELETE FROM {FINGERPRINT_TABLE} WHERE table_name = {ph}", (table_name,))
+    rows = list(zip([table_name] * len(fps), fps["key_hash"], fps["fingerprint"], _row_refs(stored, key_columns)))
+    if rows:
+        conn.exec_driver_sql(
+            f"INSERT INTO {FINGERPRINT_TABLE} (table_name, key_hash, fingerprint, row_ref) "
+            f"VALUES ({ph}, {ph}, {ph}, {ph})",
+            rows,
+        )
+
+
+# ----------------------------------------------------------------------
+# Application du diff
+# ----------------------------------------------------------------------
+def _where_key(conn: Connection, key_columns: list[str]) -> str:
+    ph = _placeholder(conn)
+    return " AND ".join(f"{_q(k)} = {ph}" for k in key_columns)
+
+
+def _expect(res, n: int, what: str) -> None:
+    # rowcount d'un executemany = total des lignes touchées (pymysql, sqlite3)
+    if res.rowcount is not None and res.rowcount >= 0 and res.rowcount != n:
+        raise IncrementalUnavailable(f"{what}: {res.rowcount} lignes touchées pour {n} attendues (empreintes périmées)")
+
+
+def apply_diff(conn: Connection, table_name: str, key_columns: list[str], diff: RowDiff,
+               fps: pd.DataFrame, stored: pd.DataFrame, old: dict[str, tuple[str, str]],
+               ciphertext=()) -> None:
+    """
+    Applique diff sur table_name dans la transaction de conn.
+    - fps: empreintes du nouvel export (même index que stored)
+    - stored: DataFrame tel qu'il doit être écrit (déjà chiffré le cas échéant)
+    - ciphertext: colonnes chiffrées de stored (cf. bulk_load.match_columns)
+    IncrementalUnavailable (-> rollback + export complet) si la table ne correspond
+    pas aux empreintes stockées.
+    """
+    ph = _placeholder(conn)
+    columns = match_columns(conn, table_name, stored, ciphertext)   # ColumnMismatch si la DDL a bougé / jeton trop long
+    by_key = pd.Series(stored.index, index=fps["key_hash"].values)
+    where = _where_key(conn, key_columns)
+    refs = dict(zip(fps["key_hash"], _row_refs(stored, key_columns)))
+
+    if diff.removed:
+        res = conn.exec_driver_sql(
+            f"DELETE FROM {_q(table_name)} WHERE {where}",
+            [tuple(json.loads(old[k][1])) for k in diff.removed],
+        )
+        _expect(res, len(diff.removed), "DELETE")
+        conn.exec_driver_sql(
+            f"DELETE FROM {FINGERPRINT_TABLE} WHERE table_name = {ph} AND key_hash = {ph}",
+            [(table_name, k) for k in diff.removed],
+        )
+
+    if diff.changed:
+        sub = stored.loc[by_key[diff.changed].values]
+        params = [
+            tuple(values) + tuple(json.loads(old[k][1]))
+            for k, values in zip(diff.changed, _rows(sub))
+        ]
+        res = conn.exec_driver_sql(
+            f"UPDATE {_q(table_name)} SET {', '.join(f'{_q(c)} = {ph}' for c in columns)} WHERE {where}",
+            params,
+        )
+        _expect(res, len(diff.changed), "UPDATE")
+        fp_by_key = dict(zip(fps["key_hash"], fps["fingerprint"]))
+        conn.exec_driver_sql(
+            f"UPDATE {FINGERPRINT_TABLE} SET fingerprint = {ph}, row_ref = {ph} "
+            f"WHERE table_name = {ph} AND key_hash = {ph}",
+            [(fp_by_key[k], refs[k], table_name, k) for k in diff.changed],
+        )
+
+    if diff.added:
+        sub = stored.loc[by_key[diff.added].values]
+        insert_executemany(conn, table_name, columns, sub)
+        fp_by_key = dict(zip(fps["key_hash"], fps["fingerprint"]))
+        conn.exec_driver_sql(
+            f"INSERT INTO {FINGERPRINT_TABLE} (table_name, key_hash, fingerprint, row_ref) "
+            f"VALUES ({ph}, {ph}, {ph}, {ph})",
+            [(table_name, k, fp_by_key[k], refs[k]) for k in diff.added],
+        )
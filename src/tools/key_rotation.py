@@ -0,0 +1,415 @@
+# tools/key_rotation.py
+"""
+Rotation de la clé Fernet: re-chiffrement en tâche de fond, par lots, reprenable.
+
+crypto_utils charge un ANNEAU de clés (Config4.ini [CleChiffrement]): KEY chiffre,
+KEY + PREVIOUS_KEYS déchiffrent (MultiFernet). Rotation:
+  1. HMAC_KEY = valeur de l'ancienne KEY (index aveugles et empreintes d'export
+     restent valides; le job refuse de tourner sinon)
+  2. PREVIOUS_KEYS = ancienne KEY, KEY = nouvelle clé (Fernet.generate_key()), redéploiement:
+     l'application lit tout et écrit avec la nouvelle clé
+  3. ce job re-chiffre l'existant avec la clé primaire, table par table
+  4. quand tout est à 'finished' (status): retirer l'ancienne clé de PREVIOUS_KEYS
+
+Tables couvertes (TARGETS + tables exportées):
+  - T_People_Identity (PII, jetons bruts VARBINARY), T_Message.body_text (idem;
+    les corps historiques en clair sont laissés tels quels)
+  - toutes les tables du registre des specs (crypto_spec), génération __prev
+    comprise: jetons en Base64, parcourues par leur clé primaire. Il faut une clé
+    primaire mono-colonne, entière et hors spec (jamais chiffrée, ex. 'indexation'
+    AUTO_INCREMENT de T_MapFrance_English); sinon la table est signalée 'skipped'
+    dans le rapport: un export complet la re-chiffrera avec la nouvelle clé.
+    Leurs empreintes d'export gardent l'ancien row_ref: le prochain export
+    incrémental qui touche une de ces lignes retombe sur un export complet
+    (IncrementalUnavailable), qui les réécrit
+
+Pour chaque table, dans l'ordre de la clé primaire, un lot = UNE transaction:
+  SELECT (FOR UPDATE en MySQL) -> déchiffrement (anneau) -> re-chiffrement des seules
+  cellules sous une ancienne clé -> UPDATE -> relecture et vérification: empreinte
+  SHA-256 du clair (clé, colonne, valeur) avant == après, et tout se déchiffre avec
+  la clé primaire seule -> checkpoint (table key_rotation_checkpoint, par table et
+  par clé primaire). Un écart lève RotationVerifyError: ROLLBACK du lot, arrêt.
+Débit plafonné (--rate lignes/s), durée plafonnée (--max-seconds, pour un cron),
+progression et ETA dans les logs.
+
+CLI (depuis src/):
+  python -m tools.key_rotation run
+  python -m tools.key_rotation run --rate 200 --max-seconds 600 --batch 500
+  python -m tools.key_rotation run --only T_People_Identity --restart
+  python -m tools.key_rotation status
+Code retour 1 si une table n'est pas terminée (ou 'skipped': pas re-chiffrable ici).
+"""
+from __future__ import annotations
+
+import sys
+import time
+import json
+import hashlib
+import argparse
+from dataclasses import dataclass
+from datetime import datetime
+
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy import inspect, text
+from sqlalchemy import types as sqltypes
+from sqlalchemy.engine import Connection, Engine
+
+import tools.crypto_utils as crypto
+import tools.utilsTools as utils
+import tools.crypto_spec_registry as spec_registry
+from tools.bulk_load import _q
+from tools.staged_publish import previous_name
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+_UNREADABLE = object()   # jeton qu'aucune clé de l'anneau ne déchiffre
+
+CHECKPOINT_TABLE = "key_rotation_checkpoint"
+
+CHECKPOINT_DDL = f"""
+CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+  target        VARCHAR(255) NOT NULL,
+  key_id        CHAR(16)     NOT NULL,
+  last_key      BIGINT       NOT NULL,
+  rows_done     BIGINT       NOT NULL,
+  cells_rotated BIGINT       NOT NULL,
+  cells_skipped BIGINT       NOT NULL,
+  started_at    DATETIME     NOT NULL,
+  updated_at    DATETIME     NOT NULL,
+  finished_at   DATETIME     NULL,
+  PRIMARY KEY (target, key_id)
+)
+"""
+
+_STATE_FIELDS = ("last_key", "rows_done", "cells_rotated", "cells_skipped", "started_at")
+
+
+class RotationVerifyError(RuntimeError):
+    """Le clair relu après re-chiffrement ne correspond pas au clair d'avant: lot annulé."""
+
+
+@dataclass(frozen=True)
+class RotationTarget:
+    table: str
+    key_column: str
+    columns: tuple[str, ...] | None = None   # None: toutes les colonnes sauf la clé
+    encoding: str = "raw"                     # "raw": jeton Fernet brut | "b64": Base64 du jeton (tables exportées)
+    bAngelmanResult: bool = False
+
+
+TARGETS = [
+    RotationTarget("T_People_Identity", "person_id",
+                   ("firstname", "lastname", "emailAddress", "dateOfBirth", "genotype",
+                    "longitude", "latitude", "secret_question", "secret_answer")),
+    RotationTarget("T_Message", "id", ("body_text",)),
+]
+
+
+def rotation_key(conn: Connection, table_name: str, spec: dict | None) -> tuple[str | None, str]:
+    """
+    Colonne de parcours d'une table exportée: sa clé primaire, si elle est mono-colonne,
+    entière et hors spec (une clé chiffrée se trie sur le jeton, pas sur la valeur).
+    (colonne, "") ou (None, raison).
+    """
+    insp = inspect(conn)
+    pk = insp.get_pk_constraint(table_name).get("constrained_columns") or []
+    if len(pk) != 1:
+        return None, "pas de clé primaire" if not pk else f"clé primaire composite {pk}"
+    col = next(c for c in insp.get_columns(table_name) if c["name"] == pk[0])
+    if not isinstance(col["type"], sqltypes.Integer):
+        return None, f"clé primaire {pk[0]} non entière ({col['type']})"
+    if spec and pk[0].lower() in {str(c).lower() for c in spec}:
+        return None, f"clé primaire {pk[0]} chiffrée"
+    return pk[0], ""
+
+
+def export_targets(engine: Engine, bAngelmanResult: bool, skipped: list[dict] | None = None) -> list[RotationTarget]:
+    """
+    Tables exportées chiffrées (registre crypto_spec) + leur génération précédente.
+    Colonnes = celles du spec enregistré pour ce schéma; sans spec, toutes sauf la clé
+    (les cellules en clair sont simplement ignorées). Les tables sans clé utilisable
+    (cf. rotation_key) sont ajoutées à skipped ({"target", "reason"}) et loggées.
+    """
+    out = []
+    with engine.begin() as conn:
+        spec_registry.ensure_table(conn)
+        names = [r[0] for r in conn.exec_driver_sql(
+            f"SELECT DISTINCT table_name FROM {spec_registry.SPEC_TABLE} ORDER BY table_name")]
+        existing = set(inspect(conn).get_table_names())
+        for name in names:
+            for t in (name, previous_name(name)):
+                if t not in existing:
+                    continue
+                columns = spec_registry.table_columns(conn, t)
+                # __prev: ses propres specs (retire_to_previous), à défaut ceux de la table live
+                spec = spec_registry.lookup(conn, t, columns) if t != name else None
+                spec = spec or spec_registry.lookup(conn, name, columns)
+                key, reason = rotation_key(conn, t, spec)
+                if key is None:
+                    logger.warning("--- Rotation %s impossible (%s): à re-chiffrer par un export complet", t, reason)
+                    if skipped is not None:
+                        skipped.append({"target": t, "reason": reason})
+                    continue
+                out.append(RotationTarget(t, key, tuple(spec) if spec else None, "b64", bAngelmanResult))
+    return out
+
+
+# -----------------------------
+#  Codec des cellules
+# -----------------------------
+def _token(value, encoding: str) -> bytes | None:
+    """Jeton Fernet d'une cellule, None si vide / pas un jeton."""
+    if value is None:
+        return None
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    try:
+        if encoding == "b64":
+            return crypto._b64d(value.decode("ascii") if isinstance(value, (bytes, bytearray)) else str(value))
+        return bytes(value) if isinstance(value, (bytes, bytearray)) else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _decrypt_keyed(ring: list[Fernet], tokens: list) -> tuple[list, list[int | None]]:
+    """
+    Clairs + rang de la clé qui a déchiffré chaque jeton (0 = primaire). None si jeton None,
+    _UNREADABLE si aucune clé de l'anneau ne le déchiffre.
+    """
+    plains: list = [None] * len(tokens)
+    used: list[int | None] = [None] * len(tokens)
+    for n, tok in enumerate(tokens):
+        if tok is None:
+            continue
+        plains[n] = _UNREADABLE
+        for k, f in enumerate(ring):
+            try:
+                plains[n], used[n] = f.decrypt(tok), k
+                break
+            except InvalidToken:
+                continue
+    return plains, used
+
+
+def _cell(token: bytes, original, encoding: str):
+    """Valeur à écrire, du même type que la cellule d'origine."""
+    if encoding == "b64":
+        s = crypto._b64e(token)
+        return s.encode("ascii") if isinstance(original, (bytes, bytearray, memoryview)) else s
+    return token
+
+
+def _digest(items) -> str:
+    h = hashlib.sha256()
+    for key, col, plain in items:
+        h.update(f"{key}\x1f{col}\x1f".encode("utf-8") + plain + b"\x1e")
+    return h.hexdigest()
+
+
+# -----------------------------
+#  Checkpoint
+# -----------------------------
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def load_checkpoint(conn: Connection, target: str, key_id: str) -> dict | None:
+    row = conn.execute(text(f"SELECT last_key, rows_done, cells_rotated, cells_skipped, started_at, updated_at, "
+                            f"finished_at FROM {CHECKPOINT_TABLE} WHERE target = :t AND key_id = :k"),
+                       {"t": target, "k": key_id}).fetchone()
+    if row is None:
+        return None
+    return {"last_key": int(row[0]), "rows_done": int(row[1]), "cells_rotated": int(row[2]),
+            "cells_skipped": int(row[3]), "started_at": str(row[4]), "updated_at": str(row[5]),
+            "finished_at": row[6] and str(row[6])}
+
+
+def _save_checkpoint(conn: Connection, target: str, key_id: str, state: dict, finished: bool) -> None:
+    now = _now()
+    params = {"t": target, "k": key_id, **{f: state[f] for f in _STATE_FIELDS},
+              "u": now, "f": now if finished else None}
+    conn.execute(text(f"DELETE FROM {CHECKPOINT_TABLE} WHERE target = :t AND key_id = :k"), params)
+    conn.execute(text(f"INSERT INTO {CHECKPOINT_TABLE} (target, key_id, {', '.join(_STATE_FIELDS)}, updated_at, "
+                      f"finished_at) VALUES (:t, :k, {', '.join(':' + f for f in _STATE_FIELDS)}, :u, :f)"), params)
+
+
+def _eta(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m{seconds % 60:02d}s"
+
+
+# -----------------------------
+#  Re-chiffrement d'une table
+# -----------------------------
+def _rotate_batch(conn: Connection, target: RotationTarget, columns: list[str], state: dict,
+                  batch_size: int, ring: list[Fernet]) -> int:
+    key, enc = target.key_column, target.encoding
+    lock = " FOR UPDATE" if conn.dialect.name == "mysql" else ""
+    select = f"SELECT {_q(key)}, {', '.join(_q(c) for c in columns)} FROM {_q(target.table)}"
+    rows = conn.execute(text(f"{select} WHERE {_q(key)} > :last ORDER BY {_q(key)} LIMIT :n{lock}"),
+                        {"last": state["last_key"], "n": batch_size}).fetchall()
+    if not rows:
+        return 0
+
+    cells = [(r[0], col, r[j + 1]) for r in rows for j, col in enumerate(columns)]
+    plains, used = _decrypt_keyed(ring, [_token(v, enc) for _, _, v in cells])
+    readable = [(k, col, p) for (k, col, _), p in zip(cells, plains) if p is not None and p is not _UNREADABLE]
+    stale = [n for n, u in enumerate(used) if u]   # déchiffré par une ancienne clé
+    state["cells_skipped"] += sum(1 for p in plains if p is _UNREADABLE)
+
+    if stale:
+        fresh = [ring[0].encrypt(plains[n]) for n in stale]
+        new_value = {n: _cell(t, cells[n][2], enc) for n, t in zip(stale, fresh)}
+        by_row: dict = {}
+        for n in stale:
+            by_row.setdefault(cells[n][0], {})[cells[n][1]] = new_value[n]
+        for changed_cols in {tuple(sorted(v)) for v in by_row.values()}:
+            params = [{"k": k, **{f"c{j}": v[c] for j, c in enumerate(changed_cols)}}
+                      for k, v in by_row.items() if tuple(sorted(v)) == changed_cols]
+            sets = ", ".join(f"{_q(c)} = :c{j}" for j, c in enumerate(changed_cols))
+            conn.execute(text(f"UPDATE {_q(target.table)} SET {sets} WHERE {_q(key)} = :k"), params)
+
+        # vérification: relecture, clé primaire seule, même clair qu'avant
+        after = conn.execute(text(f"{select} WHERE {_q(key)} > :last AND {_q(key)} <= :upto ORDER BY {_q(key)}"),
+                             {"last": state["last_key"], "upto": rows[-1][0]}).fetchall()
+        after_cells = {(r[0], col): r[j + 1] for r in after for j, col in enumerate(columns)}
+        wanted = [(k, col) for k, col, _ in readable]
+        again, _ = _decrypt_keyed(ring[:1], [_token(after_cells.get(kc), enc) for kc in wanted])
+        if any(p is None or p is _UNREADABLE for p in again):
+            raise RotationVerifyError(f"{target.table}: cellules illisibles avec la clé primaire après re-chiffrement")
+        if _digest(readable) != _digest((k, col, p) for (k, col), p in zip(wanted, again)):
+            raise RotationVerifyError(f"{target.table}: empreinte du clair différente après re-chiffrement "
+                                      f"({key} {rows[0][0]}..{rows[-1][0]})")
+        state["cells_rotated"] += len(stale)
+
+    state["last_key"] = int(rows[-1][0])
+    state["rows_done"] += len(rows)
+    return len(rows)
+
+
+def rotate_table(
+    engine: Engine,
+    target: RotationTarget,
+    *,
+    batch_size: int = 500,
+    rate: float = 0.0,
+    max_seconds: float | None = None,
+    restart: bool = False,
+    keys: list[str] | None = None,
+) -> dict:
+    """
+    Re-chiffre target avec la clé primaire (keys[0], défaut: anneau de crypto_utils).
+    rate: plafond en lignes/s (0 = pas de pause); max_seconds: arrêt propre après ce temps,
+    reprise au prochain appel. Renvoie l'état (checkpoint) + finished / batches / eta_s.
+    """
+    keys = keys or crypto.key_ring()
+    ring, kid = [Fernet(k) for k in keys], crypto.key_id(keys[0])
+    with engine.begin() as conn:
+        conn.exec_driver_sql(CHECKPOINT_DDL)
+        saved = None if restart else load_checkpoint(conn, target.table, kid)
+        columns = list(target.columns or [c["name"] for c in inspect(conn).get_columns(target.table)
+                                          if c["name"] != target.key_column])
+    if saved and saved["finished_at"]:
+        return {"target": target.table, **saved, "finished": True, "batches": 0, "eta_s": 0.0}
+    state = {f: saved[f] for f in _STATE_FIELDS} if saved else \
+        {"last_key": -1, "rows_done": 0, "cells_rotated": 0, "cells_skipped": 0, "started_at": _now()}
+
+    with engine.connect() as conn:
+        remaining = conn.execute(text(f"SELECT COUNT(*) FROM {_q(target.table)} WHERE {_q(target.key_column)} > :last"),
+                                 {"last": state["last_key"]}).scalar()
+    logger.info("--- Rotation %s (clé %s): %d lignes restantes, reprise après %s=%d",
+                target.table, kid, remaining, target.key_column, state["last_key"])
+
+    t0, done, batches, finished, eta = time.monotonic(), 0, 0, False, None
+    while not finished:
+        tb = time.monotonic()
+        with engine.begin() as conn:
+            n = _rotate_batch(conn, target, columns, state, batch_size, ring)
+            finished = n < batch_size
+            _save_checkpoint(conn, target.table, kid, state, finished)
+        batches, done = batches + 1, done + n
+
+        if rate > 0 and n:
+            time.sleep(max(0.0, n / rate - (time.monotonic() - tb)))
+        elapsed = time.monotonic() - t0
+        speed = done / elapsed if elapsed > 0 else 0.0
+        eta = 0.0 if finished else (max(0, remaining - done) / speed if speed else None)
+        logger.info("--- Rotation %s: %d/%d lignes (%.1f%%), %d cellules re-chiffrées, %.0f lignes/s, ETA %s",
+                    target.table, done, remaining, 100.0 * done / remaining if remaining else 100.0,
+                    state["cells_rotated"], speed, "-" if eta is None else _eta(eta))
+        if not finished and max_seconds is not None and elapsed >= max_seconds:
+            logger.info("--- Rotation %s: durée max atteinte, reprise au prochain lancement", target.table)
+            break
+    return {"target": target.table, "key_id": kid, **state, "finished": finished, "batches": batches, "eta_s": eta}
+
+
+def _targets(only: list[str] | None, with_exports: bool,
+             skipped: list[dict] | None = None) -> list[tuple[Engine, RotationTarget]]:
+    out, ignored = [], []
+    for bAngelmanResult in (False, True):
+        _, engine = utils._get_engine(bAngelmanResult=bAngelmanResult)
+        found = [t for t in TARGETS if t.bAngelmanResult == bAngelmanResult]
+        if with_exports:
+            found += export_targets(engine, bAngelmanResult, ignored)
+        out += [(engine, t) for t in found if not only or t.table in only]
+    if skipped is not None:
+        skipped += [s for s in ignored if not only or s["target"] in only]
+    return out
+
+
+def _skipped_report(s: dict) -> dict:
+    """Table non re-chiffrable par ce job: jamais 'finished' (l'ancienne clé reste nécessaire)."""
+    return {**s, "skipped": True, "finished": False, "batches": 0}
+
+
+def run(*, only: list[str] | None = None, with_exports: bool = True, **kw) -> list[dict]:
+    """Re-chiffre toutes les tables (ou 'only'); kw: cf. rotate_table."""
+    if len(crypto.key_ring()) > 1 and not crypto.hmac_key_pinned():
+        raise RuntimeError("HMAC_KEY absente de Config4.ini [CleChiffrement]: la fixer à l'ancienne KEY "
+                           "avant la rotation (index aveugles, empreintes d'export)")
+    reports, skipped = [], []
+    for engine, target in _targets(only, with_exports, skipped):
+        reports.append(rotate_table(engine, target, **kw))
+        if not reports[-1]["finished"]:
+            break   # durée max atteinte: on reprend là au prochain lancement
+    return reports + [_skipped_report(s) for s in skipped]
+
+
+def status(*, with_exports: bool = True) -> list[dict]:
+    kid = crypto.key_id(crypto.key_ring()[0])
+    out, skipped = [], []
+    for engine, target in _targets(None, with_exports, skipped):
+        with engine.begin() as conn:
+            conn.exec_driver_sql(CHECKPOINT_DDL)
+            cp = load_checkpoint(conn, target.table, kid)
+        out.append({"target": target.table, "key_id": kid, **(cp or {"last_key": None}),
+                    "finished": bool(cp and cp["finished_at"])})
+    return out + [_skipped_report(s) for s in skipped]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Rotation de la clé Fernet: re-chiffrement par lots, reprenable")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="Re-chiffre avec la clé primaire (reprend aux checkpoints)")
+    r.add_argument("--batch", type=int, default=500)
+    r.add_argument("--rate", type=float, default=0.0, help="Plafond en lignes/s (0 = sans pause)")
+    r.add_argument("--max-seconds", type=float)
+    r.add_argument("--only", nargs="+", help="Tables à traiter")
+    r.add_argument("--restart", action="store_true", help="Ignore les checkpoints de la clé courante")
+    r.add_argument("--no-exports", action="store_true", help="Sans les tables exportées (T_Map...)")
+    s = sub.add_parser("status", help="Checkpoints de la clé primaire courante")
+    s.add_argument("--no-exports", action="store_true")
+    args = p.parse_args(argv)
+
+    if args.cmd == "run":
+        reports = run(only=args.only, with_exports=not args.no_exports, batch_size=args.batch, rate=args.rate,
+                      max_seconds=args.max_seconds, restart=args.restart)
+    else:
+        reports = status(with_exports=not args.no_exports)
+    print(json.dumps(reports, ensure_ascii=False, indent=2, default=str))
+    return 0 if reports and all(rep["finished"] for rep in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
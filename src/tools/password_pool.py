@@ -0,0 +1,200 @@
+# tools/password_pool.py
+"""
+Pool borné pour le hachage / la vérification Argon2id hors du thread de la requête.
+
+Argon2id (m=19 MiB, cf. crypto_utils) coûte des dizaines de ms de CPU et ~19 MiB par
+appel: sans limite, un pic de connexions sature les workers PythonAnywhere et toutes
+les autres requêtes attendent derrière. Ici:
+  - ARGON2_POOL_WORKERS threads (défaut 2; 0 = exécution directe, sans pool).
+    argon2-cffi relâche le GIL pendant le calcul
+  - au plus ARGON2_POOL_QUEUE appels en attente (défaut 8) en plus de ceux en cours:
+    au-delà, PoolBusyError immédiat (délestage, la route répond 503 + Retry-After)
+  - ARGON2_POOL_TIMEOUT secondes d'attente max par appel (défaut 5, file + calcul):
+    PoolTimeoutError (sous-classe de PoolBusyError), l'appel est annulé s'il n'a pas démarré
+  - temps de file et temps de calcul mesurés séparément (stats(), GET /_argon2)
+
+Un pool par process, threads créés au premier appel (et recréés après un fork).
+"""
+from __future__ import annotations
+
+import os
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Callable
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+
+logger = setup_logger(debug=False)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+WORKERS = max(0, int(_env_float("ARGON2_POOL_WORKERS", 2)))
+MAX_QUEUE = max(0, int(_env_float("ARGON2_POOL_QUEUE", 8)))
+TIMEOUT_S = _env_float("ARGON2_POOL_TIMEOUT", 5.0)
+MAX_RETRY_AFTER_S = 30
+TIME_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolBusyError(RuntimeError):
+    """File pleine: à relayer en 503, réessayer dans retry_after secondes."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PoolTimeoutError(PoolBusyError):
+    """Appel non terminé dans le délai (file + calcul)."""
+
+
+class _Timings:
+    """Cumuls + histogramme (ms), même forme que tools.pool_telemetry."""
+
+    def __init__(self):
+        self.hist = [0] * (len(TIME_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        i = next((k for k, b in enumerate(TIME_BUCKETS_MS) if ms <= b), len(TIME_BUCKETS_MS))
+        self.hist[i] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def avg_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+    def as_dict(self) -> dict:
+        hist = [{"le_ms": b, "count": c} for b, c in zip(TIME_BUCKETS_MS, self.hist)]
+        hist.append({"le_ms": "+Inf", "count": self.hist[-1]})
+        return {"count": self.count, "avg": round(self.avg_ms(), 3), "max": round(self.max_ms, 3), "hist": hist}
+
+
+class PasswordPool:
+    def __init__(self, workers: int = WORKERS, max_queue: int = MAX_QUEUE, timeout_s: float = TIMEOUT_S):
+        self.workers, self.max_queue, self.timeout_s = workers, max_queue, timeout_s
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._pid = None
+        self._pending = 0   # en file + en cours
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.submitted = self.completed = self.rejected = self.timeouts = self.errors = 0
+            self.queue = _Timings()
+            self.compute = _Timings()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            # après un fork (uWSGI), les threads du parent n'existent plus
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="argon2")
+            self._pid = os.getpid()
+            self._pending = 0
+        return self._executor
+
+    def retry_after(self) -> int:
+        """Secondes estimées pour écouler la file actuelle (1..MAX_RETRY_AFTER_S)."""
+        per_call_s = (self.compute.avg_ms() or 100.0) / 1000
+        waves = self._pending / max(1, self.workers)
+        return max(1, min(MAX_RETRY_AFTER_S, math.ceil(waves * per_call_s)))
+
+    def _timed(self, fn: Callable, args: tuple, enqueued: float):
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            done = time.monotonic()
+            with self._lock:
+                self.queue.add((started - enqueued) * 1000)
+                self.compute.add((done - started) * 1000)
+
+    def _done(self, fut) -> None:
+        with self._lock:
+            self._pending -= 1
+            if fut.cancelled():
+                return
+            if fut.exception() is not None:
+                self.errors += 1
+            else:
+                self.completed += 1
+
+    def run(self, fn: Callable, *args):
+        """Exécute fn(*args) dans le pool et attend le résultat (PoolBusyError si file pleine / délai dépassé)."""
+        enqueued = time.monotonic()
+        if self.workers <= 0:
+            with self._lock:
+                self.submitted += 1
+            try:
+                res = self._timed(fn, args, enqueued)
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                raise
+            with self._lock:
+                self.completed += 1
+            return res
+
+        with self._lock:
+            executor = self._get_executor()
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolBusyError(f"Pool Argon2 saturé ({self._pending} appels en cours/en file)",
+                                    self.retry_after())
+            self._pending += 1
+            self.submitted += 1
+            fut = executor.submit(self._timed, fn, args, enqueued)
+        fut.add_done_callback(self._done)
+
+        try:
+            return fut.result(timeout=self.timeout_s)
+        except FuturesTimeout:
+            fut.cancel()   # sans effet si le calcul a démarré: il se termine, résultat ignoré
+            with self._lock:
+                self.timeouts += 1
+                retry = self.retry_after()
+            logger.warning("Argon2: délai de %.1fs dépassé (file + calcul)", self.timeout_s)
+            raise PoolTimeoutError(f"Argon2: délai de {self.timeout_s}s dépassé", retry) from None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pid": os.getpid(), "workers": self.workers, "max_queue": self.max_queue, "timeout_s": self.timeout_s,
+                "in_flight": self._pending, "submitted": self.submitted, "completed": self.completed,
+                "rejected": self.rejected, "timeouts": self.timeouts, "errors": self.errors,
+                "queue_ms": self.queue.as_dict(), "compute_ms": self.compute.as_dict(),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+pool = PasswordPool()
+
+
+def hash_password(password: str) -> tuple[bytes, dict]:
+    """crypto.hash_password_argon2 dans le pool."""
+    return pool.run(crypto.hash_password_argon2, password)
+
+
+def verify_password(password: str, stored_hash_bytes: bytes) -> bool:
+    """crypto.verify_password_argon2 dans le pool."""
+    return pool.run(crypto.verify_password_argon2, password, stored_hash_bytes)
+
+
+def stats() -> dict:
+    return pool.stats()
@@ -0,0 +1,364 @@
+# tools/pool_telemetry.py
+"""
+Télémétrie des pools de connexions et des tunnels SSH, pour dimensionner le
+nombre de workers PythonAnywhere face au pool (pool_size + max_overflow).
+
+Branché sur l'engine ORM de app/db.py et sur tous les engines de tools.db_pool:
+  - état live: taille du pool, connexions sorties, overflow utilisé, rendues
+  - histogramme du temps d'attente au checkout (file d'attente du pool + ouverture
+    d'une connexion si besoin), timeouts du pool
+  - invalidations (connexions jetées) et échecs du pre-ping
+  - état des tunnels SSH (tools.ssh_tunnel)
+
+Un thread échantillonne toutes les POOL_TELEMETRY_INTERVAL secondes (défaut 15)
+dans un ring buffer de POOL_TELEMETRY_SAMPLES points (défaut 5760, ~24h): pic de
+connexions sorties, attentes et max d'attente sur l'intervalle -> saturation aux
+heures de pointe. Tout est en mémoire, PAR PROCESS (chaque worker a ses chiffres).
+
+Exposé par GET /_pool (app/debug_routes.py, protégé par ROUTES_TOKEN) et par la CLI
+(depuis src/), qui interroge cet endpoint:
+  python -m tools.pool_telemetry status --url https://<site>/_pool --token $ROUTES_TOKEN
+  python -m tools.pool_telemetry history --since 3600
+  (POOL_TELEMETRY_URL / ROUTES_TOKEN en variables d'environnement)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.request
+import urllib.parse
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from tools.logger import setup_logger
+from tools.ssh_tunnel import tunnel_state
+
+logger = setup_logger(debug=False)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+SAMPLE_INTERVAL = _env_float("POOL_TELEMETRY_INTERVAL", 15)
+MAX_SAMPLES = int(_env_float("POOL_TELEMETRY_SAMPLES", 5760))
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def _pool_gauge(pool, name: str):
+    fn = getattr(pool, name, None)
+    return fn() if callable(fn) else None
+
+
+class PoolStats:
+    """Compteurs d'un engine (cumulés depuis le démarrage + intervalle d'échantillonnage)."""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.checkouts = self.checkins = self.connects = 0
+        self.invalidations = self.soft_invalidations = 0
+        self.pre_ping_failures = self.timeouts = 0
+        self.wait_hist = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self._reset_interval()
+
+    def _reset_interval(self) -> None:
+        self.i_waits = 0
+        self.i_wait_max_ms = 0.0
+        self.i_timeouts = 0
+        self.i_peak_checked_out = _pool_gauge(self.engine.pool, "checkedout") or 0
+
+    # ---------- mesures ----------
+    def record_wait(self, ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                self.i_timeouts += 1
+            i = next((k for k, b in enumerate(WAIT_BUCKETS_MS) if ms <= b), len(WAIT_BUCKETS_MS))
+            self.wait_hist[i] += 1
+            self.wait_total_ms += ms
+            self.wait_max_ms = max(self.wait_max_ms, ms)
+            self.i_waits += 1
+            self.i_wait_max_ms = max(self.i_wait_max_ms, ms)
+
+    def record_checkout(self) -> None:
+        out = _pool_gauge(self.engine.pool, "checkedout") or 0
+        with self._lock:
+            self.checkouts += 1
+            self.i_peak_checked_out = max(self.i_peak_checked_out, out)
+
+    def incr(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    # ---------- lecture ----------
+    def live(self) -> dict:
+        pool = self.engine.pool
+        size = _pool_gauge(pool, "size")
+        overflow = _pool_gauge(pool, "overflow")
+        return {
+            "pool_class": type(pool).__name__,
+            "size": size,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "checked_out": _pool_gauge(pool, "checkedout"),
+            "checked_in": _pool_gauge(pool, "checkedin"),
+            # overflow() est négatif tant que le pool n'a pas ouvert size connexions
+            "overflow_in_use": max(overflow, 0) if overflow is not None else None,
+        }
+
+    def totals(self) -> dict:
+        with self._lock:
+            n = sum(self.wait_hist)
+            hist = [{"le_ms": b, "count": c} for b, c in zip(WAIT_BUCKETS_MS, self.wait_hist)]
+            hist.append({"le_ms": "+Inf", "count": self.wait_hist[-1]})
+            return {
+                "checkouts": self.checkouts, "checkins": self.checkins, "connects": self.connects,
+                "invalidations": self.invalidations, "soft_invalidations": self.soft_invalidations,
+                "pre_ping_failures": self.pre_ping_failures, "timeouts": self.timeouts,
+                "wait_ms": {"count": n, "avg": round(self.wait_total_ms / n, 3) if n else 0.0,
+                            "max": round(self.wait_max_ms, 3), "histogram": hist},
+            }
+
+    def take_interval(self) -> dict:
+        with self._lock:
+            out = {"waits": self.i_waits, "wait_max_ms": round(self.i_wait_max_ms, 3),
+                   "timeouts": self.i_timeouts, "peak_checked_out": self.i_peak_checked_out}
+            self._reset_interval()
+            return out
+
+
+# -------------------------------------------------------------------
+# Branchement sur un engine
+# -------------------------------------------------------------------
+_stats: dict[str, PoolStats] = {}
+_samples: deque = deque(maxlen=MAX_SAMPLES)
+_lock = threading.Lock()
+_sampler: threading.Thread | None = None
+_stop = threading.Event()
+
+
+def _wrap_pool(stats: PoolStats) -> None:
+    """Chronomètre pool._do_get (attente d'une connexion libre / ouverture)."""
+    pool = stats.engine.pool
+    if getattr(pool._do_get, "_telemetry", False):
+        return
+    inner = pool._do_get
+
+    def _do_get():
+        t0 = time.perf_counter()
+        try:
+            rec = inner()
+        except Exception as e:
+            # QueuePool lève sqlalchemy.exc.TimeoutError quand pool_timeout est dépassé
+            stats.record_wait((time.perf_counter() - t0) * 1000, timed_out=type(e).__name__ == "TimeoutError")
+            raise
+        stats.record_wait((time.perf_counter() - t0) * 1000)
+        return rec
+
+    _do_get._telemetry = True
+    pool._do_get = _do_get
+
+
+def _wrap_ping(stats: PoolStats) -> None:
+    dialect = stats.engine.dialect
+    if getattr(dialect.do_ping, "_telemetry", False):
+        return
+    inner = dialect.do_ping
+
+    def do_ping(dbapi_connection):
+        try:
+            ok = inner(dbapi_connection)
+        except Exception:
+            stats.incr("pre_ping_failures")
+            raise
+        if not ok:
+            stats.incr("pre_ping_failures")
+        return ok
+
+    do_ping._telemetry = True
+    dialect.do_ping = do_ping
+
+
+def attach(engine: Engine, name: str) -> Engine:
+    """Branche la télémétrie sur engine sous le nom name (idempotent). Retourne engine."""
+    with _lock:
+        current = _stats.get(name)
+        if current is not None and current.engine is engine:
+            return engine
+        stats = PoolStats(name, engine)
+        _stats[name] = stats   # un engine recréé (dispose_engine) remplace l'ancien
+
+    event.listen(engine, "checkout", lambda *a: stats.record_checkout())
+    # engine.dispose() recrée le pool (engine_disposed est émis après): on rechronomètre
+    # le nouveau dès son premier checkout. Un engine jeté par dispose_engine / _reset_engine
+    # est détaché, et le suivant rebranché par tools.db_pool.get_engine.
+    event.listen(engine, "engine_disposed", lambda eng: _wrap_pool(stats))
+    event.listen(engine, "checkin", lambda *a: stats.incr("checkins"))
+    event.listen(engine, "connect", lambda *a: stats.incr("connects"))
+    event.listen(engine, "invalidate", lambda *a: stats.incr("invalidations"))
+    event.listen(engine, "soft_invalidate", lambda *a: stats.incr("soft_invalidations"))
+    _wrap_pool(stats)
+    _wrap_ping(stats)
+    start_sampler()
+    return engine
+
+
+def detach(name: str) -> None:
+    with _lock:
+        _stats.pop(name, None)
+
+
+# -------------------------------------------------------------------
+# Échantillonnage (ring buffer)
+# -------------------------------------------------------------------
+def sample() -> dict:
+    """Prend un échantillon maintenant et l'ajoute au ring buffer."""
+    now = time.time()
+    engines = {}
+    for name, st in list(_stats.items()):
+        live = st.live()
+        engines[name] = {"checked_out": live["checked_out"], "overflow_in_use": live["overflow_in_use"],
+                         **st.take_interval()}
+    point = {"ts": _iso(now), "t": now, "engines": engines,
+             "tunnels": [{"ssh_host": t["ssh_host"], "status": t["status"], "reconnect_count": t["reconnect_count"]}
+                         for t in tunnel_state()]}
+    _samples.append(point)
+    return point
+
+
+def _sample_loop(interval: float) -> None:
+    while not _stop.wait(interval):
+        try:
+            sample()
+        except Exception as e:   # la télémétrie ne doit jamais tuer le worker
+            logger.warning("Échantillon de télémétrie pool en erreur: %r", e)
+
+
+def start_sampler(interval: float | None = None) -> None:
+    """Démarre le thread d'échantillonnage (une fois par process; interval <= 0: désactivé)."""
+    global _sampler
+    interval = SAMPLE_INTERVAL if interval is None else interval
+    if interval <= 0 or (_sampler is not None and _sampler.is_alive()):
+        return
+    with _lock:
+        if _sampler is not None and _sampler.is_alive():
+            return
+        _stop.clear()
+        _sampler = threading.Thread(target=_sample_loop, args=(interval,), name="pool-telemetry", daemon=True)
+        _sampler.start()
+
+
+def stop_sampler() -> None:
+    _stop.set()
+
+
+def history(limit: int | None = None, since_s: float | None = None) -> list[dict]:
+    """Échantillons du ring buffer, du plus ancien au plus récent."""
+    points = list(_samples)
+    if since_s is not None:
+        cutoff = time.time() - since_s
+        points = [p for p in points if p["t"] >= cutoff]
+    if limit:
+        points = points[-limit:]
+    return [{k: v for k, v in p.items() if k != "t"} for p in points]
+
+
+def snapshot(*, history_limit: int | None = 0, since_s: float | None = None) -> dict:
+    """Photo complète: état live + cumuls par engine, tunnels, et (optionnel) historique."""
+    out = {
+        "ts": _iso(time.time()),
+        "pid": os.getpid(),
+        "sample_interval_s": SAMPLE_INTERVAL,
+        "engines": {name: {**st.live(), **st.totals()} for name, st in sorted(_stats.items())},
+        "tunnels": tunnel_state(),
+    }
+    if history_limit != 0 or since_s is not None:
+        out["history"] = history(history_limit or None, since_s)
+    return out
+
+
+# -------------------------------------------------------------------
+# CLI (interroge /_pool du worker web)
+# -------------------------------------------------------------------
+def _fetch(url: str, token: str | None, params: dict) -> dict:
+    query = urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+    req = urllib.request.Request(f"{url}?{query}" if query else url)
+    if token:
+        req.add_header("X-Admin-Token", token)
+    with urllib.request.urlopen(req, timeout=15) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def _fmt(v) -> str:
+    return "-" if v is None else str(v)
+
+
+def _print_status(snap: dict) -> None:
+    print(f"pid {snap['pid']} @ {snap['ts']}")
+    print(f"{'engine':<28} {'size':>4} {'max_ov':>6} {'out':>4} {'in':>4} {'ov':>4} "
+          f"{'waits':>7} {'avg ms':>8} {'max ms':>8} {'tmo':>4} {'inval':>5} {'ping KO':>7}")
+    for name, e in snap["engines"].items():
+        w = e["wait_ms"]
+        print(f"{name:<28} {_fmt(e['size']):>4} {_fmt(e['max_overflow']):>6} {_fmt(e['checked_out']):>4} "
+              f"{_fmt(e['checked_in']):>4} {_fmt(e['overflow_in_use']):>4} {w['count']:>7} {w['avg']:>8.2f} "
+              f"{w['max']:>8.1f} {e['timeouts']:>4} {e['invalidations']:>5} {e['pre_ping_failures']:>7}")
+        print("    attente: " + "  ".join(f"<={b['le_ms']}ms:{b['count']}" for b in w["histogram"] if b["count"]))
+    for t in snap["tunnels"]:
+        print(f"tunnel {t['ssh_host']} -> {t['remote']} port {t['local_port']}: {t['status']}, "
+              f"uptime {t['uptime_s']}s, {t['reconnect_count']} reconnexion(s)"
+              + (f", dernière erreur: {t['last_error']}" if t.get("last_error") else ""))
+
+
+def _print_history(points: list[dict]) -> None:
+    print(f"{'ts':<33} {'engine':<28} {'peak out':>8} {'ov':>4} {'waits':>6} {'max ms':>8} {'tmo':>4}  tunnels")
+    for p in points:
+        tunnels = ",".join(t["status"] for t in p["tunnels"]) or "-"
+        for name, e in p["engines"].items():
+            print(f"{p['ts']:<33} {name:<28} {e['peak_checked_out']:>8} {_fmt(e['overflow_in_use']):>4} "
+                  f"{e['waits']:>6} {e['wait_max_ms']:>8.1f} {e['timeouts']:>4}  {tunnels}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Télémétrie pool / tunnel d'un worker (GET /_pool)")
+    p.add_argument("--url", default=os.environ.get("POOL_TELEMETRY_URL", "http://127.0.0.1:5000/_pool"))
+    p.add_argument("--token", default=os.environ.get("ROUTES_TOKEN"))
+    p.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status", help="État live + cumuls")
+    h = sub.add_parser("history", help="Échantillons du ring buffer")
+    h.add_argument("--limit", type=int)
+    h.add_argument("--since", type=float, help="Fenêtre en secondes")
+    args = p.parse_args(argv)
+
+    if args.cmd == "history":
+        snap = _fetch(args.url, args.token, {"history": args.limit or -1, "since": args.since})
+    else:
+        snap = _fetch(args.url, args.token, {})
+    if args.json:
+        print(json.dumps(snap, ensure_ascii=False, indent=2))
+    elif args.cmd == "history":
+        _print_history(snap.get("history", []))
+    else:
+        _print_status(snap)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
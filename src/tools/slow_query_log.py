@@ -0,0 +1,406 @@
+# tools/slow_query_log.py
+"""
+Journal des requêtes lentes, avec capture automatique de EXPLAIN FORMAT=JSON.
+
+Branché (events SQLAlchemy) sur les engines de tools.db_pool (_run_query,
+_insert_data, readTable, unit_of_work...) et sur l'engine de app/db.py (sessions ORM).
+
+Toute requête au-dessus du seuil est enregistrée avec:
+  - son texte normalisé (littéraux / paramètres -> '?') + empreinte
+  - la FORME des paramètres liés (type, taille) -- jamais les valeurs:
+    beaucoup sont des jetons Fernet
+  - la frame appelante (premier appelant hors SQLAlchemy / pandas / helpers DB)
+  - un EXPLAIN FORMAT=JSON pris sur une connexion annexe, dans un thread à part
+    (une seule fois par empreinte et par EXPLAIN_TTL, pour ne pas charger la base)
+
+Stockage: petite base SQLite locale bornée (toutes les 100 insertions, seules les
+max_rows lignes les plus récentes sont gardées).
+
+Variables d'environnement:
+  - SLOW_QUERY_MS        : seuil en millisecondes (défaut 500, "0" = tout journaliser)
+  - SLOW_QUERY_DB        : chemin du fichier SQLite (défaut <repo>/slow_queries.sqlite)
+  - SLOW_QUERY_MAX_ROWS  : nombre max de lignes gardées (défaut 20000)
+  - SLOW_QUERY_EXPLAIN   : "false" pour ne pas capturer d'EXPLAIN (défaut true)
+
+CLI (depuis src/):
+  python -m tools.slow_query_log top --by total --limit 20 --since 24
+  python -m tools.slow_query_log top --by p95
+  python -m tools.slow_query_log show <empreinte>
+  python -m tools.slow_query_log purge
+"""
+from __future__ import annotations
+
+import os
+import sys
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import traceback
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from tools.logger import setup_logger
+from tools.sql_instrumentation import normalize_sql
+
+logger = setup_logger(debug=False)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+THRESHOLD_MS = _env_float("SLOW_QUERY_MS", 500)
+STORE_PATH = os.environ.get(
+    "SLOW_QUERY_DB",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "slow_queries.sqlite")),
+)
+MAX_ROWS = int(_env_float("SLOW_QUERY_MAX_ROWS", 20000))
+EXPLAIN_ENABLED = os.environ.get("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes", "on")
+EXPLAIN_TTL = 3600          # secondes entre deux EXPLAIN d'une même empreinte
+EXPLAIN_MAX_PENDING = 20    # au-delà, on saute l'EXPLAIN plutôt que d'empiler
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE", "WITH")
+
+# Frames ignorées pour trouver le "vrai" appelant
+_SKIP_FRAMES = (
+    os.sep + "sqlalchemy" + os.sep,
+    os.sep + "pandas" + os.sep,
+    os.sep + "contextlib.py",
+    os.sep + "threading.py",
+    os.path.join("tools", "utilsTools.py"),
+    os.path.join("tools", "db_retry.py"),
+    os.path.join("tools", "db_pool.py"),
+    os.path.join("tools", "unit_of_work.py"),
+    os.path.join("tools", "sql_instrumentation.py"),
+    os.path.join("tools", "slow_query_log.py"),
+)
+
+
+# -----------------------------
+#  Forme des paramètres (jamais les valeurs)
+# -----------------------------
+def _shape(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"bytes[{len(value)}]"
+    if isinstance(value, str):
+        return f"str[{len(value)}]"
+    if isinstance(value, (list, tuple, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def param_shape(parameters, executemany: bool = False):
+    """Types/tailles des paramètres liés, sans aucune valeur."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = param_shape(parameters[0]) if parameters else None
+        return {"executemany": len(parameters), "first": first}
+    if isinstance(parameters, dict):
+        return {k: _shape(v) for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_shape(v) for v in parameters]
+    return _shape(parameters)
+
+
+def caller_frame() -> str:
+    """'fichier:ligne in fonction' du premier appelant applicatif."""
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if not any(s in frame.filename for s in _SKIP_FRAMES):
+            return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return "?"
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+# -----------------------------
+#  Store SQLite borné
+# -----------------------------
+class SlowQueryStore:
+    def __init__(self, path: str = STORE_PATH, max_rows: int = MAX_ROWS):
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._inserts = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS slow_queries (
+                    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts          TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    statement   TEXT NOT NULL,
+                    duration_ms REAL NOT NULL,
+                    rowcount    INTEGER,
+                    params      TEXT,
+                    caller      TEXT,
+                    db          TEXT,
+                    explain     TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_slow_fp ON slow_queries(fingerprint)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_slow_ts ON slow_queries(ts)")
+        return self._conn
+
+    def add(self, *, fp, statement, duration_ms, rowcount, params, caller, db) -> int:
+        with self._lock:
+            conn = self._db()
+            cur = conn.execute(
+                "INSERT INTO slow_queries (ts, fingerprint, statement, duration_ms, rowcount, params, caller, db)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (datetime.now(timezone.utc).isoformat(timespec="seconds"), fp, statement,
+                 round(duration_ms, 2), rowcount, json.dumps(params, default=str), caller, db),
+            )
+            self._inserts += 1
+            if self._inserts % 100 == 0:
+                self._prune(conn)
+            conn.commit()
+            return cur.lastrowid
+
+    def set_explain(self, row_id: int, plan: str) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute("UPDATE slow_queries SET explain = ? WHERE id = ?", (plan, row_id))
+            conn.commit()
+
+    def _prune(self, conn) -> None:
+        conn.execute(
+            "DELETE FROM slow_queries WHERE id <= (SELECT MAX(id) FROM slow_queries) - ?",
+            (self.max_rows,),
+        )
+
+    def purge(self) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM slow_queries")
+            conn.commit()
+
+    def rows(self, since_hours: float | None = None):
+        sql = "SELECT fingerprint, statement, duration_ms, caller, ts FROM slow_queries"
+        args = ()
+        if since_hours:
+            cutoff = datetime.fromtimestamp(time.time() - since_hours * 3600, timezone.utc)
+            sql += " WHERE ts >= ?"
+            args = (cutoff.isoformat(timespec="seconds"),)
+        with self._lock:
+            return self._db().execute(sql, args).fetchall()
+
+    def top(self, by: str = "total", limit: int = 20, since_hours: float | None = None) -> list[dict]:
+        """Pires requêtes par empreinte, triées par temps total, p95, max ou nombre."""
+        groups: dict[str, dict] = {}
+        for fp, statement, duration, caller, ts in self.rows(since_hours):
+            g = groups.setdefault(fp, {"fingerprint": fp, "statement": statement,
+                                       "durations": [], "callers": set(), "last_seen": ts})
+            g["durations"].append(duration)
+            g["callers"].add(caller)
+            g["last_seen"] = max(g["last_seen"], ts)
+
+        out = []
+        for g in groups.values():
+            d = sorted(g.pop("durations"))
+            g.update(
+                count=len(d),
+                total_ms=round(sum(d), 1),
+                p95_ms=round(d[math.ceil(0.95 * len(d)) - 1], 1),    # rang le plus proche
+                max_ms=round(d[-1], 1),
+                callers=sorted(g["callers"]),
+            )
+            out.append(g)
+        key = {"total": "total_ms", "p95": "p95_ms", "max": "max_ms", "count": "count"}[by]
+        return sorted(out, key=lambda g: g[key], reverse=True)[:limit]
+
+    def latest(self, fp: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT ts, statement, duration_ms, rowcount, params, caller, db, explain"
+                " FROM slow_queries WHERE fingerprint = ? ORDER BY explain IS NULL, id DESC LIMIT 1",
+                (fp,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("ts", "statement", "duration_ms", "rowcount", "params", "caller", "db", "explain")
+        return dict(zip(keys, row))
+
+
+_store: SlowQueryStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SlowQueryStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SlowQueryStore()
+    return _store
+
+
+# -----------------------------
+#  Capture EXPLAIN (connexion annexe, thread à part)
+# -----------------------------
+_explain_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+_explain_pending = 0
+_explain_last: dict[str, float] = {}
+_explain_lock = threading.Lock()
+
+
+def _should_explain(engine: Engine, statement: str, fp: str) -> bool:
+    if not EXPLAIN_ENABLED or engine.dialect.name != "mysql":
+        return False
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return False
+    now = time.monotonic()
+    with _explain_lock:
+        if _explain_pending >= EXPLAIN_MAX_PENDING:
+            return False
+        if now - _explain_last.get(fp, -EXPLAIN_TTL) < EXPLAIN_TTL:
+            return False
+        _explain_last[fp] = now
+    return True
+
+
+def _run_explain(engine: Engine, statement: str, parameters, row_id: int) -> None:
+    global _explain_pending
+    try:
+        with engine.connect() as side:
+            res = side.exec_driver_sql("EXPLAIN FORMAT=JSON " + statement, parameters)
+            plan = res.scalar()
+        get_store().set_explain(row_id, plan)
+    except Exception as e:
+        logger.debug("EXPLAIN impossible pour la requête lente #%s: %s", row_id, e)
+    finally:
+        with _explain_lock:
+            _explain_pending -= 1
+
+
+def _submit_explain(engine: Engine, statement: str, parameters, row_id: int) -> None:
+    global _explain_pending
+    with _explain_lock:
+        _explain_pending += 1
+    _explain_pool.submit(_run_explain, engine, statement, parameters, row_id)
+
+
+# -----------------------------
+#  Events SQLAlchemy
+# -----------------------------
+_attached: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+
+# Départ porté par le contexte du statement (cf. tools.sql_instrumentation): une
+# requête en erreur ne laisse rien traîner sur la connexion poolée.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_slow_query_start", None)
+    if start is None:
+        return
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if elapsed_ms < THRESHOLD_MS or statement.lstrip().upper().startswith("EXPLAIN"):
+        return
+    try:
+        normalized = normalize_sql(statement)
+        fp = fingerprint(normalized)
+        row_id = get_store().add(
+            fp=fp,
+            statement=normalized,
+            duration_ms=elapsed_ms,
+            rowcount=getattr(cursor, "rowcount", None),
+            params=param_shape(parameters, executemany),
+            caller=caller_frame(),
+            db=conn.engine.url.database,
+        )
+        logger.warning("Requête lente (%.0f ms) [%s]: %s", elapsed_ms, fp, normalized[:200])
+        if not executemany and _should_explain(conn.engine, statement, fp):
+            _submit_explain(conn.engine, statement, parameters, row_id)
+    except Exception as e:
+        # Le journal ne doit jamais casser la requête applicative
+        logger.debug("Journal des requêtes lentes indisponible: %s", e)
+
+
+def attach(engine: Engine) -> Engine:
+    """Branche le journal des requêtes lentes sur 'engine' (idempotent)."""
+    if engine in _attached:
+        return engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _attached.add(engine)
+    return engine
+
+
+# -----------------------------
+#  CLI
+# -----------------------------
+def _print_top(rows: list[dict], by: str) -> None:
+    if not rows:
+        print("Aucune requête lente enregistrée.")
+        return
+    print(f"{'empreinte':<13}{'n':>6}{'total ms':>12}{'p95 ms':>10}{'max ms':>10}  requête")
+    for r in rows:
+        print(f"{r['fingerprint']:<13}{r['count']:>6}{r['total_ms']:>12.1f}{r['p95_ms']:>10.1f}"
+              f"{r['max_ms']:>10.1f}  {r['statement'][:100]}")
+        for c in r["callers"][:3]:
+            print(f"{'':<13}  ↳ {c}")
+    print(f"(tri: {by})")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Journal des requêtes SQL lentes")
+    p.add_argument("--db", default=STORE_PATH, help="Fichier SQLite du journal")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    top = sub.add_parser("top", help="Pires requêtes par empreinte")
+    top.add_argument("--by", choices=["total", "p95", "max", "count"], default="total")
+    top.add_argument("--limit", type=int, default=20)
+    top.add_argument("--since", type=float, default=None, help="Fenêtre en heures")
+    top.add_argument("--json", action="store_true", help="Sortie JSON")
+
+    show = sub.add_parser("show", help="Dernier enregistrement (avec EXPLAIN) d'une empreinte")
+    show.add_argument("fingerprint")
+
+    sub.add_parser("purge", help="Vide le journal")
+
+    args = p.parse_args(argv)
+    store = SlowQueryStore(args.db)
+
+    if args.cmd == "top":
+        rows = store.top(by=args.by, limit=args.limit, since_hours=args.since)
+        if args.json:
+            print(json.dumps(rows, indent=2, ensure_ascii=False))
+        else:
+            _print_top(rows, args.by)
+    elif args.cmd == "show":
+        rec = store.latest(args.fingerprint)
+        if rec is None:
+            print(f"Empreinte inconnue: {args.fingerprint}")
+            return 1
+        if rec["explain"]:
+            rec["explain"] = json.loads(rec["explain"])
+        rec["params"] = json.loads(rec["params"]) if rec["params"] else None
+        print(json.dumps(rec, indent=2, ensure_ascii=False))
+    elif args.cmd == "purge":
+        store.purge()
+        print("Journal vidé.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# tools/sql_instrumentation.py
+"""
+Instrumentation SQL par requête HTTP (nombre de requêtes, lignes, temps DB).
+
+Branché sur les events SQLAlchemy (before/after_cursor_execute) de:
+  - l'engine global de app/db.py (ORM)
+  - les engines poolés de tools.db_pool (utilsTools: _run_query, readTable...)
+
+Pour chaque requête Flask:
+  - en-tête Server-Timing:  db;dur=12.3;desc="7 queries", db-rows;desc="120 rows", app;dur=45.6
+  - une ligne de log structurée (JSON): méthode, chemin, statut, queries, rows, db_ms, total_ms
+  - détection N+1: la même requête normalisée exécutée plus de N fois -> warning
+
+Variables d'environnement:
+  - SQL_INSTRUMENTATION         : "false" pour tout désactiver (défaut true)
+  - SQL_N_PLUS_ONE_THRESHOLD    : répétitions tolérées d'une même requête (défaut 5)
+
+Hors requête HTTP (scripts d'export...), les events ne font rien.
+"""
+from __future__ import annotations
+
+import os
+import re
+import json
+import time
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+ENABLED = os.environ.get("SQL_INSTRUMENTATION", "true").lower() in ("1", "true", "yes", "on")
+try:
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get("SQL_N_PLUS_ONE_THRESHOLD", 5))
+except ValueError:
+    N_PLUS_ONE_THRESHOLD = 5
+
+
+# -----------------------------
+#  Normalisation des requêtes
+# -----------------------------
+_RE_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_RE_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_RE_IN_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_RE_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+")
+_RE_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Forme canonique d'une requête: littéraux et paramètres -> '?',
+    listes IN (...) de longueur variable -> '(?+)', espaces compactés.
+    """
+    s = _RE_STRING.sub("?", statement)
+    s = _RE_NUMBER.sub("?", s)
+    s = _RE_PLACEHOLDER.sub("?", s)
+    s = _RE_IN_LIST.sub("(?+)", s)
+    return _RE_SPACES.sub(" ", s).strip()
+
+
+# -----------------------------
+#  Statistiques par requête HTTP
+# -----------------------------
+@dataclass
+class RequestStats:
+    label: str = ""
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    rows: int = 0
+    db_time: float = 0.0                         # secondes
+    by_statement: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float, rowcount: int) -> None:
+        self.queries += 1
+        self.db_time += elapsed
+        # pymysql bufferise les résultats: rowcount = lignes lues (SELECT) ou affectées (DML)
+        if rowcount and rowcount > 0:
+            self.rows += rowcount
+        self.by_statement[normalize_sql(statement)] += 1
+
+    def n_plus_one(self, threshold: int | None = None) -> list[tuple[str, int]]:
+        """Requêtes normalisées répétées plus de 'threshold' fois (suspicion de N+1)."""
+        limit = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        return [(sql, n) for sql, n in self.by_statement.most_common() if n > limit]
+
+    def server_timing(self, total: float | None = None) -> str:
+        parts = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'db-rows;desc="{self.rows} rows"',
+        ]
+        if total is not None:
+            parts.append(f"app;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("sql_request_stats", default=None)
+
+
+def start_request(label: str = "") -> RequestStats:
+    """Démarre la collecte pour le contexte courant (requête HTTP, tâche...)."""
+    stats = RequestStats(label=label)
+    _current.set(stats)
+    return stats
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+def finish_request() -> RequestStats | None:
+    """Arrête la collecte et renvoie les stats du contexte courant."""
+    stats = _current.get()
+    _current.set(None)
+    return stats
+
+
+# -----------------------------
+#  Events SQLAlchemy
+# -----------------------------
+_instrumented: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+
+# Heure de départ portée par le contexte d'exécution (un par statement), pas par la
+# connexion: une requête en erreur n'a pas d'after_cursor_execute, et son départ
+# disparaît avec son contexte au lieu d'être imputé à la requête suivante.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._sql_instr_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = getattr(context, "_sql_instr_start", None)
+    if stats is None or start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats.record(statement, elapsed, getattr(cursor, "rowcount", -1))
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Branche les compteurs sur 'engine' (idempotent)."""
+    if not ENABLED or engine in _instrumented:
+        return engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _instrumented.add(engine)
+    return engine
+
+
+# -----------------------------
+#  Intégration Flask
+# -----------------------------
+def init_app(app) -> None:
+    """before/after_request: collecte, en-tête Server-Timing, log structuré, alerte N+1."""
+    if not ENABLED:
+        return
+    from flask import request
+
+    @app.before_request
+    def _sql_stats_start():
+        start_request(f"{request.method} {request.path}")
+
+    @app.after_request
+    def _sql_stats_finish(response):
+        stats = finish_request()
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started
+        response.headers.add("Server-Timing", stats.server_timing(total))
+
+        suspects = stats.n_plus_one()
+        logger.info("sql_stats %s", json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "queries": stats.queries,
+            "rows": stats.rows,
+            "db_ms": round(stats.db_time * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+            "n_plus_one": len(suspects),
+        }, ensure_ascii=False))
+        for sql, count in suspects:
+            logger.warning("N+1 suspect sur %s: %dx %s", stats.label, count, sql[:300])
+        return response
+
+    @app.teardown_request
+    def _sql_stats_reset(exc):
+        # Requête interrompue avant after_request: on ne laisse rien traîner dans le contexte
+        _current.set(None)
@@ -0,0 +1,282 @@
+# tools/ssh_tunnel.py
+"""
+Superviseur de tunnel SSH partagé par tous les accès DB (local uniquement).
+
+- UN tunnel par (hôte SSH, utilisateur, hôte distant, port distant) pour tout le process
+  (tools.utilsTools, app.db, app.common.db_read).
+- Démarrage paresseux: rien n'est ouvert tant qu'aucune connexion DB n'est demandée.
+- Port local réservé à la création et conservé entre reconstructions: les URLs
+  des engines restent valides, les connexions mortes sont éliminées par pre_ping.
+- Un thread de sonde vérifie périodiquement le tunnel (SSH_TUNNEL_PROBE_INTERVAL,
+  défaut 30s) et le reconstruit après une coupure réseau, avec backoff.
+- state() expose: statut, uptime, nombre de reconnexions, dernière erreur.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import socket
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import event
+
+from tools.logger import setup_logger
+
+try:
+    # sshtunnel n’est nécessaire que en local
+    from sshtunnel import SSHTunnelForwarder
+except ImportError:
+    SSHTunnelForwarder = None  # pour éviter un crash si pas installé
+
+logger = setup_logger(debug=False)
+
+PROBE_INTERVAL = float(os.environ.get("SSH_TUNNEL_PROBE_INTERVAL", "30"))
+MAX_BACKOFF = float(os.environ.get("SSH_TUNNEL_MAX_BACKOFF", "120"))
+LOCAL_HOST = "127.0.0.1"
+
+
+def _free_local_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((LOCAL_HOST, 0))
+        return s.getsockname()[1]
+
+
+def _iso(ts: float | None) -> str | None:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+class TunnelSupervisor:
+    """
+    Tunnel SSH longue durée, reconstruit automatiquement.
+
+    Usage:
+        tunnel = get_tunnel(cfg["ssh_host"], cfg["ssh_user"], cfg["ssh_pass"], cfg["db_host"])
+        url = _build_db_url(cfg, tunnel.port)   # n'ouvre rien
+        tunnel.attach(engine)                   # ouvre/répare avant chaque nouvelle connexion
+    """
+
+    def __init__(
+        self,
+        ssh_host: str,
+        ssh_user: str,
+        ssh_pass: str,
+        remote_host: str,
+        remote_port: int = 3306,
+        *,
+        probe_interval: float = PROBE_INTERVAL,
+        max_backoff: float = MAX_BACKOFF,
+        forwarder_factory: Callable | None = None,
+    ):
+        self.ssh_host = ssh_host
+        self.ssh_user = ssh_user
+        self._ssh_pass = ssh_pass
+        self.remote = (remote_host, int(remote_port))
+        self.probe_interval = probe_interval
+        self.max_backoff = max_backoff
+        self._factory = forwarder_factory or SSHTunnelForwarder
+        self.port = _free_local_port()
+
+        self._lock = threading.RLock()
+        self._forwarder = None
+        self._started_at: float | None = None
+        self._stop_event = threading.Event()
+        self._prober: threading.Thread | None = None
+        self._attached = weakref.WeakSet()
+
+        self.reconnect_count = 0
+        self.last_error: str | None = None
+        self.last_error_at: float | None = None
+        self.last_probe_at: float | None = None
+        self.last_probe_ok: bool | None = None
+
+    # ---------- cycle de vie ----------
+    def _build(self):
+        if self._factory is None:
+            raise RuntimeError(
+                "sshtunnel n’est pas installé alors que LOCAL_CONNEXION=True. "
+                "pip install sshtunnel ou mets LOCAL_CONNEXION=False."
+            )
+        return self._factory(
+            self.ssh_host,
+            ssh_username=self.ssh_user,
+            ssh_password=self._ssh_pass,
+            remote_bind_address=self.remote,
+            local_bind_address=(LOCAL_HOST, self.port),
+        )
+
+    def _stop_forwarder(self) -> None:
+        fwd, self._forwarder = self._forwarder, None
+        if fwd is not None:
+            try:
+                fwd.stop()
+            except Exception as e:
+                logger.warning("Arrêt du tunnel SSH en erreur: %r", e)
+
+    def _start_locked(self, reason: str | None) -> None:
+        was_started = self._started_at is not None
+        self._stop_forwarder()
+        try:
+            fwd = self._build()
+            fwd.start()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.last_error_at = time.time()
+            logger.error("Ouverture du tunnel SSH vers %s impossible: %s", self.ssh_host, e)
+            raise
+        self._forwarder = fwd
+        self._started_at = time.time()
+        if was_started:
+            self.reconnect_count += 1
+            logger.warning("Tunnel SSH reconstruit (%s) sur le port %d", reason or "inactif", self.port)
+        else:
+            logger.info("Tunnel SSH ouvert sur le port local %d", self.port)
+        self._start_prober()
+
+    def _start_prober(self) -> None:
+        if self._prober is not None and self._prober.is_alive():
+            return
+        if self.probe_interval <= 0:
+            return
+        self._stop_event.clear()
+        self._prober = threading.Thread(target=self._probe_loop, name=f"ssh-tunnel-probe-{self.port}", daemon=True)
+        self._prober.start()
+
+    def ensure(self) -> int:
+        """Démarre le tunnel si nécessaire (ou le reconstruit s'il est tombé); retourne le port local."""
+        fwd = self._forwarder
+        if fwd is not None and fwd.is_active:
+            return self.port
+        with self._lock:
+            fwd = self._forwarder
+            if fwd is None or not fwd.is_active:
+                self._start_locked("inactif" if fwd is not None else None)
+        return self.port
+
+    def local_port(self) -> int:
+        return self.ensure()
+
+    def attach(self, engine) -> None:
+        """Branche ensure() avant chaque nouvelle connexion DBAPI de l'engine (idempotent)."""
+        if engine in self._attached:
+            return
+
+        def _before_connect(dialect, conn_rec, cargs, cparams):
+            # ne rien retourner: SQLAlchemy ouvre ensuite la connexion normalement
+            self.ensure()
+
+        event.listen(engine, "do_connect", _before_connect)
+        self._attached.add(engine)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        with self._lock:
+            self._stop_forwarder()
+            self._started_at = None
+
+    # ---------- santé ----------
+    def is_healthy(self, timeout: float = 5.0) -> bool:
+        fwd = self._forwarder
+        if fwd is None or not fwd.is_active:
+            return False
+        try:
+            # check_tunnels() ouvre une connexion de test jusqu'à la destination distante
+            fwd.check_tunnels()
+            if not all(fwd.tunnel_is_up.values()):
+                return False
+        except Exception:
+            return False
+        try:
+            with socket.create_connection((LOCAL_HOST, self.port), timeout=timeout):
+                pass
+        except OSError:
+            return False
+        return True
+
+    def probe(self) -> bool:
+        """Sonde le tunnel une fois; le reconstruit s'il est démarré mais KO."""
+        if self._started_at is None:
+            return False
+        ok = self.is_healthy()
+        self.last_probe_at = time.time()
+        self.last_probe_ok = ok
+        if ok:
+            return True
+        with self._lock:
+            if not self.is_healthy():
+                self._start_locked("sonde KO")
+        return True
+
+    def _probe_loop(self) -> None:
+        delay = self.probe_interval
+        while not self._stop_event.wait(delay):
+            try:
+                self.probe()
+                delay = self.probe_interval
+            except Exception:
+                # last_error déjà renseigné par _start_locked
+                delay = min(delay * 2, self.max_backoff)
+
+    def state(self) -> dict:
+        fwd = self._forwarder
+        now = time.time()
+        if self._started_at is None:
+            status = "idle"
+        elif fwd is not None and fwd.is_active:
+            status = "up"
+        else:
+            status = "down"
+        return {
+            "ssh_host": self.ssh_host,
+            "remote": f"{self.remote[0]}:{self.remote[1]}",
+            "local_port": self.port,
+            "status": status,
+            "started_at": _iso(self._started_at),
+            "uptime_s": round(now - self._started_at, 1) if self._started_at else 0.0,
+            "reconnect_count": self.reconnect_count,
+            "last_error": self.last_error,
+            "last_error_at": _iso(self.last_error_at),
+            "last_probe_at": _iso(self.last_probe_at),
+            "last_probe_ok": self.last_probe_ok,
+        }
+
+
+# -------------------------------------------------------------------
+# Registre process-wide
+# -------------------------------------------------------------------
+_supervisors: dict[tuple, TunnelSupervisor] = {}
+_registry_lock = threading.Lock()
+
+
+def get_tunnel(ssh_host: str, ssh_user: str, ssh_pass: str, remote_host: str, remote_port: int = 3306) -> TunnelSupervisor:
+    """Retourne LE superviseur partagé pour cette destination (créé sans ouvrir le tunnel)."""
+    key = (ssh_host, ssh_user, remote_host, int(remote_port))
+    sup = _supervisors.get(key)
+    if sup is not None:
+        return sup
+    with _registry_lock:
+        sup = _supervisors.get(key)
+        if sup is None:
+            sup = TunnelSupervisor(ssh_host, ssh_user, ssh_pass, remote_host, remote_port)
+            _supervisors[key] = sup
+    return sup
+
+
+def tunnel_state() -> list[dict]:
+    return [sup.state() for sup in list(_supervisors.values())]
+
+
+def stop_all() -> None:
+    with _registry_lock:
+        sups = list(_supervisors.values())
+        _supervisors.clear()
+    for sup in sups:
+        sup.stop()
+
+
+atexit.register(stop_all)
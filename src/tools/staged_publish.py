@@ -0,0 +1,161 @@
+# tools/staged_publish.py
+"""
+Publication "zéro coupure" d'une table exportée (export_Table).
+
+Avant: DROP TABLE -> CREATE -> INSERT. Pendant tout le rechargement, les routes
+qui lisent la table (_read_table_as_json) tombaient en erreur ou renvoyaient [].
+
+Ici la nouvelle génération est construite à côté puis publiée d'un coup:
+  1. <table>__staging créée avec la DDL du script (nom de table substitué)
+  2. chargement + validation dans la table fantôme (la table live n'est pas touchée)
+  3. RENAME TABLE <table> TO <table>__prev, <table>__staging TO <table>
+     (un seul RENAME TABLE MySQL = atomique: un lecteur voit l'ancienne OU la nouvelle)
+  4. <table>__prev est gardée pour un retour arrière instantané (rollback)
+
+CLI (depuis src/):
+  python -m tools.staged_publish rollback T_MapFrance_English
+  python -m tools.staged_publish rollback T_MapASConnect --asconnect
+  python -m tools.staged_publish status T_MapFrance_English
+"""
+from __future__ import annotations
+
+import re
+import sys
+import argparse
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from tools.logger import setup_logger
+
+logger = setup_logger(debug=False)
+
+STAGING_SUFFIX = "__staging"
+PREVIOUS_SUFFIX = "__prev"
+_SWAP_SUFFIX = "__swap"
+
+
+def staging_name(table_name: str) -> str:
+    return f"{table_name}{STAGING_SUFFIX}"
+
+
+def previous_name(table_name: str) -> str:
+    return f"{table_name}{PREVIOUS_SUFFIX}"
+
+
+def _q(name: str) -> str:
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def table_exists(engine: Engine, table_name: str) -> bool:
+    with engine.connect() as conn:
+        return inspect(conn).has_table(table_name)
+
+
+def staging_ddl(ddl: str, table_name: str) -> str:
+    """
+    Réécrit le script CREATE TABLE <table_name> pour créer <table_name>__staging.
+    ValueError si le script ne crée pas cette table (on ne devine pas).
+    """
+    pattern = re.compile(
+        r"(CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?)`?" + re.escape(table_name) + r"`?(?=[\s(])",
+        re.IGNORECASE,
+    )
+    new_ddl, n = pattern.subn(lambda m: m.group(1) + _q(staging_name(table_name)), ddl, count=1)
+    if n == 0:
+        raise ValueError(f"Le script ne contient pas CREATE TABLE {table_name}")
+    return new_ddl
+
+
+def drop_if_exists(engine: Engine, table_name: str) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {_q(table_name)}")
+
+
+def _rename_all(engine: Engine, pairs: list[tuple[str, str]], *, drop_first: str | None = None) -> None:
+    """
+    DROP TABLE IF EXISTS drop_first, puis renommages atomiques, sur UNE connexion:
+      - MySQL : un seul RENAME TABLE a TO b, c TO d (atomique côté serveur)
+      - autres: ALTER TABLE ... RENAME TO dans une transaction (SQLite: DDL transactionnel,
+                BEGIN IMMEDIATE pour prendre le verrou d'écriture sur le dernier état du schéma)
+    """
+    with engine.connect() as conn:
+        mysql = conn.dialect.name == "mysql"
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")   # pysqlite n'ouvre pas de transaction pour du DDL
+        if drop_first:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {_q(drop_first)}")
+        if mysql:
+            conn.exec_driver_sql("RENAME TABLE " + ", ".join(f"{_q(a)} TO {_q(b)}" for a, b in pairs))
+        else:
+            for a, b in pairs:
+                conn.exec_driver_sql(f"ALTER TABLE {_q(a)} RENAME TO {_q(b)}")
+        conn.commit()
+
+
+def swap_in(engine: Engine, table_name: str) -> None:
+    """
+    Publie <table>__staging à la place de <table>; l'ancienne génération devient <table>__prev
+    (la génération précédente __prev, elle, est supprimée).
+    """
+    staging, prev = staging_name(table_name), previous_name(table_name)
+    if table_exists(engine, table_name):
+        pairs = [(table_name, prev), (staging, table_name)]
+        _rename_all(engine, pairs, drop_first=prev)
+    else:
+        pairs = [(staging, table_name)]
+        _rename_all(engine, pairs)
+    logger.info("Publication de %s: %s", table_name, " + ".join(f"{a} -> {b}" for a, b in pairs))
+
+
+def rollback(engine: Engine, table_name: str) -> None:
+    """
+    Retour à la génération précédente: <table> et <table>__prev sont échangées
+    (donc un second rollback republie la génération qu'on vient de retirer).
+    """
+    prev, tmp = previous_name(table_name), f"{table_name}{_SWAP_SUFFIX}"
+    if not table_exists(engine, prev):
+        raise RuntimeError(f"Pas de génération précédente pour {table_name} ({prev} absente)")
+    _rename_all(engine, [(table_name, tmp), (prev, table_name), (tmp, prev)], drop_first=tmp)
+    logger.info("Rollback de %s: %s republiée", table_name, prev)
+
+
+def status(engine: Engine, table_name: str) -> dict:
+    """Nombre de lignes de chaque génération présente (None si la table n'existe pas)."""
+    out = {}
+    with engine.connect() as conn:
+        insp = inspect(conn)
+        for name in (table_name, previous_name(table_name), staging_name(table_name)):
+            out[name] = (
+                conn.exec_driver_sql(f"SELECT COUNT(*) FROM {_q(name)}").scalar()
+                if insp.has_table(name) else None
+            )
+    return out
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Publication des tables exportées (génération live / précédente)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    for cmd, help_ in (("rollback", "Republie la génération précédente"), ("status", "Lignes par génération")):
+        sp = sub.add_parser(cmd, help=help_)
+        sp.add_argument("table")
+        sp.add_argument("--asconnect", action="store_true", help="Base ASConnect au lieu d'AngelmanResult")
+    args = p.parse_args(argv)
+
+    # import tardif: utilsTools importe ce module
+    from tools.utilsTools import _get_engine, rollback_table
+
+    bAngelmanResult = not args.asconnect
+    if args.cmd == "rollback":
+        rollback_table(args.table, bAngelmanResult=bAngelmanResult)
+    _, engine = _get_engine(bAngelmanResult=bAngelmanResult)
+    for name, n in status(engine, args.table).items():
+        print(f"{name:<50} {'-' if n is None else n}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
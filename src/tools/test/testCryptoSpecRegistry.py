@@ -0,0 +1,257 @@
+"""
+Test du registre des specs de chiffrement (tools.crypto_spec_registry).
+
+Base SQLite jetable, colonnes chiffrées Fernet comme en prod:
+  - export_Table enregistre le spec inféré une fois (+ colonnes de la table publiée)
+  - lectures (db_read historique et streaming, exportGlobal.readTable_with_retry):
+    spec relu depuis le registre, AUCUNE inférence, cache sans SQL au 2e appel
+  - export incrémental: chiffre avec le spec enregistré
+  - schéma changé: nouvelle version, l'ancienne suit la génération __prev; rollback_table la republie
+  - base neuve: la lecture ne crée pas crypto_spec (pas de DDL), pas de spec
+  - table sans spec enregistré: repli sur l'inférence (sur toute la table, sans streaming)
+
+  python tools/test/testCryptoSpecRegistry.py
+"""
+import sys, os
+import json
+import time
+import tempfile
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+from sqlalchemy import create_engine, event
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+import tools.utilsTools as utils
+import tools.crypto_spec_registry as registry
+import tools.drift_guard as drift
+import app.common.db_read as db_read
+import exportBI.exportGlobal as export_global
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+TABLE = "T_MapTest_English"
+SCRIPT = "createMapTest.sql"
+COLUMNS = ["id", "annee", "genotype", "naissance"]
+ROWS = 120
+
+
+def _ddl(extra: str = "") -> str:
+    return f"""CREATE TABLE {TABLE} (
+    indexation INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    annee TEXT NOT NULL,
+    genotype TEXT NOT NULL,
+    naissance TEXT NOT NULL{extra}
+);"""
+
+
+def _source(rows: int = ROWS, ville: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        "id": [str(i) for i in range(1, rows + 1)],
+        "annee": rng.integers(1990, 2020, rows).astype(str),
+        "genotype": rng.choice(["Deletion", "Mutation", "UPD", "ICD"], rows),
+        "naissance": [f"20{10 + i % 10}-0{1 + i % 9}-1{i % 10}" for i in range(rows)],
+    })
+    if ville:
+        df["ville"] = rng.choice(["Paris", "Lyon", "Nantes"], rows)
+    return df
+
+
+class _Reader:
+    def __init__(self, df):
+        self.df = df
+
+    def readData(self):
+        return self.df.copy()
+
+
+class _Patched:
+    """Redirige _get_engine / SQL_DIR vers la base de test, compte les inférences de spec."""
+
+    def __init__(self, engine, sql_dir):
+        self.engine, self.sql_dir = engine, sql_dir
+        self.inferred = []
+
+    def _count(self, fn):
+        def _wrapped(df, *a, **kw):
+            self.inferred.append(list(df.columns))
+            return fn(df, *a, **kw)
+        return _wrapped
+
+    def __enter__(self):
+        self._orig = (utils._get_engine, utils.SQL_DIR, utils.send_email_alert,
+                      crypto.infer_crypto_spec, utils.infer_crypto_spec)
+        utils._get_engine = lambda **kw: ("sqlite_test", self.engine)
+        utils.SQL_DIR = self.sql_dir
+        utils.send_email_alert = lambda title, msg: None
+        crypto.infer_crypto_spec = self._count(self._orig[3])
+        utils.infer_crypto_spec = self._count(self._orig[4])
+        return self
+
+    def __exit__(self, *exc):
+        (utils._get_engine, utils.SQL_DIR, utils.send_email_alert,
+         crypto.infer_crypto_spec, utils.infer_crypto_spec) = self._orig
+
+
+class _Queries:
+    def __init__(self, engine):
+        self.engine, self.sql = engine, []
+
+    def _hook(self, conn, cursor, statement, *a):
+        self.sql.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._hook)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._hook)
+
+
+def _check_rows(records: list, df: pd.DataFrame) -> None:
+    got = sorted(records, key=lambda r: float(r["id"]))
+    assert len(got) == len(df), (len(got), len(df))
+    for r, (_, src) in zip(got, df.iterrows()):
+        assert float(r["id"]) == float(src["id"]) and float(r["annee"]) == float(src["annee"]), (r, src)
+        assert r["genotype"] == src["genotype"] and r["naissance"] == src["naissance"], (r, src)
+        assert isinstance(r["indexation"], int), r   # pas chiffrée: jamais passée au déchiffrement
+
+
+def _read_json(engine, stream: bool) -> list:
+    app = Flask(__name__)
+    with app.app_context():
+        if stream:
+            resp = db_read._stream_json_from_engine(engine, TABLE, chunk_rows=50)
+            return json.loads("".join(resp.response))
+        return db_read._read_json_from_engine(engine, TABLE).get_json()
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_lookup_without_table(engine):
+    registry.invalidate()
+    with _Queries(engine) as q:
+        assert registry.lookup(engine, TABLE, ["indexation"] + COLUMNS) is None
+    assert not any("CREATE" in s.upper() for s in q.sql), q.sql
+    with engine.connect() as conn:
+        assert not registry.inspect(conn).has_table(registry.SPEC_TABLE)
+    registry.invalidate()
+    logger.info("✅ lecture sans table crypto_spec: aucun DDL, pas de spec (inférence)")
+
+
+def test_export_stores_spec(engine, patched, df):
+    assert utils.export_Table(TABLE, SCRIPT, _Reader(df))["mode"] == "staged"
+    assert len(patched.inferred) == 1, patched.inferred     # une seule inférence, à l'export
+    with engine.connect() as conn:
+        specs = registry.load_specs(conn, TABLE)
+    assert len(specs) == 1, specs
+    (version, entry), = specs.items()
+    assert entry["columns"] == ["indexation"] + COLUMNS and version == registry.schema_version(entry["columns"])
+    assert entry["spec"] == patched._orig[3](df) and entry["spec"]["naissance"] == "date", entry
+    assert entry["run_id"], entry
+    logger.info("✅ export: spec inféré une fois et enregistré (version %s)", version)
+
+
+def test_reads_use_registry(engine, patched, df):
+    patched.inferred.clear()
+    registry.invalidate()
+    with _Queries(engine) as q:
+        _check_rows(_read_json(engine, stream=False), df)
+    assert any(registry.SPEC_TABLE in s for s in q.sql)
+    with _Queries(engine) as q:
+        _check_rows(_read_json(engine, stream=True), df)
+        got = export_global.readTable_with_retry(TABLE)
+    assert not any(registry.SPEC_TABLE in s for s in q.sql), "le cache aurait dû servir"
+    _check_rows(got.to_dict(orient="records"), df)
+    assert patched.inferred == [], patched.inferred
+    logger.info("✅ db_read (historique + streaming) et exportGlobal: spec du registre, 0 inférence, cache")
+
+
+def test_incremental_reuses_spec(engine, patched, df):
+    changed = df.copy()
+    changed.loc[0, "genotype"] = "UPD" if changed.loc[0, "genotype"] != "UPD" else "ICD"
+    patched.inferred.clear()
+    report = utils.export_Table(TABLE, SCRIPT, _Reader(changed), publish="incremental")
+    assert report["mode"] == "incremental" and report["changed"] == 1, report
+    assert patched.inferred == [], patched.inferred
+    registry.invalidate()
+    _check_rows(_read_json(engine, stream=False), changed)
+    logger.info("✅ incrémental: lignes chiffrées avec le spec enregistré")
+    return changed
+
+
+def test_schema_change_and_rollback(engine, patched, tmp, df):
+    Path(tmp, SCRIPT).write_text(_ddl(",\n    ville TEXT NOT NULL"), encoding="utf-8")
+    wider = _source(ville=True)
+    no_guard = drift.DriftConfig.from_env(mode="off")   # colonne ajoutée: refusée par le garde-fou sinon
+    assert utils.export_Table(TABLE, SCRIPT, _Reader(wider), drift_config=no_guard)["mode"] == "staged"
+    with engine.connect() as conn:
+        specs = registry.load_specs(conn, TABLE)
+        cols = registry.table_columns(conn, TABLE)
+    assert len(specs) == 1 and specs[registry.schema_version(cols)]["spec"]["ville"] == "str", specs
+    assert registry.lookup(engine, TABLE + "__prev", ["indexation"] + COLUMNS) is not None   # ancienne génération
+    assert registry.lookup(engine, TABLE, ["indexation"] + COLUMNS) is None
+    assert registry.lookup(engine, TABLE, ["indexation", "id", "annee"]) is None             # schéma inconnu
+
+    patched.inferred.clear()
+    records = _read_json(engine, stream=False)
+    assert {r["ville"] for r in records} <= {"Paris", "Lyon", "Nantes"}
+    utils.rollback_table(TABLE)
+    _check_rows(_read_json(engine, stream=True), df)     # génération précédente: son propre spec
+    assert patched.inferred == [], patched.inferred
+    logger.info("✅ schéma changé: nouvelle version; rollback relu avec l'ancienne")
+
+
+def test_fallback_inference(engine, patched):
+    other = "T_NoSpec"
+    plain = pd.DataFrame({"genotype": ["Deletion", "UPD"], "pays": ["France", "Spain"]})
+    crypto.encrypt_dataframe_auto(plain).to_sql(other, engine, index=False)
+    patched.inferred.clear()
+    app = Flask(__name__)
+    with app.app_context():
+        got = db_read._read_json_from_engine(engine, other).get_json()
+        assert got == plain.to_dict(orient="records"), got
+        assert len(patched.inferred) == 1, patched.inferred
+        # streaming: pas de spec inféré sur le 1er chunk seul, toute la table en mode historique
+        resp = db_read._stream_json_from_engine(engine, other, chunk_rows=1)
+        assert not resp.is_streamed and resp.get_json() == got, resp
+    assert len(patched.inferred) == 2, patched.inferred
+    logger.info("✅ table sans spec enregistré: repli sur l'inférence, sans streaming")
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, SCRIPT).write_text(_ddl(), encoding="utf-8")
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'specs.sqlite')}", future=True)
+        try:
+            with _Patched(engine, tmp) as patched:
+                df = _source()
+                test_lookup_without_table(engine)
+                test_export_stores_spec(engine, patched, df)
+                test_reads_use_registry(engine, patched, df)
+                df = test_incremental_reuses_spec(engine, patched, df)
+                test_schema_change_and_rollback(engine, patched, tmp, df)
+                test_fallback_inference(engine, patched)
+        except Exception:
+            logger.exception("❌ Test registre des specs KO")
+            raise
+        finally:
+            registry.invalidate()
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
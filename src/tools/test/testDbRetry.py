@@ -0,0 +1,236 @@
+"""
+Harnais d'injection de fautes pour la politique de relance MySQL (tools.db_retry).
+
+Simule chaque classe d'erreur du driver (transitoire, permanente, ambiguë)
+sans base de données: horloge et sleep sont virtuels, le test est instantané.
+
+  python tools/test/testDbRetry.py
+"""
+import sys, os
+import time
+import random
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import pymysql
+from sqlalchemy import exc as sa_exc
+
+from tools.logger import setup_logger
+from tools.db_retry import (
+    RetryPolicy, run_with_retry, classify_error, is_connection_error,
+    TRANSIENT, PERMANENT, AMBIGUOUS,
+)
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+
+# -----------------------------
+#  Fabrique d'erreurs "driver"
+# -----------------------------
+def _sa_error(sa_cls, pymysql_cls, code: int, msg: str):
+    orig = pymysql_cls(code, msg)
+    return sa_cls("SELECT 1", {}, orig)
+
+def lost_connection():      return _sa_error(sa_exc.OperationalError, pymysql.err.OperationalError, 2013, "Lost connection to MySQL server during query")
+def gone_away():            return _sa_error(sa_exc.OperationalError, pymysql.err.OperationalError, 2006, "MySQL server has gone away")
+def deadlock():             return _sa_error(sa_exc.OperationalError, pymysql.err.OperationalError, 1213, "Deadlock found when trying to get lock")
+def lock_wait_timeout():    return _sa_error(sa_exc.OperationalError, pymysql.err.OperationalError, 1205, "Lock wait timeout exceeded")
+def syntax_error():         return _sa_error(sa_exc.ProgrammingError, pymysql.err.ProgrammingError, 1064, "You have an error in your SQL syntax")
+def duplicate_key():        return _sa_error(sa_exc.IntegrityError, pymysql.err.IntegrityError, 1062, "Duplicate entry 'x' for key 'uq'")
+def fk_violation():         return _sa_error(sa_exc.IntegrityError, pymysql.err.IntegrityError, 1452, "Cannot add or update a child row")
+def unknown_operational():  return _sa_error(sa_exc.OperationalError, pymysql.err.OperationalError, 1317, "Query execution was interrupted")
+
+
+class FaultInjector:
+    """Callable qui lève les erreurs de 'faults' dans l'ordre, puis renvoie 'result'."""
+
+    def __init__(self, faults, result="ok"):
+        self.faults = list(faults)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.faults:
+            raise self.faults.pop(0)()
+        return self.result
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _run(injector, policy, **kwargs):
+    vc = VirtualClock()
+    try:
+        result = run_with_retry(injector, policy=policy, sleep=vc.sleep, clock=vc.clock,
+                                rng=random.Random(42), **kwargs)
+        return result, None, vc
+    except Exception as e:
+        return None, e, vc
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_classification():
+    for make in (lost_connection, gone_away, deadlock, lock_wait_timeout):
+        assert classify_error(make()) == TRANSIENT, make.__name__
+    for make in (syntax_error, duplicate_key, fk_violation):
+        assert classify_error(make()) == PERMANENT, make.__name__
+    assert classify_error(unknown_operational()) == AMBIGUOUS
+    assert classify_error(RuntimeError("???")) == AMBIGUOUS
+    assert classify_error(ValueError("bug")) == PERMANENT
+    assert is_connection_error(lost_connection()) and is_connection_error(gone_away())
+    assert not is_connection_error(deadlock())
+    logger.info("✅ classification des erreurs OK")
+
+
+def test_transient_recovers():
+    inj = FaultInjector([lost_connection, deadlock, lock_wait_timeout])
+    result, err, vc = _run(inj, RetryPolicy(transient_retries=5))
+    assert err is None and result == "ok", err
+    assert inj.calls == 4
+    assert len(vc.sleeps) == 3
+    logger.info("✅ transitoires relancées puis succès (délais=%s)", [round(s, 3) for s in vc.sleeps])
+
+
+def test_permanent_fails_fast():
+    for make in (syntax_error, duplicate_key, fk_violation):
+        inj = FaultInjector([make])
+        _, err, vc = _run(inj, RetryPolicy())
+        assert err is not None and inj.calls == 1, make.__name__
+        assert vc.sleeps == [], "aucune attente sur une erreur permanente"
+        assert mysql_code(err) == mysql_code(make())
+    logger.info("✅ erreurs permanentes: une seule tentative, aucune attente")
+
+
+def test_ambiguous_budget():
+    inj = FaultInjector([unknown_operational, unknown_operational, unknown_operational])
+    _, err, _ = _run(inj, RetryPolicy(ambiguous_retries=1))
+    assert err is not None and inj.calls == 2, inj.calls
+    logger.info("✅ budget ambigu respecté (2 tentatives)")
+
+
+def test_transient_budget_exhausted():
+    inj = FaultInjector([gone_away] * 10)
+    _, err, _ = _run(inj, RetryPolicy(transient_retries=3, deadline=1000))
+    assert err is not None and inj.calls == 4, inj.calls
+    logger.info("✅ budget transitoire épuisé -> erreur d'origine relancée")
+
+
+def test_deadline():
+    policy = RetryPolicy(transient_retries=100, base_delay=1.0, max_delay=1.0, multiplier=1.0, deadline=5.0)
+    inj = FaultInjector([lost_connection] * 100)
+    _, err, vc = _run(inj, policy)
+    assert err is not None
+    assert vc.now <= policy.deadline, vc.now
+    logger.info("✅ deadline globale respectée (%.2fs virtuelles, %d tentatives)", vc.now, inj.calls)
+
+
+def test_backoff_is_bounded_and_jittered():
+    policy = RetryPolicy(base_delay=0.1, max_delay=2.0, multiplier=2.0)
+    rng = random.Random(1)
+    delays = [policy.backoff(i, rng) for i in range(10)]
+    assert all(0 <= d <= 2.0 for d in delays), delays
+    assert len(set(delays)) == len(delays), "jitter attendu"
+    logger.info("✅ backoff exponentiel borné avec jitter")
+
+
+def test_on_error_hook():
+    seen = []
+    inj = FaultInjector([lost_connection, deadlock])
+    _run(inj, RetryPolicy(), on_error=lambda e, c: seen.append((mysql_code(e), c)))
+    assert seen == [(2013, TRANSIENT), (1213, TRANSIENT)], seen
+    logger.info("✅ hook on_error appelé pour chaque échec")
+
+
+def test_max_attempts_cap():
+    inj = FaultInjector([lost_connection] * 10)
+    _, err, _ = _run(inj, RetryPolicy(transient_retries=10), max_attempts=2)
+    assert err is not None and inj.calls == 2
+    logger.info("✅ max_attempts plafonne les tentatives")
+
+
+def test_run_query_integration():
+    """_run_query de bout en bout: engine jeté sur perte de connexion, pas sur deadlock."""
+    import tools.utilsTools as utils
+
+    resets = []
+    faults = FaultInjector([lost_connection, deadlock], result=[("row",)])
+    orig = (utils._get_engine, utils._execute_sql, utils._reset_engine, utils.run_with_retry)
+    utils._get_engine = lambda **kw: ("fake_db", object())
+    utils._execute_sql = lambda engine, query, **kw: faults()
+    utils._reset_engine = lambda key: resets.append(key)
+    vc = VirtualClock()
+    utils.run_with_retry = lambda fn, **kw: orig[3](fn, sleep=vc.sleep, clock=vc.clock, **kw)
+    try:
+        rows = utils._run_query("SELECT 1", return_result=True)
+    finally:
+        utils._get_engine, utils._execute_sql, utils._reset_engine, utils.run_with_retry = orig
+    assert rows == [("row",)]
+    assert resets == ["fake_db"], resets
+    assert sum(vc.sleeps) < 1.0, "plus de sleep(3) fixe"
+    logger.info("✅ _run_query: relances classées, engine jeté uniquement sur perte de connexion")
+
+
+def test_bulk_load_resets_infile_engine():
+    """_bulk_insert_data en LOAD DATA: perte de connexion -> l'engine ":infile" est jeté aussi."""
+    import tools.utilsTools as utils
+
+    resets = []
+    faults = FaultInjector([lost_connection], result="load_data")
+    orig = (utils._get_engine, utils.bulk_load, utils._reset_engine, utils.run_with_retry)
+    utils._get_engine = lambda local_infile=False, **kw: ("fake_db:infile" if local_infile else "fake_db", object())
+    utils.bulk_load = lambda *a, **kw: faults()
+    utils._reset_engine = lambda key: resets.append(key)
+    vc = VirtualClock()
+    utils.run_with_retry = lambda fn, **kw: orig[3](fn, sleep=vc.sleep, clock=vc.clock, **kw)
+    try:
+        used = utils._bulk_insert_data(None, "T_Test", mode="load_data")
+    finally:
+        utils._get_engine, utils.bulk_load, utils._reset_engine, utils.run_with_retry = orig
+    assert used == "load_data" and faults.calls == 2
+    assert resets == ["fake_db", "fake_db:infile"], resets
+    logger.info("✅ _bulk_insert_data: engines normal et :infile jetés sur perte de connexion")
+
+
+def mysql_code(e):
+    return getattr(getattr(e, "orig", None), "args", (None,))[0]
+
+
+def main():
+    start = time.time()
+    try:
+        test_classification()
+        test_transient_recovers()
+        test_permanent_fails_fast()
+        test_ambiguous_budget()
+        test_transient_budget_exhausted()
+        test_deadline()
+        test_backoff_is_bounded_and_jittered()
+        test_on_error_hook()
+        test_max_attempts_cap()
+        test_run_query_integration()
+        test_bulk_load_resets_infile_engine()
+    except Exception:
+        logger.exception("❌ Test relances KO")
+        raise
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
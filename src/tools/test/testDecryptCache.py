@@ -0,0 +1,179 @@
+"""
+Test du cache des déchiffrements (tools.crypto_utils.decrypt_cache).
+
+  - désactivé par défaut: rien n'est mis en cache
+  - hit / miss, clair identique, bornes: taille (LRU) et TTL, clairs trop longs ignorés
+  - invalidate / rechargement de l'anneau de clés
+  - updateData (base SQLite jetable) retire du cache les anciens jetons des champs modifiés
+
+  python tools/test/testDecryptCache.py
+"""
+import sys, os
+import time
+import tempfile
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from sqlalchemy import create_engine, text
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+import tools.utilsTools as utils
+import tools.unit_of_work as uow_mod
+import angelmanSyndromeConnexion.peopleBlindIndex as people_index
+from angelmanSyndromeConnexion.peopleUpdate import updateData
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+cache = crypto.decrypt_cache
+
+SCHEMA = [
+    """CREATE TABLE T_People_Public (id INTEGER PRIMARY KEY, gender TEXT, city TEXT, country TEXT,
+       country_code TEXT, lang TEXT, age_years INTEGER, pseudo TEXT, status TEXT DEFAULT 'active',
+       is_connected INTEGER DEFAULT 0, is_info INTEGER DEFAULT 0)""",
+    """CREATE TABLE T_People_Identity (person_id INTEGER PRIMARY KEY, firstname BLOB, lastname BLOB,
+       emailAddress BLOB, dateOfBirth BLOB, genotype BLOB, longitude BLOB, latitude BLOB, photo BLOB,
+       photo_mime TEXT, email_sha BLOB UNIQUE, password_hash BLOB, password_algo TEXT, password_meta TEXT,
+       password_updated_at TEXT, secret_question BLOB, secret_answer BLOB)""",
+]
+
+
+class _Clock:
+    """Remplace time.monotonic de crypto_utils (TTL)."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __enter__(self):
+        self._orig = crypto.time.monotonic
+        crypto.time.monotonic = lambda: self.now
+        return self
+
+    def __exit__(self, *exc):
+        crypto.time.monotonic = self._orig
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_disabled_by_default():
+    assert not cache.enabled or os.getenv("DECRYPT_CACHE_SIZE"), cache.stats()
+    cache.configure(max_entries=0)
+    tok = crypto.encrypt_str("Louise")
+    assert crypto.decrypt_or_plain(tok) == crypto.decrypt_or_plain(tok) == "Louise"
+    st = cache.stats()
+    assert st["size"] == 0 and st["hits"] == 0 and st["hit_ratio"] is None, st
+    logger.info("✅ désactivé par défaut: aucun clair conservé")
+
+
+def test_hits_lru_ttl():
+    cache.configure(max_entries=3, ttl=60)
+    cache.reset_stats()
+    toks = [crypto.encrypt_str(f"Prénom{i}") for i in range(4)]
+    assert [crypto.decrypt_or_plain(t) for t in toks[:3]] == ["Prénom0", "Prénom1", "Prénom2"]
+    assert crypto.decrypt_bytes_to_str_strict(memoryview(toks[0])) == "Prénom0"     # hit, devient le plus récent
+    crypto.decrypt_or_plain(toks[3])                                                   # évince Prénom1 (LRU)
+    st = cache.stats()
+    assert st["hits"] == 1 and st["misses"] == 4 and st["evictions"] == 1 and st["size"] == 3, st
+    crypto.decrypt_or_plain(toks[1])
+    assert cache.stats()["misses"] == 5
+
+    # nombres (decrypt_number) via le même cache, clair texte lu une seule fois
+    n = crypto.encrypt_number(48.85)
+    assert crypto.decrypt_number(n) == crypto.decrypt_number(n) == 48.85
+    # échecs jamais en cache, repli en clair inchangé
+    assert crypto.decrypt_or_plain(b"ancien message en clair") == "ancien message en clair"
+    assert cache.stats()["size"] == 3
+
+    # TTL
+    with _Clock() as clock:
+        cache.configure(max_entries=10, ttl=5)
+        cache.reset_stats()
+        crypto.decrypt_or_plain(toks[0])
+        clock.now += 4
+        crypto.decrypt_or_plain(toks[0])
+        clock.now += 2
+        crypto.decrypt_or_plain(toks[0])
+    st = cache.stats()
+    assert st["hits"] == 1 and st["expired"] == 1 and st["misses"] == 2, st
+
+    # clairs trop longs: pas mis en cache
+    cache.configure(max_entries=10, max_len=16)
+    crypto.decrypt_or_plain(crypto.encrypt_str("x" * 17))
+    assert cache.stats()["size"] == 0
+    cache.configure(max_len=4096)
+    logger.info("✅ hit/miss, LRU borné, TTL, clairs longs ignorés: %s", st)
+
+
+def test_invalidate_and_ring():
+    cache.configure(max_entries=10, ttl=60)
+    cache.reset_stats()
+    a, b = crypto.encrypt_str("a"), crypto.encrypt_str("b")
+    crypto.decrypt_or_plain(a), crypto.decrypt_or_plain(b)
+    assert cache.invalidate([a, None, memoryview(a), b"pas-en-cache"]) == 1
+    assert cache.stats()["size"] == 1 and cache.stats()["invalidations"] == 1
+    crypto.set_key_ring(crypto.key_ring(), hmac_key=crypto._hmac_key)
+    assert cache.stats()["size"] == 0
+    logger.info("✅ invalidate + vidé au rechargement de l'anneau")
+
+
+def test_update_invalidates(engine):
+    cache.configure(max_entries=100, ttl=60)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO T_People_Public (id, gender, city, country, country_code, lang, age_years, pseudo) "
+                          "VALUES (7, 'F', 'Lyon', 'France', 'FR', 'fr', 9, 'Louise')"))
+        conn.execute(text("INSERT INTO T_People_Identity (person_id, firstname, lastname, emailAddress, dateOfBirth, "
+                          "genotype, longitude, latitude, email_sha) VALUES (7, :fn, :ln, :em, :dob, :gt, :lon, :lat, :sha)"),
+                     {"fn": crypto.encrypt_str("Louise"), "ln": crypto.encrypt_str("Martin"),
+                      "em": crypto.encrypt_str("louise@example.org"), "dob": crypto.encrypt_str("2016-01-02"),
+                      "gt": crypto.encrypt_str("UPD"), "lon": crypto.encrypt_number(4.8),
+                      "lat": crypto.encrypt_number(45.7), "sha": crypto.email_sha256("louise@example.org")})
+
+    def _read():
+        with engine.connect() as conn:
+            r = conn.execute(text("SELECT firstname, lastname, genotype FROM T_People_Identity WHERE person_id = 7")).one()
+        return r, [crypto.decrypt_or_plain(v) for v in r]
+
+    old, clear = _read()
+    assert clear == ["Louise", "Martin", "UPD"]
+    cache.reset_stats()
+    assert updateData("louise@example.org", firstname="Louisa", genotype="Deletion") == 1
+    assert cache.stats()["invalidations"] >= 2, cache.stats()
+    assert cache.invalidate([old[0], old[2]]) == 0          # anciens jetons déjà retirés
+    assert cache.invalidate([old[1]]) == 1                  # colonne non modifiée: toujours en cache
+    assert _read()[1] == ["Louisa", "Martin", "Deletion"]
+    logger.info("✅ updateData invalide les anciens jetons des champs modifiés")
+
+
+def main():
+    start = time.time()
+    saved = (cache.max_entries, cache.ttl, cache.max_len)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'cache.sqlite')}", future=True)
+        with engine.begin() as conn:
+            for stmt in SCHEMA:
+                conn.execute(text(stmt))
+            people_index.PEOPLE_INDEX.ensure_tables(conn)   # fait au déploiement (SQL/createPeopleBlindIndex.sql)
+        orig = (utils._get_engine, uow_mod._get_engine)
+        utils._get_engine = uow_mod._get_engine = lambda **kw: ("sqlite_test", engine)
+        try:
+            test_disabled_by_default()
+            test_hits_lru_ttl()
+            test_invalidate_and_ring()
+            test_update_invalidates(engine)
+        except Exception:
+            logger.exception("❌ Test cache de déchiffrement KO")
+            raise
+        finally:
+            utils._get_engine, uow_mod._get_engine = orig
+            cache.configure(max_entries=saved[0], ttl=saved[1], max_len=saved[2])
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
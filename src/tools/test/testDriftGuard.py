@@ -0,0 +1,230 @@
+"""
+Test du garde-fou de dérive avant publication (tools.drift_guard, export_Table).
+
+Base SQLite jetable (pas besoin de MySQL), colonnes chiffrées comme en prod:
+  - 1er export: pas de référence, publié, profil stocké dans export_profile
+  - export comparable: publié
+  - colonne vidée, libellé de génotype inconnu, année aberrante, colonne disparue:
+    refusé, table live intacte, rapport JSON (alerte + export_run), CLI report
+  - mode warn: mêmes violations signalées mais publication
+  - check ajouté par register_check / DriftConfig.checks
+
+  python tools/test/testDriftGuard.py
+"""
+import sys, os
+import io
+import json
+import time
+import tempfile
+import contextlib
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from tools.logger import setup_logger
+import tools.utilsTools as utils
+import tools.drift_guard as drift
+import tools.export_ledger as ledger
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+TABLE = "T_MapTest_English"
+SCRIPT = "createMapTest.sql"
+DDL = f"""CREATE TABLE {TABLE} (
+    indexation INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    annee TEXT NOT NULL,
+    genotype TEXT NOT NULL,
+    sexe TEXT NOT NULL,
+    ville TEXT NOT NULL
+);"""
+ROWS = 300
+
+
+def _source(rows: int = ROWS, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": [str(i) for i in range(1, rows + 1)],
+        "annee": rng.integers(1990, 2020, rows).astype(str),
+        "genotype": rng.choice(["Deletion", "Mutation", "UPD", "ICD"], rows),
+        "sexe": rng.choice(["M", "F"], rows),
+        "ville": rng.choice([f"ville{i}" for i in range(40)], rows),
+    })
+
+
+class _Reader:
+    source = "google_sheet"
+
+    def __init__(self, df):
+        self.df = df
+
+    def readData(self):
+        return self.df.copy()
+
+
+class _Patched:
+    """Redirige _get_engine / SQL_DIR vers la base de test; capture les e-mails d'alerte."""
+
+    def __init__(self, engine, sql_dir):
+        self.engine, self.sql_dir = engine, sql_dir
+        self.alerts = []
+
+    def __enter__(self):
+        self._orig = (utils._get_engine, utils.SQL_DIR, utils.send_email_alert)
+        utils._get_engine = lambda **kw: ("sqlite_test", self.engine)
+        utils.SQL_DIR = self.sql_dir
+        utils.send_email_alert = lambda title, msg: self.alerts.append((title, msg))
+        return self
+
+    def __exit__(self, *exc):
+        utils._get_engine, utils.SQL_DIR, utils.send_email_alert = self._orig
+
+
+def _raw(engine) -> list:
+    with engine.connect() as conn:
+        return sorted(conn.execute(text(f"SELECT * FROM {TABLE}")).fetchall())
+
+
+def _last_run(engine) -> dict:
+    with engine.connect() as conn:
+        return ledger.fetch_runs(conn, TABLE, limit=1)[0]
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_profile_and_ddl():
+    df = _source()
+    df.loc[:9, "ville"] = None
+    p = drift.profile_dataframe(df, ("genotype", "sexe"))
+    assert p["stats"]["annee"]["kind"] == "numeric" and 1990 <= p["stats"]["annee"]["min"] <= p["stats"]["annee"]["max"] < 2020, p
+    assert abs(p["stats"]["ville"]["null_ratio"] - 10 / ROWS) < 1e-6 and p["stats"]["ville"]["kind"] == "text", p
+    assert p["stats"]["sexe"]["values"] == ["F", "M"] and "values" not in p["stats"]["ville"], p
+    json.dumps(p)
+    assert drift.ddl_columns(DDL) == ["id", "annee", "genotype", "sexe", "ville"]
+    france = (SRC_DIR / "SQLScript" / "France" / "createMapFrance_English.sql").read_text(encoding="utf-8")
+    assert drift.ddl_columns(france)[:3] == ["id", "annee", "code_Departement"], drift.ddl_columns(france)
+    logger.info("✅ profil (nulls, numérique, libellés) et colonnes de DDL")
+
+
+def test_baseline(engine, patched, df):
+    assert utils.export_Table(TABLE, SCRIPT, _Reader(df))["mode"] == "staged"
+    with engine.connect() as conn:
+        stored = drift.load_profile(conn, TABLE)
+    assert stored and stored["rows"] == ROWS and stored["ddl_mismatch"] == {"missing": [], "extra": []}, stored
+    assert stored["stats"]["genotype"]["values"] == ["Deletion", "ICD", "Mutation", "UPD"], stored
+
+    again = _source(seed=8)   # mêmes distributions, autres tirages
+    assert utils.export_Table(TABLE, SCRIPT, _Reader(again))["mode"] == "staged"
+    assert not patched.alerts, patched.alerts
+    logger.info("✅ 1er export + export comparable publiés, profil stocké")
+    return again
+
+
+def _expect_blocked(engine, patched, df, check: str, column) -> dict:
+    before = _raw(engine)
+    patched.alerts.clear()
+    assert utils.export_Table(TABLE, SCRIPT, _Reader(df)) is None
+    assert _raw(engine) == before, "la table live a bougé malgré le refus"
+    run = _last_run(engine)
+    report = json.loads(run["error"])
+    assert run["outcome"] == "rejected" and run["rows_rejected"] == len(df) and report["blocked"], run
+    assert any(v["check"] == check and v["column"] == column and v["severity"] == "block"
+               for v in report["violations"]), report
+    assert patched.alerts and "drift" in patched.alerts[0][1], patched.alerts
+    return report
+
+
+def test_blocked(engine, patched, df):
+    emptied = df.copy()
+    emptied.loc[: ROWS // 3, "ville"] = None
+    _expect_blocked(engine, patched, emptied, "null_ratio", "ville")
+
+    relabel = df.copy()
+    relabel["genotype"] = relabel["genotype"].replace("Deletion", "Délétion")
+    report = _expect_blocked(engine, patched, relabel, "category", "genotype")
+    cat = next(v for v in report["violations"] if v["check"] == "category")
+    assert cat["observed"] == ["Délétion"], cat
+
+    outlier = df.copy()
+    outlier.loc[0, "annee"] = "1900"
+    _expect_blocked(engine, patched, outlier, "range", "annee")
+
+    collapsed = df.copy()
+    collapsed["ville"] = "ville0"
+    _expect_blocked(engine, patched, collapsed, "cardinality", "ville")
+
+    dropped = df.drop(columns="ville")
+    report = _expect_blocked(engine, patched, dropped, "schema", None)
+    assert any("ville" in v["message"] for v in report["violations"]), report
+    logger.info("✅ nulls, libellé, plage, cardinalité, schéma: export refusé, table live intacte")
+
+
+def test_cli_report(engine):
+    orig = utils._get_engine
+    utils._get_engine = lambda **kw: ("sqlite_test", engine)
+    try:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            assert drift.main(["report", TABLE]) == 0
+            assert drift.main(["profile", TABLE]) == 0
+    finally:
+        utils._get_engine = orig
+    assert '"schema"' in out.getvalue() and '"stats"' in out.getvalue(), out.getvalue()
+    logger.info("✅ CLI: rapport du dernier refus + profil de référence")
+
+
+def test_warn_mode(engine, patched, df):
+    relabel = df.copy()
+    relabel["sexe"] = relabel["sexe"].replace("F", "W")
+    report = utils.export_Table(TABLE, SCRIPT, _Reader(relabel), drift_config=drift.DriftConfig.from_env(mode="warn"))
+    assert report is not None and _last_run(engine)["outcome"] == "ok"
+    with engine.connect() as conn:   # la nouvelle génération devient la référence
+        assert drift.load_profile(conn, TABLE)["stats"]["sexe"]["values"] == ["M", "W"]
+    logger.info("✅ mode warn: violations signalées, export publié")
+    return relabel
+
+
+def test_custom_check(engine, patched, df):
+    def min_rows(current, previous, ctx):
+        return [drift.Violation("min_rows", None, "block", "trop peu de lignes")] if current["rows"] < 1000 else []
+
+    cfg = drift.DriftConfig.from_env(checks=drift.CHECKS + [min_rows])
+    assert utils.export_Table(TABLE, SCRIPT, _Reader(df), drift_config=cfg) is None
+    assert json.loads(_last_run(engine)["error"])["violations"][0]["check"] == "min_rows"
+
+    cfg = drift.DriftConfig.from_env(allowed={"sexe": {"M", "F"}})
+    assert utils.export_Table(TABLE, SCRIPT, _Reader(df), drift_config=cfg) is None   # "W" n'est pas autorisé
+    logger.info("✅ check personnalisé et libellés autorisés explicites")
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, SCRIPT).write_text(DDL, encoding="utf-8")
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'drift.sqlite')}", future=True)
+        try:
+            test_profile_and_ddl()
+            with _Patched(engine, tmp) as patched:
+                df = test_baseline(engine, patched, _source())
+                test_blocked(engine, patched, df)
+                test_cli_report(engine)
+                df = test_warn_mode(engine, patched, df)
+                test_custom_check(engine, patched, df)
+        except Exception:
+            logger.exception("❌ Test garde-fou de dérive KO")
+            raise
+        finally:
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
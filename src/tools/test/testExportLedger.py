@@ -0,0 +1,197 @@
+"""
+Test du journal des exports (tools.export_ledger) et de update_log.
+
+Base SQLite jetable (pas besoin de MySQL):
+  - chaque export_Table laisse une ligne dans export_run: source, lignes, temps par
+    étape, octets envoyés, issue (ok / rejected / error + texte de l'erreur)
+  - update_log: une seule ligne par table, mise à jour par upsert
+  - tendances: une durée ou un volume hors médiane glissante est signalé (CLI code 1)
+  - métadonnées (empreintes, spec, profil) impossibles à écrire après publication: run 'ok',
+    update_log à jour, anciennes empreintes effacées (prochain incrémental complet)
+
+  python tools/test/testExportLedger.py
+"""
+import sys, os
+import io
+import time
+import tempfile
+import contextlib
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from tools.logger import setup_logger
+import tools.utilsTools as utils
+import tools.export_ledger as ledger
+import tools.incremental_export as incr
+import tools.crypto_spec_registry as spec_registry
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+TABLE = "T_MapTest_English"
+SCRIPT = "createMapTest.sql"
+DDL = f"""CREATE TABLE {TABLE} (
+    id INT NOT NULL UNIQUE,
+    annee VARCHAR(16) NOT NULL
+);"""
+
+
+class _Reader:
+    source = "google_sheet"
+
+    def __init__(self, rows: int, fail: bool = False):
+        self.rows, self.fail = rows, fail
+
+    def readData(self):
+        if self.fail:
+            raise ConnectionError("Google Sheets indisponible")
+        return pd.DataFrame({"id": range(1, self.rows + 1), "annee": ["2010"] * self.rows})
+
+
+class _Patched:
+    """Redirige _get_engine / SQL_DIR vers la base de test; pas d'e-mail d'alerte."""
+
+    def __init__(self, engine, sql_dir):
+        self.engine, self.sql_dir = engine, sql_dir
+        self.alerts = []
+
+    def __enter__(self):
+        self._orig = (utils._get_engine, utils.SQL_DIR, utils.send_email_alert)
+        utils._get_engine = lambda **kw: ("sqlite_test", self.engine)
+        utils.SQL_DIR = self.sql_dir
+        utils.send_email_alert = lambda title, msg: self.alerts.append(title)
+        return self
+
+    def __exit__(self, *exc):
+        utils._get_engine, utils.SQL_DIR, utils.send_email_alert = self._orig
+
+
+def _runs(engine) -> list:
+    with engine.connect() as conn:
+        return ledger.fetch_runs(conn, TABLE)
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_ok_runs(engine):
+    for _ in range(3):
+        utils.export_Table(TABLE, SCRIPT, _Reader(500), encrypt=False)
+    runs = _runs(engine)
+    assert len(runs) == 3 and all(r["outcome"] == "ok" for r in runs), runs
+    last = runs[0]
+    assert last["source"] == "google_sheet" and last["publish_mode"] == "staged", last
+    assert last["rows_read"] == 500 and last["rows_written"] == 500 and last["rows_rejected"] == 0, last
+    assert last["t_insert"] > 0 and last["t_swap"] > 0 and last["t_read"] >= 0, last
+    assert last["bytes_sent"] > 500 * 8, last["bytes_sent"]
+    logger.info("✅ runs OK tracés: insert %.3fs, swap %.3fs, %d octets envoyés",
+                last["t_insert"], last["t_swap"], last["bytes_sent"])
+
+
+def test_update_log_upsert(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT table_name, updated_at FROM update_log")).fetchall()
+    assert [r[0] for r in rows] == [TABLE], rows
+    logger.info("✅ update_log: une seule ligne par table (upsert)")
+
+
+def test_rejected_and_error(engine, patched):
+    utils.export_Table(TABLE, SCRIPT, _Reader(100), encrypt=False)   # < 90% des 500 lignes
+    assert patched.alerts, "l'alerte e-mail du garde-fou n'est pas partie"
+    try:
+        utils.export_Table(TABLE, SCRIPT, _Reader(500, fail=True), encrypt=False)
+        raise AssertionError("export_Table aurait dû échouer")
+    except ConnectionError:
+        pass
+    error, rejected = _runs(engine)[:2]
+    assert rejected["outcome"] == "rejected" and rejected["rows_rejected"] == 100 and rejected["rows_written"] == 0, rejected
+    assert error["outcome"] == "error" and "Google Sheets indisponible" in error["error"], error
+    logger.info("✅ run rejeté (garde-fou 90%) et run en erreur tracés")
+
+
+def test_trends(engine):
+    base = ledger.trends(_runs(engine))
+    assert base[0]["flags"], "le dernier run en erreur doit être signalé"
+
+    # Historique synthétique: 10 runs ~1s / 1000 lignes puis un run lent et maigre
+    fake = []
+    for i in range(10):
+        fake.append({"table_name": "T_Fake", "outcome": "ok", "duration_s": 1.0 + i * 0.01,
+                     "rows_read": 1000, "rows_written": 1000, "started_at": f"2026-01-{i + 1:02d}", "error": None})
+    fake.append({"table_name": "T_Fake", "outcome": "ok", "duration_s": 2.5, "rows_read": 800,
+                 "rows_written": 800, "started_at": "2026-01-20", "error": None})
+    fake.reverse()   # plus récents d'abord, comme fetch_runs
+    item = ledger.trends(fake, window=10, time_ratio=1.5, rows_drop=0.1)[0]
+    assert len(item["flags"]) == 2, item
+    assert not ledger.trends(fake[1:], window=10)[0]["flags"]
+
+    # CLI: code retour 1 si une table est signalée
+    orig = utils._get_engine
+    utils._get_engine = lambda **kw: ("sqlite_test", engine)
+    try:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            rc = ledger.main(["trends"])
+            ledger.main(["history", TABLE])
+    finally:
+        utils._get_engine = orig
+    assert rc == 1 and TABLE in out.getvalue(), out.getvalue()
+    logger.info("✅ tendances: régressions durée / volume signalées, CLI code 1\n%s", out.getvalue())
+
+
+def test_metadata_failure(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM update_log"))
+    assert utils.export_Table(TABLE, SCRIPT, _Reader(500), encrypt=False)["mode"] == "staged"
+    with engine.connect() as conn:
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {incr.FINGERPRINT_TABLE}")).scalar() == 500
+
+    def _boom(*a, **kw):
+        raise RuntimeError("registre indisponible")
+
+    orig = spec_registry.save_spec
+    spec_registry.save_spec = _boom
+    try:
+        report = utils.export_Table(TABLE, SCRIPT, _Reader(510), encrypt=False, publish="staged")
+    finally:
+        spec_registry.save_spec = orig
+    assert report["mode"] == "staged" and report["added"] == 510, report
+    run = _runs(engine)[0]
+    assert run["outcome"] == "ok" and run["rows_written"] == 510, run
+    with engine.connect() as conn:
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {TABLE}")).scalar() == 510
+        assert conn.execute(text("SELECT COUNT(*) FROM update_log WHERE table_name = :t"), {"t": TABLE}).scalar() == 1
+        # transaction des métadonnées annulée en bloc: pas d'empreintes de l'ancienne génération
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {incr.FINGERPRINT_TABLE}")).scalar() == 0
+    logger.info("✅ métadonnées non écrites après publication: run ok, update_log à jour, empreintes effacées")
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, SCRIPT).write_text(DDL, encoding="utf-8")
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'ledger.sqlite')}", future=True)
+        try:
+            with _Patched(engine, tmp) as patched:
+                test_ok_runs(engine)
+                test_update_log_upsert(engine)
+                test_rejected_and_error(engine, patched)
+            test_trends(engine)
+            with _Patched(engine, tmp):
+                test_metadata_failure(engine)
+        except Exception:
+            logger.exception("❌ Test journal des exports KO")
+            raise
+        finally:
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
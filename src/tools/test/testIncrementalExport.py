@@ -0,0 +1,244 @@
+"""
+Test de l'export incrémental (export_Table(publish="incremental"), tools.incremental_export).
+
+Base SQLite jetable (pas besoin de MySQL), colonnes chiffrées Fernet comme en prod:
+  - un export identique n'écrit rien (les jetons chiffrés en base ne bougent pas)
+  - ajout / modification / suppression de quelques lignes: seules celles-ci sont écrites,
+    le rapport donne les bons comptes, la table déchiffrée == le DataFrame source
+  - empreintes incohérentes avec la table -> repli sur un export complet
+  - crash en plein diff -> rollback, table et empreintes intactes
+  - export -> export -> rollback_table -> export incrémental: empreintes et profil oubliés
+    (export complet, pas "0 changement"), génération republiée relue avec son propre spec
+
+  python tools/test/testIncrementalExport.py
+"""
+import sys, os
+import time
+import tempfile
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+
+from tools.logger import setup_logger
+from tools.crypto_utils import decrypt_dataframe, infer_crypto_spec
+import tools.utilsTools as utils
+import tools.incremental_export as incr
+import tools.drift_guard as drift
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+TABLE = "T_MapTest_English"
+SCRIPT = "createMapTest.sql"
+DDL = f"""CREATE TABLE {TABLE} (
+    id TEXT NOT NULL UNIQUE,
+    annee TEXT NOT NULL,
+    genotype TEXT NOT NULL,
+    sexe TEXT NOT NULL
+);"""
+ROWS = 200
+
+
+def _source(rows: int = ROWS) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        "id": [str(i) for i in range(1, rows + 1)],
+        "annee": rng.integers(1990, 2020, rows).astype(str),
+        "genotype": rng.choice(["Délétion", "Mutation", "UPD", "ICD"], rows),
+        "sexe": rng.choice(["M", "F"], rows),
+    })
+
+
+class _Reader:
+    def __init__(self, df):
+        self.df = df
+
+    def readData(self):
+        return self.df.copy()
+
+
+class _Patched:
+    """Redirige _get_engine vers l'engine SQLite et SQL_DIR vers le script de test."""
+
+    def __init__(self, engine, sql_dir):
+        self.engine, self.sql_dir = engine, sql_dir
+
+    def __enter__(self):
+        self._orig = (utils._get_engine, utils.SQL_DIR)
+        utils._get_engine = lambda **kw: ("sqlite_test", self.engine)
+        utils.SQL_DIR = self.sql_dir
+        return self
+
+    def __exit__(self, *exc):
+        utils._get_engine, utils.SQL_DIR = self._orig
+
+
+class _Writes:
+    """Compte les INSERT/UPDATE/DELETE (lignes) sur la table exportée."""
+
+    def __init__(self, engine):
+        self.engine, self.rows = engine, 0
+
+    def _hook(self, conn, cursor, statement, parameters, context, executemany):
+        head = statement.lstrip().upper()
+        if TABLE.upper() in head.split("WHERE")[0] and head.startswith(("INSERT", "UPDATE", "DELETE")):
+            self.rows += len(parameters) if executemany else 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._hook)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._hook)
+
+
+def _raw(engine) -> list:
+    with engine.connect() as conn:
+        return sorted(conn.execute(text(f"SELECT * FROM {TABLE}")).fetchall())
+
+
+def _decrypted(engine, spec) -> pd.DataFrame:
+    with engine.connect() as conn:
+        df = pd.read_sql_table(TABLE, conn)
+    df = decrypt_dataframe(df, spec)
+    return df.sort_values("id", key=lambda s: s.astype(int)).reset_index(drop=True)
+
+
+def _same(engine, source: pd.DataFrame) -> bool:
+    spec = infer_crypto_spec(source)
+    expected = source.sort_values("id", key=lambda s: s.astype(int)).reset_index(drop=True)
+    got = _decrypted(engine, spec)[list(expected.columns)]
+    for col, ctype in spec.items():   # decrypt_number renvoie des float
+        if ctype == "number":
+            got[col], expected[col] = got[col].astype(float), expected[col].astype(float)
+    return got.astype(str).equals(expected.astype(str))
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_first_export(engine, df):
+    report = utils.export_Table(TABLE, SCRIPT, _Reader(df), publish="incremental")
+    assert report["mode"] == "staged", report   # pas de table: export complet
+    assert _same(engine, df)
+    with engine.connect() as conn:
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {incr.FINGERPRINT_TABLE}")).scalar() == len(df)
+    logger.info("✅ premier export complet + %d empreintes", len(df))
+
+
+def test_noop(engine, df):
+    before = _raw(engine)
+    with _Writes(engine) as w:
+        report = utils.export_Table(TABLE, SCRIPT, _Reader(df), publish="incremental")
+    assert report == {"mode": "incremental", "added": 0, "changed": 0, "removed": 0, "unchanged": len(df)}, report
+    assert w.rows == 0 and _raw(engine) == before
+    logger.info("✅ export identique: 0 écriture, jetons chiffrés inchangés")
+
+
+def test_small_diff(engine, df) -> pd.DataFrame:
+    new = df.copy()
+    flip = new["id"].isin(["3", "50", "120"])   # libellés connus: le garde-fou de dérive laisse passer
+    new.loc[flip, "sexe"] = new.loc[flip, "sexe"].map({"M": "F", "F": "M"})
+    new = new[~new["id"].isin(["7", "8"])]
+    added = pd.DataFrame({"id": ["201", "202", "203", "204"], "annee": ["2021"] * 4,
+                          "genotype": ["UPD"] * 4, "sexe": ["F"] * 4})
+    new = pd.concat([new, added], ignore_index=True)
+
+    with _Writes(engine) as w:
+        report = utils.export_Table(TABLE, SCRIPT, _Reader(new), publish="incremental")
+    assert report == {"mode": "incremental", "added": 4, "changed": 3, "removed": 2,
+                      "unchanged": len(df) - 5}, report
+    assert w.rows == 4 + 3 + 2, w.rows
+    assert _same(engine, new)
+    logger.info("✅ diff appliqué: %s, %d lignes écrites", report, w.rows)
+    return new
+
+
+def test_crash_midway(engine, df):
+    new = df.copy()
+    one = new["id"] == "1"
+    new.loc[one, "annee"] = "2005" if new.loc[one, "annee"].iloc[0] != "2005" else "2006"
+    new = new[new["id"] != "2"]
+    before_rows = _raw(engine)
+    with engine.connect() as conn:
+        before_fp = sorted(conn.execute(text(f"SELECT * FROM {incr.FINGERPRINT_TABLE}")).fetchall())
+
+    def _boom(conn, cursor, statement, *a):
+        if statement.lstrip().upper().startswith("UPDATE " + "`" + TABLE.upper()):
+            raise RuntimeError("crash simulé pendant l'UPDATE")
+
+    event.listen(engine, "before_cursor_execute", _boom)
+    try:
+        utils.export_Table(TABLE, SCRIPT, _Reader(new), publish="incremental")
+        raise AssertionError("export_Table aurait dû échouer")
+    except RuntimeError:
+        pass
+    finally:
+        event.remove(engine, "before_cursor_execute", _boom)
+    with engine.connect() as conn:
+        after_fp = sorted(conn.execute(text(f"SELECT * FROM {incr.FINGERPRINT_TABLE}")).fetchall())
+    assert _raw(engine) == before_rows and after_fp == before_fp
+    logger.info("✅ crash en plein diff: DELETE annulé, table et empreintes intactes")
+
+
+def test_stale_fingerprints(engine, df):
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {incr.FINGERPRINT_TABLE} WHERE rowid = (SELECT MIN(rowid) FROM {incr.FINGERPRINT_TABLE})"))
+    report = utils.export_Table(TABLE, SCRIPT, _Reader(df), publish="incremental")
+    assert report["mode"] == "staged", report
+    assert _same(engine, df)
+    report = utils.export_Table(TABLE, SCRIPT, _Reader(df), publish="incremental")
+    assert report["mode"] == "incremental" and report["unchanged"] == len(df), report
+    logger.info("✅ empreintes incohérentes -> export complet, puis incrémental à nouveau")
+
+
+def test_rollback_then_incremental(engine, df):
+    no_guard = drift.DriftConfig.from_env(mode="off")
+    other = df.copy()
+    other["sexe"] = other["sexe"].map({"M": "1", "F": "2"})   # autre spec: sexe devient "number"
+    assert utils.export_Table(TABLE, SCRIPT, _Reader(other), publish="staged", drift_config=no_guard)["mode"] == "staged"
+    utils.rollback_table(TABLE)   # live: df, __prev: other
+
+    with engine.connect() as conn:
+        columns = [c[1] for c in conn.execute(text(f"PRAGMA table_info({TABLE})"))]
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {incr.FINGERPRINT_TABLE}")).scalar() == 0
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {drift.PROFILE_TABLE} WHERE table_name = :t"), {"t": TABLE}).scalar() == 0
+    assert utils.load_crypto_spec(TABLE, columns)["sexe"] == "str"
+    assert _same(engine, df)
+
+    report = utils.export_Table(TABLE, SCRIPT, _Reader(other), publish="incremental", drift_config=no_guard)
+    assert report["mode"] == "staged", report   # sans empreintes: export complet
+    assert _same(engine, other) and utils.load_crypto_spec(TABLE, columns)["sexe"] == "number"
+    logger.info("✅ rollback: empreintes et profil oubliés, spec de la génération republiée, puis export complet")
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, SCRIPT).write_text(DDL, encoding="utf-8")
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'incr.sqlite')}", future=True)
+        try:
+            with _Patched(engine, tmp):
+                df = _source()
+                test_first_export(engine, df)
+                test_noop(engine, df)
+                df = test_small_diff(engine, df)
+                test_crash_midway(engine, df)
+                test_stale_fingerprints(engine, df)
+                test_rollback_then_incremental(engine, df)
+        except Exception:
+            logger.exception("❌ Test export incrémental KO")
+            raise
+        finally:
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Test de l'inférence de spec par échantillon (crypto_utils.infer_crypto_spec).
+
+Pour chaque table T_Map (colonnes lues dans src/SQLScript/*/createMap*.sql), un
+DataFrame réaliste de 3000 lignes, tel qu'export_Table le chiffre (après fillna)
+et tel que les lectures le voient (Base64 chiffré): le spec par échantillon doit
+être IDENTIQUE au parse complet (sample=0, ancien comportement). Plus:
+  - colonnes proches des seuils: l'échantillon ne tranche pas -> parse complet
+  - 2e inférence: décisions servies par le cache (aucun pd.to_datetime)
+
+  python tools/test/testInferSpecSampling.py
+"""
+import sys, os
+import time
+import warnings
+from pathlib import Path
+from datetime import date, timedelta
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import numpy as np
+import pandas as pd
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+from tools.drift_guard import ddl_columns
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+ROWS = 3000
+GROUPS = ["<4 years", "4-8 years", "8-12 years", "12-17 years", ">18 years"]
+GENOTYPES = ["Deletion", "Mutation", "UPD", "ICD", "Clinical", "Mosaic", "I don't know"]
+
+
+def _values(col: str, n: int, rng) -> object:
+    c = col.lower()
+    if c in ("indexation", "id", "internal_id"):
+        return np.arange(1, n + 1)
+    if c in ("age", "edad", "idade"):
+        age = rng.integers(0, 45, n).astype(float)
+        age[rng.random(n) < 0.03] = np.nan
+        return age
+    if c == "annee":
+        return rng.integers(1980, 2024, n).astype(str)
+    if c == "groupage":
+        return pd.Categorical(rng.choice(GROUPS, n), categories=GROUPS)
+    if "geno" in c or c == "diagnostico":
+        return rng.choice(GENOTYPES, n)
+    if c in ("gender", "sexe", "sexo", "genero"):
+        return rng.choice(["M", "F"], n)
+    if c == "code_departement":
+        codes = np.array([f"{i:02d}" for i in range(1, 96)] + ["2A", "2B", "971", "974"], dtype=object)
+        out = rng.choice(codes, n)
+        out[rng.random(n) < 0.04] = "Maroc"
+        return out
+    if c == "difficultessa":
+        return rng.choice(["Sommeil", "Épilepsie, sommeil", "Alimentation", "Aucune"], n)
+    if c == "datecreation":
+        return [date(2023, 1, 1) + timedelta(days=int(d)) for d in rng.integers(0, 700, n)]
+    if c == "country_code":
+        return rng.choice(["FR", "ES", "BR", "MX", "AR", "IN"], n)
+    if c == "linkdashboard":
+        return rng.choice(["a1b2c3", "d4e5f6"], n)
+    return np.array([f"Ville {i}" for i in rng.integers(0, 400, n)], dtype=object)
+
+
+def _as_exported(df: pd.DataFrame) -> pd.DataFrame:
+    """Mêmes normalisations qu'export_Table avant chiffrement."""
+    df = df.replace([np.inf, -np.inf], np.nan)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("object")
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].fillna(0.0)
+        elif pd.api.types.is_object_dtype(df[col]):
+            df[col] = df[col].fillna("None")
+    return df
+
+
+def _shapes() -> dict:
+    shapes = {}
+    for path in sorted((SRC_DIR / "SQLScript").glob("*/createMap*.sql")):
+        ddl = path.read_text(encoding="utf-8")
+        cols = ddl_columns(ddl)
+        if "indexation" in ddl and "indexation" not in cols:
+            cols = ["indexation"] + cols
+        shapes[path.stem] = cols
+    return shapes
+
+
+class _DateParses:
+    """Compte les appels à _date_ratio (pd.to_datetime x2) et leur taille."""
+
+    def __enter__(self):
+        self.calls, self._orig = [], crypto._date_ratio
+        crypto._date_ratio = lambda s: (self.calls.append(len(s)), self._orig(s))[1]
+        return self
+
+    def __exit__(self, *exc):
+        crypto._date_ratio = self._orig
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_tmap_shapes():
+    rng = np.random.default_rng(11)
+    shapes = _shapes()
+    assert len(shapes) >= 30, shapes.keys()
+    checked = 0
+    for name, cols in shapes.items():
+        raw = pd.DataFrame({c: _values(c, ROWS, rng) for c in cols})
+        exported = _as_exported(raw)
+        for df in (raw, exported, crypto.encrypt_dataframe_auto(exported.drop(columns=["indexation"], errors="ignore"))):
+            crypto._infer_cache.clear()
+            fast = crypto.infer_crypto_spec(df)
+            full = crypto.infer_crypto_spec(df, sample=0)
+            assert fast == full, (name, {c: (fast[c], full[c]) for c in fast if fast[c] != full[c]})
+            checked += 1
+    logger.info("✅ %d tables T_Map x 3 états (brut, exporté, chiffré): spec identique au parse complet", len(shapes))
+
+
+def test_ambiguous_escalates():
+    rng = np.random.default_rng(5)
+    n = 5000
+    ages = rng.integers(1, 40, n).astype(str).astype(object)
+    ages[rng.random(n) < 0.10] = "None"          # ~90% de nombres: pile sur num_ratio
+    births = pd.Series([f"{d:02d}/{m:02d}/20{y:02d}" for d, m, y in
+                        zip(rng.integers(1, 28, n), rng.integers(1, 12, n), rng.integers(0, 20, n))], dtype=object)
+    births[rng.random(n) < 0.20] = "inconnue"    # ~80% de dates: pile sur date_ratio
+    clear_cut = rng.integers(1, 40, n).astype(str).astype(object)
+    clear_cut[rng.random(n) < 0.03] = "None"
+    df = pd.DataFrame({"age": ages, "naissance": births, "edad": clear_cut})
+
+    crypto._infer_cache.clear()
+    with _DateParses() as parses:
+        fast = crypto.infer_crypto_spec(df)
+    assert fast == crypto.infer_crypto_spec(df, sample=0), fast
+    assert n in parses.calls, parses.calls       # au moins une colonne escaladée au parse complet
+    with _DateParses() as parses:
+        crypto.infer_crypto_spec(df[["edad"]])
+    assert parses.calls == [] or max(parses.calls) <= crypto.INFER_SAMPLE, parses.calls   # tranché sur l'échantillon (cache)
+    logger.info("✅ colonnes à la limite des seuils: parse complet, spec identique (%s)", fast)
+
+
+def test_cache():
+    rng = np.random.default_rng(2)
+    df = _as_exported(pd.DataFrame({c: _values(c, ROWS, rng) for c in ["annee", "genotype", "city", "code_Departement"]}))
+    crypto._infer_cache.clear()
+    with _DateParses() as first:
+        spec = crypto.infer_crypto_spec(df)
+    assert first.calls and max(first.calls) <= crypto.INFER_SAMPLE, first.calls
+    with _DateParses() as second:
+        assert crypto.infer_crypto_spec(df.copy()) == spec
+    assert second.calls == [], second.calls
+
+    changed = df.copy()
+    changed["annee"] = "None"                    # même nom / dtype / taille, autres valeurs
+    assert crypto.infer_crypto_spec(changed)["annee"] == crypto.infer_crypto_spec(changed, sample=0)["annee"] == "str"
+    logger.info("✅ cache par empreinte de colonne: 2e inférence sans parse (%s)", spec)
+
+
+def main():
+    start = time.time()
+    warnings.simplefilter("ignore", UserWarning)   # "Could not infer format" de pd.to_datetime
+    try:
+        test_tmap_shapes()
+        test_ambiguous_escalates()
+        test_cache()
+    except Exception:
+        logger.exception("❌ Test inférence par échantillon KO")
+        raise
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
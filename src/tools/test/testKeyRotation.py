@@ -0,0 +1,248 @@
+"""
+Test de la rotation de clé Fernet (anneau crypto_utils + tools.key_rotation).
+
+Base SQLite jetable, données chiffrées avec la clé actuelle puis nouvelle clé primaire:
+  - anneau: l'ancienne clé déchiffre encore, la nouvelle chiffre; keyed_sha256 inchangé (HMAC_KEY)
+  - re-chiffrement T_People_Identity (jetons bruts), T_Message (corps en clair historiques
+    laissés tels quels), table publiée par export_Table (DDL façon T_MapFrance_English,
+    toutes les colonnes chiffrées sauf la clé 'indexation' AUTO_INCREMENT) + sa génération __prev
+  - tables exportées sans clé parcourable (clé primaire chiffrée, pas de clé): signalées 'skipped'
+  - reprise: arrêt après --max-seconds, reprise au checkpoint; déjà terminé -> 0 lot
+  - vérification: re-chiffrement faussé -> RotationVerifyError, lot annulé, checkpoint intact
+  - ancienne clé retirée de l'anneau: tout se relit
+
+  python tools/test/testKeyRotation.py
+"""
+import sys, os
+import time
+import tempfile
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import pandas as pd
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy import create_engine, text
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+import tools.utilsTools as utils
+import tools.key_rotation as kr
+import tools.crypto_spec_registry as registry
+from tools.drift_guard import DriftConfig
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+N_PEOPLE = 23
+MAP = "T_MapTest_English"
+ENC_PK = "T_MapTest_Deutsch"
+LEGACY = "T_MapTest_Legacy"
+# DDL façon src/SQLScript/France/ (AUTOINCREMENT SQLite au lieu de AUTO_INCREMENT)
+DDL = {
+    MAP: f"""CREATE TABLE {MAP} (
+    indexation INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INT NOT NULL UNIQUE,
+    annee VARBINARY(64) NOT NULL,
+    genotype VARBINARY(512) NOT NULL
+);""",
+    # façon Germany: la clé primaire vient des données, donc chiffrée
+    ENC_PK: f"""CREATE TABLE {ENC_PK} (
+    id INT PRIMARY KEY,
+    genotype VARBINARY(512) NOT NULL
+);""",
+}
+PII = ["firstname", "lastname", "emailAddress", "dateOfBirth", "genotype",
+       "longitude", "latitude", "secret_question", "secret_answer"]
+
+
+class _Reader:
+    def __init__(self, df):
+        self.df = df
+
+    def readData(self):
+        return self.df.copy()
+
+
+def _seed(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE T_People_Identity (person_id INTEGER PRIMARY KEY, "
+                          f"{', '.join(c + ' BLOB' for c in PII)}, email_sha BLOB)"))
+        conn.execute(text("CREATE TABLE T_Message (id INTEGER PRIMARY KEY, body_text BLOB, lang TEXT)"))
+        for pid in range(1, N_PEOPLE + 1):
+            clear = {"firstname": f"Prénom{pid}", "lastname": f"Nom{pid}", "emailAddress": f"p{pid}@example.org",
+                     "dateOfBirth": "2014-05-06", "genotype": "Deletion", "secret_answer": f"chat {pid}"}
+            params = {c: crypto.encrypt_str(v) for c, v in clear.items()}
+            params.update(longitude=crypto.encrypt_number(2.35), latitude=crypto.encrypt_number(48.85),
+                          secret_question=crypto.encrypt_number(1), id=pid, sha=bytes([pid]))
+            conn.execute(text(f"INSERT INTO T_People_Identity VALUES (:id, {', '.join(':' + c for c in PII)}, :sha)"),
+                         params)
+        conn.execute(text("INSERT INTO T_Message VALUES (1, :a, 'fr'), (2, :b, 'fr'), (3, NULL, 'fr')"),
+                     {"a": crypto.encrypt_str("Bonjour"), "b": b"ancien message en clair"})
+
+    # tables exportées: deux exports staged -> MAP + MAP__prev
+    df = pd.DataFrame({"id": [101, 102, 103], "annee": ["2001", "2010", "2019"], "genotype": ["UPD", "ICD", "Deletion"]})
+    no_guard = DriftConfig.from_env(mode="off")
+    for _ in range(2):
+        utils.export_Table(MAP, MAP + ".sql", _Reader(df), drift_config=no_guard)
+    utils.export_Table(ENC_PK, ENC_PK + ".sql", _Reader(df[["id", "genotype"]]), drift_config=no_guard)
+    with engine.begin() as conn:
+        df[["genotype"]].to_sql(LEGACY, con=conn, index=False)   # ancienne table to_sql: pas de clé primaire
+        registry.save_spec(conn, LEGACY, {"genotype": "str"})
+
+
+def _people(engine) -> list:
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT person_id, {', '.join(PII)} FROM T_People_Identity ORDER BY person_id")).fetchall()
+    return [[crypto.decrypt_bytes_to_str_strict(v) for v in r[1:]] for r in rows]
+
+
+def _only_key(engine, key) -> bool:
+    """Tous les jetons (PII, messages chiffrés, tables exportées) lisibles avec 'key' seule."""
+    f = Fernet(key)
+    with engine.connect() as conn:
+        blobs = [v for r in conn.execute(text(f"SELECT {', '.join(PII)} FROM T_People_Identity")) for v in r]
+        blobs.append(conn.execute(text("SELECT body_text FROM T_Message WHERE id = 1")).scalar())
+        for name in (MAP, MAP + "__prev"):
+            blobs += [crypto._b64d(v) for r in conn.execute(text(f"SELECT id, annee, genotype FROM {name}")) for v in r]
+    try:
+        for b in blobs:
+            f.decrypt(b)
+        return True
+    except InvalidToken:
+        return False
+
+
+class _Patched:
+    def __init__(self, engine, sql_dir):
+        self.engine, self.sql_dir = engine, sql_dir
+
+    def __enter__(self):
+        self._orig = (utils._get_engine, crypto.key_ring(), crypto._hmac_key, crypto._hmac_cfg, utils.SQL_DIR)
+        utils._get_engine = lambda **kw: ("sqlite_test", self.engine)
+        utils.SQL_DIR = self.sql_dir
+        return self
+
+    def __exit__(self, *exc):
+        utils._get_engine, utils.SQL_DIR = self._orig[0], self._orig[4]
+        crypto._hmac_cfg = self._orig[3]
+        crypto.set_key_ring(self._orig[1], hmac_key=self._orig[2])
+
+
+class _BadFernet(Fernet):
+    """Re-chiffre un autre clair: la vérification doit le voir."""
+
+    def encrypt(self, data):
+        return super().encrypt(b"x" + data)
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_ring(old_key, new_key):
+    fp_before = crypto.keyed_sha256("Deletion", purpose="test")
+    old_token = crypto.encrypt_str("avant")
+    crypto.set_key_ring([new_key, old_key], hmac_key=old_key)
+    assert crypto.decrypt_bytes_to_str_strict(old_token) == "avant"
+    Fernet(new_key).decrypt(crypto.encrypt_str("après"))                 # la nouvelle clé chiffre
+    assert crypto.keyed_sha256("Deletion", purpose="test") == fp_before  # index / empreintes stables
+    try:
+        kr.run(only=["T_Message"])
+        raise AssertionError("HMAC_KEY non fixée: run aurait dû refuser")
+    except RuntimeError:
+        pass
+    crypto._hmac_cfg = old_key
+    logger.info("✅ anneau: ancienne clé lisible, nouvelle clé primaire, keyed_sha256 inchangé")
+
+
+def test_verify_rollback(engine):
+    orig = kr.Fernet
+    kr.Fernet = _BadFernet
+    try:
+        kr.run(only=["T_People_Identity"], batch_size=5)
+        raise AssertionError("RotationVerifyError attendue")
+    except kr.RotationVerifyError as e:
+        logger.info("--- %s", e)
+    finally:
+        kr.Fernet = orig
+    with engine.connect() as conn:
+        cp = kr.load_checkpoint(conn, "T_People_Identity", crypto.key_id(crypto.key_ring()[0]))
+    assert cp is None, cp
+    assert _people(engine)[0][0] == "Prénom1"
+    logger.info("✅ vérification du clair: lot faussé annulé, checkpoint intact")
+
+
+def test_resume_and_finish(engine, clear, new_key):
+    clock = iter(range(0, 10_000, 10))
+    orig = kr.time.monotonic
+    kr.time.monotonic = lambda: float(next(clock))    # chaque lot "dure" 10 s
+    try:
+        first = kr.run(only=["T_People_Identity"], batch_size=5, max_seconds=25)
+    finally:
+        kr.time.monotonic = orig
+    assert len(first) == 1 and not first[0]["finished"] and first[0]["rows_done"] == 10, first
+    assert first[0]["eta_s"] and first[0]["eta_s"] > 0, first
+    assert _people(engine) == clear and not _only_key(engine, new_key)
+
+    reports = kr.run(batch_size=5, rate=10_000)
+    by_table = {r["target"]: r for r in reports if not r.get("skipped")}
+    skipped = {r["target"]: r["reason"] for r in reports if r.get("skipped")}
+    assert set(by_table) == {"T_People_Identity", "T_Message", MAP, MAP + "__prev"}, by_table
+    assert skipped == {ENC_PK: "clé primaire id chiffrée", LEGACY: "pas de clé primaire"}, skipped
+    assert all(r["finished"] for r in by_table.values()), reports
+    pi = by_table["T_People_Identity"]
+    assert pi["rows_done"] == N_PEOPLE and pi["cells_rotated"] == N_PEOPLE * len(PII), pi
+    assert by_table["T_Message"]["cells_rotated"] == 1 and by_table["T_Message"]["cells_skipped"] == 1
+    assert by_table[MAP]["rows_done"] == 3 and by_table[MAP]["cells_rotated"] == 9, by_table[MAP]
+
+    assert _people(engine) == clear and _only_key(engine, new_key)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT body_text FROM T_Message WHERE id = 2")).scalar() == b"ancien message en clair"
+    assert all(r["batches"] == 0 for r in kr.run(batch_size=5))
+    st = kr.status()
+    assert all(s["finished"] for s in st if not s.get("skipped"))
+    assert {s["target"] for s in st if not s["finished"]} == {ENC_PK, LEGACY}, st   # l'ancienne clé reste nécessaire
+    logger.info("✅ re-chiffrement reprenable: %s, ignorées: %s",
+                {t: r["cells_rotated"] for t, r in by_table.items()}, skipped)
+
+
+def test_retire_old_key(engine, clear, old_key, new_key):
+    crypto.set_key_ring([new_key], hmac_key=old_key)
+    assert _people(engine) == clear
+    with engine.connect() as conn:
+        df = pd.read_sql(text(f"SELECT * FROM {MAP} ORDER BY indexation"), conn)
+    dec = crypto.decrypt_dataframe(df, utils.load_crypto_spec(MAP, list(df.columns)))
+    assert dec["genotype"].tolist() == ["UPD", "ICD", "Deletion"], dec
+    assert dec["id"].tolist() == [101, 102, 103], dec
+    logger.info("✅ ancienne clé retirée: tout se relit avec la nouvelle seule")
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'rotation.sqlite')}", future=True)
+        try:
+            for name, ddl in DDL.items():
+                Path(tmp, name + ".sql").write_text(ddl, encoding="utf-8")
+            with _Patched(engine, tmp):
+                old_key = crypto.key_ring()[0]
+                new_key = Fernet.generate_key().decode()
+                _seed(engine)
+                clear = _people(engine)
+                test_ring(old_key, new_key)
+                test_verify_rollback(engine)
+                test_resume_and_finish(engine, clear, new_key)
+                test_retire_old_key(engine, clear, old_key, new_key)
+        except Exception:
+            logger.exception("❌ Test rotation de clé KO")
+            raise
+        finally:
+            registry.invalidate()
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Test du pool Argon2 (tools.password_pool + angelmanSyndromeConnexion.peoplePassword).
+
+  - hachage / vérification réels dans le pool, et en direct (workers=0)
+  - file bornée: au-delà de workers + max_queue -> PoolBusyError immédiat avec Retry-After
+  - délai par appel: PoolTimeoutError, appel en file annulé
+  - temps de file et temps de calcul mesurés séparément
+  - login (authenticate_and_get_id) sur pool saturé: 503 + Retry-After, pas 401
+
+  python tools/test/testPasswordPool.py
+"""
+import sys, os
+import time
+import threading
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from flask import Flask, Blueprint, jsonify
+
+from tools.logger import setup_logger
+import tools.crypto_utils as crypto
+import tools.password_pool as pp
+import angelmanSyndromeConnexion.peopleAuth as people_auth
+from app.v5.common import register_error_handlers
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+
+class _Gate:
+    """Tâche bloquée jusqu'à open(): occupe un worker."""
+
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self._open = threading.Event()
+
+    def task(self, value=None):
+        self.started.release()
+        self._open.wait(10)
+        return value
+
+    def open(self):
+        self._open.set()
+
+
+def _drain(pool, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while pool.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def _background(pool, fn, *args) -> threading.Thread:
+    t = threading.Thread(target=lambda: pool.run(fn, *args), daemon=True)
+    t.start()
+    return t
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_hash_verify():
+    phc, meta = pp.hash_password("S3cret!pwd")
+    assert meta["algo"] == "argon2id"
+    assert pp.verify_password("S3cret!pwd", phc) and not pp.verify_password("autre", phc)
+    inline = pp.PasswordPool(workers=0)
+    assert inline.run(crypto.verify_password_argon2, "S3cret!pwd", phc)
+    st = pp.stats()
+    assert st["completed"] >= 3 and st["compute_ms"]["count"] >= 3 and st["in_flight"] == 0, st
+    logger.info("✅ hash/verify dans le pool: calcul moyen %.1f ms", st["compute_ms"]["avg"])
+
+
+def test_shedding():
+    pool = pp.PasswordPool(workers=2, max_queue=2, timeout_s=10)
+    gate = _Gate()
+    threads = [_background(pool, gate.task, i) for i in range(4)]
+    gate.started.acquire(timeout=5), gate.started.acquire(timeout=5)     # 2 en cours
+    deadline = time.monotonic() + 5
+    while pool.stats()["in_flight"] < 4 and time.monotonic() < deadline:   # 2 en file
+        time.sleep(0.01)
+    t0 = time.monotonic()
+    try:
+        pool.run(gate.task)
+        raise AssertionError("PoolBusyError attendue")
+    except pp.PoolBusyError as e:
+        assert not isinstance(e, pp.PoolTimeoutError)
+        assert 1 <= e.retry_after <= pp.MAX_RETRY_AFTER_S, e.retry_after
+    assert time.monotonic() - t0 < 0.5      # délestage immédiat, sans attendre
+    gate.open()
+    for t in threads:
+        t.join(5)
+    st = pool.stats()
+    assert st["rejected"] == 1 and st["completed"] == 4 and st["in_flight"] == 0, st
+    assert pool.run(lambda: 42) == 42       # la file s'est vidée
+    pool.shutdown()
+    logger.info("✅ délestage: file pleine -> PoolBusyError immédiat, %s", {k: st[k] for k in ("submitted", "rejected")})
+
+
+def test_timeout_and_timings():
+    pool = pp.PasswordPool(workers=1, max_queue=4, timeout_s=0.3)
+    gate = _Gate()
+    first = _background(pool, gate.task)
+    gate.started.acquire(timeout=5)
+    try:
+        pool.run(gate.task)        # en file derrière le premier, jamais démarré
+        raise AssertionError("PoolTimeoutError attendue")
+    except pp.PoolTimeoutError as e:
+        assert e.retry_after >= 1
+    st = pool.stats()
+    assert st["timeouts"] >= 1 and st["in_flight"] == 1, st      # appel en file annulé
+    gate.open()
+    first.join(5)
+    _drain(pool)        # le premier appel (délai dépassé lui aussi) finit son calcul
+
+    # temps de file vs temps de calcul: B attend que A (~150 ms) libère l'unique worker
+    pool.reset_stats()
+    pool.timeout_s = 5
+    a = _background(pool, time.sleep, 0.15)
+    time.sleep(0.02)
+    pool.run(time.sleep, 0.01)
+    a.join(5)
+    st = pool.stats()
+    assert st["compute_ms"]["count"] == 2 and st["queue_ms"]["max"] >= 80, st
+    assert st["compute_ms"]["max"] >= 140, st
+    pool.shutdown()
+    logger.info("✅ délai par appel + file %.0f ms / calcul %.0f ms mesurés séparément",
+                st["queue_ms"]["max"], st["compute_ms"]["max"])
+
+
+def test_login_503():
+    phc, _ = crypto.hash_password_argon2("S3cret!pwd")
+    app = Flask(__name__)
+    bp = Blueprint("test_login", __name__)
+    register_error_handlers(bp)
+
+    @bp.post("/login")
+    def login():
+        pid = people_auth.authenticate_and_get_id("x@example.org", "S3cret!pwd", lang="fr")
+        return (jsonify({"ok": True, "id": pid}), 200) if pid else (jsonify({"ok": False}), 401)
+
+    app.register_blueprint(bp)
+    orig = (pp.pool, people_auth._get_auth_row_by_email, people_auth.setLang)
+    pp.pool = pp.PasswordPool(workers=1, max_queue=0, timeout_s=5)
+    people_auth._get_auth_row_by_email = lambda email, bAngelmanResult=True: (7, phc)
+    people_auth.setLang = lambda pid, lang: None
+    gate = _Gate()
+    try:
+        with app.test_client() as client:
+            assert client.post("/login").get_json() == {"ok": True, "id": 7}
+            busy = _background(pp.pool, gate.task)
+            gate.started.acquire(timeout=5)
+            resp = client.post("/login")
+            assert resp.status_code == 503, resp.status_code
+            assert int(resp.headers["Retry-After"]) >= 1, resp.headers
+            assert resp.get_json()["code"] == "service_busy", resp.get_json()
+            gate.open()
+            busy.join(5)
+            _drain(pp.pool)
+            assert client.post("/login").status_code == 200
+    finally:
+        pp.pool.shutdown()
+        pp.pool, people_auth._get_auth_row_by_email, people_auth.setLang = orig
+    logger.info("✅ login sur pool saturé: 503 + Retry-After %s", resp.headers["Retry-After"])
+
+
+def main():
+    start = time.time()
+    try:
+        test_hash_verify()
+        test_shedding()
+        test_timeout_and_timings()
+        test_login_503()
+    except Exception:
+        logger.exception("❌ Test pool Argon2 KO")
+        raise
+    finally:
+        pp.pool.shutdown()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Test de la télémétrie pool / tunnel (tools.pool_telemetry, GET /_pool, CLI).
+
+Base SQLite jetable (QueuePool comme en prod, pool_size=2 + max_overflow=1):
+  - état live: connexions sorties, overflow utilisé
+  - histogramme des attentes au checkout, timeout du pool quand il est saturé
+  - invalidation et échec du pre-ping comptés
+  - engine.dispose() (pool recréé) et _reset_engine (engine recréé): attentes toujours mesurées
+  - ring buffer: pic de connexions sorties sur l'intervalle, taille bornée
+  - /_pool protégé par ROUTES_TOKEN; la CLI lit le même endpoint
+
+  python tools/test/testPoolTelemetry.py
+"""
+import sys, os
+import io
+import json
+import time
+import tempfile
+import threading
+import contextlib
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from collections import deque
+from flask import Flask
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+from werkzeug.serving import make_server
+
+from tools.logger import setup_logger
+import tools.pool_telemetry as telemetry
+import tools.db_pool as db_pool
+import tools.utilsTools as utils
+from app.debug_routes import bp as debug_bp
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+NAME = "sqlite_test"
+TOKEN = "secret-test-token"
+
+
+def _stats(name: str = NAME) -> dict:
+    return telemetry.snapshot()["engines"][name]
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_saturation(engine):
+    hold, held = threading.Event(), []
+
+    def _holder():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            held.append(1)
+            hold.wait(5)
+
+    threads = [threading.Thread(target=_holder) for _ in range(3)]   # 2 du pool + 1 overflow
+    for t in threads:
+        t.start()
+    while len(held) < 3:
+        time.sleep(0.01)
+
+    live = _stats()
+    assert live["checked_out"] == 3 and live["overflow_in_use"] == 1 and live["size"] == 2, live
+
+    # pool plein: le 4e checkout attend pool_timeout puis échoue
+    try:
+        engine.connect()
+        raise AssertionError("le checkout aurait dû expirer")
+    except exc.TimeoutError:
+        pass
+
+    # un checkout qui attend qu'une connexion se libère
+    threading.Timer(0.15, hold.set).start()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    for t in threads:
+        t.join()
+
+    s = _stats()
+    assert s["timeouts"] == 1 and s["checked_out"] == 0, s
+    slow = sum(b["count"] for b in s["wait_ms"]["histogram"] if b["le_ms"] == "+Inf" or b["le_ms"] >= 100)
+    assert slow >= 2 and s["wait_ms"]["max"] >= 100, s["wait_ms"]   # le timeout (~300ms) + l'attente (~150ms)
+    logger.info("✅ saturation: 3 sorties dont 1 overflow, 1 timeout, attente max %.0fms", s["wait_ms"]["max"])
+
+
+def test_invalidation_and_preping(engine):
+    with engine.connect() as conn:
+        conn.invalidate()
+    assert _stats()["invalidations"] == 1
+
+    # connexion rendue au pool puis fermée dans son dos: le pre-ping échoue au checkout suivant
+    with engine.connect() as conn:
+        dbapi_conn = conn.connection.dbapi_connection
+    dbapi_conn.close()
+    for _ in range(3):   # le pool tourne entre ses connexions: on retombe forcément sur la fermée
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    s = _stats()
+    assert s["pre_ping_failures"] >= 1 and s["invalidations"] >= 2, s
+    logger.info("✅ invalidation + échec du pre-ping comptés (%d / %d)", s["invalidations"], s["pre_ping_failures"])
+
+
+def test_dispose_keeps_timing(engine):
+    before = _stats()["wait_ms"]["count"]
+    engine.dispose()
+    assert getattr(engine.pool._do_get, "_telemetry", False), "pool recréé non chronométré"
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert _stats()["wait_ms"]["count"] == before + 1
+    logger.info("✅ engine.dispose(): nouveau pool chronométré dès le 1er checkout")
+
+
+def test_reset_engine_reattach(tmp):
+    key = "sqlite_reset"
+    url = lambda: f"sqlite:///{os.path.join(tmp, 'reset.sqlite')}"
+    first = db_pool.get_engine(key, url, poolclass=QueuePool, pool_size=1, max_overflow=0)
+    try:
+        with first.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert _stats(key)["wait_ms"]["count"] == 1
+        utils._reset_engine(key)      # erreur de connexion: engine jeté, télémétrie détachée
+        assert key not in telemetry.snapshot()["engines"]
+        second = db_pool.get_engine(key, url, poolclass=QueuePool, pool_size=1, max_overflow=0)
+        assert second is not first and getattr(second.pool._do_get, "_telemetry", False)
+        with second.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        s = _stats(key)
+        assert s["wait_ms"]["count"] == 1 and s["checkouts"] == 1, s
+    finally:
+        db_pool.dispose_engine(key)
+    logger.info("✅ _reset_engine: engine recréé rebranché (attentes, checkouts)")
+
+
+def test_ring_buffer(engine):
+    telemetry.sample()   # remet l'intervalle à zéro
+    conns = [engine.connect() for _ in range(2)]
+    for c in conns:
+        c.close()
+    point = telemetry.sample()
+    e = point["engines"][NAME]
+    assert e["peak_checked_out"] == 2 and e["checked_out"] == 0 and e["waits"] == 2, e
+    assert isinstance(point["tunnels"], list)
+
+    orig = telemetry._samples
+    telemetry._samples = deque(maxlen=5)
+    try:
+        for _ in range(12):
+            telemetry.sample()
+        assert len(telemetry.history()) == 5 and len(telemetry.history(limit=2)) == 2
+        assert telemetry.history(since_s=3600) == telemetry.history()
+    finally:
+        telemetry._samples = orig
+    logger.info("✅ ring buffer: pic de connexions sur l'intervalle, taille bornée")
+
+
+def test_endpoint_and_cli():
+    app = Flask(__name__)
+    app.register_blueprint(debug_bp)
+    os.environ["ROUTES_TOKEN"] = TOKEN
+    client = app.test_client()
+    assert client.get("/_pool").status_code == 401
+    resp = client.get("/_pool?history=-1", headers={"X-Admin-Token": TOKEN})
+    body = resp.get_json()
+    assert resp.status_code == 200 and NAME in body["engines"] and body["history"], body.keys()
+
+    server = make_server("127.0.0.1", 0, app)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/_pool"
+    try:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            assert telemetry.main(["--url", url, "--token", TOKEN, "status"]) == 0
+            assert telemetry.main(["--url", url, "--token", TOKEN, "history", "--limit", "3"]) == 0
+            assert telemetry.main(["--url", url, "--token", TOKEN, "--json", "status"]) == 0
+    finally:
+        server.shutdown()
+    text_out = out.getvalue()
+    assert NAME in text_out and "attente:" in text_out and "peak out" in text_out, text_out
+    json.loads(text_out[text_out.index("{"):])
+    logger.info("✅ /_pool protégé par jeton, CLI status/history\n%s", text_out[:text_out.index("{")])
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'pool.sqlite')}", future=True, poolclass=QueuePool,
+                               pool_size=2, max_overflow=1, pool_timeout=0.3, pool_pre_ping=True)
+        telemetry.attach(engine, NAME)
+        telemetry.stop_sampler()   # échantillons pris à la main
+        try:
+            test_saturation(engine)
+            test_invalidation_and_preping(engine)
+            test_dispose_keeps_timing(engine)
+            test_reset_engine_reattach(tmp)
+            test_ring_buffer(engine)
+            test_endpoint_and_cli()
+        except Exception:
+            logger.exception("❌ Test télémétrie pool KO")
+            raise
+        finally:
+            telemetry.detach(NAME)
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
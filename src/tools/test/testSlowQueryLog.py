@@ -0,0 +1,116 @@
+"""
+Test du journal des requêtes lentes (tools.slow_query_log).
+
+Engine SQLite jetable, SLOW_QUERY_MS=0 (tout est journalisé):
+  - les lignes stockées gardent la FORME des paramètres, jamais leurs valeurs
+  - top(): tri par temps total, p95 au rang le plus proche
+  - le store est purgé à max_rows (les plus récentes restent)
+  - une requête en erreur ne laisse pas de départ sur la connexion
+Pas d'EXPLAIN (MySQL seulement).
+
+  python tools/test/testSlowQueryLog.py
+"""
+import sys, os
+import json
+import time
+import tempfile
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+_TMP = tempfile.TemporaryDirectory()
+# lus à l'import du module
+os.environ["SLOW_QUERY_MS"] = "0"
+os.environ["SLOW_QUERY_DB"] = os.path.join(_TMP.name, "slow.sqlite")
+
+from sqlalchemy import create_engine, text
+
+from tools.logger import setup_logger
+import tools.slow_query_log as slow
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+SECRET = "gAAAAABsecret-fernet-token=="
+
+
+def test_params_shape_only(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE people (id INTEGER PRIMARY KEY, token TEXT)"))
+        conn.execute(text("INSERT INTO people (id, token) VALUES (:id, :tok)"), {"id": 4242, "tok": SECRET})
+        conn.execute(text("SELECT id FROM people WHERE token = :tok"), {"tok": SECRET})
+    with slow.get_store()._lock:
+        rows = slow.get_store()._db().execute("SELECT statement, params, caller FROM slow_queries").fetchall()
+    inserts = [r for r in rows if r[0].startswith("INSERT INTO people")]
+    assert len(inserts) == 1, rows
+    params = json.loads(inserts[0][1])
+    assert params == ["int", f"str[{len(SECRET)}]"], params      # qmark sous SQLite: liste positionnelle
+    for statement, params, caller in rows:
+        assert SECRET not in statement + params and "4242" not in statement + params, (statement, params)
+    assert all("testSlowQueryLog.py" in r[2] for r in inserts), inserts
+    logger.info("✅ %d lignes: forme des paramètres seulement (%s)", len(rows), inserts[0][1])
+
+
+def test_top(tmp):
+    store = slow.SlowQueryStore(os.path.join(tmp, "top.sqlite"), max_rows=1000)
+    common = dict(rowcount=1, params=[], caller="test", db="test")
+    for d in range(1, 21):                                       # 20 durées: p95 = 19e valeur
+        store.add(fp="many", statement="SELECT a", duration_ms=float(d), **common)
+    store.add(fp="one", statement="SELECT b", duration_ms=150.0, **common)
+    for d in (40.0, 60.0):
+        store.add(fp="two", statement="SELECT c", duration_ms=d, **common)
+
+    top = store.top(by="total")
+    assert [g["fingerprint"] for g in top] == ["many", "one", "two"], top
+    many = top[0]
+    assert many["count"] == 20 and many["total_ms"] == 210.0, many
+    assert many["p95_ms"] == 19.0 and many["max_ms"] == 20.0, many
+    assert top[1]["p95_ms"] == 150.0 and top[2]["p95_ms"] == 60.0, top
+    assert [g["fingerprint"] for g in store.top(by="p95")] == ["one", "two", "many"]
+    assert [g["fingerprint"] for g in store.top(by="count", limit=1)] == ["many"]
+    logger.info("✅ top: tri par total, p95 = %.1f ms sur 20 mesures", many["p95_ms"])
+
+
+def test_prune(tmp):
+    store = slow.SlowQueryStore(os.path.join(tmp, "prune.sqlite"), max_rows=30)
+    for i in range(200):
+        store.add(fp=f"fp{i}", statement="SELECT ?", duration_ms=1.0, rowcount=1, params=[], caller="test", db="test")
+    with store._lock:
+        kept = [r[0] for r in store._db().execute("SELECT fingerprint FROM slow_queries ORDER BY id").fetchall()]
+    assert kept == [f"fp{i}" for i in range(170, 200)], kept
+    logger.info("✅ purge: %d lignes gardées sur 200 (les plus récentes)", len(kept))
+
+
+def test_failed_statement(engine):
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("SELECT nope FROM missing_table"))
+        except Exception:
+            pass
+        conn.execute(text("SELECT 1"))
+        assert not any("start" in str(k) for k in conn.info), dict(conn.info)
+    logger.info("✅ requête en erreur: aucun départ orphelin sur la connexion")
+
+
+def main():
+    start = time.time()
+    engine = create_engine(f"sqlite:///{os.path.join(_TMP.name, 'app.sqlite')}", future=True)
+    slow.attach(engine)
+    try:
+        test_params_shape_only(engine)
+        test_top(_TMP.name)
+        test_prune(_TMP.name)
+        test_failed_statement(engine)
+    except Exception:
+        logger.exception("❌ Test journal des requêtes lentes KO")
+        raise
+    finally:
+        engine.dispose()
+        _TMP.cleanup()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
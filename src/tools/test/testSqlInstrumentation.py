@@ -0,0 +1,140 @@
+"""
+Test de l'instrumentation SQL par requête (tools.sql_instrumentation).
+
+Petite appli Flask + SQLite en mémoire: vérifie le comptage, l'en-tête
+Server-Timing, la détection N+1 et le temps DB après une requête en erreur.
+Aucun accès MySQL.
+
+  python tools/test/testSqlInstrumentation.py
+"""
+import sys, os
+import time
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from tools.logger import setup_logger
+import tools.sql_instrumentation as instr
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+
+def _make_app():
+    engine = create_engine("sqlite://", future=True, poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    instr.instrument_engine(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE people (id INTEGER PRIMARY KEY, city TEXT)"))
+        conn.execute(text("INSERT INTO people VALUES (1,'Paris'),(2,'Lyon'),(3,'Lille'),(4,'Nice'),(5,'Metz'),(6,'Pau'),(7,'Caen')"))
+
+    app = Flask(__name__)
+    instr.init_app(app)
+
+    @app.get("/bulk")
+    def bulk():
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT id, city FROM people")).fetchall()
+        return jsonify(len(rows))
+
+    @app.get("/n_plus_one")
+    def n_plus_one():
+        with engine.connect() as conn:
+            ids = [r[0] for r in conn.execute(text("SELECT id FROM people")).fetchall()]
+            cities = [conn.execute(text("SELECT city FROM people WHERE id = :id"), {"id": i}).scalar() for i in ids]
+        return jsonify(cities)
+
+    @app.get("/failing")
+    def failing():
+        with engine.connect() as conn:
+            try:
+                conn.execute(text("SELECT nope FROM missing_table"))
+            except Exception:
+                pass
+            conn.execute(text("SELECT 1"))
+        return jsonify("ok")
+
+    return app, engine
+
+
+def test_normalize_sql():
+    a = instr.normalize_sql("SELECT * FROM T_People_Public WHERE id = 12 AND city = 'Paris'")
+    b = instr.normalize_sql("SELECT *   FROM T_People_Public\n WHERE id = 7 AND city = 'Lyon'")
+    assert a == b == "SELECT * FROM T_People_Public WHERE id = ? AND city = ?", a
+    c = instr.normalize_sql("SELECT 1 FROM t WHERE id IN (%s, %s, %s)")
+    d = instr.normalize_sql("SELECT 1 FROM t WHERE id IN (%s)")
+    assert c == d, (c, d)
+    logger.info("✅ normalisation des requêtes OK")
+
+
+def test_request_headers(app):
+    client = app.test_client()
+    resp = client.get("/bulk")
+    timing = resp.headers.get("Server-Timing", "")
+    assert 'desc="1 queries"' in timing, timing
+    # rows = cursor.rowcount: lignes lues avec pymysql (curseur bufferisé), -1 -> 0 sous SQLite
+    assert "db-rows;desc=" in timing, timing
+    assert "app;dur=" in timing, timing
+    logger.info("✅ Server-Timing: %s", timing)
+
+
+def test_n_plus_one_detection(app):
+    client = app.test_client()
+    warnings = []
+    orig = instr.logger.warning
+    instr.logger.warning = lambda msg, *args: warnings.append(msg % args)
+    try:
+        resp = client.get("/n_plus_one")
+    finally:
+        instr.logger.warning = orig
+    timing = resp.headers["Server-Timing"]
+    assert 'desc="8 queries"' in timing, timing
+    assert len(warnings) == 1 and "7x" in warnings[0], warnings
+    logger.info("✅ N+1 détecté: %s", warnings[0])
+
+
+def test_failed_statement_leaves_no_start(app, engine):
+    with app.test_request_context():
+        stats = instr.start_request("GET /failing")
+        try:
+            app.view_functions["failing"]()
+        finally:
+            instr.finish_request()
+    # la requête en erreur n'est pas comptée et ne laisse rien sur la connexion (poolée)
+    assert stats.queries == 1, stats.queries
+    with engine.connect() as conn:
+        assert not any("start" in str(k) for k in conn.info), dict(conn.info)
+    logger.info("✅ requête en erreur: aucun départ orphelin sur la connexion")
+
+
+def test_outside_request_is_noop(engine):
+    assert instr.current_stats() is None
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert instr.current_stats() is None
+    logger.info("✅ hors requête HTTP: aucune collecte")
+
+
+def main():
+    start = time.time()
+    app, engine = _make_app()
+    try:
+        test_normalize_sql()
+        test_request_headers(app)
+        test_n_plus_one_detection(app)
+        test_failed_statement_leaves_no_start(app, engine)
+        test_outside_request_is_noop(engine)
+    except Exception:
+        logger.exception("❌ Test instrumentation SQL KO")
+        raise
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
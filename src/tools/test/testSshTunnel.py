@@ -0,0 +1,142 @@
+"""
+Test du superviseur de tunnel SSH (tools.ssh_tunnel) contre un sshd LOCAL (loopback).
+
+Pré-requis: un sshd qui écoute sur 127.0.0.1 et accepte l'utilisateur de test.
+  SSH_TEST_HOST=127.0.0.1:22 SSH_TEST_USER=moi SSH_TEST_PASSWORD=xxx \
+  python tools/test/testSshTunnel.py
+
+Un petit serveur "echo" TCP sur loopback sert de destination distante.
+"""
+import sys, os
+import time
+import socket
+import threading
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from tools.logger import setup_logger
+from tools.ssh_tunnel import TunnelSupervisor
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+SSH_HOST = os.environ.get("SSH_TEST_HOST", "127.0.0.1")
+SSH_USER = os.environ.get("SSH_TEST_USER", os.environ.get("USER", ""))
+SSH_PASS = os.environ.get("SSH_TEST_PASSWORD", "")
+
+
+def _start_echo_server() -> tuple[socket.socket, int]:
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(16)
+
+    def _serve():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            def _echo(c):
+                with c:
+                    while True:
+                        data = c.recv(1024)
+                        if not data:
+                            return
+                        c.sendall(data)
+            threading.Thread(target=_echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=_serve, daemon=True).start()
+    return srv, srv.getsockname()[1]
+
+
+def _roundtrip(port: int, payload: bytes = b"ping") -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as c:
+        c.sendall(payload)
+        return c.recv(1024)
+
+
+def test_lazy_start(sup: TunnelSupervisor):
+    assert sup.state()["status"] == "idle", sup.state()
+    assert sup.state()["reconnect_count"] == 0
+    port = sup.ensure()
+    assert port == sup.port
+    assert sup.state()["status"] == "up", sup.state()
+    logger.info("✅ démarrage paresseux OK (port %d)", port)
+
+
+def test_roundtrip(sup: TunnelSupervisor):
+    assert _roundtrip(sup.ensure()) == b"ping"
+    logger.info("✅ aller-retour via le tunnel OK")
+
+
+def test_rebuild_after_drop(sup: TunnelSupervisor):
+    port_before = sup.port
+    # Simule une coupure réseau: le transport SSH meurt sous nos pieds
+    sup._forwarder.stop()
+    assert not sup.is_healthy()
+
+    # Un appelant "en vol" passe par ensure() et ne doit pas échouer
+    results = []
+    def _caller():
+        results.append(_roundtrip(sup.ensure(), b"in-flight"))
+    t = threading.Thread(target=_caller)
+    t.start()
+    sup.probe()
+    t.join(timeout=30)
+
+    assert results == [b"in-flight"], results
+    assert sup.port == port_before, "le port local doit rester stable"
+    assert sup.state()["reconnect_count"] >= 1, sup.state()
+    assert sup.state()["status"] == "up"
+    logger.info("✅ reconstruction après coupure OK: %s", sup.state())
+
+
+def test_background_probe(sup: TunnelSupervisor):
+    count = sup.reconnect_count
+    sup._forwarder.stop()
+    deadline = time.time() + 10 * sup.probe_interval
+    while time.time() < deadline and sup.reconnect_count == count:
+        time.sleep(0.2)
+    assert sup.reconnect_count == count + 1, sup.state()
+    assert _roundtrip(sup.port) == b"ping"
+    logger.info("✅ sonde périodique: tunnel reconstruit automatiquement")
+
+
+def test_failure_is_reported():
+    bad = TunnelSupervisor(SSH_HOST, SSH_USER, "mauvais-mot-de-passe", "127.0.0.1", 9, probe_interval=0)
+    try:
+        bad.ensure()
+        raise AssertionError("ensure() aurait dû échouer")
+    except AssertionError:
+        raise
+    except Exception:
+        pass
+    assert bad.state()["last_error"], bad.state()
+    logger.info("✅ erreur d'ouverture exposée dans state(): %s", bad.state()["last_error"])
+
+
+def main():
+    start = time.time()
+    srv, echo_port = _start_echo_server()
+    sup = TunnelSupervisor(SSH_HOST, SSH_USER, SSH_PASS, "127.0.0.1", echo_port, probe_interval=1.0)
+    try:
+        test_lazy_start(sup)
+        test_roundtrip(sup)
+        test_rebuild_after_drop(sup)
+        test_background_probe(sup)
+        test_failure_is_reported()
+    except Exception:
+        logger.exception("❌ Test tunnel SSH KO")
+        raise
+    finally:
+        sup.stop()
+        srv.close()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Test de la publication "zéro coupure" de export_Table (tools.staged_publish).
+
+Base SQLite jetable en WAL (pas besoin de MySQL): l'engine poolé de utilsTools
+et celui de app/common/db_read.py pointent dessus le temps du test.
+
+Pendant que export_Table recharge la table plusieurs fois, des threads martèlent
+la route de lecture (_read_table_as_json) et on vérifie:
+  - zéro réponse en erreur, zéro réponse vide
+  - chaque réponse vient d'UNE génération (jamais un mélange)
+Puis: rollback vers la génération précédente, et échec en plein chargement
+(la table live ne bouge pas, la table fantôme est nettoyée).
+
+  python tools/test/testStagedPublish.py
+"""
+import sys, os
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import pandas as pd
+from flask import Flask
+from sqlalchemy import create_engine, event, inspect, text
+
+from tools.logger import setup_logger
+import tools.utilsTools as utils
+import tools.staged_publish as staged
+import app.common.db_read as db_read
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+TABLE = "T_MapTest_English"
+SCRIPT = "createMapTest.sql"
+# DDL façon src/SQLScript/<Pays>/ (AUTOINCREMENT SQLite au lieu de AUTO_INCREMENT)
+DDL = f"""CREATE TABLE {TABLE} (
+    indexation INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INT NOT NULL UNIQUE,
+    generation VARCHAR(16) NOT NULL,
+    country VARCHAR(64) NOT NULL
+);"""
+ROWS = 3000
+READERS = 4
+
+
+class _Reader:
+    def __init__(self, generation: str, rows: int = ROWS):
+        self.generation, self.rows = generation, rows
+
+    def readData(self):
+        return pd.DataFrame({
+            "id": range(1, self.rows + 1),
+            "generation": [self.generation] * self.rows,
+            "country": ["France"] * self.rows,
+        })
+
+
+class _Patched:
+    """Redirige utilsTools (export) et db_read (API) vers l'engine SQLite, SQL_DIR vers le script de test."""
+
+    def __init__(self, engine, sql_dir):
+        self.engine, self.sql_dir = engine, sql_dir
+
+    def __enter__(self):
+        self._orig = (utils._get_engine, utils.SQL_DIR, db_read._read_engine, db_read.load_db_config)
+        utils._get_engine = lambda **kw: ("sqlite_test", self.engine)
+        utils.SQL_DIR = self.sql_dir
+        db_read._read_engine = lambda cfg: self.engine
+        db_read.load_db_config = lambda: {}
+        return self
+
+    def __exit__(self, *exc):
+        utils._get_engine, utils.SQL_DIR, db_read._read_engine, db_read.load_db_config = self._orig
+
+
+def _make_engine(path: str):
+    engine = create_engine(
+        f"sqlite:///{path}", future=True,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _wal(dbapi_conn, _):
+        dbapi_conn.execute("PRAGMA journal_mode=WAL")
+
+    return engine
+
+
+def _make_app():
+    app = Flask(__name__)
+
+    @app.get("/map")
+    def _map():
+        return db_read._read_table_as_json(TABLE, decrypt=False)
+
+    return app
+
+
+def _generations(engine) -> set:
+    with engine.connect() as conn:
+        return {r[0] for r in conn.execute(text(f"SELECT DISTINCT generation FROM {TABLE}"))}
+
+
+class _Hammer:
+    """Threads qui lisent la route en boucle et comptent les réponses KO."""
+
+    def __init__(self, app):
+        self.app = app
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.ok = self.errors = self.empty = self.mixed = 0
+        self.samples = []
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(READERS)]
+
+    def _run(self):
+        client = self.app.test_client()
+        while not self.stop.is_set():
+            try:
+                resp = client.get("/map")
+                status, body = resp.status_code, resp.get_data()
+                records = json.loads(body) if status == 200 else None
+            except Exception as e:
+                status, records = None, None
+                with self.lock:
+                    self.samples.append(repr(e))
+            with self.lock:
+                if status != 200:
+                    self.errors += 1
+                elif not records:
+                    self.empty += 1
+                elif len({r["generation"] for r in records}) != 1 or len(records) != ROWS:
+                    self.mixed += 1
+                else:
+                    self.ok += 1
+
+    def __enter__(self):
+        for t in self.threads:
+            t.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        for t in self.threads:
+            t.join(timeout=60)
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_first_load(engine):
+    utils.export_Table(TABLE, SCRIPT, _Reader("g0"), encrypt=False)
+    assert _generations(engine) == {"g0"}
+    names = set(inspect(engine).get_table_names())
+    assert staged.staging_name(TABLE) not in names and staged.previous_name(TABLE) not in names, names
+    logger.info("✅ premier export: table publiée sans génération précédente")
+
+
+def test_reload_under_load(engine, app, reloads: int = 5):
+    with _Hammer(app) as hammer:
+        time.sleep(0.2)
+        for i in range(1, reloads + 1):
+            utils.export_Table(TABLE, SCRIPT, _Reader(f"g{i}"), encrypt=False)
+        time.sleep(0.2)
+    assert hammer.ok > 0, "aucune lecture n'a abouti"
+    assert hammer.errors == 0 and hammer.empty == 0 and hammer.mixed == 0, (
+        f"erreurs={hammer.errors} vides={hammer.empty} mélangées={hammer.mixed} {hammer.samples[:3]}"
+    )
+    assert _generations(engine) == {f"g{reloads}"}
+    logger.info("✅ %d rechargements sous %d lecteurs: %d réponses, 0 erreur, 0 vide", reloads, READERS, hammer.ok)
+
+
+def test_rollback(engine):
+    live = _generations(engine)
+    with engine.connect() as conn:
+        prev = {r[0] for r in conn.execute(text(f"SELECT DISTINCT generation FROM {staged.previous_name(TABLE)}"))}
+    utils.rollback_table(TABLE)
+    assert _generations(engine) == prev, (_generations(engine), prev)
+    utils.rollback_table(TABLE)
+    assert _generations(engine) == live
+    logger.info("✅ rollback: %s republiée, puis retour à %s", prev, live)
+
+
+def test_failed_load_keeps_live(engine):
+    live = _generations(engine)
+    orig = utils._bulk_insert_data
+
+    def _boom(df, table_name, **kw):
+        orig(df.head(10), table_name, **kw)
+        raise RuntimeError("crash simulé pendant le chargement")
+
+    utils._bulk_insert_data = _boom
+    try:
+        utils.export_Table(TABLE, SCRIPT, _Reader("broken"), encrypt=False)
+        raise AssertionError("export_Table aurait dû échouer")
+    except RuntimeError:
+        pass
+    finally:
+        utils._bulk_insert_data = orig
+    assert _generations(engine) == live
+    assert staged.staging_name(TABLE) not in inspect(engine).get_table_names()
+    logger.info("✅ échec en plein chargement: table live intacte, table fantôme supprimée")
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, SCRIPT).write_text(DDL, encoding="utf-8")
+        engine = _make_engine(os.path.join(tmp, "staged.sqlite"))
+        app = _make_app()
+        try:
+            with _Patched(engine, tmp):
+                test_first_load(engine)
+                test_reload_under_load(engine, app)
+                test_rollback(engine)
+                test_failed_load_keeps_live(engine)
+        except Exception:
+            logger.exception("❌ Test publication staged KO")
+            raise
+        finally:
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
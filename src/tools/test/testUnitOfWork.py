@@ -0,0 +1,199 @@
+"""
+Test d'atomicité de l'unité de travail (tools.unit_of_work) et de deleteDataById.
+
+Base SQLite jetable (pas besoin de MySQL): l'engine poolé de utilsTools est
+remplacé le temps du test. On "tue" l'opération au milieu de deux façons:
+  - une exception injectée avant la N-ième requête
+  - un SIGKILL du process en pleine transaction (sous-process)
+et on vérifie qu'aucune ligne n'a bougé.
+
+  python tools/test/testUnitOfWork.py
+"""
+import sys, os
+import time
+import signal
+import tempfile
+import subprocess
+from pathlib import Path
+# met le *parent* du script (souvent .../src) dans sys.path
+SRC_DIR = Path(__file__).resolve().parents[2]  # .../src
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from sqlalchemy import create_engine, event, text
+
+from tools.logger import setup_logger
+import tools.utilsTools as utils
+import tools.unit_of_work as uow_mod
+from tools.unit_of_work import unit_of_work
+
+# Set up logger
+logger = setup_logger(debug=False)
+
+SCHEMA = [
+    "CREATE TABLE T_People_Public (id INTEGER PRIMARY KEY, pseudo TEXT, is_info INTEGER)",
+    "CREATE TABLE T_People_Identity (person_id INTEGER PRIMARY KEY, firstname TEXT)",
+    "CREATE TABLE T_Conversation (id INTEGER PRIMARY KEY, is_group INTEGER)",
+    "CREATE TABLE T_Conversation_Member (conversation_id INTEGER, people_public_id INTEGER)",
+    "CREATE TABLE T_Message (id INTEGER PRIMARY KEY, conversation_id INTEGER, sender_people_id INTEGER)",
+    # équivalent SQLite de SQL/createPeopleBlindIndex.sql (créé au déploiement)
+    """CREATE TABLE T_People_BlindIndex (person_id INTEGER NOT NULL, column_name TEXT NOT NULL,
+       bidx TEXT NOT NULL, version TEXT NOT NULL, PRIMARY KEY (person_id, column_name))""",
+]
+SEED = [
+    "INSERT INTO T_People_Public VALUES (1, 'Alice A.', 0), (2, 'Bob B.', 0)",
+    "INSERT INTO T_People_Identity VALUES (1, 'enc-alice'), (2, 'enc-bob')",
+    "INSERT INTO T_Conversation VALUES (10, 0)",
+    "INSERT INTO T_Conversation_Member VALUES (10, 1), (10, 2)",
+    "INSERT INTO T_Message VALUES (100, 10, 1), (101, 10, 2)",
+]
+TABLES = ["T_People_Public", "T_People_Identity", "T_Conversation", "T_Conversation_Member", "T_Message"]
+
+
+def _make_db(path: str):
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    with engine.begin() as conn:
+        for stmt in SCHEMA + SEED:
+            conn.execute(text(stmt))
+    return engine
+
+
+def _snapshot(engine) -> dict:
+    with engine.connect() as conn:
+        return {t: conn.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar() for t in TABLES}
+
+
+class _Patched:
+    """Redirige _get_engine (utilsTools + unit_of_work) vers l'engine SQLite."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __enter__(self):
+        self._orig = (utils._get_engine, uow_mod._get_engine)
+        fake = lambda **kw: ("sqlite_test", self.engine)
+        utils._get_engine = uow_mod._get_engine = fake
+        return self
+
+    def __exit__(self, *exc):
+        utils._get_engine, uow_mod._get_engine = self._orig
+
+
+class _KillAfter:
+    """Lève une exception avant la n-ième requête DELETE et les suivantes (y compris quand l'unité est rejouée)."""
+
+    def __init__(self, engine, n: int):
+        self.engine, self.n, self.seen = engine, n, 0
+
+    def _hook(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("DELETE"):
+            self.seen += 1
+            if self.seen >= self.n:
+                raise RuntimeError(f"crash simulé avant le DELETE n°{self.n}")
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._hook)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._hook)
+
+
+# -----------------------------
+#  Tests
+# -----------------------------
+def test_commit_and_rollback(engine):
+    before = _snapshot(engine)
+    try:
+        with unit_of_work(engine=engine) as uow:
+            uow.execute("DELETE FROM T_Message WHERE sender_people_id = :id", {"id": 1})
+            uow.execute("DELETE FROM T_People_Identity WHERE person_id = :id", {"id": 1})
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert _snapshot(engine) == before, "le ROLLBACK doit tout annuler"
+
+    with unit_of_work(engine=engine) as uow:
+        uow.execute("UPDATE T_People_Public SET is_info = 1 WHERE id = 2")
+        assert uow.execute("SELECT is_info FROM T_People_Public WHERE id = 2", scalar=True) == 1
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT is_info FROM T_People_Public WHERE id = 2")).scalar() == 1
+    logger.info("✅ COMMIT en sortie normale, ROLLBACK complet sur exception")
+
+
+def test_savepoint(engine):
+    with unit_of_work(engine=engine) as uow:
+        uow.execute("UPDATE T_People_Public SET pseudo = 'keep' WHERE id = 2")
+        try:
+            with uow.savepoint():
+                uow.execute("UPDATE T_People_Public SET pseudo = 'lost' WHERE id = 2")
+                raise ValueError("échec local")
+        except ValueError:
+            pass
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT pseudo FROM T_People_Public WHERE id = 2")).scalar() == "keep"
+    logger.info("✅ savepoint: seul le bloc en échec est annulé")
+
+
+def test_delete_killed_midway(engine):
+    from angelmanSyndromeConnexion.peopleDelete import deleteDataById
+    before = _snapshot(engine)
+    for n in (1, 2, 3, 4):
+        with _Patched(engine), _KillAfter(engine, n):
+            try:
+                deleteDataById(1)
+                raise AssertionError("deleteDataById aurait dû échouer")
+            except RuntimeError:
+                pass
+        assert _snapshot(engine) == before, f"lignes orphelines après crash au DELETE n°{n}: {_snapshot(engine)}"
+    logger.info("✅ deleteDataById interrompu à chaque étape: aucune ligne modifiée")
+
+    with _Patched(engine):
+        assert deleteDataById(1) == 1
+        assert deleteDataById(1) == 0
+    after = _snapshot(engine)
+    assert after["T_People_Public"] == 1 and after["T_People_Identity"] == 1
+    assert after["T_Conversation"] == 0, "la conversation 1-1 orpheline doit partir"
+    logger.info("✅ deleteDataById complet: %s", after)
+
+
+def _child_killed_in_transaction(path: str):
+    """Sous-process: supprime une partie des lignes puis se fait SIGKILL avant le COMMIT."""
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    with unit_of_work(engine=engine) as uow:
+        uow.execute("DELETE FROM T_Message WHERE sender_people_id = 2")
+        uow.execute("DELETE FROM T_People_Identity WHERE person_id = 2")
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_process_killed(path: str, engine):
+    before = _snapshot(engine)
+    proc = subprocess.run([sys.executable, __file__, "--child", path], timeout=60)
+    assert proc.returncode == -signal.SIGKILL, proc.returncode
+    assert _snapshot(engine) == before, _snapshot(engine)
+    logger.info("✅ process tué en pleine transaction: aucune ligne modifiée")
+
+
+def main():
+    start = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "uow.sqlite")
+        engine = _make_db(path)
+        try:
+            test_commit_and_rollback(engine)
+            test_savepoint(engine)
+            test_process_killed(path, engine)
+            test_delete_killed_midway(engine)
+        except Exception:
+            logger.exception("❌ Test unité de travail KO")
+            raise
+        finally:
+            engine.dispose()
+    logger.info("Execution time: %.2fs", time.time() - start)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        _child_killed_in_transaction(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,110 @@
+# tools/unit_of_work.py
+"""
+Unité de travail: UNE connexion épinglée pour toute une opération multi-requêtes.
+
+Avant: START TRANSACTION / DELETE... / COMMIT passaient par des _run_query
+séparés -> chaque appel prenait sa propre connexion du pool, donc rien n'était
+transactionnel (un crash au milieu laissait des lignes identity/public orphelines).
+
+Ici:
+    from tools.unit_of_work import unit_of_work
+
+    with unit_of_work(bAngelmanResult=False) as uow:
+        uow.execute("DELETE FROM T_Message WHERE sender_people_id = :id", {"id": pid})
+        with uow.savepoint():          # échec local -> rollback au savepoint seulement
+            uow.execute(...)
+        uow.execute(...)
+    # sortie normale -> COMMIT ; exception -> ROLLBACK de tout
+
+run_in_unit_of_work(worker) rejoue l'unité ENTIÈRE (jamais une requête isolée)
+selon la politique de tools.db_retry (deadlock, perte de connexion...).
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from tools.logger import setup_logger
+from tools.utilsTools import _get_engine, _retry_hook
+from tools.db_retry import RetryPolicy, run_with_retry
+
+logger = setup_logger(debug=False)
+
+T = TypeVar("T")
+
+
+class UnitOfWork:
+    """Accès SQL sur la connexion épinglée (même transaction pour tous les appels)."""
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self.statements = 0
+
+    def execute(self, query, params: dict | None = None, *, return_result: bool = False, scalar: bool = False):
+        """
+        Même contrat que utilsTools._run_query, mais sur la connexion de l'unité:
+        - return_result=True -> fetchall()
+        - scalar=True -> scalar_one_or_none()
+        - sinon -> le CursorResult (rowcount, lastrowid...)
+        """
+        stmt = text(query) if isinstance(query, str) else query
+        res = self.conn.execute(stmt, params or {})
+        self.statements += 1
+        if scalar:
+            return res.scalar_one_or_none()
+        if return_result:
+            return res.fetchall()
+        return res
+
+    @contextmanager
+    def savepoint(self) -> Iterator["UnitOfWork"]:
+        """SAVEPOINT: une exception dans le bloc annule le bloc seulement, puis est relancée."""
+        with self.conn.begin_nested():
+            yield self
+
+
+@contextmanager
+def unit_of_work(*, bAngelmanResult: bool = True, asconnect_env=None, engine: Engine | None = None) -> Iterator[UnitOfWork]:
+    """
+    Ouvre une transaction sur UNE connexion du pool de la base cible.
+    COMMIT à la sortie normale du bloc, ROLLBACK sur toute exception (relancée).
+    - engine: force un engine (tests); sinon l'engine poolé de utilsTools._get_engine
+    """
+    if engine is None:
+        _, engine = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        uow = UnitOfWork(conn)
+        try:
+            yield uow
+        except BaseException:
+            if trans.is_active:
+                trans.rollback()
+            logger.warning("Unit of work rolled back after %d statement(s).", uow.statements)
+            raise
+        trans.commit()
+
+
+def run_in_unit_of_work(
+    worker_fn: Callable[[UnitOfWork], T],
+    *,
+    bAngelmanResult: bool = True,
+    asconnect_env=None,
+    retry_policy: RetryPolicy | None = None,
+    label: str = "Unit of work",
+) -> T:
+    """
+    Exécute worker_fn(uow) dans une unité de travail, rejouée en bloc en cas d'erreur transitoire.
+    worker_fn doit être rejouable (tout ce qu'il écrit est annulé par le ROLLBACK).
+    """
+    key, _ = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
+
+    def _attempt():
+        with unit_of_work(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env) as uow:
+            return worker_fn(uow)
+
+    return run_with_retry(_attempt, policy=retry_policy, on_error=_retry_hook(key), label=label)
@@ -5,13 +5,23 @@ import smtplib
 import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
-from sshtunnel import SSHTunnelForwarder
 from configparser import ConfigParser
 from email.message import EmailMessage
 from datetime import datetime
 import logging
 from tools.logger import setup_logger
-from tools.crypto_utils import encrypt_dataframe_auto
+from tools.crypto_utils import encrypt_dataframe, infer_crypto_spec
+from tools.db_pool import get_engine, dispose_engine
+from tools.ssh_tunnel import get_tunnel
+from tools.config_loader import load_parser, get_section, get_value
+from tools.db_retry import run_with_retry, is_connection_error
+from tools.bulk_load import bulk_load, DEFAULT_MODE as BULK_DEFAULT_MODE
+import tools.staged_publish as staged
+import tools.incremental_export as incr
+import tools.export_ledger as ledger
+import tools.drift_guard as drift
+import tools.crypto_spec_registry as spec_registry
+from tools.bulk_load import ColumnMismatch
 
 # ----- Logger -----
 logger = setup_logger(debug=True)
@@ -21,20 +31,20 @@ BASE_DIR = os.path.dirname(__file__)
 CONFIG_PATH = os.path.join(BASE_DIR, "../../angelman_viz_keys/Config2.ini")
 CONFIG_GMAIL_PATH = os.path.join(BASE_DIR, "../../angelman_viz_keys/Config4.ini")
 SQL_DIR = os.path.join(BASE_DIR, "../SQLScript")
+# Publication des exports: "staged" (table fantôme + RENAME atomique), "inplace" (DROP/CREATE/INSERT)
+# ou "incremental" (seules les lignes ajoutées/modifiées/supprimées, repli sur "staged")
+PUBLISH_MODE = os.environ.get("EXPORT_PUBLISH_MODE", "staged").lower()
 # Détection du contexte (local vs PythonAnywhere)
 LOCAL_CONNEXION = not os.environ.get("PYTHONANYWHERE_DOMAIN", "").lower().startswith("eu.pythonanywhere")
 
 # ----- Config helpers -----
 def load_config(filepath: str) -> ConfigParser:
-    config = ConfigParser()
-    if config.read(filepath):
-        return config
-    raise FileNotFoundError(f"Config file not found: {filepath}")
-
-import os
+    # Parsé une fois puis mis en cache (invalidé si le fichier change), cf. tools.config_loader
+    return load_parser(filepath)
 
 def get_db_params(*, bAngelmanResult: bool = True, asconnect_env: str | None = None):
-    cfg = load_config(CONFIG_PATH)
+    ssh = get_section(CONFIG_PATH, "SSH")
+    mysql = get_section(CONFIG_PATH, "MySQL")
 
     # Par défaut, on lit une variable d'env (pratique en prod / PythonAnywhere)
     # Valeurs attendues : "prod" ou "test"
@@ -46,33 +56,33 @@ def get_db_params(*, bAngelmanResult: bool = True, asconnect_env: str | None = N
 
     # 1) AngelmanResult (True) : toujours prod
     if bAngelmanResult:
-        db_pass = cfg["MySQL"]["DB_PASSWORD"]
-        db_name = cfg["MySQL"]["DB_NAME"]
+        db_pass = mysql["DB_PASSWORD"]
+        db_name = mysql["DB_NAME"]
 
     # 2) ASConnect (False) : switch prod/test
     else:
         if (asconnect_env == "test") or (bForceTest):
             logger.info("BASE DE TEST")
-            db_pass = cfg["MySQL"]["DB_PASSWORDTESTAS"]
-            db_name = cfg["MySQL"]["DB_NAMETESTAS"]
+            db_pass = mysql["DB_PASSWORDTESTAS"]
+            db_name = mysql["DB_NAMETESTAS"]
         else:
             logger.info("BASE DE PROD")
-            db_pass = cfg["MySQL"]["DB_PASSWORDAS"]
-            db_name = cfg["MySQL"]["DB_NAMEAS"]
+            db_pass = mysql["DB_PASSWORDAS"]
+            db_name = mysql["DB_NAMEAS"]
 
     return {
-        "ssh_host": cfg["SSH"]["SSH_HOST"],
-        "ssh_user": cfg["SSH"]["SSH_USERNAME"],
-        "ssh_pass": cfg["SSH"]["SSH_PASSWORD"],
-        "db_host":  cfg["MySQL"]["DB_HOST"],
-        "db_user":  cfg["MySQL"]["DB_USERNAME"],
+        "ssh_host": ssh["SSH_HOST"],
+        "ssh_user": ssh["SSH_USERNAME"],
+        "ssh_pass": ssh["SSH_PASSWORD"],
+        "db_host":  mysql["DB_HOST"],
+        "db_user":  mysql["DB_USERNAME"],
         "db_pass":  db_pass,
         "db_name":  db_name,
     }
     
 # ----- Email -----
 def send_email_alert(title: str, message: str) -> None:
-    cfg = load_config(CONFIG_GMAIL_PATH)
+    gmail_password = get_value(CONFIG_GMAIL_PATH, "Gmail", "PASSWORD")
     msg = EmailMessage()
     msg["Subject"] = title
     msg["From"] = "fastfrancecontact@gmail.com"
@@ -82,7 +92,7 @@ def send_email_alert(title: str, message: str) -> None:
     try:
         with smtplib.SMTP("smtp.gmail.com", 587) as server:
             server.starttls()
-            server.login("fastfrancecontact", cfg['Gmail']['PASSWORD'])
+            server.login("fastfrancecontact", gmail_password)
             server.send_message(msg)
             logger.info("Email sent successfully.")
     except Exception as e:
@@ -94,121 +104,78 @@ def _build_db_url(params, local_port=None) -> str:
     port = local_port if local_port else 3306
     return f"mysql+pymysql://{params['db_user']}:{params['db_pass']}@{host}:{port}/{params['db_name']}"
 
-def _run_in_transaction_with_conn(worker_fn, *, max_retries=3, bAngelmanResult=True, asconnect_env=None):
-    """
-    Exécute worker_fn(conn) dans UNE transaction/connexion.
-    Retourne la valeur renvoyée par worker_fn.
-    """
-    cfg = get_db_params(bAngelmanResult=bAngelmanResult,asconnect_env=asconnect_env)
-
-    def _do(db_url: str):
-        engine = create_engine(db_url, pool_pre_ping=True, future=True)
-        try:
-            with engine.begin() as conn:
-                return worker_fn(conn)
-        finally:
-            engine.dispose()
+# ----- Engines poolés (registre process-wide) -----
+def _engine_key(cfg) -> str:
+    # Une entrée de registre par base cible (AngelmanResult / ASConnect prod / test)
+    return cfg["db_name"]
 
-    attempt = 0
-    while attempt < max_retries:
-        try:
-            if LOCAL_CONNEXION:
-                with SSHTunnelForwarder(
-                    (cfg["ssh_host"]),
-                    ssh_username=cfg["ssh_user"],
-                    ssh_password=cfg["ssh_pass"],
-                    remote_bind_address=(cfg["db_host"], 3306),
-                ) as tunnel:
-                    return _do(_build_db_url(cfg, tunnel.local_bind_port))
-            else:
-                return _do(_build_db_url(cfg))
-        except Exception as e:
-            attempt += 1
-            logger.error("[Attempt %d] Transaction (worker) failed: %s", attempt, e)
-            if attempt < max_retries:
-                logger.info("Retrying in 3 seconds...")
-                time.sleep(3)
-            else:
-                raise
-
-'''
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import make_url
-from sqlalchemy.exc import DBAPIError, OperationalError
+def _shared_tunnel(cfg):
+    """Superviseur du tunnel SSH partagé par tous les accès DB (cf. tools.ssh_tunnel)."""
+    return get_tunnel(cfg["ssh_host"], cfg["ssh_user"], cfg["ssh_pass"], cfg["db_host"], 3306)
 
-def _execute_sql(DATABASE_URL, query, *, return_result=False, scalar=False, params=None):
+def _get_engine(*, bAngelmanResult=True, asconnect_env=None, local_infile=False):
     """
-    Exécute une requête SQLAlchemy text() ou str.
-    - return_result=True -> fetchall()
-    - scalar=True -> scalar_one_or_none() (ou scalar())
+    Retourne (key, engine) pour la base cible.
+    L'engine est créé une seule fois par process puis partagé (pool de connexions).
+    - local_infile=True: engine dédié avec LOAD DATA LOCAL INFILE autorisé côté client (chargements en masse)
     """
-    url = make_url(DATABASE_URL)
-    safe_url = url._replace(password="***")  # masque le mdp dans les logs
-    logger.debug("Creating engine for %s (dialect=%s, driver=%s)",
-                 str(safe_url), url.get_backend_name(), url.get_driver_name())
-
-    # Ajustements utiles selon le dialecte
-    connect_args = {}
-    engine_kwargs = dict(pool_pre_ping=True, future=True)
-    if url.get_backend_name().startswith("sqlite"):
-        connect_args["check_same_thread"] = False
-        engine_kwargs.update(connect_args=connect_args)
-
-    engine = create_engine(DATABASE_URL, **engine_kwargs)
-
-    try:
-        # Préflight: ouvre une connexion brute et ping le serveur
-        with engine.connect() as conn:
-            logger.debug("Connected. Running preflight ping...")
-            try:
-                conn.exec_driver_sql("SELECT 1")
-            except Exception as ping_err:
-                logger.error("Preflight ping failed: %r", ping_err)
-                raise
+    cfg = get_db_params(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
+    key = _engine_key(cfg)
+    overrides = {}
+    if local_infile:
+        key += ":infile"
+        overrides = {"connect_args": {"local_infile": True}, "pool_size": 1, "max_overflow": 0}
+
+    if LOCAL_CONNEXION:
+        tunnel = _shared_tunnel(cfg)
+        engine = get_engine(key, lambda: _build_db_url(cfg, tunnel.port), **overrides)
+        tunnel.attach(engine)
+    else:
+        engine = get_engine(key, lambda: _build_db_url(cfg), **overrides)
+    return key, engine
+
+def _reset_engine(key: str) -> None:
+    """Jette l'engine après une erreur de connexion: reconstruit au prochain appel (le tunnel est supervisé à part)."""
+    dispose_engine(key)
+
+def _retry_hook(*keys: str):
+    """on_error pour run_with_retry: jette le(s) engine(s) si la connexion est en cause (pas sur un deadlock)."""
+    def _hook(e, error_class):
+        if is_connection_error(e):
+            for key in keys:
+                _reset_engine(key)
+    return _hook
+
+def _run_in_transaction_with_conn(worker_fn, *, max_retries=None, retry_policy=None, bAngelmanResult=True, asconnect_env=None):
+    """
+    Exécute worker_fn(conn) dans UNE transaction/connexion.
+    Retourne la valeur renvoyée par worker_fn.
+    Relances selon la classe d'erreur (cf. tools.db_retry); max_retries plafonne le nombre de tentatives.
+    """
+    key, _ = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
 
-        # Si ping OK, on peut ouvrir un begin() transactionnel
+    def _attempt():
+        _, engine = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
         with engine.begin() as conn:
-            logger.debug("Transaction opened.")
-            stmt = text(query) if isinstance(query, str) else query
-            res = conn.execute(stmt, params or {})
-            if scalar:
-                try:
-                    return res.scalar_one_or_none()
-                except Exception:
-                    return res.scalar()
-            if return_result:
-                return res.fetchall()
-            return None
-
-    except OperationalError as e:
-        # Erreurs réseau/auth/SSL/limites de connexions
-        logger.error("OperationalError on %s: %s | orig=%r", str(safe_url), e, getattr(e, "orig", None))
-        raise
-    except DBAPIError as e:
-        # Erreurs DBAPI génériques (driver)
-        logger.error("DBAPIError on %s: %s | orig=%r", str(safe_url), e, getattr(e, "orig", None))
-        raise
-    except Exception as e:
-        logger.error("Execution error on %s: %s", str(safe_url), e)
-        raise
-    finally:
-        try:
-            engine.dispose()
-            logger.debug("Database connection closed.")
-        except Exception as e:
-            logger.warning("Dispose failed: %r", e)
-'''
+            return worker_fn(conn)
+
+    return run_with_retry(
+        _attempt,
+        policy=retry_policy,
+        max_attempts=max_retries,
+        on_error=_retry_hook(key),
+        label="Transaction (worker)",
+    )
 
-def _execute_sql(DATABASE_URL, query, *, return_result=False, scalar=False, params=None):
+def _execute_sql(engine, query, *, return_result=False, scalar=False, params=None):
     """
-    Exécute une requête SQLAlchemy text() ou str.
+    Exécute une requête SQLAlchemy text() ou str sur une connexion du pool.
     - return_result=True -> fetchall()
     - scalar=True -> scalar_one_or_none() (ou scalar())
     """
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
     try:
         with engine.begin() as conn:
-            logger.debug("Connected to database.")
+            logger.debug("Connection checked out from pool.")
             stmt = text(query) if isinstance(query, str) else query
             res = conn.execute(stmt, params or {})
             if scalar:
@@ -223,13 +190,9 @@ def _execute_sql(DATABASE_URL, query, *, return_result=False, scalar=False, para
     except Exception as e:
         logger.error("Execution error: %s", e)
         raise
-    finally:
-        engine.dispose()
-        logger.debug("Database connection closed.")
 
 
-def _insert_df(DATABASE_URL, table_name, df, if_exists='replace'):
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
+def _insert_df(engine, table_name, df, if_exists='replace'):
     try:
         with engine.begin() as conn:
             df.to_sql(table_name, con=conn, if_exists=if_exists, index=False)
@@ -237,116 +200,304 @@ def _insert_df(DATABASE_URL, table_name, df, if_exists='replace'):
     except Exception as e:
         logger.error("Insert error: %s", e)
         raise
-    finally:
-        engine.dispose()
 
 # ----- Public helpers -----
-def _run_query(query, *, return_result=False, scalar=False, max_retries=3, params=None, bAngelmanResult=True, asconnect_env=None):
+def _run_query(query, *, return_result=False, scalar=False, max_retries=None, retry_policy=None, params=None, bAngelmanResult=True, asconnect_env=None):
     """
-    Exécute une requête avec gestion du tunnel SSH si nécessaire.
+    Exécute une requête via l'engine poolé de la base cible (tunnel SSH partagé si nécessaire).
     - params: dict des bind params
     - return_result: fetchall()
     - scalar: scalar()
+    - retry_policy: RetryPolicy (tools.db_retry); max_retries plafonne le nombre de tentatives
     """
-    cfg = get_db_params(bAngelmanResult=bAngelmanResult,asconnect_env=asconnect_env)
-    attempt = 0
-    while attempt < max_retries:
-        try:
-            if LOCAL_CONNEXION:
-                with SSHTunnelForwarder(
-                    (cfg["ssh_host"]),
-                    ssh_username=cfg["ssh_user"],
-                    ssh_password=cfg["ssh_pass"],
-                    remote_bind_address=(cfg["db_host"], 3306),
-                ) as tunnel:
-                    db_url = _build_db_url(cfg, tunnel.local_bind_port)
-                    return _execute_sql(db_url, query, return_result=return_result, scalar=scalar, params=params)
-            else:
-                db_url = _build_db_url(cfg)
-                return _execute_sql(db_url, query, return_result=return_result, scalar=scalar, params=params)
-        except Exception as e:
-            attempt += 1
-            logger.error("[Attempt %d] Query failed: %s", attempt, e)
-            if attempt < max_retries:
-                logger.info("Retrying in 3 seconds...")
-                time.sleep(3)
-            else:
-                raise
-
-def _insert_data(df, table_name, if_exists='replace',bAngelmanResult=True, asconnect_env=None):
-    cfg = get_db_params(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
-    max_retries = 3
-    attempt = 0
-    while attempt < max_retries:
-        try:
-            if LOCAL_CONNEXION:
-                with SSHTunnelForwarder(
-                    (cfg["ssh_host"]),
-                    ssh_username=cfg["ssh_user"],
-                    ssh_password=cfg["ssh_pass"],
-                    remote_bind_address=(cfg["db_host"], 3306),
-                ) as tunnel:
-                    db_url = _build_db_url(cfg, tunnel.local_bind_port)
-                    return _insert_df(db_url, table_name, df, if_exists)
-            else:
-                db_url = _build_db_url(cfg)
-                return _insert_df(db_url, table_name, df, if_exists)
-        except Exception as e:
-            attempt += 1
-            logger.error("[Attempt %d] Insert failed: %s", attempt, e)
-            if attempt < max_retries:
-                logger.info("Retrying insert in 3 seconds...")
-                time.sleep(3)
-            else:
-                logger.error("Insert failed after %d attempts")
-                raise
+    key, _ = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
+
+    def _attempt():
+        _, engine = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
+        return _execute_sql(engine, query, return_result=return_result, scalar=scalar, params=params)
+
+    return run_with_retry(
+        _attempt,
+        policy=retry_policy,
+        max_attempts=max_retries,
+        on_error=_retry_hook(key),
+        label="Query",
+    )
+
+def _insert_data(df, table_name, if_exists='replace',bAngelmanResult=True, asconnect_env=None, retry_policy=None):
+    key, _ = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
+
+    def _attempt():
+        _, engine = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
+        return _insert_df(engine, table_name, df, if_exists)
+
+    return run_with_retry(
+        _attempt,
+        policy=retry_policy,
+        on_error=_retry_hook(key),
+        label=f"Insert into {table_name}",
+    )
+
+def _bulk_insert_data(df, table_name, *, mode=None, batch_size=None, ciphertext=(), bAngelmanResult=True, asconnect_env=None, retry_policy=None):
+    """
+    Charge df dans la table déjà créée par son script DDL (types conservés), cf. tools.bulk_load.
+    ciphertext: colonnes chiffrées (spec), élargies si la DDL ne peut pas contenir les jetons.
+    Une seule transaction par tentative: rejouable après un rollback.
+    """
+    key, _ = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
+    mode = (mode or BULK_DEFAULT_MODE).lower()
+    keys = [key]
+    if mode == "load_data":
+        # LOAD DATA passe par l'engine ":infile": c'est lui qu'il faut jeter s'il perd sa connexion
+        keys.append(_get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env, local_infile=True)[0])
+
+    def _attempt():
+        _, engine = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env)
+        infile_engine = None
+        if mode == "load_data":
+            _, infile_engine = _get_engine(bAngelmanResult=bAngelmanResult, asconnect_env=asconnect_env, local_infile=True)
+        return bulk_load(engine, table_name, df, mode=mode, batch_size=batch_size, infile_engine=infile_engine,
+                         ciphertext=ciphertext)
+
+    return run_with_retry(
+        _attempt,
+        policy=retry_policy,
+        on_error=_retry_hook(*keys),
+        label=f"Bulk load into {table_name}",
+    )
 
 # ----- update_log utilitaires -----
-def _create_update_log_table_if_not_exists(bAngelmanResult=True):
-    query = """
+_UPDATE_LOG_DDL = """
     CREATE TABLE IF NOT EXISTS update_log (
       table_name VARCHAR(255) PRIMARY KEY,
       updated_at DATETIME
     )
     """
-    _run_query(query,bAngelmanResult=bAngelmanResult)
+
+def _create_update_log_table_if_not_exists(bAngelmanResult=True):
+    _run_query(_UPDATE_LOG_DDL,bAngelmanResult=bAngelmanResult)
     logger.info("Create Table `update_log` if not exists.")
 
+def _upsert_update_log(conn, table_name: str, ts: str) -> None:
+    """Une seule requête: INSERT ... ON DUPLICATE KEY UPDATE (MySQL) / ON CONFLICT (SQLite)."""
+    if conn.dialect.name == "mysql":
+        sql = """
+            INSERT INTO update_log (table_name, updated_at) VALUES (:t, :ts)
+            ON DUPLICATE KEY UPDATE updated_at = :ts
+        """
+    else:
+        sql = """
+            INSERT INTO update_log (table_name, updated_at) VALUES (:t, :ts)
+            ON CONFLICT(table_name) DO UPDATE SET updated_at = excluded.updated_at
+        """
+    conn.execute(text(sql), {"t": table_name, "ts": ts})
+
 def _log_table_update(table_name: str,bAngelmanResult:bool):
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     logger.info("Trying to log update for %s at %s", table_name, now)
 
-    # Vérifie si la ligne existe
-    exists_sql = text("""
-        SELECT COUNT(*) FROM update_log WHERE table_name = :t
-    """)
-    count = _run_query(exists_sql, scalar=True, params={"t": table_name},bAngelmanResult=bAngelmanResult) or 0
-
-    if count == 0:
-        insert_sql = text("""
-            INSERT INTO update_log (table_name, updated_at)
-            VALUES (:t, :ts)
-        """)
-        _run_query(insert_sql, params={"t": table_name, "ts": now}, bAngelmanResult=bAngelmanResult)
-        logger.info("Inserted new row for %s in update_log.", table_name)
-    else:
-        update_sql = text("""
-            UPDATE update_log SET updated_at = :ts WHERE table_name = :t
-        """)
-        _run_query(update_sql, params={"ts": now, "t": table_name},bAngelmanResult=bAngelmanResult)
-        logger.info("Updated row for %s in update_log.", table_name)
+    def _worker(conn):
+        conn.execute(text(_UPDATE_LOG_DDL))
+        _upsert_update_log(conn, table_name, now)
+
+    # même connexion, même transaction (plus de SELECT COUNT puis INSERT/UPDATE séparés)
+    _run_in_transaction_with_conn(_worker, bAngelmanResult=bAngelmanResult)
+    logger.info("Logged update for %s in update_log.", table_name)
+
+def _record_run(run, bAngelmanResult=True):
+    """Enregistre le run dans export_run (tools.export_ledger). Ne fait jamais échouer l'export."""
+    try:
+        _run_in_transaction_with_conn(lambda conn: ledger.insert_run(conn, run), bAngelmanResult=bAngelmanResult)
+    except Exception as e:
+        logger.warning("export_run: run %s de %s non enregistré (%s)", run.run_id, run.table_name, e)
 
 # ----- Export générique -----
-def export_Table(table_name, sql_script, reader, encrypt=True, bAngelmanResult=True):
+def _table_exists(table_name, bAngelmanResult=True) -> bool:
+    key, _ = _get_engine(bAngelmanResult=bAngelmanResult)
+
+    def _attempt():
+        _, engine = _get_engine(bAngelmanResult=bAngelmanResult)
+        return staged.table_exists(engine, table_name)
+
+    return run_with_retry(_attempt, on_error=_retry_hook(key), label=f"Exists {table_name}")
+
+def _count_rows(table_name, bAngelmanResult=True) -> int:
+    return int(_run_query(text(f"SELECT COUNT(*) FROM `{table_name}`"), scalar=True, bAngelmanResult=bAngelmanResult) or 0)
+
+def _publish_inplace(df, table_name, ddl, table_exists, bAngelmanResult=True, run=None, ciphertext=()):
+    """Ancien mode: DROP -> CREATE -> INSERT (table absente/vide pendant le chargement)."""
+    if table_exists:
+        logger.info("--- Drop Table.")
+        _run_query(text(f"DROP TABLE `{table_name}`"),bAngelmanResult=bAngelmanResult)
+    logger.info("--- Create Table.")
+    _run_query(ddl,bAngelmanResult=bAngelmanResult)
+    logger.info("--- Insert data into Table.")
+    with ledger.stage(run, "insert"):
+        _bulk_insert_data(df, table_name, ciphertext=ciphertext, bAngelmanResult=bAngelmanResult)
+
+def _publish_staged(df, table_name, ddl, bAngelmanResult=True, run=None, ciphertext=()):
+    """
+    Chargement dans <table>__staging, validation, puis RENAME atomique (cf. tools.staged_publish).
+    La table live n'est jamais vide; l'ancienne génération reste dans <table>__prev.
+    """
+    shadow = staged.staging_name(table_name)
+    _, engine = _get_engine(bAngelmanResult=bAngelmanResult)
+    staged.drop_if_exists(engine, shadow)   # reste d'un export interrompu
+    try:
+        logger.info("--- Create Table %s.", shadow)
+        _run_query(staged.staging_ddl(ddl, table_name),bAngelmanResult=bAngelmanResult)
+        logger.info("--- Insert data into %s.", shadow)
+        with ledger.stage(run, "insert"):
+            _bulk_insert_data(df, shadow, ciphertext=ciphertext, bAngelmanResult=bAngelmanResult)
+
+        loaded = _count_rows(shadow, bAngelmanResult=bAngelmanResult)
+        if loaded != len(df):
+            raise RuntimeError(f"{shadow}: {loaded} lignes chargées pour {len(df)} attendues")
+
+        logger.info("--- Swap %s -> %s.", shadow, table_name)
+        with ledger.stage(run, "swap"):
+            staged.swap_in(engine, table_name)
+    except Exception:
+        # la table live n'a pas bougé: on ne laisse pas traîner la table fantôme
+        try:
+            staged.drop_if_exists(engine, shadow)
+        except Exception as e:
+            logger.warning("Impossible de supprimer %s: %s", shadow, e)
+        raise
+
+def _export_incremental(df, table_name, key_columns, fps, encrypt=True, bAngelmanResult=True):
+    """
+    Applique seulement le diff (tools.incremental_export) en UNE transaction.
+    fps: empreintes calculées sur le clair. Seules les lignes à écrire sont chiffrées,
+    avec le spec enregistré de la table live (tools.crypto_spec_registry) pour rester
+    cohérent avec les lignes déjà en place, à défaut inféré sur tout le DataFrame.
+    Retourne (RowDiff, spec); IncrementalUnavailable / ColumnMismatch -> export complet.
+    """
+    inferred = None
+
+    def _worker(conn):
+        nonlocal inferred
+        incr.ensure_fingerprint_table(conn)
+        old = incr.load_fingerprints(conn, table_name)
+        live = conn.exec_driver_sql(f"SELECT COUNT(*) FROM `{table_name}`").scalar()
+        if not old or len(old) != live:
+            raise incr.IncrementalUnavailable(f"{len(old)} empreintes pour {live} lignes dans {table_name}")
+        spec = {}
+        if encrypt:
+            spec = spec_registry.lookup(conn, table_name, spec_registry.table_columns(conn, table_name))
+            if spec is None:
+                if inferred is None:
+                    inferred = infer_crypto_spec(df)
+                spec = inferred
+        diff = incr.diff_fingerprints(fps, old)
+        if not diff.empty:
+            mask = fps["key_hash"].isin(set(diff.added) | set(diff.changed)).values
+            sub = df[mask]
+            stored = encrypt_dataframe(sub, spec) if spec else sub
+            incr.apply_diff(conn, table_name, list(key_columns), diff, fps[mask], stored, old, ciphertext=list(spec))
+        return diff, spec
+
+    return _run_in_transaction_with_conn(_worker, bAngelmanResult=bAngelmanResult)
+
+def _forget_fingerprints(table_name, bAngelmanResult=True):
+    """Avant une publication complète: si l'écriture des nouvelles empreintes échoue, le prochain incrémental sera complet."""
+    _run_in_transaction_with_conn(lambda conn: incr.delete_fingerprints(conn, table_name), bAngelmanResult=bAngelmanResult)
+
+def _load_profile(table_name, bAngelmanResult=True):
+    return _run_in_transaction_with_conn(lambda conn: drift.load_profile(conn, table_name), bAngelmanResult=bAngelmanResult)
+
+def _store_metadata(table_name, run, *, spec, profile=None, fingerprints=None, new_generation=False, bAngelmanResult=True):
+    """
+    Métadonnées de la génération publiée, en UNE transaction (tout ou rien):
+      - fingerprints (fps, stored, key_columns): base du prochain export incrémental (export complet)
+      - spec de chiffrement, relu tel quel par les lectures; new_generation (staged): les specs
+        de la génération sortante passent sous <table>__prev
+      - profile: référence du garde-fou de dérive au prochain export
+    La table est déjà publiée: comme _record_run, ne fait jamais échouer l'export.
+    """
+    def _worker(conn):
+        if fingerprints is not None:
+            fps, stored, key_columns = fingerprints
+            incr.ensure_fingerprint_table(conn)
+            incr.replace_fingerprints(conn, table_name, fps, stored, list(key_columns))
+        if new_generation:
+            spec_registry.retire_to_previous(conn, table_name)
+        spec_registry.save_spec(conn, table_name, spec, run.run_id)
+        if profile is not None:
+            drift.save_profile(conn, table_name, profile, run.run_id)
+
+    try:
+        _run_in_transaction_with_conn(_worker, bAngelmanResult=bAngelmanResult)
+    except Exception as e:
+        spec_registry.invalidate(table_name)
+        logger.error("Métadonnées de %s non enregistrées (run %s): %s. Prochain export complet, "
+                     "lectures sur le spec précédent ou par inférence.", table_name, run.run_id, e)
+
+def _forget_generation(conn, table_name):
+    incr.delete_fingerprints(conn, table_name)
+    drift.delete_profile(conn, table_name)
+
+def rollback_table(table_name, bAngelmanResult=True):
+    """
+    Republie la génération précédente (<table>__prev) d'un export staged.
+    Empreintes et profil décrivaient la génération retirée: effacés AVANT l'échange (le
+    prochain export est complet, sans référence de dérive); les specs de chiffrement
+    sont échangés avec ceux de __prev juste après.
+    """
+    _, engine = _get_engine(bAngelmanResult=bAngelmanResult)
+    _run_in_transaction_with_conn(lambda conn: _forget_generation(conn, table_name), bAngelmanResult=bAngelmanResult)
+    staged.rollback(engine, table_name)
+    _run_in_transaction_with_conn(lambda conn: spec_registry.swap_with_previous(conn, table_name), bAngelmanResult=bAngelmanResult)
+    _log_table_update(table_name,bAngelmanResult=bAngelmanResult)
+
+def export_Table(table_name, sql_script, reader, encrypt=True, bAngelmanResult=True, publish=None, key_columns=("id",), drift_config=None):
     """
     - reader.readData() -> DataFrame
     - sql_script: nom de fichier SQL à exécuter pour (re)créer la table
+    - publish: "staged" | "inplace" | "incremental" (défaut: EXPORT_PUBLISH_MODE, "staged")
+    - key_columns: clé métier des empreintes de lignes (mode incremental)
+    - drift_config: seuils du garde-fou de dérive (tools.drift_guard.DriftConfig, défaut: from_env())
+    Retourne un rapport {"mode", "added", "changed", "removed", "unchanged"} (None si l'export est refusé).
+    Chaque appel est tracé dans export_run (tools.export_ledger).
     """
+    publish = (publish or PUBLISH_MODE).lower()
+    run = ledger.ExportRun(table_name, source=ledger.reader_source(reader), publish_mode=publish)
+    _, engine = _get_engine(bAngelmanResult=bAngelmanResult)
     try:
-        start = time.time()
-        logger.info("--- Reading data for %s", table_name)
+        with run.count_bytes(engine):
+            report = _export_table(table_name, sql_script, reader, run, encrypt=encrypt,
+                                   bAngelmanResult=bAngelmanResult, publish=publish, key_columns=key_columns,
+                                   drift_config=drift_config or drift.DriftConfig.from_env())
+        if report is not None:
+            run.finish("ok")
+        else:
+            run.finish("rejected", run.rejection)
+        return report
+
+    except Exception as e:
+        run.finish("error", e)
+        logger.error("An error occurred in export_Table for %s: %s", table_name, e)
+        raise
+    finally:
+        _record_run(run, bAngelmanResult=bAngelmanResult)
+
+def _export_table(table_name, sql_script, reader, run, *, encrypt, bAngelmanResult, publish, key_columns, drift_config):
+    logger.info("--- Reading data for %s", table_name)
+    with run.stage("read"):
         df = reader.readData()
+    run.rows_read = int(df.shape[0])
+
+    script_path = os.path.join(SQL_DIR, sql_script)
+    with open(script_path, "r", encoding="utf-8") as f:
+        ddl = f.read()
 
+    guard = drift_config.mode != "off"
+    if guard:
+        # profil sur le clair, AVANT fillna (sinon les nulls deviennent "None" / 0.0)
+        with run.stage("validate"):
+            profile = drift.profile_dataframe(df, drift_config.category_columns)
+
+    with run.stage("fillna"):
         # Normalisations simples
         df = df.replace([np.inf, -np.inf], np.nan)
         # pandas >= 2 : categories -> object avant to_sql
@@ -361,63 +512,90 @@ def export_Table(table_name, sql_script, reader, encrypt=True, bAngelmanResult=T
             elif pd.api.types.is_object_dtype(df[col]):
                 df[col] = df[col].fillna("None")
 
-        current_count = int(df.shape[0])
-
-        # Table existe ?
-        table_exists = bool(
-            _run_query(
-                text("""
-                    SELECT COUNT(*) FROM information_schema.tables 
-                    WHERE table_schema = DATABASE() AND table_name = :t
-                """),
-                scalar=True,
-                params={"t": table_name},
-                bAngelmanResult=bAngelmanResult
-            ) or 0
+    current_count = int(df.shape[0])
+
+    # Table existe ?
+    table_exists = _table_exists(table_name, bAngelmanResult=bAngelmanResult)
+
+    previous_count = 0
+    if table_exists:
+        previous_count = _count_rows(table_name, bAngelmanResult=bAngelmanResult)
+
+    if table_exists and current_count < 0.9 * previous_count:
+        logger.warning("--- Data check failed. Keeping previous version.")
+        run.rows_rejected = current_count
+        run.rejection = f"volume: {current_count} lignes < 90% de {previous_count}"
+        send_email_alert(
+            f"Alert about the Table {table_name}",
+            f"Hi,\n\nWe decided to keep the previous database.\nCurrent Version lines: {current_count}\nPrevious Version Lines: {previous_count}",
         )
+        return None
 
-        previous_count = 0
+    if guard:
+        with run.stage("drift"):
+            previous = _load_profile(table_name, bAngelmanResult=bAngelmanResult) if table_exists else None
+            drift_report = drift.validate(profile, previous, table_name=table_name, config=drift_config, ddl=ddl)
+            try:
+                drift.enforce(drift_report, drift_config)
+            except drift.DriftViolation:
+                logger.warning("--- Drift check failed. Keeping previous version.")
+                run.rows_rejected = current_count
+                run.rejection = drift_report.to_json()
+                send_email_alert(
+                    f"Alert about the Table {table_name}",
+                    f"Hi,\n\nWe decided to keep the previous database (data drift).\n\n{drift_report.to_json(indent=2)}",
+                )
+                return None
+
+    logger.info("--- Data validated.")
+    # Empreintes sur le clair (avant chiffrement): base du mode incrémental
+    try:
+        fps = incr.row_fingerprints(df, list(key_columns))
+    except incr.IncrementalUnavailable as e:
+        logger.info("--- Pas d'empreintes pour %s: %s", table_name, e)
+        fps = None
+
+    report = None
+    spec = {}   # {} = rien de chiffré (encrypt=False)
+    if publish == "incremental" and fps is not None and table_exists:
+        try:
+            # diff + chiffrement des seules lignes écrites: compté dans "insert"
+            with run.stage("insert"):
+                diff, spec = _export_incremental(df, table_name, key_columns, fps, encrypt=encrypt, bAngelmanResult=bAngelmanResult)
+            report = {"mode": "incremental", **diff.counts()}
+            run.rows_written = len(diff.added) + len(diff.changed) + len(diff.removed)
+        except (incr.IncrementalUnavailable, ColumnMismatch) as e:
+            logger.warning("--- Incrémental impossible pour %s (%s): export complet.", table_name, e)
+
+    if report is None:
         if table_exists:
-            previous_count = int(
-                _run_query(
-                    text(f"SELECT COUNT(*) FROM `{table_name}`"),
-                    scalar=True,
-                    bAngelmanResult=bAngelmanResult
-                ) or 0
-            )
-
-        if table_exists and current_count < 0.9 * previous_count:
-            logger.warning("--- Data check failed. Keeping previous version.")
-            send_email_alert(
-                f"Alert about the Table {table_name}",
-                f"Hi,\n\nWe decided to keep the previous database.\nCurrent Version lines: {current_count}\nPrevious Version Lines: {previous_count}",
-            )
+            _forget_fingerprints(table_name, bAngelmanResult=bAngelmanResult)
+        if encrypt:
+            with run.stage("encrypt"):
+                # spec inféré une fois ici, enregistré après publication pour les lectures
+                spec = infer_crypto_spec(df)
+                encrypt_dataframe(df, spec, inplace=True)
+
+        if publish == "inplace":
+            _publish_inplace(df, table_name, ddl, table_exists, bAngelmanResult=bAngelmanResult, run=run, ciphertext=list(spec))
         else:
-            logger.info("--- Data validated.")
-            # (Re)crée la table à partir du script
-            if table_exists:
-                logger.info("--- Drop Table.")
-                _run_query(text(f"DROP TABLE `{table_name}`"),bAngelmanResult=bAngelmanResult)
+            _publish_staged(df, table_name, ddl, bAngelmanResult=bAngelmanResult, run=run, ciphertext=list(spec))
+        report = {"mode": "inplace" if publish == "inplace" else "staged",
+                  "added": current_count, "changed": 0, "removed": previous_count, "unchanged": 0}
+        run.rows_written = current_count
 
-            script_path = os.path.join(SQL_DIR, sql_script)
-            with open(script_path, "r", encoding="utf-8") as f:
-                logger.info("--- Create Table.")
-                _run_query(f.read(),bAngelmanResult=bAngelmanResult)
+    _store_metadata(table_name, run, spec=spec, profile=profile if guard else None,
+                    fingerprints=(fps, df, key_columns) if report["mode"] != "incremental" and fps is not None else None,
+                    new_generation=report["mode"] == "staged" and table_exists, bAngelmanResult=bAngelmanResult)
 
-            if encrypt:
-                encrypt_dataframe_auto(df, return_spec=True,inplace=True)
-            logger.info("--- Insert data into Table.")
-            _insert_data(df, table_name,bAngelmanResult=bAngelmanResult)
+    run.publish_mode = report["mode"]
+    logger.info("--- %s: %s", table_name, report)
+    if report["mode"] != "incremental" or run.rows_written:
+        logger.info("--- Update Log")
+        _log_table_update(table_name,bAngelmanResult=bAngelmanResult)
 
-            _create_update_log_table_if_not_exists(bAngelmanResult=bAngelmanResult)
-            logger.info("--- Update Log")
-            _log_table_update(table_name,bAngelmanResult=bAngelmanResult)
-
-            logger.info("Execution time for %s: %.2fs", table_name, time.time() - start)
-
-    except Exception as e:
-        logger.error("An error occurred in export_Table for %s: %s", table_name, e)
-        raise
+    logger.info("Execution time for %s: %.2fs", table_name, run.elapsed_s)
+    return report
 
 # ----- Debug -----
 def _debug_database_name(DATABASE_URL):
@@ -432,22 +610,58 @@ def _debug_database_name(DATABASE_URL):
         engine.dispose()
 
 # ----- Lecture simple -----
-def readTable(table_name: str,bAngelmanResult=True) -> pd.DataFrame:
+def _quote_ident(name: str) -> str:
+    return "`" + str(name).replace("`", "``") + "`"
+
+def _select_sql(table_name: str, columns=None, where=None):
+    cols = ", ".join(_quote_ident(c) for c in columns) if columns else "*"
+    sql = f"SELECT {cols} FROM {_quote_ident(table_name)}"
+    if where:
+        sql += f" WHERE {where}"
+    return text(sql)
+
+def _iter_table_chunks(stmt, params, chunksize: int, bAngelmanResult=True):
+    """
+    Générateur de DataFrames via un curseur serveur (stream_results):
+    la mémoire reste bornée par UN chunk, la connexion est rendue au pool en fin d'itération.
+    """
+    _, engine = _get_engine(bAngelmanResult=bAngelmanResult)
+    with engine.connect() as conn:
+        res = conn.execution_options(stream_results=True, max_row_buffer=chunksize).execute(stmt, params or {})
+        cols = list(res.keys())
+        for part in res.partitions(chunksize):
+            yield pd.DataFrame.from_records(part, columns=cols)
+
+def readTable(table_name: str, bAngelmanResult=True, *, columns=None, where=None, params=None, chunksize=None):
+    """
+    Lit une table dans un DataFrame.
+    - columns: liste des colonnes à lire (défaut: toutes). Éviter de ramener les BLOB inutiles (photo...)
+    - where: prédicat SQL optionnel avec bind params (ex: "country_code = :cc"), valeurs dans params
+    - chunksize: si fourni, retourne un GÉNÉRATEUR de DataFrames de chunksize lignes max
+      (curseur côté serveur: mémoire bornée par un chunk). Les erreurs sont alors relancées.
+    """
+    stmt = _select_sql(table_name, columns, where)
+    if chunksize:
+        logger.info("Read Table %s (chunks de %d lignes)", table_name, chunksize)
+        return _iter_table_chunks(stmt, params, int(chunksize), bAngelmanResult=bAngelmanResult)
     try:
         logger.info("Read Table %s", table_name)
-        rows = _run_query(text(f"SELECT * FROM `{table_name}`"), return_result=True, bAngelmanResult=bAngelmanResult)
+        rows = _run_query(stmt, params=params, return_result=True, bAngelmanResult=bAngelmanResult)
         if not rows:
-            return pd.DataFrame()
-        # Compat SQLAlchemy 1.4 / 2.0
-        try:
-            data = [row._mapping for row in rows]
-        except AttributeError:
-            data = [dict(row) for row in rows]
-        return pd.DataFrame(data)
+            return pd.DataFrame(columns=list(columns) if columns else None)
+        return pd.DataFrame.from_records(rows, columns=list(rows[0]._fields))
     except Exception as e:
         logger.error("Erreur lors de la lecture de la table %s: %s", table_name, e)
         return pd.DataFrame()
 
+def load_crypto_spec(table_name: str, columns, bAngelmanResult=True):
+    """
+    Spec de chiffrement enregistré par export_Table pour une table lue avec ces colonnes
+    (liste d'un SELECT *). None si inconnu ou schéma changé: à ré-inférer. Caché.
+    """
+    _, engine = _get_engine(bAngelmanResult=bAngelmanResult)
+    return spec_registry.lookup(engine, table_name, columns)
+
 # -----------------------------
 #  SQL helpers (DDL)
 # -----------------------------